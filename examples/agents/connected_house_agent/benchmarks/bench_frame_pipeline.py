@@ -0,0 +1,213 @@
+"""
+Time to pass one minute of camera frames from GetFrames to ProcessFrames.
+
+Runs ``process_frames`` of the get_frames function and ``encode_images`` of the
+process_frames function against a local S3 stand-in: an HTTP server that
+stores objects in memory and waits ``--latency-ms`` before every response, like
+an S3 round trip. No AWS credentials or network access are needed.
+
+Frames are PNGs of a still scene with sensor noise, in which a square moves
+during ``--active`` of the minute, so dropping unchanged frames can be
+compared with sending all of them.
+
+Usage:
+    pip install -r functions/process_camera_streams/get_frames/requirements.txt
+    python benchmarks/bench_frame_pipeline.py --frames 20 --active 0.2 --workers 1 8
+"""
+
+import argparse
+import base64
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+FUNCTIONS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "functions",
+    "process_camera_streams",
+)
+
+
+class S3StandIn(BaseHTTPRequestHandler):
+    """PutObject and GetObject on objects kept in memory."""
+
+    protocol_version = "HTTP/1.1"
+    objects = dict()
+    latency = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.lock:
+            S3StandIn.requests += 1
+            self.objects[self.path] = body
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("ETag", '"0"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        with self.lock:
+            S3StandIn.requests += 1
+            body = self.objects.get(self.path)
+        time.sleep(self.latency)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_function(name):
+    # Lambda runs the handler with its function directory on the path
+    sys.path.insert(0, os.path.join(FUNCTIONS, name))
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(FUNCTIONS, name, "app.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_frames(count: int, width: int, height: int, active: float):
+    rng = np.random.default_rng(0)
+    scene = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    scene = scene.repeat(8, axis=0).repeat(8, axis=1).astype(np.int16)
+    moving = range(count // 4, count // 4 + round(count * active))
+    side = height // 4
+
+    start = datetime.now() - timedelta(minutes=1)
+    frames = list()
+    for index in range(count):
+        pixels = scene + rng.integers(-3, 4, scene.shape)
+        if index in moving:
+            left = (index - moving.start) * (width - side) // max(len(moving), 1)
+            pixels[side : 2 * side, left : left + side] = 255
+        png = io.BytesIO()
+        Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(png, "PNG")
+        frames.append(
+            {
+                "TimeStamp": start + timedelta(seconds=3 * index),
+                "ImageContent": base64.b64encode(png.getvalue()).decode("utf-8"),
+            }
+        )
+    return frames
+
+
+def run(
+    get_frames,
+    process_frames,
+    frames,
+    workers: int,
+    inline_bytes: int,
+    deduplicate: bool,
+):
+    get_frames.UPLOAD_WORKERS = workers
+    get_frames.INLINE_FRAMES_MAX_BYTES = inline_bytes
+    get_frames.DEDUPLICATE_FRAMES = deduplicate
+    get_frames.last_thumbnails.clear()
+    process_frames.DOWNLOAD_WORKERS = workers
+    S3StandIn.requests = 0
+
+    start = time.perf_counter()
+    frame_groups = get_frames.process_frames(frames, "kitchen")
+    upload = time.perf_counter() - start
+
+    model_frames = 0
+    start = time.perf_counter()
+    for group in frame_groups:
+        if group[0].get("unchanged"):
+            continue
+        encoded_images = process_frames.encode_images(group)
+        assert len(encoded_images) == len(group)
+        model_frames += len(encoded_images)
+    download = time.perf_counter() - start
+    get_frames.metrics.clear_metrics()
+
+    payload = len(json.dumps(frame_groups))
+    label = "inline" if inline_bytes else "s3"
+    print(
+        f"{label:>6} {'yes' if deduplicate else 'no':>5} {workers:>7}"
+        f" {upload * 1000:>9.1f} {download * 1000:>11.1f} {S3StandIn.requests:>8}"
+        f" {model_frames:>6}/{len(frames):<3} {payload / 1024:>10.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=25)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=120)
+    parser.add_argument(
+        "--active", type=float, default=0.2, help="Fraction of frames with movement"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--inline-bytes", type=int, default=200 * 1024)
+    args = parser.parse_args()
+
+    S3StandIn.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), S3StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update(
+        AWS_ENDPOINT_URL_S3=f"http://127.0.0.1:{server.server_port}",
+        AWS_ACCESS_KEY_ID="testing",
+        AWS_SECRET_ACCESS_KEY="testing",
+        AWS_DEFAULT_REGION="us-west-2",
+        AWS_REQUEST_CHECKSUM_CALCULATION="when_required",
+        AWS_RESPONSE_CHECKSUM_VALIDATION="when_required",
+        FRAMES_BUCKET="frames",
+        DELIVERY_STREAM="camera-logs",
+        MODEL_ID="amazon.nova-lite-v1:0",
+        POWERTOOLS_LOG_LEVEL="WARNING",
+        POWERTOOLS_METRICS_NAMESPACE="connected-house",
+    )
+    get_frames = load_function("get_frames")
+    process_frames = load_function("process_frames")
+    frames = make_frames(args.frames, args.width, args.height, args.active)
+
+    print(
+        f"{'mode':>6} {'dedup':>5} {'workers':>7} {'upload ms':>9}"
+        f" {'download ms':>11} {'S3 calls':>8} {'model frames':>10}"
+        f" {'payload KB':>10}"
+    )
+    for workers in args.workers:
+        run(get_frames, process_frames, frames, workers, 0, deduplicate=False)
+    for workers in args.workers:
+        run(get_frames, process_frames, frames, workers, 0, deduplicate=True)
+    for deduplicate in (False, True):
+        run(
+            get_frames,
+            process_frames,
+            frames,
+            max(args.workers),
+            args.inline_bytes,
+            deduplicate,
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,44 @@ import boto3
 import base64
 import os
 
-from io import BytesIO
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from aws_lambda_powertools import Logger
+from itertools import repeat
+from aws_lambda_powertools import Logger, Metrics
+from aws_lambda_powertools.metrics import MetricUnit
 
+import numpy as np
+
+from frame_filter import changed_frames, thumbnail
 
 # Environment variables
 FRAMES_BUCKET = os.environ["FRAMES_BUCKET"]
 SAMPLING_INTERVAL_MS = 3000  # 3 seconds
 FRAMES_PER_GROUP = 25
+UPLOAD_WORKERS = 8
+# Frames are passed to ProcessFrames in the state machine payload instead of
+# through S3 while their base64 content fits in this many bytes in total.
+# Step Functions payloads are limited to 256 KB. 0 always uses S3.
+INLINE_FRAMES_MAX_BYTES = int(os.environ.get("INLINE_FRAMES_MAX_BYTES", "0"))
+# Frames that changed in less than this fraction of their thumbnail since the
+# last kept frame are not sent to the model.
+DEDUPLICATE_FRAMES = os.environ.get("DEDUPLICATE_FRAMES", "true").lower() == "true"
+FRAME_CHANGE_THRESHOLD = float(os.environ.get("FRAME_CHANGE_THRESHOLD", "0.005"))
 
 # Initialize AWS clients
-s3_client = boto3.client("s3")
+s3_client = boto3.client("s3", config=Config(max_pool_connections=UPLOAD_WORKERS))
 kvs_client = boto3.client("kinesisvideo")
 
 logger = Logger()
+metrics = Metrics()
+
+# Timestamp of the last frame and thumbnail of the last kept frame of each
+# stream, kept across warm invocations to compare the next minute of frames with.
+last_thumbnails = {}
 
 
+@metrics.log_metrics
 def lambda_handler(event, context):
     try:
         stream_name = event["Payload"]["streamName"]
@@ -79,40 +100,123 @@ def get_frames(client, stream_name, start_time, end_time):
 
 
 def process_frames(frames, stream_name):
-    """Process and group frames."""
+    """Process and group frames, uploading the changed ones in parallel.
+
+    A group in which no frame changed is replaced by a single entry marked
+    unchanged, which ProcessFrames reports without calling the model.
+    """
     logger.info(f"Retrieved {len(frames)} images")
 
-    frame_groups = []
-    current_group = []
+    frames = [frame for frame in frames if "Error" not in frame]
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        changed = find_changed_frames(executor, frames, stream_name)
+        kept_frames = [frame for frame, keep in zip(frames, changed) if keep]
+
+        inline = []
+        inline_budget = INLINE_FRAMES_MAX_BYTES
+        for frame in kept_frames:
+            size = len(frame["ImageContent"])
+            inline.append(size <= inline_budget)
+            if inline[-1]:
+                inline_budget -= size
+
+        frame_data = iter(
+            executor.map(process_single_frame, kept_frames, repeat(stream_name), inline)
+        )
+
+        frame_groups = []
+        for start in range(0, len(frames), FRAMES_PER_GROUP):
+            kept = sum(changed[start : start + FRAMES_PER_GROUP])
+            group = [next(frame_data) for _ in range(kept)]
+            if not group:
+                group = [
+                    {
+                        "timestamp_string": frames[start]["TimeStamp"].isoformat(),
+                        "stream_name": stream_name,
+                        "unchanged": True,
+                    }
+                ]
+            frame_groups.append(group)
+
+    add_frame_metrics(stream_name, frames, kept_frames, frame_groups)
+    return frame_groups
 
-    for frame in frames:
-        if "Error" in frame:
-            continue
 
-        frame_data = process_single_frame(frame, stream_name)
-        current_group.append(frame_data)
+def find_changed_frames(executor, frames, stream_name):
+    """Which frames changed since the last kept frame."""
+    if not DEDUPLICATE_FRAMES or not frames:
+        return [True] * len(frames)
 
-        if len(current_group) == FRAMES_PER_GROUP:
-            frame_groups.append(current_group)
-            current_group = []
+    thumbnails = np.stack(
+        list(
+            executor.map(
+                lambda frame: thumbnail(base64.b64decode(frame["ImageContent"])),
+                frames,
+            )
+        )
+    )
 
-    # Add any remaining frames as a group
-    if current_group:
-        frame_groups.append(current_group)
+    # The last kept frame of this execution environment is only a valid
+    # reference when its minute ended just before this minute of frames.
+    reference = None
+    previous = last_thumbnails.get(stream_name)
+    if previous is not None:
+        gap = frames[0]["TimeStamp"] - previous[0]
+        if timedelta(0) < gap <= timedelta(milliseconds=2 * SAMPLING_INTERVAL_MS):
+            reference = previous[1]
+
+    changed = changed_frames(thumbnails, FRAME_CHANGE_THRESHOLD, reference)
+    kept = np.flatnonzero(changed)
+    last_kept = thumbnails[kept[-1]] if len(kept) else reference
+    last_thumbnails[stream_name] = (frames[-1]["TimeStamp"], last_kept)
+
+    return changed.tolist()
+
+
+def add_frame_metrics(stream_name, frames, kept_frames, frame_groups):
+    dropped = len(frames) - len(kept_frames)
+    skipped_groups = sum(1 for group in frame_groups if group[0].get("unchanged"))
+    logger.info(
+        f"Kept {len(kept_frames)} of {len(frames)} frames,"
+        f" {skipped_groups} of {len(frame_groups)} groups unchanged"
+    )
 
-    return frame_groups
+    metrics.add_dimension(name="stream", value=stream_name)
+    metrics.add_metric(name="FramesSampled", unit=MetricUnit.Count, value=len(frames))
+    metrics.add_metric(name="FramesDropped", unit=MetricUnit.Count, value=dropped)
+    if frames:
+        metrics.add_metric(
+            name="FrameDropRatio",
+            unit=MetricUnit.Percent,
+            value=100 * dropped / len(frames),
+        )
+    metrics.add_metric(
+        name="GroupsSkipped", unit=MetricUnit.Count, value=skipped_groups
+    )
 
 
-def process_single_frame(frame, stream_name):
-    """Process a single frame: decode, upload to S3, and return metadata."""
-    image_data = base64.b64decode(frame["ImageContent"])
-    image_file = BytesIO(image_data)
+def process_single_frame(frame, stream_name, inline=False):
+    """Process a single frame: decode, upload to S3, and return metadata.
 
+    An inline frame keeps its base64 content in the metadata and is not
+    uploaded.
+    """
     timestamp = frame["TimeStamp"]
+    if inline:
+        # KVS returns the image base64 encoded, as the model expects it
+        return {
+            "timestamp_string": timestamp.isoformat(),
+            "image_base64": frame["ImageContent"],
+            "stream_name": stream_name,
+        }
+
+    image_data = base64.b64decode(frame["ImageContent"])
     s3_frame_key = f"frames/{timestamp.isoformat()}_{os.urandom(4).hex()}.png"
 
     try:
-        s3_client.upload_fileobj(image_file, FRAMES_BUCKET, s3_frame_key)
+        # One request per frame, frames are far below the multipart threshold
+        s3_client.put_object(Bucket=FRAMES_BUCKET, Key=s3_frame_key, Body=image_data)
     except Exception as e:
         logger.error(f"Error uploading frame to S3: {str(e)}")
         raise
@@ -0,0 +1,51 @@
+"""
+Change detection between camera frames.
+
+Frames are reduced to small grayscale thumbnails and compared with NumPy. A
+frame is kept when enough thumbnail pixels changed since the last kept frame,
+so a still scene is sent to the model once instead of every few seconds, and a
+scene that changes a little every frame is still sent once the changes add up.
+"""
+
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+THUMBNAIL_SIZE = 64
+# Gray levels a thumbnail pixel must move by to count as changed, above
+# sensor noise and compression artifacts.
+PIXEL_DELTA = 16
+
+
+def thumbnail(image_data):
+    """Grayscale THUMBNAIL_SIZE x THUMBNAIL_SIZE thumbnail of an image."""
+    with Image.open(BytesIO(image_data)) as image:
+        small = image.convert("L").resize(
+            (THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.BOX, reducing_gap=2.0
+        )
+    return np.asarray(small, dtype=np.int16)
+
+
+def changed_frames(thumbnails, threshold, reference=None):
+    """
+    Which frames changed since the last kept frame.
+
+    Args:
+        thumbnails: Array of shape (frames, size, size) from thumbnail().
+        threshold: Fraction of thumbnail pixels that must change.
+        reference: Thumbnail of the last kept frame before the first one.
+            Without it the first frame always counts as changed.
+
+    Returns:
+        Boolean array with one entry per frame.
+    """
+    changed = np.zeros(len(thumbnails), dtype=bool)
+    kept = reference
+    # Each frame is compared with the last kept one, so this walks the frames
+    # in order; the pixels of one comparison are still compared at once.
+    for index, frame in enumerate(thumbnails):
+        if kept is None or (np.abs(frame - kept) > PIXEL_DELTA).mean() > threshold:
+            changed[index] = True
+            kept = frame
+    return changed
@@ -2,16 +2,20 @@ import json
 import os
 import boto3
 import base64
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from aws_lambda_powertools import Logger
 
 # Environment variables
 FRAMES_BUCKET = os.environ["FRAMES_BUCKET"]
 DELIVERY_STREAM = os.environ["DELIVERY_STREAM"]
 MODEL_ID = os.environ["MODEL_ID"]
-
+DOWNLOAD_WORKERS = 8
+# Reported for a group in which GetFrames found no changed frame
+NO_CHANGE_DESCRIPTION = "No change since the previous report."
 
 # Initialize AWS clients
-s3_client = boto3.client("s3")
+s3_client = boto3.client("s3", config=Config(max_pool_connections=DOWNLOAD_WORKERS))
 firehose_client = boto3.client("firehose")
 bedrock_client = boto3.client("bedrock-runtime", region_name="us-west-2")
 
@@ -26,13 +30,16 @@ def lambda_handler(event, context):
         timestamp_string = payload[0]["timestamp_string"]
         stream_name = payload[0]["stream_name"]
 
-        encoded_images = [encode_image(image["s3_frame_key"]) for image in payload]
+        if payload[0].get("unchanged"):
+            description = NO_CHANGE_DESCRIPTION
+        else:
+            encoded_images = encode_images(payload)
 
-        prompt = get_prompt(stream_name)
-        model_payload = get_prompt_payload(encoded_images, prompt)
+            prompt = get_prompt(stream_name)
+            model_payload = get_prompt_payload(encoded_images, prompt)
 
-        response = invoke_model(model_payload)
-        description = get_completion_from_response(response)
+            response = invoke_model(model_payload)
+            description = get_completion_from_response(response)
 
         logger.info(f"Report for {stream_name}: {description}")
 
@@ -54,6 +61,19 @@ def lambda_handler(event, context):
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
 
 
+def encode_images(frames):
+    """Base64 images of the frames in order, downloading them in parallel."""
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        return list(executor.map(get_encoded_image, frames))
+
+
+def get_encoded_image(frame):
+    # Passed inline by GetFrames when it fit in the state machine payload
+    if "image_base64" in frame:
+        return frame["image_base64"]
+    return encode_image(frame["s3_frame_key"])
+
+
 def encode_image(s3_frame_key):
     try:
         response = s3_client.get_object(Bucket=FRAMES_BUCKET, Key=s3_frame_key)
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "functions",
+        "process_camera_streams",
+        "get_frames",
+    ),
+)
+
+from frame_filter import THUMBNAIL_SIZE, changed_frames  # noqa: E402
+
+THRESHOLD = 0.005
+
+
+def scene(count, step):
+    """Frames of a still scene in which a square brightens by ``step`` per frame."""
+    frames = np.full((count, THUMBNAIL_SIZE, THUMBNAIL_SIZE), 100, dtype=np.int16)
+    for index in range(count):
+        frames[index, :16, :16] += step * index
+    return frames
+
+
+class TestChangedFrames(unittest.TestCase):
+    def test_still_scene_is_kept_once(self):
+        self.assertEqual(
+            changed_frames(scene(5, 0), THRESHOLD).tolist(), [True] + [False] * 4
+        )
+
+    def test_slow_change_is_kept_once_it_adds_up(self):
+        # 5 gray levels per frame never passes PIXEL_DELTA between neighbours,
+        # but does against the frame kept four frames earlier.
+        changed = changed_frames(scene(9, 5), THRESHOLD)
+
+        self.assertEqual(
+            changed.tolist(),
+            [True, False, False, False, True, False, False, False, True],
+        )
+
+    def test_reference_is_the_last_kept_frame(self):
+        frames = scene(4, 5)
+
+        changed = changed_frames(frames[1:], THRESHOLD, reference=frames[0])
+
+        self.assertEqual(changed.tolist(), [False, False, False])
+        self.assertEqual(changed_frames(frames[:0], THRESHOLD).tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
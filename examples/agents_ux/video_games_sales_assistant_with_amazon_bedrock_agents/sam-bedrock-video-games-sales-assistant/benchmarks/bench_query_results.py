@@ -0,0 +1,133 @@
+"""
+Time and peak memory of serializing query results for the agent, offline.
+
+An in-memory SQLite table with the columns of the video games sales table
+stands in for PostgreSQL. Each query is serialized by the previous
+implementation (``fetchall`` and the whole list encoded again for every row
+once over the budget) and by ``serialize_rows`` from the Lambda function.
+
+Usage:
+    python benchmarks/bench_query_results.py --rows 100 1000 10000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "functions",
+        "assistant-api-postgresql-haiku-35",
+    ),
+)
+
+from query_results import MAX_RESULT_BYTES, get_size, serialize_rows  # noqa: E402
+
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+def create_database(rows: int) -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+    connection.execute(
+        "CREATE TABLE video_games_sales_units (title TEXT, console TEXT,"
+        " genre TEXT, publisher TEXT, developer TEXT, critic_score DECIMAL,"
+        " total_sales DECIMAL, release_date DATE)"
+    )
+    connection.executemany(
+        "INSERT INTO video_games_sales_units VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"Game {index}",
+                ("PS4", "XOne", "NS", "PC")[index % 4],
+                ("Action", "Sports", "Shooter", "Role-Playing")[index % 4],
+                f"Publisher {index % 50}",
+                f"Developer {index % 200}",
+                str(Decimal(index % 100) / 10),
+                str(Decimal(index % 2000) / 100),
+                date(2000 + index % 24, 1 + index % 12, 1 + index % 28).isoformat(),
+            )
+            for index in range(rows)
+        ),
+    )
+    return connection
+
+
+def previous_serializer(cursor):
+    """get_query_results before serialize_rows, without the database calls."""
+    rows = cursor.fetchall()
+    column_names = [desc[0] for desc in cursor.description]
+    records = []
+    records_to_return = []
+    for item in rows:
+        record = {}
+        for x, value in enumerate(item):
+            if type(value) is Decimal:
+                record[column_names[x]] = float(value)
+            elif isinstance(value, date):
+                record[column_names[x]] = str(value)
+            else:
+                record[column_names[x]] = value
+        records.append(record)
+    if get_size(json.dumps(records)) > MAX_RESULT_BYTES:
+        for item in records:
+            if get_size(json.dumps(records_to_return)) <= MAX_RESULT_BYTES:
+                records_to_return.append(item)
+    else:
+        records_to_return = records
+    return records_to_return, len(records)
+
+
+def streaming_serializer(cursor):
+    return serialize_rows(cursor)
+
+
+def measure(connection: sqlite3.Connection, serializer):
+    cursor = connection.cursor()
+    tracemalloc.start()
+    start = time.perf_counter()
+    cursor.execute("SELECT * FROM video_games_sales_units")
+    records, total_rows = serializer(cursor)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    cursor.close()
+    return records, total_rows, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>8} {'serializer':>10} {'kept':>6} {'bytes':>7}"
+        f" {'ms':>10} {'peak MB':>9}"
+    )
+    for rows in args.rows:
+        connection = create_database(rows)
+        for label, serializer in (
+            ("previous", previous_serializer),
+            ("streaming", streaming_serializer),
+        ):
+            records, total_rows, seconds, peak = measure(connection, serializer)
+            assert total_rows == rows
+            print(
+                f"{rows:>8} {label:>10} {len(records):>6}"
+                f" {get_size(json.dumps(records)):>7} {seconds * 1000:>10.1f}"
+                f" {peak / 1024 / 1024:>9.2f}"
+            )
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,8 @@ import os
 import psycopg2
 import uuid
 from botocore.exceptions import ClientError
-from decimal import Decimal
-from datetime import date, datetime
+from datetime import datetime
+from query_results import get_size, serialize_rows
 
 SECRET_NAME = os.environ["SECRET_NAME"]
 POSTGRESQL_HOST = os.environ["POSTGRESQL_HOST"]
@@ -13,6 +13,10 @@ DATABASE_NAME = os.environ["DATABASE_NAME"]
 QUESTION_ANSWERS_TABLE = os.environ["QUESTION_ANSWERS_TABLE"]
 AWS_REGION = os.environ["AWS_REGION"]
 
+# Kept across warm invocations of the same execution environment
+cached_secret = None
+cached_connection = None
+
 
 def get_secret(secret_name, region_name):
     # Create a Secrets Manager client
@@ -25,28 +29,46 @@ def get_secret(secret_name, region_name):
         # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
         raise e
     secret = json.loads(get_secret_value_response["SecretString"])
-    print(secret)
     return secret
 
 
 def get_postgresql_connection():
-    secret = get_secret(SECRET_NAME, AWS_REGION)
+    global cached_secret, cached_connection
+    if cached_connection is not None and not cached_connection.closed:
+        return cached_connection
+
+    if cached_secret is None:
+        cached_secret = get_secret(SECRET_NAME, AWS_REGION)
     try:
-        conn = psycopg2.connect(
+        cached_connection = psycopg2.connect(
             host=POSTGRESQL_HOST,
             database=DATABASE_NAME,
-            user=secret["username"],
-            password=secret["password"],
+            user=cached_secret["username"],
+            password=cached_secret["password"],
         )
         print("Connected to the PostgreSQL database!")
     except (Exception, psycopg2.Error) as error:
         print("Error connecting to the PostgreSQL database:", error)
+        # The password may have been rotated, read it again next time
+        cached_secret = None
+        cached_connection = None
         return False
-    return conn
+    return cached_connection
 
 
-def get_size(string):
-    return len(string.encode("utf-8"))
+def run_query(connection, sql_query):
+    # A named cursor is a server-side cursor, so rows arrive in batches
+    # instead of all at once on execute.
+    cur = connection.cursor(name="query_results")
+    try:
+        cur.execute(sql_query)
+        return serialize_rows(cur)
+    finally:
+        if not connection.closed:
+            cur.close()
+            # Queries are read-only, end the transaction so the connection can
+            # be reused by the next invocation.
+            connection.rollback()
 
 
 def get_query_results(sql_query):
@@ -57,42 +79,34 @@ def get_query_results(sql_query):
         }
 
     message = ""
-    cur = connection.cursor()
-    records = []
-    records_to_return = []
     # Execute a SQL query
     try:
-        cur.execute(sql_query)
-        rows = cur.fetchall()
-        column_names = [desc[0] for desc in cur.description]
-        for item in rows:
-            record = {}
-            for x, value in enumerate(item):
-                if type(value) is Decimal:
-                    record[column_names[x]] = float(value)
-                elif isinstance(value, date):
-                    record[column_names[x]] = str(value)
-                else:
-                    record[column_names[x]] = value
-            records.append(record)
-        if get_size(json.dumps(records)) > 24000:
-
-            for item in records:
-                if get_size(json.dumps(records_to_return)) <= 24000:
-                    records_to_return.append(item)
+        try:
+            records_to_return, total_rows = run_query(connection, sql_query)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if not connection.closed:
+                raise
+            # The cached connection was dropped while the function was idle
+            print("Reconnecting to the PostgreSQL database")
+            connection = get_postgresql_connection()
+            if connection == False:
+                return {
+                    "error": "Something went wrong connecting to the database, ask the user to try again later."
+                }
+            records_to_return, total_rows = run_query(connection, sql_query)
+        if len(records_to_return) < total_rows:
             message = (
                 "The data is too large, it has been truncated from "
-                + str(len(records))
+                + str(total_rows)
                 + " to "
                 + str(len(records_to_return))
                 + " rows."
             )
-        else:
-            records_to_return = records
 
     except (Exception, psycopg2.Error) as error:
         print("Error executing SQL query:", error)
-        connection.rollback()  # Rollback the transaction if there's an error
+        if not connection.closed:
+            connection.rollback()  # Rollback the transaction if there's an error
         return {"error": error.pgerror}
 
     if message != "":
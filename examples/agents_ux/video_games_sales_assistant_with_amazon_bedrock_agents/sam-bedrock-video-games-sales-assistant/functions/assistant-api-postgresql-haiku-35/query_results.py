@@ -0,0 +1,68 @@
+"""
+Serialization of SQL query results for the agent.
+
+Works with any DB-API cursor. Rows are read with ``fetchmany`` and each record
+is encoded once, so the size of the JSON list is known as it grows and the
+records that fit in the response budget are kept without encoding the list
+again for every row.
+"""
+
+import json
+from decimal import Decimal
+from datetime import date
+
+# Lambda responses to Bedrock Agents are limited to 25 KB.
+MAX_RESULT_BYTES = 24000
+FETCH_BATCH_SIZE = 500
+
+
+def get_size(string):
+    return len(string.encode("utf-8"))
+
+
+def to_record(column_names, row):
+    record = {}
+    for x, value in enumerate(row):
+        if type(value) is Decimal:
+            record[column_names[x]] = float(value)
+        elif isinstance(value, date):
+            record[column_names[x]] = str(value)
+        else:
+            record[column_names[x]] = value
+    return record
+
+
+def serialize_rows(cursor, max_bytes=MAX_RESULT_BYTES, batch_size=FETCH_BATCH_SIZE):
+    """
+    Read the rows of an executed cursor and keep the records whose JSON list
+    fits in max_bytes. Returns the records and the total number of rows.
+
+    Rows past the budget are fetched in batches to count them but are not
+    converted or encoded.
+    """
+    column_names = None
+    records = []
+    size = get_size("[]")
+    total_rows = 0
+    full = False
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        total_rows += len(rows)
+        if full:
+            continue
+        if column_names is None:
+            column_names = [desc[0] for desc in cursor.description]
+        for row in rows:
+            record = to_record(column_names, row)
+            # json.dumps separates list items with ", "
+            record_size = get_size(json.dumps(record))
+            if records:
+                record_size += 2
+            if size + record_size > max_bytes:
+                full = True
+                break
+            records.append(record)
+            size += record_size
+    return records, total_rows
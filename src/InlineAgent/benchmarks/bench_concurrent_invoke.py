@@ -0,0 +1,74 @@
+"""
+Throughput of ``InlineAgent.invoke`` versus the number of concurrent sessions.
+
+The agent runtime is replaced by ``FakeAgentRuntime``, which blocks like boto3
+does: the request waits ``--latency`` seconds for headers and every event
+waits ``--latency`` seconds on the socket. With a non-blocking invoke, throughput
+grows with concurrency until the stream executor is saturated.
+
+Usage:
+    python benchmarks/bench_concurrent_invoke.py --concurrency 1 10 50 100 200
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from InlineAgent import ClientPool, set_client_pool
+from InlineAgent.agent import InlineAgent
+from InlineAgent.testing import FakeAgentRuntime, chunk, fake_client_factory
+
+
+async def run(agent: InlineAgent, concurrency: int, turns: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def turn(index: int):
+        async with semaphore:
+            await agent.invoke(input_text="Hello", session_id=f"session-{index}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(index) for index in range(turns)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 10, 50, 100, 200]
+    )
+    parser.add_argument("--turns-per-session", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--chunks", type=int, default=4)
+    args = parser.parse_args()
+
+    runtime = FakeAgentRuntime(
+        [chunk("token ")] * args.chunks,
+        latency=args.latency,
+        event_latency=args.latency,
+    )
+    set_client_pool(
+        ClientPool(
+            max_connections=max(args.concurrency),
+            client_factory=fake_client_factory(runtime),
+        )
+    )
+
+    agent = InlineAgent(
+        foundation_model="benchmark",
+        instruction="You are a benchmark agent.",
+        agent_name="BenchmarkAgent",
+        profile=None,
+    )
+
+    print(f"{'concurrency':>12} {'turns':>8} {'seconds':>10} {'turns/s':>10}")
+    for concurrency in args.concurrency:
+        turns = concurrency * args.turns_per_session
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = asyncio.run(run(agent, concurrency, turns))
+        print(f"{concurrency:>12} {turns:>8} {elapsed:>10.2f} {turns / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
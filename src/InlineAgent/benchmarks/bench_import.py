@@ -0,0 +1,95 @@
+"""
+Cold import time of the SDK, measured in fresh interpreters.
+
+Each statement is run ``--runs`` times in a new ``python`` process and the
+median wall time of the import is reported together with the heavy optional
+stacks it loaded. Pass ``--budget`` to use it as a regression gate: the script
+exits with status 1 when a median exceeds the budget or when the minimal
+``InlineAgent``/``ActionGroup`` import loads OpenTelemetry, MCP, rich or
+pydantic-settings.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_import.py --budget 0.6
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "opentelemetry",
+    "openinference",
+    "mcp",
+    "rich",
+    "pydantic_settings",
+)
+
+STATEMENTS = {
+    "package": "import InlineAgent",
+    "agent": "from InlineAgent import InlineAgent, ActionGroup",
+    "observability": "from InlineAgent.observability import observe",
+}
+
+# Only the minimal statements are expected to stay clear of the heavy stacks.
+LIGHT_STATEMENTS = ("package", "agent")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(statement: str, runs: int):
+    timings, heavy = list(), list()
+    for _ in range(runs):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                PROBE.format(statement=statement, heavy=HEAVY_MODULES),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        heavy = result["heavy"]
+    return statistics.median(timings), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Fail when the median import of the minimal statements exceeds this many seconds.",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'statement':>14} {'median s':>10}  heavy modules")
+    for label, statement in STATEMENTS.items():
+        seconds, heavy = measure(statement, args.runs)
+        print(f"{label:>14} {seconds:>10.3f}  {', '.join(heavy) or '-'}")
+        if label in LIGHT_STATEMENTS:
+            if heavy:
+                failed = True
+            if args.budget is not None and seconds > args.budget:
+                failed = True
+
+    if failed:
+        print("Import budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
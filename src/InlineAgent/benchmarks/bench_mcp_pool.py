@@ -0,0 +1,97 @@
+"""
+Startup time, open file descriptors and server processes versus agent count.
+
+Every agent gets an MCP client for the local stdio echo server, either its own
+``MCPStdio`` (one process each) or a ``PooledMCPServer`` sharing one ``MCPPool``
+connection. File descriptors and child processes are read from ``/proc``, so
+run it on Linux.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_mcp_pool.py --agents 1 10 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+from InlineAgent.testing.mcp_echo_server import server_parameters
+from InlineAgent.tools import MCPPool, MCPStdio, PooledMCPServer
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def child_processes() -> int:
+    me = str(os.getpid())
+    count = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        with contextlib.suppress(OSError):
+            with open(f"/proc/{pid}/stat") as stat:
+                if stat.read().rsplit(")", 1)[1].split()[1] == me:
+                    count += 1
+    return count
+
+
+async def run(mode: str, agents: int):
+    fds = open_fds()
+    pool = MCPPool() if mode == "pooled" else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "pooled":
+            clients = await asyncio.gather(
+                *(
+                    PooledMCPServer.create(server_params=server_parameters(), pool=pool)
+                    for _ in range(agents)
+                )
+            )
+        else:
+            # MCPStdio must be cleaned up by the task that created it.
+            clients = [
+                await MCPStdio.create(server_params=server_parameters())
+                for _ in range(agents)
+            ]
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client.call_tool("echo", {"text": "hello"}) for client in clients)
+    )
+    first_call = time.perf_counter() - start
+
+    print(
+        f"{mode:>8} {agents:>7} {startup:>10.2f} {first_call * 1000:>12.1f}"
+        f" {open_fds() - fds:>8} {child_processes():>10}"
+    )
+
+    if pool is not None:
+        await pool.close()
+    for client in reversed(clients):
+        await client.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=("separate", "pooled"),
+        default=["separate", "pooled"],
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':>8} {'agents':>7} {'startup s':>10} {'calls ms':>12}"
+        f" {'new fds':>8} {'processes':>10}"
+    )
+    for mode in args.modes:
+        for agents in args.agents:
+            asyncio.run(run(mode, agents))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+MCP tool-call throughput against the local stdio echo server.
+
+Measures connecting with and without the tool schema cache, ``slow_echo``
+calls sent one at a time versus pipelined over one session with bounded
+in-flight calls, and a large multi-part result joined by ``call_tool`` versus
+read part by part with ``iter_tool_result``.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_mcp_tools.py --calls 200 --in-flight 1 8 32
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from InlineAgent.testing.mcp_echo_server import server_parameters
+from InlineAgent.tools import MCPStdio
+
+
+async def connect(**kwargs) -> MCPStdio:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await MCPStdio.create(server_params=server_parameters(), **kwargs)
+
+
+async def bench_connect(repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mcp_tools.json")
+        for label, schema_cache in (("listed", None), ("cached", path)):
+            await (await connect(schema_cache=schema_cache)).cleanup()
+            seconds = list()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                server = await connect(schema_cache=schema_cache)
+                seconds.append(time.perf_counter() - start)
+                await server.cleanup()
+            print(
+                f"connect {label:>8}: {min(seconds) * 1000:8.1f} ms (best of {repeat})"
+            )
+
+
+async def bench_calls(calls: int, in_flight: int, seconds: float):
+    server = await connect(max_in_flight=in_flight)
+    try:
+        slow_echo = server.callable_tools["slow_echo"]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(slow_echo(text=str(index), seconds=seconds) for index in range(calls))
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        await server.cleanup()
+    print(
+        f"in flight {in_flight:>4}: {calls} calls in {elapsed:6.2f} s,"
+        f" {calls / elapsed:8.1f} calls/s"
+    )
+
+
+async def bench_parts(count: int, size: int):
+    server = await connect()
+    try:
+        arguments = {"count": count, "size": size}
+        start = time.perf_counter()
+        joined = await server.call_tool("parts", arguments)
+        join_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        largest = 0
+        async for part in server.iter_tool_result("parts", arguments):
+            largest = max(largest, len(part))
+        iter_seconds = time.perf_counter() - start
+    finally:
+        await server.cleanup()
+    print(
+        f"{count} parts of {size} chars: call_tool {join_seconds * 1000:7.1f} ms"
+        f" ({len(joined)} chars joined), iter_tool_result {iter_seconds * 1000:7.1f} ms"
+        f" (largest part {largest} chars)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Connects per mode")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--call-seconds", type=float, default=0.01)
+    parser.add_argument("--parts", type=int, default=64)
+    parser.add_argument("--part-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    asyncio.run(bench_connect(args.repeat))
+    for in_flight in args.in_flight:
+        asyncio.run(bench_calls(args.calls, in_flight, args.call_seconds))
+    asyncio.run(bench_parts(args.parts, args.part_size))
+
+
+if __name__ == "__main__":
+    main()
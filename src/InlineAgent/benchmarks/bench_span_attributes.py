@@ -0,0 +1,108 @@
+"""
+Exported span attribute bytes per invocation under each attribute budget.
+
+Replays the recorded supervisor/collaborator trace (``data/multi_agent_trace.jsonl``)
+through ``ProcessL2Trace.process_trace_event`` into an in-memory exporter, once
+per ``AttributeBudget`` configuration, and reports the size of the attribute
+keys and string values that would be sent to the collector, plus the time spent
+processing the events.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_span_attributes.py --invocations 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("PRODUCE_BEDROCK_OTEL_TRACES", "true")
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from InlineAgent.observability.attributes import AttributeBudget, attribute_budget
+from InlineAgent.observability.process import ProcessL2Trace
+from InlineAgent.observability.span_manager import SpanManager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_span_manager import FIXTURE, load_trace
+
+BUDGETS = {
+    "default": dict(),
+    "truncate 1024": dict(max_length=1024),
+    "hash 1024": dict(max_length=1024, overflow="hash"),
+    "dedup": dict(dedup=True),
+    "dedup+truncate": dict(max_length=1024, dedup=True),
+}
+
+
+def replay(events, budget_kwargs, invocations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(invocations):
+        span_manager = SpanManager()
+        with attribute_budget(AttributeBudget(**budget_kwargs)):
+            for event in events:
+                ProcessL2Trace.process_trace_event(
+                    trace_data=event,
+                    span_manager=span_manager,
+                    save_traces=False,
+                    session_id=event["sessionId"],
+                    show_traces=False,
+                )
+            span_manager.end_all_spans(status_code=StatusCode.OK)
+    return time.perf_counter() - start
+
+
+def attribute_bytes(spans) -> int:
+    total = 0
+    for span in spans:
+        for key, value in span.attributes.items():
+            total += len(key.encode("utf-8"))
+            if isinstance(value, str):
+                total += len(value.encode("utf-8"))
+            elif isinstance(value, (tuple, list)):
+                total += sum(len(str(item).encode("utf-8")) for item in value)
+            else:
+                total += len(str(value).encode("utf-8"))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--trace", default=FIXTURE)
+    args = parser.parse_args()
+
+    events = load_trace(args.trace)
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    print(f"{len(events)} events per invocation, {args.invocations} invocations")
+    print(f"{'budget':>16} {'spans':>6} {'attr bytes':>12} {'ratio':>7} {'ms/inv':>8}")
+    baseline = None
+    for label, budget_kwargs in BUDGETS.items():
+        exporter.clear()
+        replay(events, budget_kwargs, 1)
+        spans = exporter.get_finished_spans()
+        size = attribute_bytes(spans)
+        baseline = baseline or size
+
+        exporter.clear()
+        elapsed = replay(events, budget_kwargs, args.invocations)
+        exporter.clear()
+        print(
+            f"{label:>16} {len(spans):>6} {size:>12} {size / baseline:>7.2f}"
+            f" {elapsed * 1000 / args.invocations:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Trace events per second through the span bookkeeping of ``observe()``.
+
+Replays a recorded supervisor/collaborator trace (``data/multi_agent_trace.jsonl``)
+through ``ProcessL2Trace.process_trace_event`` with OpenTelemetry spans enabled,
+once with the ``__slots__`` ``SpanManager`` and once with the pydantic model it
+replaced (``legacy_span_manager.py``). Each replay is one agent invocation: a
+fresh manager, every event, then ``end_all_spans``.
+
+Both are measured twice: with the default no-op tracer, which isolates the
+bookkeeping cost, and with an SDK tracer provider without exporters, which
+adds span creation but no I/O.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_span_manager.py --invocations 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("PRODUCE_BEDROCK_OTEL_TRACES", "true")
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import StatusCode
+
+from InlineAgent.observability.process import ProcessL2Trace
+from InlineAgent.observability.span_manager import SpanManager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from legacy_span_manager import SpanManager as LegacySpanManager
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "multi_agent_trace.jsonl"
+)
+
+
+def load_trace(path: str):
+    with open(path) as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    for event in events:
+        # boto3 hands observe() datetimes, the recording stores strings.
+        event["eventTime"] = datetime.fromisoformat(event["eventTime"])
+    return events
+
+
+def replay(events, manager_class, invocations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(invocations):
+        span_manager = manager_class()
+        for event in events:
+            ProcessL2Trace.process_trace_event(
+                trace_data=event,
+                span_manager=span_manager,
+                save_traces=False,
+                session_id=event["sessionId"],
+                show_traces=False,
+            )
+        span_manager.end_all_spans(status_code=StatusCode.OK)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invocations", type=int, default=500)
+    parser.add_argument("--trace", default=FIXTURE)
+    args = parser.parse_args()
+
+    events = load_trace(args.trace)
+    total = len(events) * args.invocations
+
+    print(f"{len(events)} events per invocation, {args.invocations} invocations")
+    print(f"{'tracer':>8} {'implementation':>16} {'seconds':>10} {'events/s':>12}")
+    # The global tracer provider can only be set once, so no-op goes first.
+    for tracer in ("noop", "sdk"):
+        if tracer == "sdk":
+            trace.set_tracer_provider(TracerProvider())
+        results = dict()
+        for label, manager_class in (
+            ("pydantic", LegacySpanManager),
+            ("slots", SpanManager),
+        ):
+            replay(events, manager_class, 1)  # warm up
+            elapsed = replay(events, manager_class, args.invocations)
+            results[label] = total / elapsed
+            print(f"{tracer:>8} {label:>16} {elapsed:>10.3f} {results[label]:>12.0f}")
+        print(
+            f"{tracer:>8} {'speedup':>16} {results['slots'] / results['pydantic']:>23.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
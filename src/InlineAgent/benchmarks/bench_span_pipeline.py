@@ -0,0 +1,141 @@
+"""
+Span processing overhead per agent turn for each exporter pipeline.
+
+Replays the recorded supervisor/collaborator trace (``data/multi_agent_trace.jsonl``)
+through ``ProcessL2Trace.process_trace_event``. Each replay is one agent turn.
+It runs once per pipeline built from ``ObservabilityConfig``: no-op tracer,
+SDK provider without processors, batch export to a null exporter, head and
+tail sampling in front of it, and the OTLP/JSON file exporter.
+
+``turn ms`` is the time spent on the invoking thread. ``+flush ms`` also
+counts the batch processor's background export, flushed after the run.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_span_pipeline.py --invocations 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("PRODUCE_BEDROCK_OTEL_TRACES", "true")
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import StatusCode
+
+from InlineAgent.observability import span_manager as span_manager_module
+from InlineAgent.observability.exporters import OTLPJsonFileSpanExporter
+from InlineAgent.observability.process import ProcessL2Trace
+from InlineAgent.observability.settings_management import ObservabilityConfig
+from InlineAgent.observability.span_manager import SpanManager
+from InlineAgent.observability.trace_provider import create_span_processor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_span_manager import FIXTURE, load_trace
+
+
+class NullSpanExporter(SpanExporter):
+    def __init__(self):
+        self.exported = 0
+
+    def export(self, spans):
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+
+class CountingFileExporter(OTLPJsonFileSpanExporter):
+    exported = 0
+
+    def export(self, spans):
+        self.exported += len(spans)
+        return super().export(spans)
+
+
+def replay(events, invocations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(invocations):
+        span_manager = SpanManager()
+        for event in events:
+            ProcessL2Trace.process_trace_event(
+                trace_data=event,
+                span_manager=span_manager,
+                save_traces=False,
+                session_id=event["sessionId"],
+                show_traces=False,
+            )
+        span_manager.end_all_spans(status_code=StatusCode.OK)
+    return time.perf_counter() - start
+
+
+def pipelines(directory: str):
+    yield "noop tracer", None, None
+    yield "sdk, no processor", ObservabilityConfig(), None
+    yield "batch", ObservabilityConfig(), NullSpanExporter()
+    yield "batch, head 10%", ObservabilityConfig(SAMPLE_RATIO=0.1), NullSpanExporter()
+    yield "batch, tail 10%", ObservabilityConfig(
+        TAIL_SAMPLE_SUCCESS_RATIO=0.1
+    ), NullSpanExporter()
+    yield "batch, drop LLM", ObservabilityConfig(
+        SPAN_DROP_NAMES=["LLM"]
+    ), NullSpanExporter()
+    # Encoding is slower than the replay, so the queue must hold a burst.
+    yield "batch, otlp file", ObservabilityConfig(
+        SPAN_BATCH_MAX_QUEUE_SIZE=16384
+    ), CountingFileExporter(os.path.join(directory, "spans.jsonl"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invocations", type=int, default=500)
+    parser.add_argument("--trace", default=FIXTURE)
+    args = parser.parse_args()
+
+    events = load_trace(args.trace)
+    directory = tempfile.TemporaryDirectory()
+
+    print(f"{len(events)} events per turn, {args.invocations} turns")
+    print(f"{'pipeline':>20} {'turn ms':>9} {'+flush ms':>10} {'exported':>9}")
+    for label, config, exporter in pipelines(directory.name):
+        if config is None:
+            tracer = trace.NoOpTracer()
+            provider = None
+        else:
+            sampler = None
+            if config.SAMPLE_RATIO < 1.0:
+                sampler = ParentBased(TraceIdRatioBased(config.SAMPLE_RATIO))
+            provider = TracerProvider(sampler=sampler)
+            if exporter is not None:
+                provider.add_span_processor(create_span_processor(config, exporter))
+            tracer = provider.get_tracer("bench")
+        span_manager_module.tracer = tracer
+
+        replay(events, 1)  # warm up
+        if provider is not None:
+            provider.force_flush()
+        if exporter is not None:
+            exporter.exported = 0
+
+        start = time.perf_counter()
+        elapsed = replay(events, args.invocations)
+        if provider is not None:
+            provider.force_flush()
+        total = time.perf_counter() - start
+        if provider is not None:
+            provider.shutdown()
+
+        exported = getattr(exporter, "exported", "")
+        print(
+            f"{label:>20} {elapsed * 1000 / args.invocations:>9.3f}"
+            f" {total * 1000 / args.invocations:>10.3f} {exported:>9}"
+        )
+
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
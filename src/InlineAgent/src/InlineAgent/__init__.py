@@ -4,16 +4,151 @@ Bedrock Agents module for interacting with Amazon Bedrock Agents.
 This package provides functionality for working with Amazon Bedrock Agents,
 allowing users to create, manage, and interact with AI agents powered by
 Amazon Bedrock.
+
+Exports are imported on first access, so ``import InlineAgent`` stays cheap
+and observability, MCP and settings dependencies are only loaded when used.
 """
 
-from .action_group import ActionGroup, ActionGroups
-from .agent import InlineAgent, CollaboratorAgent, require_confirmation
-from .knowledge_base import knowledgebase_plugin
-from .constants import USER_INPUT_ACTION_GROUP_NAME, TraceColor, Level
-from .utils import AgentAppConfig
-from .observability import *
-from .tools import *
-from .types import *
-from . import _version
-
-__version__ = _version.get_versions()["version"]
+from typing import TYPE_CHECKING
+
+from ._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .action_group import ActionGroup, ActionGroups
+    from .agent import *
+    from .knowledge_base import knowledgebase_plugin
+    from .constants import USER_INPUT_ACTION_GROUP_NAME, TraceColor, Level
+    from .utils import AgentAppConfig
+    from .client_pool import ClientPool, get_client_pool, set_client_pool
+    from .metrics import (
+        InvokeMetrics,
+        InvokeResult,
+        MetricsExporter,
+        PrometheusMetricsExporter,
+        StatsDMetricsExporter,
+        OTelMetricsExporter,
+        get_metrics_exporter,
+        set_metrics_exporter,
+    )
+    from .name_resolver import NameResolver, get_name_resolver, set_name_resolver
+    from .file_output import (
+        FileOutputWriter,
+        SavedFile,
+        get_file_writer,
+        set_file_writer,
+    )
+    from .sink import (
+        OutputSink,
+        ConsoleSink,
+        NullSink,
+        LoggingSink,
+        JsonSink,
+        BufferedSink,
+        get_output_sink,
+        set_output_sink,
+    )
+    from .observability import *
+    from .tools import *
+    from .types import *
+
+_EXPORTS = {
+    "ActionGroup": ".action_group",
+    "ActionGroups": ".action_group",
+    "InlineAgent": ".agent",
+    "CollaboratorAgent": ".agent",
+    "require_confirmation": ".agent",
+    "cacheable": ".agent",
+    "ResponseCache": ".agent",
+    "MemoryResponseCache": ".agent",
+    "DiskResponseCache": ".agent",
+    "CachedResponse": ".agent",
+    "CompiledAgent": ".agent",
+    "ProcessROC": ".agent",
+    "get_stream_executor": ".agent",
+    "set_stream_executor": ".agent",
+    "AgentEvent": ".agent",
+    "TextChunk": ".agent",
+    "TraceStep": ".agent",
+    "ReturnControlEvent": ".agent",
+    "FilesEvent": ".agent",
+    "OutputFile": ".agent",
+    "UsageTotals": ".agent",
+    "knowledgebase_plugin": ".knowledge_base",
+    "USER_INPUT_ACTION_GROUP_NAME": ".constants",
+    "TraceColor": ".constants",
+    "Level": ".constants",
+    "AgentAppConfig": ".utils",
+    "ClientPool": ".client_pool",
+    "get_client_pool": ".client_pool",
+    "set_client_pool": ".client_pool",
+    "InvokeMetrics": ".metrics",
+    "InvokeResult": ".metrics",
+    "MetricsExporter": ".metrics",
+    "PrometheusMetricsExporter": ".metrics",
+    "StatsDMetricsExporter": ".metrics",
+    "OTelMetricsExporter": ".metrics",
+    "get_metrics_exporter": ".metrics",
+    "set_metrics_exporter": ".metrics",
+    "NameResolver": ".name_resolver",
+    "get_name_resolver": ".name_resolver",
+    "set_name_resolver": ".name_resolver",
+    "FileOutputWriter": ".file_output",
+    "SavedFile": ".file_output",
+    "get_file_writer": ".file_output",
+    "set_file_writer": ".file_output",
+    "OutputSink": ".sink",
+    "ConsoleSink": ".sink",
+    "NullSink": ".sink",
+    "LoggingSink": ".sink",
+    "JsonSink": ".sink",
+    "BufferedSink": ".sink",
+    "get_output_sink": ".sink",
+    "set_output_sink": ".sink",
+    # observability
+    "Trace": ".observability",
+    "observe": ".observability",
+    "TraceContext": ".observability",
+    "TraceDispatcher": ".observability",
+    "get_trace_dispatcher": ".observability",
+    "set_trace_dispatcher": ".observability",
+    "TraceReplayer": ".observability",
+    "load_trace_events": ".observability",
+    "ObservabilityConfig": ".observability",
+    "create_tracer_provider": ".observability",
+    "TraceWriter": ".observability",
+    "read_traces": ".observability",
+    "get_trace_writer": ".observability",
+    "set_trace_writer": ".observability",
+    # tools
+    "MCPStdio": ".tools",
+    "MCPServer": ".tools",
+    "MCPHttp": ".tools",
+    "MCPPool": ".tools",
+    "PooledMCPServer": ".tools",
+    "SSEServerParameters": ".tools",
+    "get_mcp_pool": ".tools",
+    "set_mcp_pool": ".tools",
+    # types
+    "Executor": ".types",
+    "Parameter": ".types",
+    "FunctionDefination": ".types",
+    "APISchema": ".types",
+    "InlineCollaboratorAgentConfig": ".types",
+    "InlineCollaboratorConfigurations": ".types",
+    "MCPConfig": ".types",
+    "S3": ".types",
+}
+
+__all__ = list(_EXPORTS)
+
+_getattr, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        # versioneer may shell out to git, so only resolve the version on demand.
+        from . import _version
+
+        globals()["__version__"] = _version.get_versions()["version"]
+        return globals()["__version__"]
+    return _getattr(name)
@@ -0,0 +1,37 @@
+"""
+PEP 562 helpers for packages that import their exports on first access.
+
+``import InlineAgent`` only has to pay for what a program uses: observability
+pulls in the OpenTelemetry SDK and exporters, the MCP clients pull in the
+``mcp`` stack, and neither is needed to invoke an agent.
+"""
+
+import importlib
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """Return ``__getattr__`` and ``__dir__`` for ``package``.
+
+    Args:
+        package (str): ``__name__`` of the package.
+        exports (Dict[str, str]): Exported name to the relative module that
+            defines it, e.g. ``{"observe": ".agent_instrument"}``.
+    """
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str):
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        # Cache on the package so the next lookup skips __getattr__.
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
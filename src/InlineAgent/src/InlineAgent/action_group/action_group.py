@@ -1,6 +1,9 @@
+import copy
+import hashlib
 import json
 from functools import cached_property
 import re
+import threading
 from typing import (
     Annotated,
     List,
@@ -9,6 +12,7 @@ from typing import (
     Callable,
     Literal,
     Optional,
+    Iterable,
     Self,
     Tuple,
     Union,
@@ -17,7 +21,8 @@ from inspect import Parameter, signature
 import boto3
 from pydantic import BaseModel, computed_field, model_validator, validate_call, Field
 
-from InlineAgent.tools import MCPServer
+from InlineAgent.client_pool import get_client_pool
+from InlineAgent.tools.base import MCPServer
 from InlineAgent.types import APISchema, Executor, FunctionDefination
 
 
@@ -67,7 +72,7 @@ class ActionGroup(BaseModel):
         print(
             f"Using `{self.profile}` [profile](https://docs.aws.amazon.com/cli/v1/userguide/cli-configure-files.html)."
         )
-        return boto3.Session(profile_name=self.profile)
+        return get_client_pool().get_session(self.profile)
 
     @computed_field
     @cached_property
@@ -77,7 +82,7 @@ class ActionGroup(BaseModel):
         try:
             if self.test:
                 return "Mock-Account", "Mock-Region"
-            sts_client = self.session.client("sts")
+            sts_client = get_client_pool().get_client("sts", profile=self.profile)
             identity = sts_client.get_caller_identity()
             return identity["Account"], self.session.region_name
         except Exception as e:
@@ -330,7 +335,15 @@ class ActionGroups(BaseModel):
         return json.dumps(self.actionGroups, indent=4)
 
 
+_WHITESPACE_RUN = re.compile(r" +")
+
+FROZEN_SCHEMA_VERSION = 1
+
+
 class ActionGroupBuilder:
+    _schema_cache: Dict[str, Dict] = dict()
+    _schema_cache_lock = threading.Lock()
+
     @staticmethod
     def get_indent_level(line: str) -> int:
         """Count the number of leading spaces to determine indent level."""
@@ -358,21 +371,9 @@ class ActionGroupBuilder:
         return current_param, current_desc
 
     @staticmethod
-    @validate_call
     def clean_string(line: str) -> str:
-        clean_line = str()
-        prev_char: str = None
-        for character in line:
-
-            if character == " ":
-                prev_char = " "
-            else:
-                if prev_char == " ":
-                    clean_line += " " + character
-                else:
-                    clean_line += character
-                prev_char = character
-        return clean_line
+        """Collapse runs of spaces into one and drop trailing spaces."""
+        return _WHITESPACE_RUN.sub(" ", line).rstrip(" ")
 
     @staticmethod
     @validate_call
@@ -486,14 +487,102 @@ class ActionGroupBuilder:
         )  # default to string for unknown types
 
     @staticmethod
-    @validate_call
+    def schema_fingerprint(
+        func: Callable, argument_key: str = "Parameters:", return_key: str = "Returns:"
+    ) -> str:
+        """Hash everything the generated function schema depends on."""
+        parts = (
+            getattr(func, "__module__", None) or "",
+            getattr(func, "__qualname__", func.__name__),
+            func.__doc__ or "",
+            str(signature(func)),
+            argument_key,
+            return_key,
+            str(getattr(func, "__is_confirmation_required__", False)),
+        )
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
     def create_function_schema(
         func: Callable, argument_key: str = "Parameters:", return_key: str = "Returns:"
     ) -> FunctionDefination:
+        """Return the function schema for a tool, parsing its docstring only once."""
+        if not callable(func):
+            raise ValueError("func must be callable")
 
         if func.__doc__ is None:
             raise ValueError("Docstring is empty or None")
 
+        fingerprint = ActionGroupBuilder.schema_fingerprint(
+            func=func, argument_key=argument_key, return_key=return_key
+        )
+        schema = ActionGroupBuilder._schema_cache.get(fingerprint)
+        if schema is None:
+            schema = ActionGroupBuilder._build_function_schema(
+                func=func, argument_key=argument_key, return_key=return_key
+            )
+            with ActionGroupBuilder._schema_cache_lock:
+                ActionGroupBuilder._schema_cache[fingerprint] = schema
+
+        return copy.deepcopy(schema)
+
+    @staticmethod
+    def clear_schema_cache():
+        with ActionGroupBuilder._schema_cache_lock:
+            ActionGroupBuilder._schema_cache.clear()
+
+    @staticmethod
+    def freeze_schemas(path: str, action_groups: Iterable[ActionGroup]) -> int:
+        """Write the schemas of every tool in the action groups to a JSON file.
+
+        Load the file with ``load_frozen_schemas`` at startup to skip docstring
+        parsing. Entries are keyed by ``schema_fingerprint`` so a changed
+        docstring or signature is re-parsed instead of using a stale schema.
+
+        Returns:
+            int: Number of schemas written.
+        """
+        schemas = dict()
+        for action_group in action_groups:
+            for func in action_group.tools:
+                fingerprint = ActionGroupBuilder.schema_fingerprint(
+                    func=func,
+                    argument_key=action_group.argument_key,
+                    return_key=action_group.return_key,
+                )
+                schemas[fingerprint] = ActionGroupBuilder.create_function_schema(
+                    func=func,
+                    argument_key=action_group.argument_key,
+                    return_key=action_group.return_key,
+                )
+
+        with open(path, "w") as file:
+            json.dump({"version": FROZEN_SCHEMA_VERSION, "schemas": schemas}, file)
+
+        return len(schemas)
+
+    @staticmethod
+    def load_frozen_schemas(path: str) -> int:
+        """Seed the schema cache from a file written by ``freeze_schemas``.
+
+        Returns:
+            int: Number of schemas loaded.
+        """
+        with open(path, "r") as file:
+            frozen = json.load(file)
+
+        if frozen.get("version") != FROZEN_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported frozen schema version in {path}")
+
+        with ActionGroupBuilder._schema_cache_lock:
+            ActionGroupBuilder._schema_cache.update(frozen["schemas"])
+
+        return len(frozen["schemas"])
+
+    @staticmethod
+    def _build_function_schema(
+        func: Callable, argument_key: str, return_key: str
+    ) -> Dict:
         description, param_descriptions = ActionGroupBuilder.parse_docstring(
             docstring=func.__doc__, argument_key=argument_key, return_key=return_key
         )
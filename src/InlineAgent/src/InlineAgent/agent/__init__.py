@@ -10,16 +10,49 @@ Amazon Bedrock.
 
 from .inline_agent import (
     InlineAgent,
+    CompiledAgent,
 )
 from .confirmation import require_confirmation
+from .events import (
+    AgentEvent,
+    FilesEvent,
+    OutputFile,
+    ReturnControlEvent,
+    TextChunk,
+    TraceStep,
+    UsageTotals,
+)
+from .event_stream import get_stream_executor, set_stream_executor
 from .process_roc import ProcessROC
+from .response_cache import (
+    CachedResponse,
+    DiskResponseCache,
+    MemoryResponseCache,
+    ResponseCache,
+    cacheable,
+)
 from .collaborator_agent_instance import (
     CollaboratorAgent,
 )
 
 __all__ = [
     "InlineAgent",
+    "CompiledAgent",
     "require_confirmation",
+    "AgentEvent",
+    "FilesEvent",
+    "OutputFile",
+    "ReturnControlEvent",
+    "TextChunk",
+    "TraceStep",
+    "UsageTotals",
+    "get_stream_executor",
+    "set_stream_executor",
     "ProcessROC",
+    "CachedResponse",
+    "DiskResponseCache",
+    "MemoryResponseCache",
+    "ResponseCache",
+    "cacheable",
     "CollaboratorAgent",
 ]
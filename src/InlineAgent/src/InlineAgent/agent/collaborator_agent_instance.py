@@ -8,14 +8,14 @@ import boto3
 from typing import Dict, Literal
 from pydantic import Field
 from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
 
 
 from InlineAgent.constants import (
     TraceColor,
 )
 from InlineAgent.agent.process_roc import ProcessROC
+from InlineAgent.client_pool import get_client_pool
+from InlineAgent.name_resolver import get_name_resolver
 from InlineAgent.observability import Trace
 
 
@@ -30,11 +30,11 @@ class CollaboratorAgent:
     @property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_client_pool().get_session(self.profile)
 
     @property
     def account_id(self) -> str:
-        sts_client = self.session.client("sts")
+        sts_client = get_client_pool().get_client("sts", profile=self.profile)
         identity = sts_client.get_caller_identity()
         return identity["Account"]
 
@@ -60,7 +60,7 @@ class CollaboratorAgent:
         agent_arn = CollaboratorAgent.get_agent_arn_by_name(
             agent_name=self.agent_name,
             region=self.region,
-            account_id=self.account_id,
+            account_id=get_name_resolver().resolve_account_id(profile=self.profile),
             session=self.session,
         )
 
@@ -76,18 +76,9 @@ class CollaboratorAgent:
 
     @staticmethod
     def get_agent_id_by_name(agent_name: str, session: boto3.Session):
-        # Create Bedrock Agent client
-        bedrock_agent = session.client("bedrock-agent")
-
-        # List all agents and find the one matching the name
-        paginator = bedrock_agent.get_paginator("list_agents")
-
-        for page in paginator.paginate():
-            for agent in page["agentSummaries"]:
-                if agent["agentName"] == agent_name:
-                    return agent["agentId"]
-
-        raise ValueError(f"Agent {agent_name} not found")
+        return get_name_resolver().resolve_agent_id(
+            agent_name, profile=session.profile_name
+        )
 
     @staticmethod
     def get_agent_arn_by_name(
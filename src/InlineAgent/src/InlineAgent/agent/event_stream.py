@@ -0,0 +1,112 @@
+"""
+Non-blocking bridge between boto3 calls and asyncio.
+
+boto3 ``invoke_inline_agent`` blocks until the response headers arrive and its
+``EventStream`` blocks on every socket read. Running either inside a coroutine
+stalls every other session on the event loop for the whole agent turn.
+``call_blocking`` runs the request on a dedicated executor and
+``aiter_event_stream`` drains the stream on the same executor, handing events
+to the loop through an ``asyncio.Queue``.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+DEFAULT_MAX_STREAM_WORKERS = 256
+
+_STREAM_END = object()
+
+_executor_lock = threading.Lock()
+_stream_executor: Optional[Executor] = None
+
+
+def get_stream_executor() -> Executor:
+    """Return the process-wide executor used for blocking agent runtime calls."""
+    global _stream_executor
+
+    with _executor_lock:
+        if _stream_executor is None:
+            _stream_executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_STREAM_WORKERS,
+                thread_name_prefix="inline-agent-stream",
+            )
+        return _stream_executor
+
+
+def set_stream_executor(executor: Optional[Executor]) -> Optional[Executor]:
+    """Install a process-wide stream executor and return the previous one.
+
+    Every open event stream holds one worker until it is drained, so the
+    executor should have at least as many workers as concurrent sessions.
+    """
+    global _stream_executor
+
+    with _executor_lock:
+        previous, _stream_executor = _stream_executor, executor
+        return previous
+
+
+async def call_blocking(
+    func: Callable, *args, executor: Optional[Executor] = None, **kwargs
+) -> Any:
+    """Run a blocking call on the stream executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor or get_stream_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def aiter_event_stream(
+    event_stream: Iterable, executor: Optional[Executor] = None
+) -> AsyncIterator[Any]:
+    """Iterate a blocking event stream without blocking the event loop.
+
+    A worker thread reads events as soon as they arrive and queues them for
+    the coroutine, so network reads overlap with event processing. Errors
+    raised while reading are re-raised in the consumer. If the consumer stops
+    early the worker stops reading and the stream is closed.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+
+    def put(item):
+        if stopped.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # The loop closed while the stream was still being read.
+            stopped.set()
+
+    def produce():
+        try:
+            for event in event_stream:
+                if stopped.is_set():
+                    break
+                put((event, None))
+        except BaseException as e:
+            put((_STREAM_END, e))
+            return
+        finally:
+            if stopped.is_set():
+                close = getattr(event_stream, "close", None)
+                if close is not None:
+                    close()
+        put((_STREAM_END, None))
+
+    loop.run_in_executor(executor or get_stream_executor(), produce)
+
+    try:
+        while True:
+            event, error = await queue.get()
+            if event is _STREAM_END:
+                if error is not None:
+                    raise error
+                break
+            yield event
+    finally:
+        stopped.set()
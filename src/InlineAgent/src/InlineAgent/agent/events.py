@@ -0,0 +1,74 @@
+"""
+Typed events yielded by ``InlineAgent.stream``.
+
+Every event is an immutable, slotted dataclass so consumers can dispatch with
+``isinstance`` or ``match`` without reaching into the raw service payload.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Tuple, Union
+
+from InlineAgent.metrics import InvokeMetrics
+
+
+@dataclass(frozen=True, slots=True)
+class TextChunk:
+    """A piece of the final answer, in arrival order."""
+
+    text: str
+    attribution: Optional[Mapping[str, Any]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class TraceStep:
+    """One trace event with the token usage it reports, if any."""
+
+    trace: Mapping[str, Any]
+    step_type: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_calls: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class OutputFile:
+    name: str
+    type: str
+    data: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class FilesEvent:
+    """Files produced by the agent, e.g. by the code interpreter."""
+
+    files: Tuple[OutputFile, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ReturnControlEvent:
+    """The agent asked the caller to run one or more tools."""
+
+    invocation_id: str
+    invocation_inputs: Tuple[Mapping[str, Any], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class UsageTotals:
+    """Totals for the whole turn, always the last event of a stream.
+
+    ``metrics`` breaks the totals down by step, model and collaborator and
+    adds time to first token, tool latencies and return of control round trips.
+    """
+
+    input_tokens: int
+    output_tokens: int
+    llm_calls: int
+    duration_seconds: float
+    metrics: Optional[InvokeMetrics] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+AgentEvent = Union[TextChunk, TraceStep, FilesEvent, ReturnControlEvent, UsageTotals]
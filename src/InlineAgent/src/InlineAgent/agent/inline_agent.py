@@ -1,35 +1,104 @@
 from dataclasses import dataclass, field
-from datetime import datetime, UTC
+from types import MappingProxyType
 
+import asyncio
+import hashlib
 import json
+import time
 import uuid
 import copy
-import os
 import boto3
-from typing import Callable, Dict, List, Literal, Optional, Tuple, Union
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from botocore.config import Config
 from pydantic import Field
-from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
 
 
 from InlineAgent.action_group import ActionGroups
 from InlineAgent.action_group.action_group import ActionGroup
 from InlineAgent.agent.collaborator_agent_instance import CollaboratorAgent
+from InlineAgent.client_pool import get_client_pool
+from InlineAgent.file_output import SavedFile, get_file_writer
 from InlineAgent.constants import (
     USER_INPUT_ACTION_GROUP_NAME,
     TraceColor,
 )
+from InlineAgent.agent.event_stream import aiter_event_stream, call_blocking
+from InlineAgent.agent.events import (
+    AgentEvent,
+    FilesEvent,
+    OutputFile,
+    ReturnControlEvent,
+    TextChunk,
+    TraceStep,
+    UsageTotals,
+)
 from InlineAgent.agent.process_roc import ProcessROC
+from InlineAgent.agent.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    roc_is_cacheable,
+)
+from InlineAgent.metrics import (
+    InvokeMetrics,
+    InvokeResult,
+    MetricsExporter,
+    export_metrics,
+    get_metrics_exporter,
+)
 from InlineAgent.observability import Trace
+from InlineAgent.sink import NullSink, OutputSink, get_output_sink
 from InlineAgent.knowledge_base import KnowledgeBasePlugin
-from InlineAgent.tools.mcp import MCPServer
+from InlineAgent.tools.base import MCPServer
 from InlineAgent.types import (
     InlineCollaboratorAgentConfig,
     InlineCollaboratorConfigurations,
 )
 
 
+def _freeze(value):
+    """Read-only copy of a payload: mappings become proxies, lists tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """Plain dict and list copy of a frozen payload, as boto3 expects it."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class CompiledAgent:
+    """Read-only request payload built once from an ``InlineAgent``.
+
+    ``content_hash`` identifies the payload and changes whenever any field that
+    ends up in the request changes. The payload is frozen all the way down
+    (mappings are read-only proxies, lists are tuples), so it cannot drift
+    from its hash; ``get_invoke_params()`` returns a plain copy.
+    """
+
+    invoke_params: Mapping
+    agent_params: Mapping
+    content_hash: str
+    collaborators: Tuple["CompiledAgent", ...] = ()
+
+
 @dataclass
 class InlineAgent:
     foundation_model: str
@@ -50,15 +119,21 @@ class InlineAgent:
     profile: str = field(default="default")
     user_input: bool = False
     tool_map: Dict[str, Callable] = None
+    client_config: Optional[Config] = None
+    tool_concurrency: Optional[int] = None
+    tool_timeout: Optional[float] = None
+    sink: Optional[OutputSink] = None
+    metrics_exporter: Optional[MetricsExporter] = None
+    response_cache: Optional[ResponseCache] = None
 
     @property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_client_pool().get_session(self.profile)
 
     @property
     def account_id(self) -> str:
-        sts_client = self.session.client("sts")
+        sts_client = get_client_pool().get_client("sts", profile=self.profile)
         identity = sts_client.get_caller_identity()
         return identity["Account"]
 
@@ -139,7 +214,59 @@ class InlineAgent:
         if not self.collaborator_configuration.instruction:
             self.collaborator_configuration.instruction = self.instruction
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name != "_compiled":
+            self.__dict__["_compiled"] = None
+
+    def invalidate(self):
+        """Drop the compiled payload, e.g. after mutating a list field in place."""
+        self.__dict__["_compiled"] = None
+
+    def compile(self) -> CompiledAgent:
+        """Return the compiled request payload, rebuilding it only when stale.
+
+        The payload is cached until a field is assigned or ``invalidate()`` is
+        called, and is rebuilt when any ``InlineAgent`` collaborator recompiles.
+        """
+        collaborators = tuple(
+            collaborator.compile()
+            for collaborator in self.collaborators or []
+            if isinstance(collaborator, InlineAgent)
+        )
+
+        compiled: CompiledAgent = self.__dict__.get("_compiled")
+        if (
+            compiled is not None
+            and len(compiled.collaborators) == len(collaborators)
+            and all(
+                previous is current
+                for previous, current in zip(compiled.collaborators, collaborators)
+            )
+        ):
+            return compiled
+
+        invoke_params = self._build_invoke_params()
+        content_hash = hashlib.sha256(
+            json.dumps(invoke_params, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+        compiled = CompiledAgent(
+            invoke_params=_freeze(invoke_params),
+            agent_params=_freeze(self._build_agent_params()),
+            content_hash=content_hash,
+            collaborators=collaborators,
+        )
+        self.__dict__["_compiled"] = compiled
+        return compiled
+
     def get_invoke_params(self) -> Dict:
+        return _thaw(self.compile().invoke_params)
+
+    def get_agent_params(self) -> Dict:
+        return _thaw(self.compile().agent_params)
+
+    def _build_invoke_params(self) -> Dict:
         invokeParams = dict()
         match self.agent_collaboration:
             case "DISABLED":
@@ -187,7 +314,7 @@ class InlineAgent:
 
         return {k: v for k, v in invokeParams.items() if v}
 
-    def get_agent_params(self):
+    def _build_agent_params(self) -> Dict:
         agentParams = {
             "actionGroups": self.action_groups,
             "agentCollaboration": self.agent_collaboration,
@@ -203,203 +330,455 @@ class InlineAgent:
         }
         return {k: v for k, v in agentParams.items() if v}
 
-    async def invoke(
+    async def stream(
         self,
         input_text: str,
+        session_id: Optional[str] = None,
         enable_trace: bool = True,
-        session_id: str = str(uuid.uuid4()),
         end_session: bool = False,
         session_state: Dict = None,
-        add_citation: bool = False,
-        process_response: bool = True,
-        truncate_response: int = None,
-        streaming_configurations: Dict = {"streamFinalResponse": False},
-        bedrock_model_configurations: Dict = {
-            "performanceConfig": {"latency": "standard"}
-        },
-    ):
+        streaming_configurations: Dict = None,
+        bedrock_model_configurations: Dict = None,
+        handle_return_control: bool = True,
+        sink: OutputSink = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[AgentEvent]:
+        """Invoke the agent and yield typed events as they arrive.
+
+        Nothing is printed. Text is yielded chunk by chunk, so with
+        ``streamFinalResponse`` enabled the first ``TextChunk`` arrives as soon
+        as the service sends it. Return-of-control requests are yielded as
+        ``ReturnControlEvent`` and, when ``handle_return_control`` is set, run
+        through ``ProcessROC`` before the agent is invoked again. The last
+        event is always ``UsageTotals``, whose ``metrics`` are also handed to
+        the agent's ``metrics_exporter`` or the process-wide one. ``sink``
+        only receives tool output from ``ProcessROC`` and defaults to
+        ``NullSink``.
+
+        With a ``response_cache`` set and ``use_cache`` on, a cached answer is
+        replayed as ``TextChunk`` and ``FilesEvent`` events without calling
+        the service, and cacheable turns are stored once answered.
+        """
         if session_state is None:
             session_state = {}
 
-        print(f"SessionId: {session_id}")
-        if "returnControlInvocationResults" in session_state:
-            raise ValueError(
-                "returnControlInvocationResults key is not supported in inlineSessionState"
-            )
+        if session_id is None:
+            session_id = str(uuid.uuid4())
 
-        if "invocationId" in session_state:
-            raise ValueError("invocationId key is not supported in inlineSessionState")
+        if sink is None:
+            sink = NullSink()
 
-        agent_answer = ""
+        if streaming_configurations is None:
+            streaming_configurations = {"streamFinalResponse": False}
 
-        bedrock_agent_runtime = boto3.Session(profile_name=self.profile).client(
-            "bedrock-agent-runtime"
-        )
+        if bedrock_model_configurations is None:
+            bedrock_model_configurations = {
+                "performanceConfig": {"latency": "standard"}
+            }
 
-        inlineSessionState = copy.deepcopy(session_state)
+        self._check_session_state(session_state)
 
         total_input_tokens = 0
         total_output_tokens = 0
         total_llm_calls = 0
+        metrics = InvokeMetrics(agent_name=self.agent_name, session_id=session_id)
+        # Model of each model invocation, by trace id, for its usage.
+        models: Dict[str, str] = dict()
+
+        time_before_call = time.perf_counter()
+
+        compiled = self.compile()
+        cache = self.response_cache if use_cache else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(compiled.content_hash, input_text, session_state)
+        if cache_key is not None:
+            cached = await self._call_cache(cache, cache.get, cache_key)
+            if cached is not None:
+                metrics.cache_hit = True
+                for event in cached.events:
+                    if metrics.time_to_first_token is None:
+                        metrics.time_to_first_token = (
+                            time.perf_counter() - time_before_call
+                        )
+                    yield event
+                yield self._finish(metrics, time_before_call, 0, 0, 0)
+                return
+        # Answer events of this turn, while it may still be cached.
+        recorded: List[AgentEvent] = list()
+
+        bedrock_agent_runtime = get_client_pool().get_client(
+            "bedrock-agent-runtime", profile=self.profile, config=self.client_config
+        )
 
-        time_before_call = datetime.now(UTC)
-        cite = None
-        orch_step = 0
-        sub_step = 0
+        inlineSessionState = copy.deepcopy(session_state)
 
-        stream_final_response = streaming_configurations["streamFinalResponse"]
-        # print(self.get_invoke_params())
-        while not agent_answer:
+        invoke_params = _thaw(compiled.invoke_params)
+        answered = False
+        while not answered:
+            request = dict(
+                sessionId=session_id,
+                inputText=input_text,
+                enableTrace=enable_trace,
+                endSession=end_session,
+                streamingConfigurations=streaming_configurations,
+                bedrockModelConfigurations=bedrock_model_configurations,
+                **invoke_params,
+            )
             if inlineSessionState:
-                response = bedrock_agent_runtime.invoke_inline_agent(
-                    sessionId=session_id,
-                    inputText=input_text,
-                    enableTrace=enable_trace,
-                    endSession=end_session,
-                    inlineSessionState=inlineSessionState,
-                    streamingConfigurations=streaming_configurations,
-                    bedrockModelConfigurations=bedrock_model_configurations,
-                    **self.get_invoke_params(),
-                )
-            else:
-                response = bedrock_agent_runtime.invoke_inline_agent(
-                    sessionId=session_id,
-                    inputText=input_text,
-                    enableTrace=enable_trace,
-                    endSession=end_session,
-                    streamingConfigurations=streaming_configurations,
-                    bedrockModelConfigurations=bedrock_model_configurations,
-                    **self.get_invoke_params(),
-                )
+                request["inlineSessionState"] = inlineSessionState
 
-            if not process_response:
-                return response
+            response = await call_blocking(
+                bedrock_agent_runtime.invoke_inline_agent, **request
+            )
+            metrics.requests += 1
 
             inlineSessionState = copy.deepcopy(session_state)
 
-            event_stream = response["completion"]
-
             try:
-                for event in event_stream:
-                    # print(json.dumps(event, indent=2, default=str))
-                    if "files" in event:
-                        files_event = event["files"]
-
-                        console = Console()
-                        print("\n\n")
-                        console.print(Markdown("**Files saved in output directory**"))
-
-                        files_list = files_event["files"]
-                        for idx, this_file in enumerate(files_list):
-                            file_bytes = this_file["bytes"]
-
-                            # save bytes to file, given the name of file and the bytes
-                            directory_path = os.path.join(os.getcwd(), "output")
-                            if not os.path.exists(directory_path):
-                                try:
-                                    os.makedirs(directory_path, exist_ok=True)
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            if not os.path.exists(
-                                os.path.join(directory_path, str(session_id))
-                            ):
-                                try:
-                                    os.makedirs(
-                                        os.path.join(directory_path, str(session_id)),
-                                        exist_ok=True,
-                                    )
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            file_name = os.path.join(
-                                directory_path, str(session_id), this_file["name"]
+                async for event in aiter_event_stream(response["completion"]):
+                    if "chunk" in event:
+                        answered = True
+                        if metrics.time_to_first_token is None:
+                            metrics.time_to_first_token = (
+                                time.perf_counter() - time_before_call
                             )
-                            with open(file_name, "wb") as f:
-                                f.write(file_bytes)
+                        chunk = event["chunk"]
+                        text_chunk = TextChunk(
+                            text=chunk.get("bytes", b"").decode("utf8"),
+                            attribution=chunk.get("attribution"),
+                        )
+                        if cache_key is not None:
+                            recorded.append(text_chunk)
+                        yield text_chunk
+
+                    elif "trace" in event and "trace" in event["trace"]:
+                        trace = event["trace"]["trace"]
+                        step_type = next(iter(trace), "")
+                        input_tokens, output_tokens, llm_calls = Trace.usage(trace)
+                        total_input_tokens += input_tokens
+                        total_output_tokens += output_tokens
+                        total_llm_calls += llm_calls
+                        self._record_usage(
+                            metrics,
+                            models,
+                            event["trace"],
+                            step_type,
+                            (input_tokens, output_tokens, llm_calls),
+                        )
+                        yield TraceStep(
+                            trace=trace,
+                            step_type=step_type,
+                            input_tokens=input_tokens,
+                            output_tokens=output_tokens,
+                            llm_calls=llm_calls,
+                        )
+
+                    elif "files" in event:
+                        files_event = FilesEvent(
+                            files=tuple(
+                                OutputFile(
+                                    name=this_file["name"],
+                                    type=this_file.get("type", ""),
+                                    data=this_file["bytes"],
+                                )
+                                for this_file in event["files"]["files"]
+                            )
+                        )
+                        if cache_key is not None:
+                            recorded.append(files_event)
+                        yield files_event
+
+                    elif "returnControl" in event:
+                        roc_event = event["returnControl"]
+                        metrics.roc_round_trips += 1
+                        if not (
+                            handle_return_control
+                            and roc_is_cacheable(
+                                roc_event["invocationInputs"], self.tool_map
+                            )
+                        ):
+                            cache_key = None
+                        yield ReturnControlEvent(
+                            invocation_id=roc_event["invocationId"],
+                            invocation_inputs=tuple(roc_event["invocationInputs"]),
+                        )
+                        if not handle_return_control:
+                            answered = True
+                            continue
 
-                    if "returnControl" in event:
                         inlineSessionState = await ProcessROC.process_roc(
                             inlineSessionState=inlineSessionState,
-                            roc_event=event["returnControl"],
+                            roc_event=roc_event,
                             tool_map=self.tool_map,
+                            max_concurrency=self.tool_concurrency,
+                            tool_timeout=self.tool_timeout,
+                            sink=sink,
+                            tool_calls=metrics.tool_calls,
                         )
+            except Exception as e:
+                metadata = response.get("ResponseMetadata", {})
+                e.add_note(
+                    f"request ID: {metadata.get('RequestId')}, retries: {metadata.get('RetryAttempts')}"
+                )
+                raise
+
+        if cache_key is not None and any(
+            isinstance(event, TextChunk) for event in recorded
+        ):
+            await self._call_cache(
+                cache, cache.set, cache_key, CachedResponse(events=tuple(recorded))
+            )
 
-                    # Process trace
-                    if "trace" in event and "trace" in event["trace"] and enable_trace:
+        yield self._finish(
+            metrics,
+            time_before_call,
+            total_input_tokens,
+            total_output_tokens,
+            total_llm_calls,
+        )
 
-                        # print(json.dumps(event["trace"], indent=2))
-                        input_tokens, output_tokens, llm_calls = Trace.parse_trace(
-                            trace=event["trace"]["trace"],
+    def _finish(
+        self,
+        metrics: InvokeMetrics,
+        time_before_call: float,
+        input_tokens: int,
+        output_tokens: int,
+        llm_calls: int,
+    ) -> UsageTotals:
+        metrics.duration_seconds = time.perf_counter() - time_before_call
+        export_metrics(metrics, self.metrics_exporter or get_metrics_exporter())
+
+        return UsageTotals(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            llm_calls=llm_calls,
+            duration_seconds=metrics.duration_seconds,
+            metrics=metrics,
+        )
+
+    @staticmethod
+    async def _call_cache(cache: ResponseCache, method: Callable, *args):
+        if cache.blocking:
+            return await call_blocking(method, *args)
+        return method(*args)
+
+    def _record_usage(
+        self,
+        metrics: InvokeMetrics,
+        models: Dict[str, str],
+        trace_data: Dict,
+        step_type: str,
+        usage: Tuple[int, int, int],
+    ):
+        step = trace_data["trace"].get(step_type)
+        if not isinstance(step, dict):
+            return
+
+        model_input = step.get("modelInvocationInput")
+        if model_input and "foundationModel" in model_input:
+            models[model_input.get("traceId", "")] = model_input["foundationModel"]
+
+        if not usage[2]:
+            return
+
+        # Collaborator traces carry their name; the rest are this agent's.
+        collaborator = trace_data.get("collaboratorName") or self.agent_name
+        model_output = step.get("modelInvocationOutput") or {}
+        model = models.pop(
+            model_output.get("traceId", ""),
+            self.foundation_model if collaborator == self.agent_name else "",
+        )
+        metrics.add_usage(step_type, model, collaborator, *usage)
+
+    async def invoke(
+        self,
+        input_text: str,
+        enable_trace: bool = True,
+        session_id: str = str(uuid.uuid4()),
+        end_session: bool = False,
+        session_state: Dict = None,
+        add_citation: bool = False,
+        process_response: bool = True,
+        truncate_response: int = None,
+        streaming_configurations: Dict = {"streamFinalResponse": False},
+        bedrock_model_configurations: Dict = {
+            "performanceConfig": {"latency": "standard"}
+        },
+        sink: OutputSink = None,
+        use_cache: bool = True,
+    ):
+        """Invoke the agent, show the answer and traces on ``sink`` and return
+        the answer as an ``InvokeResult``, a ``str`` carrying the turn's
+        ``InvokeMetrics``.
+        """
+        if session_state is None:
+            session_state = {}
+
+        sink = sink or self.sink or get_output_sink()
+
+        if sink.enabled:
+            sink.write(f"SessionId: {session_id}", kind="session")
+        self._check_session_state(session_state)
+
+        if not process_response:
+            return await self._invoke_raw(
+                input_text=input_text,
+                enable_trace=enable_trace,
+                session_id=session_id,
+                end_session=end_session,
+                session_state=session_state,
+                streaming_configurations=streaming_configurations,
+                bedrock_model_configurations=bedrock_model_configurations,
+            )
+
+        answer_parts: List[str] = list()
+        cite = None
+        usage = None
+        saved_files: List[asyncio.Future] = list()
+        file_writer = get_file_writer()
+
+        try:
+            async for event in self.stream(
+                input_text=input_text,
+                session_id=session_id,
+                enable_trace=enable_trace,
+                end_session=end_session,
+                session_state=session_state,
+                streaming_configurations=streaming_configurations,
+                bedrock_model_configurations=bedrock_model_configurations,
+                sink=sink,
+                use_cache=use_cache,
+            ):
+                if isinstance(event, TextChunk):
+                    if add_citation and event.attribution:
+                        text, cite = Trace.add_citation(
+                            citations=event.attribution["citations"],
+                            cite=1 if not cite else cite,
+                            sink=sink,
+                        )
+                        answer_parts.append(text)
+                    else:
+                        answer_parts.append(event.text)
+                        if sink.enabled:
+                            sink.write(
+                                event.text,
+                                TraceColor.final_output,
+                                end="",
+                                kind="answer",
+                            )
+
+                elif isinstance(event, TraceStep):
+                    if sink.enabled:
+                        Trace.parse_trace(
+                            trace=event.trace,
                             truncateResponse=truncate_response,
                             agentName=self.agent_name,
+                            sink=sink,
                         )
-                        total_input_tokens += int(input_tokens)
-                        total_output_tokens += int(output_tokens)
-                        total_llm_calls += int(llm_calls)
 
-                    # Get Final Answer
-                    if "chunk" in event:
-                        if add_citation:
-                            if "attribution" in event["chunk"]:
-                                agent_answer, cite = Trace.add_citation(
-                                    citations=event["chunk"]["attribution"][
-                                        "citations"
-                                    ],
-                                    cite=1 if not cite else cite,
-                                )
-                            else:
-                                data = event["chunk"]["bytes"]
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(
-                                        data.decode("utf8"), TraceColor.final_output
-                                    ),
-                                    end="",
-                                )
-                        elif not add_citation:
-                            data = event["chunk"]["bytes"]
-                            if stream_final_response:
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(
-                                        data.decode("utf8"), TraceColor.final_output
-                                    ),
-                                    end="",
-                                )
-                            else:
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(agent_answer, TraceColor.final_output),
-                                    end="",
-                                )
-
-            except Exception as e:
-                print(
-                    colored("Caught exception while invoking Agent", TraceColor.error)
-                )
-                print(colored(f"input text: {input_text}", TraceColor.error))
-                print(
-                    colored(
-                        f"request ID: {response['ResponseMetadata']['RequestId']}, retries: {response['ResponseMetadata']['RetryAttempts']}\n",
-                        TraceColor.error,
+                elif isinstance(event, FilesEvent):
+                    saved_files.extend(
+                        asyncio.wrap_future(
+                            file_writer.submit(
+                                session_id=session_id,
+                                name=this_file.name,
+                                data=this_file.data,
+                                type=this_file.type,
+                            )
+                        )
+                        for this_file in event.files
                     )
-                )
-                print(colored(f"Error: {e}", TraceColor.error))
-                raise Exception("Unexpected exception: ", e)
 
-        duration = datetime.now(UTC) - time_before_call
+                elif isinstance(event, UsageTotals):
+                    usage = event
 
-        print(
-            colored(
-                f"\nAgent made a total of {total_llm_calls} LLM calls, "
-                + f"using {total_input_tokens+total_output_tokens} tokens "
-                + f"(in: {total_input_tokens}, out: {total_output_tokens})"
-                + f", and took {duration.total_seconds():,.1f} total seconds",
+        except Exception as e:
+            sink.write(
+                "Caught exception while invoking Agent", TraceColor.error, kind="error"
+            )
+            sink.write(f"input text: {input_text}", TraceColor.error, kind="error")
+            for note in getattr(e, "__notes__", []):
+                sink.write(f"{note}\n", TraceColor.error, kind="error")
+            sink.write(f"Error: {e}", TraceColor.error, kind="error")
+            raise Exception("Unexpected exception: ", e)
+
+        if saved_files:
+            self._report_saved_files(await asyncio.gather(*saved_files), sink=sink)
+
+        if sink.enabled and usage.metrics.cache_hit:
+            sink.write(
+                f"\nAnswered from the response cache in {usage.duration_seconds:,.3f} seconds",
+                TraceColor.stats,
+                kind="stats",
+            )
+        elif sink.enabled:
+            sink.write(
+                f"\nAgent made a total of {usage.llm_calls} LLM calls, "
+                + f"using {usage.total_tokens} tokens "
+                + f"(in: {usage.input_tokens}, out: {usage.output_tokens})"
+                + f", and took {usage.duration_seconds:,.1f} total seconds",
                 TraceColor.stats,
+                kind="stats",
             )
+
+        return InvokeResult("".join(answer_parts), usage.metrics)
+
+    async def _invoke_raw(
+        self,
+        input_text: str,
+        enable_trace: bool,
+        session_id: str,
+        end_session: bool,
+        session_state: Dict,
+        streaming_configurations: Dict,
+        bedrock_model_configurations: Dict,
+    ):
+        """Return the unprocessed ``invoke_inline_agent`` response."""
+        self._check_session_state(session_state)
+
+        bedrock_agent_runtime = get_client_pool().get_client(
+            "bedrock-agent-runtime", profile=self.profile, config=self.client_config
+        )
+        request = dict(
+            sessionId=session_id,
+            inputText=input_text,
+            enableTrace=enable_trace,
+            endSession=end_session,
+            streamingConfigurations=streaming_configurations,
+            bedrockModelConfigurations=bedrock_model_configurations,
+            **self.get_invoke_params(),
         )
+        if session_state:
+            request["inlineSessionState"] = copy.deepcopy(session_state)
 
-        return agent_answer
+        return await call_blocking(bedrock_agent_runtime.invoke_inline_agent, **request)
+
+    @staticmethod
+    def _check_session_state(session_state: Dict):
+        if "returnControlInvocationResults" in session_state:
+            raise ValueError(
+                "returnControlInvocationResults key is not supported in inlineSessionState"
+            )
+
+        if "invocationId" in session_state:
+            raise ValueError("invocationId key is not supported in inlineSessionState")
+
+    @staticmethod
+    def _report_saved_files(saved_files: List[SavedFile], sink: OutputSink):
+        if not sink.enabled:
+            return
+
+        sink.write("\n\n", kind="files")
+        sink.markdown("**Files saved in output directory**", kind="files")
+        for saved_file in saved_files:
+            if saved_file.path is None:
+                sink.write(
+                    f"Skipped {saved_file.name} ({saved_file.original_size} bytes)",
+                    kind="files",
+                )
+            elif saved_file.truncated:
+                sink.write(
+                    f"{saved_file.path} truncated to {saved_file.size} of {saved_file.original_size} bytes",
+                    kind="files",
+                )
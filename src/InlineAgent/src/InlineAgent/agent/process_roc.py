@@ -1,17 +1,38 @@
-import copy
+import asyncio
+import functools
 import inspect
 import json
-from typing import Any, Callable, Dict, Union
-from termcolor import colored
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 from InlineAgent.constants import TraceColor
+from InlineAgent.metrics import ToolCall
+from InlineAgent.sink import OutputSink, get_output_sink
 
 
 class ProcessROC:
     @staticmethod
     async def process_roc(
-        inlineSessionState: Dict, roc_event: Dict, tool_map: Dict[str, Callable]
+        inlineSessionState: Dict,
+        roc_event: Dict,
+        tool_map: Dict[str, Callable],
+        max_concurrency: Optional[int] = None,
+        tool_timeout: Optional[float] = None,
+        sink: OutputSink = None,
+        tool_calls: Optional[List[ToolCall]] = None,
     ):
+        """Run every invocation input of a return-of-control event.
+
+        Inputs that need user confirmation are prompted for one at a time, in
+        order. Every other tool call is dispatched concurrently, bounded by
+        ``max_concurrency`` and ``tool_timeout``. Results keep the order of
+        ``invocationInputs``. The latency of every dispatched call is
+        appended to ``tool_calls`` when it is given.
+
+        A timed out coroutine tool is cancelled. A timed out synchronous tool
+        cannot be: it keeps running in its thread and its side effects may
+        land after the agent was told the call failed.
+        """
         # TODO: Tool to invoke is str and callable
         if "returnControlInvocationResults" in inlineSessionState:
             raise ValueError(
@@ -21,11 +42,15 @@ class ProcessROC:
         if "invocationId" in inlineSessionState:
             raise ValueError("invocationId key is not supported in sessionState")
 
-        inlineSessionState = copy.deepcopy(inlineSessionState)
         inlineSessionState = {"returnControlInvocationResults": []}
         inlineSessionState["invocationId"] = roc_event["invocationId"]
 
-        for invocationInput in roc_event["invocationInputs"]:
+        results: List[Dict] = [None] * len(roc_event["invocationInputs"])
+        # Calls are only started once every input was checked, so a bad input
+        # leaves no coroutine behind that is never awaited.
+        pending: List[Tuple[int, Callable[[], Awaitable[Dict]]]] = list()
+
+        for index, invocationInput in enumerate(roc_event["invocationInputs"]):
 
             # This is a Tagged Union structure. Only one of the following top level keys will be set: apiInvocationInput, functionInvocationInput.
             # If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member.
@@ -39,63 +64,10 @@ class ProcessROC:
                 "actionInvocationType"
             ]
             functionInvocationInput = invocationInput["functionInvocationInput"]
-            actionGroup = functionInvocationInput["actionGroup"]
 
-            parameters = dict()
-            for param in functionInvocationInput["parameters"]:
-                if param["type"] == "array":
-                    result = None
-                    try:
-                        result = json.loads(param["value"])
-                    except Exception as e:
-                        print(f"JSON parsing error: {str(e)}")
-                        print(f"Attempting to fix malformed JSON: {param['value']}")
-                        try:
-                            # More robust JSON string handling
-                            json_str = param["value"]
-                            # First try to detect if it's already in a valid format but with syntax errors
-                            if json_str.startswith('{') or json_str.startswith('['):
-                                # Try different approaches to fix common JSON errors
-                                try:
-                                    # Try to evaluate as Python literal
-                                    import ast
-                                    result = ast.literal_eval(json_str)
-                                except:
-                                    # If that doesn't work, try more aggressive replacements
-                                    json_str = (
-                                        json_str
-                                        .replace("=", ":")
-                                        .replace("[{", '[{"')
-                                        .replace("}]", '"}]')
-                                    )
-                                    json_str = json_str.replace(", ", '", "').replace(":", '":"')
-                                    # Fix double replacement of colons inside already quoted strings
-                                    json_str = json_str.replace('"":""', '":"')
-                                    result = json.loads(json_str)
-                            else:
-                                # Handle non-JSON formatted strings
-                                # Convert from key=value format to JSON
-                                pairs = [p.strip() for p in json_str.split(',')]
-                                result_dict = {}
-                                for pair in pairs:
-                                    if '=' in pair:
-                                        k, v = pair.split('=', 1)
-                                        result_dict[k.strip()] = v.strip()
-                                result = result_dict
-                        except Exception as parse_error:
-                            print(f"Failed to fix JSON: {str(parse_error)}")
-                            # As a last resort, just return the string as-is
-                            result = param["value"]
-                    finally:
-                        parameters[param["name"]] = result
-                elif param["type"] == "string":
-                    parameters[param["name"]] = param["value"]
-                elif param["type"] == "number":
-                    parameters[param["name"]] = int(param["value"])
-                elif param["type"] == "boolean":
-                    parameters[param["name"]] = bool(param["value"])
-                elif param["type"] == "integer":
-                    parameters[param["name"]] = int(param["value"])
+            parameters = ProcessROC.parse_parameters(
+                functionInvocationInput["parameters"]
+            )
             if (
                 actionInvocationType == "RESULT"
                 or actionInvocationType == "USER_CONFIRMATION_AND_RESULT"
@@ -110,40 +82,160 @@ class ProcessROC:
                     )
 
                 if actionInvocationType == "USER_CONFIRMATION_AND_RESULT":
-                    await ProcessROC.process_user_confirmation(
-                        sessionState=inlineSessionState,
+                    results[index] = await ProcessROC._confirm(
                         tool_to_invoke=tool_to_invoke,
                         functionInvocationInput=functionInvocationInput,
                         include_result=True,
                         parameters=parameters,
+                        tool_timeout=tool_timeout,
+                        sink=sink,
                     )
 
                 else:
-                    inlineSessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": await ProcessROC.invoke_roc_function(
+                    pending.append(
+                        (
+                            index,
+                            functools.partial(
+                                ProcessROC.invoke_roc_function,
                                 functionInvocationInput=functionInvocationInput,
                                 tool_to_invoke=tool_to_invoke,
                                 parameters=parameters,
                                 confirm=None,
-                            )
-                        }
+                                timeout=tool_timeout,
+                                sink=sink,
+                            ),
+                        )
                     )
 
             elif actionInvocationType == "USER_CONFIRMATION":
                 tool_to_invoke = functionInvocationInput["function"]
-                await ProcessROC.process_user_confirmation(
-                    sessionState=inlineSessionState,
+                results[index] = await ProcessROC._confirm(
                     tool_to_invoke=tool_to_invoke,
                     functionInvocationInput=functionInvocationInput,
                     include_result=False,
                     parameters=parameters,
+                    tool_timeout=tool_timeout,
+                    sink=sink,
                 )
 
-        inlineSessionState.update(inlineSessionState)
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def timed(index: int, invoke: Callable[[], Awaitable[Dict]]) -> Dict:
+            if tool_calls is None:
+                return await invoke()
+            start = time.perf_counter()
+            result = await invoke()
+            functionInvocationInput = roc_event["invocationInputs"][index][
+                "functionInvocationInput"
+            ]
+            tool_calls.append(
+                ToolCall(
+                    name=functionInvocationInput["function"],
+                    action_group=functionInvocationInput["actionGroup"],
+                    seconds=time.perf_counter() - start,
+                    ok=result.get("responseState") != "FAILURE",
+                )
+            )
+            return result
+
+        async def run(index: int, invoke: Callable[[], Awaitable[Dict]]):
+            if semaphore is None:
+                results[index] = {"functionResult": await timed(index, invoke)}
+                return
+            async with semaphore:
+                results[index] = {"functionResult": await timed(index, invoke)}
+
+        await asyncio.gather(*(run(index, invoke) for index, invoke in pending))
+
+        inlineSessionState["returnControlInvocationResults"] = [
+            result for result in results if result is not None
+        ]
 
         return inlineSessionState
 
+    @staticmethod
+    def parse_parameters(parameters: List[Dict]) -> Dict[str, Any]:
+        """Convert function invocation parameters to python values by type."""
+        parsed = dict()
+        for param in parameters:
+            if param["type"] == "array":
+                result = None
+                try:
+                    result = json.loads(param["value"])
+                except Exception as e:
+                    print(f"JSON parsing error: {str(e)}")
+                    print(f"Attempting to fix malformed JSON: {param['value']}")
+                    try:
+                        # More robust JSON string handling
+                        json_str = param["value"]
+                        # First try to detect if it's already in a valid format but with syntax errors
+                        if json_str.startswith("{") or json_str.startswith("["):
+                            # Try different approaches to fix common JSON errors
+                            try:
+                                # Try to evaluate as Python literal
+                                import ast
+
+                                result = ast.literal_eval(json_str)
+                            except:
+                                # If that doesn't work, try more aggressive replacements
+                                json_str = (
+                                    json_str.replace("=", ":")
+                                    .replace("[{", '[{"')
+                                    .replace("}]", '"}]')
+                                )
+                                json_str = json_str.replace(", ", '", "').replace(
+                                    ":", '":"'
+                                )
+                                # Fix double replacement of colons inside already quoted strings
+                                json_str = json_str.replace('"":""', '":"')
+                                result = json.loads(json_str)
+                        else:
+                            # Handle non-JSON formatted strings
+                            # Convert from key=value format to JSON
+                            pairs = [p.strip() for p in json_str.split(",")]
+                            result_dict = {}
+                            for pair in pairs:
+                                if "=" in pair:
+                                    k, v = pair.split("=", 1)
+                                    result_dict[k.strip()] = v.strip()
+                            result = result_dict
+                    except Exception as parse_error:
+                        print(f"Failed to fix JSON: {str(parse_error)}")
+                        # As a last resort, just return the string as-is
+                        result = param["value"]
+                finally:
+                    parsed[param["name"]] = result
+            elif param["type"] == "string":
+                parsed[param["name"]] = param["value"]
+            elif param["type"] == "number":
+                parsed[param["name"]] = int(param["value"])
+            elif param["type"] == "boolean":
+                parsed[param["name"]] = bool(param["value"])
+            elif param["type"] == "integer":
+                parsed[param["name"]] = int(param["value"])
+        return parsed
+
+    @staticmethod
+    async def _confirm(
+        functionInvocationInput: Dict,
+        include_result: bool,
+        parameters: Dict,
+        tool_to_invoke: Union[str, Callable],
+        tool_timeout: Optional[float],
+        sink: OutputSink,
+    ) -> Dict:
+        sessionState = {"returnControlInvocationResults": []}
+        await ProcessROC.process_user_confirmation(
+            sessionState=sessionState,
+            tool_to_invoke=tool_to_invoke,
+            functionInvocationInput=functionInvocationInput,
+            include_result=include_result,
+            parameters=parameters,
+            tool_timeout=tool_timeout,
+            sink=sink,
+        )
+        return sessionState["returnControlInvocationResults"][0]
+
     @staticmethod
     async def process_user_confirmation(
         sessionState: Dict,
@@ -151,6 +243,8 @@ class ProcessROC:
         include_result: bool,
         parameters: Dict,
         tool_to_invoke: Union[str, Callable] = None,
+        tool_timeout: Optional[float] = None,
+        sink: OutputSink = None,
     ):
         while True:
             if isinstance(tool_to_invoke, Callable):
@@ -168,6 +262,8 @@ class ProcessROC:
                                 tool_to_invoke=tool_to_invoke,
                                 confirm="CONFIRM",
                                 parameters=parameters,
+                                timeout=tool_timeout,
+                                sink=sink,
                             )
                         }
                     )
@@ -223,7 +319,17 @@ class ProcessROC:
         parameters: Dict = dict(),
         confirm: str = None,
         tool_to_invoke: Callable = None,
+        timeout: Optional[float] = None,
+        sink: OutputSink = None,
     ) -> Dict:
+        """Invoke a tool and build its function result.
+
+        Coroutine tools run on the event loop and synchronous tools run in the
+        default thread pool so they do not block other sessions. A tool that
+        exceeds ``timeout`` seconds returns a FAILURE result. Only coroutine
+        tools are cancelled on timeout; a synchronous tool runs to completion
+        in its thread.
+        """
 
         functionResult = dict
 
@@ -231,16 +337,18 @@ class ProcessROC:
         try:
 
             if inspect.iscoroutinefunction(tool_to_invoke):
-                result = await tool_to_invoke(**parameters)
+                invocation = tool_to_invoke(**parameters)
             else:
-                result = tool_to_invoke(**parameters)
+                invocation = asyncio.to_thread(
+                    functools.partial(tool_to_invoke, **parameters)
+                )
+            result = await asyncio.wait_for(invocation, timeout=timeout)
 
-            print(
-                colored(
-                    f"Tool output: {result}",
-                    TraceColor.invocation_input,
+            sink = sink or get_output_sink()
+            if sink.enabled:
+                sink.write(
+                    f"Tool output: {result}", TraceColor.invocation_input, kind="tool"
                 )
-            )
 
             functionResult = {
                 "actionGroup": functionInvocationInput["actionGroup"],
@@ -248,6 +356,18 @@ class ProcessROC:
                 "function": functionInvocationInput["function"],
                 "responseBody": {"TEXT": {"body": result}},
             }
+        except asyncio.TimeoutError:
+            functionResult = {
+                "actionGroup": functionInvocationInput["actionGroup"],
+                "agentId": functionInvocationInput["agentId"],
+                "function": functionInvocationInput["function"],
+                "responseBody": {
+                    "TEXT": {
+                        "body": f"{functionInvocationInput['function']} timed out after {timeout} seconds"
+                    }
+                },
+                "responseState": "FAILURE",
+            }
         except Exception as e:
             functionResult = {
                 "actionGroup": functionInvocationInput["actionGroup"],
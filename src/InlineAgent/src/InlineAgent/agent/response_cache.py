@@ -0,0 +1,318 @@
+"""
+Opt-in cache of agent answers for repeated, deterministic questions.
+
+With ``InlineAgent(response_cache=...)`` set, ``stream`` and ``invoke`` look
+the turn up before calling the service and replay the cached answer chunks and
+files on a hit. Entries are keyed on the compiled agent's ``content_hash``, the
+normalized input text and the session state keys listed in ``state_keys``, so
+changing the instruction, tools, knowledge bases or any other request field
+misses.
+
+A turn is only stored when the agent answered and every return of control in
+it ran tools marked with ``@cacheable``. Turns with uncached tools, user
+confirmation or user input are passed through, as are turns whose session
+state carries keys outside ``state_keys`` (e.g. conversation history or files).
+
+Cached answers never reach the service, so they are not part of the service
+side session memory of ``session_id``.
+
+Backends:
+
+* ``MemoryResponseCache``: LRU with TTL, per process,
+* ``DiskResponseCache``: SQLite file with TTL and LRU, shared across processes.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from InlineAgent.agent.events import FilesEvent, OutputFile, TextChunk
+
+DEFAULT_STATE_KEYS = ("sessionAttributes", "promptSessionAttributes")
+
+
+def cacheable(func: Callable) -> Callable:
+    """Mark a tool as safe to cache: same arguments, same result.
+
+    Turns that return control to unmarked tools are never cached.
+    """
+    func.__is_cacheable__ = True
+    return func
+
+
+def normalize_input(input_text: str) -> str:
+    """Collapse whitespace and case so trivially different questions match."""
+    return " ".join(input_text.split()).casefold()
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    """The answer events of one turn, in the order they arrived."""
+
+    events: Tuple[object, ...]
+
+    @property
+    def text(self) -> str:
+        return "".join(
+            event.text for event in self.events if isinstance(event, TextChunk)
+        )
+
+    def to_json(self) -> str:
+        events = list()
+        for event in self.events:
+            if isinstance(event, TextChunk):
+                events.append({"text": event.text, "attribution": event.attribution})
+            else:
+                events.append(
+                    {
+                        "files": [
+                            {
+                                "name": this_file.name,
+                                "type": this_file.type,
+                                "data": base64.b64encode(this_file.data).decode(),
+                            }
+                            for this_file in event.files
+                        ]
+                    }
+                )
+        return json.dumps(events, default=str)
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedResponse":
+        events = list()
+        for event in json.loads(data):
+            if "files" in event:
+                events.append(
+                    FilesEvent(
+                        files=tuple(
+                            OutputFile(
+                                name=this_file["name"],
+                                type=this_file["type"],
+                                data=base64.b64decode(this_file["data"]),
+                            )
+                            for this_file in event["files"]
+                        )
+                    )
+                )
+            else:
+                events.append(
+                    TextChunk(text=event["text"], attribution=event["attribution"])
+                )
+        return cls(events=tuple(events))
+
+
+class ResponseCache(ABC):
+    """Store of ``CachedResponse`` by key.
+
+    Args:
+        ttl (float): Seconds an entry lives. ``None`` keeps it until evicted.
+        max_entries (int): Entries kept; the least recently used go first.
+        state_keys (Sequence[str]): Session state keys that are part of the
+            key. Turns whose session state has other keys are not cached.
+    """
+
+    # Whether get and set do I/O and should run off the event loop.
+    blocking = False
+
+    def __init__(
+        self,
+        ttl: Optional[float] = 3600.0,
+        max_entries: int = 1024,
+        state_keys: Sequence[str] = DEFAULT_STATE_KEYS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.state_keys = tuple(state_keys)
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self, content_hash: str, input_text: str, session_state: Optional[Dict]
+    ) -> Optional[str]:
+        """Key of a turn, ``None`` when the session state makes it uncacheable."""
+        session_state = session_state or {}
+        if any(name not in self.state_keys for name in session_state):
+            return None
+        payload = json.dumps(
+            [
+                content_hash,
+                normalize_input(input_text),
+                {name: session_state.get(name) for name in self.state_keys},
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, response: CachedResponse):
+        self._set(key, response)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, response: CachedResponse):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with TTL."""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = 3600.0,
+        max_entries: int = 1024,
+        state_keys: Sequence[str] = DEFAULT_STATE_KEYS,
+    ):
+        super().__init__(ttl=ttl, max_entries=max_entries, state_keys=state_keys)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[float, CachedResponse]] = OrderedDict()
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, response = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def _set(self, key: str, response: CachedResponse):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskResponseCache(ResponseCache):
+    """SQLite backed cache with TTL and LRU eviction.
+
+    Args:
+        path (str): Database file, created when missing.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = 86400.0,
+        max_entries: int = 10000,
+        state_keys: Sequence[str] = DEFAULT_STATE_KEYS,
+    ):
+        super().__init__(ttl=ttl, max_entries=max_entries, state_keys=state_keys)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, expires REAL, accessed REAL, value TEXT)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] is not None and row[0] < now:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return CachedResponse.from_json(row[1])
+
+    def _set(self, key: str, response: CachedResponse):
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        value = response.to_json()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, expires, now, value),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+
+def roc_is_cacheable(
+    invocation_inputs: Iterable[Dict], tool_map: Optional[Dict[str, Callable]]
+) -> bool:
+    """Whether every input of a return of control runs a ``@cacheable`` tool
+    without asking the user."""
+    tool_map = tool_map or {}
+    for invocation_input in invocation_inputs:
+        function_input = invocation_input.get("functionInvocationInput")
+        if function_input is None or function_input.get("actionInvocationType") != (
+            "RESULT"
+        ):
+            return False
+        tool = tool_map.get(function_input.get("function"))
+        if not getattr(tool, "__is_cacheable__", False):
+            return False
+    return True
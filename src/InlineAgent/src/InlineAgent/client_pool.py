@@ -0,0 +1,141 @@
+"""
+Shared pool of boto3 sessions and clients.
+
+Creating a ``boto3.Session`` resolves credentials and creating a client builds
+a new HTTP connection pool, both of which are expensive to repeat on every
+invoke. ``ClientPool`` keeps one session per profile and one client per
+(service, profile, region, config) so that ``InlineAgent``,
+``CollaboratorAgent``, ``KnowledgeBasePlugin`` and ``ActionGroup`` reuse warm,
+keep-alive connections.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_SIZE = 32
+DEFAULT_MAX_CONNECTIONS = 50
+
+ClientFactory = Callable[[boto3.Session, str, Optional[str], Config], Any]
+
+
+def default_client_factory(
+    session: boto3.Session,
+    service_name: str,
+    region_name: Optional[str],
+    config: Config,
+):
+    return session.client(service_name, region_name=region_name, config=config)
+
+
+def config_key(config: Optional[Config]) -> Hashable:
+    """Build a hashable key from the user provided options of a botocore Config."""
+    if config is None:
+        return None
+    options = getattr(config, "_user_provided_options", None)
+    if options is None:
+        return id(config)
+    return repr(sorted(options.items()))
+
+
+class ClientPool:
+    """Thread-safe LRU pool of boto3 sessions and clients.
+
+    Args:
+        max_size (int): Maximum number of clients kept alive in the pool.
+        max_connections (int): Maximum HTTP connections kept per client.
+        config (Config): Default botocore Config merged into every client.
+        client_factory (Callable): Builds a client from
+            ``(session, service_name, region_name, config)``.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_POOL_SIZE,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        config: Optional[Config] = None,
+        client_factory: Optional[ClientFactory] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.config = Config(tcp_keepalive=True, max_pool_connections=max_connections)
+        if config is not None:
+            self.config = self.config.merge(config)
+        self.client_factory = client_factory or default_client_factory
+
+        self._lock = threading.RLock()
+        self._sessions: dict = dict()
+        self._clients: OrderedDict = OrderedDict()
+
+    def get_session(self, profile: Optional[str] = "default") -> boto3.Session:
+        """Return the shared session for a profile, creating it once."""
+        with self._lock:
+            session = self._sessions.get(profile)
+            if session is None:
+                session = boto3.Session(profile_name=profile)
+                self._sessions[profile] = session
+            return session
+
+    def get_client(
+        self,
+        service_name: str,
+        profile: Optional[str] = "default",
+        region: Optional[str] = None,
+        config: Optional[Config] = None,
+    ):
+        """Return a pooled client for the service, profile, region and config."""
+        key: Tuple = (service_name, profile, region, config_key(config))
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            session = self.get_session(profile)
+            client_config = self.config.merge(config) if config else self.config
+            client = self.client_factory(
+                session, service_name, region or session.region_name, client_config
+            )
+            self._clients[key] = client
+
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+
+            return client
+
+    def set_client_factory(self, client_factory: Optional[ClientFactory]):
+        """Replace the client factory and drop every cached client."""
+        with self._lock:
+            self.client_factory = client_factory or default_client_factory
+            self._clients.clear()
+
+    def clear(self):
+        """Drop every cached session and client."""
+        with self._lock:
+            self._clients.clear()
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_client_pool = ClientPool()
+
+
+def get_client_pool() -> ClientPool:
+    """Return the process-wide client pool."""
+    return _client_pool
+
+
+def set_client_pool(client_pool: ClientPool) -> ClientPool:
+    """Install a process-wide client pool and return the previous one."""
+    global _client_pool
+
+    previous, _client_pool = _client_pool, client_pool
+    return previous
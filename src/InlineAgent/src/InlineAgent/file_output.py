@@ -0,0 +1,189 @@
+"""
+Background writer for files returned by the agent.
+
+``files`` events carry whole artifacts (e.g. code interpreter charts) as bytes.
+``FileOutputWriter`` writes them on worker threads, slicing the payload through
+a ``memoryview`` so no copies are made, and hashes the content while writing.
+Callers get a ``SavedFile`` with the path, size and SHA-256, which is what
+``observe()`` records in spans instead of the decoded payload.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Literal, Optional, Union
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+TruncationPolicy = Literal["truncate", "skip", "error"]
+
+
+@dataclass(frozen=True)
+class SavedFile:
+    """Result of writing one agent file.
+
+    ``path`` is ``None`` when the file was skipped because it exceeded the cap.
+    ``size`` is the number of bytes written and ``original_size`` the size the
+    agent returned.
+    """
+
+    name: str
+    path: Optional[str]
+    size: int
+    original_size: int
+    sha256: str
+    truncated: bool = False
+    type: str = ""
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class FileOutputWriter:
+    """Write agent files to ``<directory>/<session_id>/<name>`` off the event loop.
+
+    Args:
+        directory (str): Root output directory, relative to the working
+            directory of each write when not absolute.
+        max_bytes (int): Largest file written in full. ``None`` has no cap.
+        truncation (str): What to do with a file larger than ``max_bytes``:
+            ``"truncate"`` writes the first ``max_bytes`` bytes, ``"skip"``
+            writes nothing and ``"error"`` fails the write with ``ValueError``.
+        chunk_size (int): Bytes written and hashed per step.
+        max_workers (int): Threads used for writing.
+    """
+
+    def __init__(
+        self,
+        directory: str = "output",
+        max_bytes: Optional[int] = None,
+        truncation: TruncationPolicy = "truncate",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_workers: int = 2,
+    ):
+        if truncation not in ("truncate", "skip", "error"):
+            raise ValueError(f"Unsupported truncation policy {truncation}")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.truncation = truncation
+        self.chunk_size = chunk_size
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inline-agent-files"
+        )
+        self._lock = threading.Lock()
+        self._directories = set()
+
+    def submit(
+        self,
+        session_id: str,
+        name: str,
+        data: Union[bytes, bytearray, memoryview],
+        type: str = "",
+    ) -> "Future[SavedFile]":
+        """Queue a file for writing and return a future for its ``SavedFile``."""
+        return self._executor.submit(
+            self._write, str(session_id), name, memoryview(data), type
+        )
+
+    async def save(
+        self,
+        session_id: str,
+        name: str,
+        data: Union[bytes, bytearray, memoryview],
+        type: str = "",
+    ) -> SavedFile:
+        """Write a file without blocking the event loop."""
+        return await asyncio.wrap_future(
+            self.submit(session_id=session_id, name=name, data=data, type=type)
+        )
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _session_directory(self, session_id: str, create: bool = False) -> str:
+        directory = os.path.join(os.path.abspath(self.directory), session_id)
+        with self._lock:
+            if create or directory not in self._directories:
+                os.makedirs(directory, exist_ok=True)
+                self._directories.add(directory)
+        return directory
+
+    def _write(
+        self, session_id: str, name: str, view: memoryview, type: str
+    ) -> SavedFile:
+        view = view.cast("B")
+        original_size = view.nbytes
+        truncated = self.max_bytes is not None and original_size > self.max_bytes
+
+        if truncated and self.truncation == "error":
+            raise ValueError(
+                f"File {name} is {original_size} bytes, over the {self.max_bytes} byte cap"
+            )
+        if truncated and self.truncation == "skip":
+            return SavedFile(
+                name=name,
+                path=None,
+                size=0,
+                original_size=original_size,
+                sha256="",
+                truncated=True,
+                type=type,
+            )
+        if truncated:
+            view = view[: self.max_bytes]
+
+        # Only keep the base name so a returned file cannot escape the directory.
+        base_name = os.path.basename(name)
+        path = os.path.join(self._session_directory(session_id), base_name)
+        try:
+            file = open(path, "wb")
+        except FileNotFoundError:
+            # The directory was removed after it was created, e.g. by a cleanup.
+            path = os.path.join(
+                self._session_directory(session_id, create=True), base_name
+            )
+            file = open(path, "wb")
+        digest = hashlib.sha256()
+        with file:
+            for offset in range(0, view.nbytes, self.chunk_size):
+                chunk = view[offset : offset + self.chunk_size]
+                digest.update(chunk)
+                file.write(chunk)
+
+        return SavedFile(
+            name=name,
+            path=path,
+            size=view.nbytes,
+            original_size=original_size,
+            sha256=digest.hexdigest(),
+            truncated=truncated,
+            type=type,
+        )
+
+
+_writer_lock = threading.Lock()
+_file_writer: Optional[FileOutputWriter] = None
+
+
+def get_file_writer() -> FileOutputWriter:
+    """Return the process-wide file writer, creating it on first use."""
+    global _file_writer
+
+    with _writer_lock:
+        if _file_writer is None:
+            _file_writer = FileOutputWriter()
+        return _file_writer
+
+
+def set_file_writer(writer: Optional[FileOutputWriter]) -> Optional[FileOutputWriter]:
+    """Install a process-wide file writer and return the previous one."""
+    global _file_writer
+
+    with _writer_lock:
+        previous, _file_writer = _file_writer, writer
+        return previous
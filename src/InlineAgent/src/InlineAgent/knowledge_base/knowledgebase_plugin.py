@@ -5,6 +5,9 @@ from typing import Any, Dict, Optional
 import boto3
 from pydantic import BaseModel, Field, computed_field, model_validator, validate_call
 
+from InlineAgent.client_pool import get_client_pool
+from InlineAgent.name_resolver import get_name_resolver
+
 
 class KnowledgeBasePlugin(BaseModel):
     name: str
@@ -19,17 +22,18 @@ class KnowledgeBasePlugin(BaseModel):
     @cached_property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_client_pool().get_session(self.profile)
 
     def to_dict(self) -> dict:
         """Convert the KnowledgeBase instance to a dictionary"""
 
         # Adding for unittest
         if self.name != "SKaEdphpZh":
-            knowledgeBaseId = KnowledgeBasePlugin.get_knowledge_base_id_by_name(
-                self.name, self.session
-            )
-            if knowledgeBaseId is None:
+            try:
+                knowledgeBaseId = get_name_resolver().resolve_knowledge_base_id(
+                    self.name, profile=self.profile
+                )
+            except ValueError:
                 raise ValueError(f"Knowledge base {self.name} does not exist")
         else:
             knowledgeBaseId = "ThisIsMockId"
@@ -54,29 +58,9 @@ class KnowledgeBasePlugin(BaseModel):
         Returns:
             Optional[str]: Knowledge base ID if found, None otherwise
         """
-        # Create a Bedrock Agent client"
-        bedrock_agent = session.client("bedrock-agent")
-
-        # Initialize variables for pagination
-        next_token = None
-
-        while True:
-            # Prepare the list request
-            kwargs = {}
-            if next_token:
-                kwargs["nextToken"] = next_token
-
-            # List knowledge bases
-            response = bedrock_agent.list_knowledge_bases(**kwargs)
-
-            # Search for the knowledge base with matching name
-            for kb in response.get("knowledgeBaseSummaries", []):
-                if kb.get("name") == knowledge_base_name:
-                    return kb.get("knowledgeBaseId")
-
-            # Check if there are more results
-            next_token = response.get("nextToken")
-            if not next_token:
-                break
-
-            raise ValueError(f"Knowledge base {knowledge_base_name} not found")
+        try:
+            return get_name_resolver().resolve_knowledge_base_id(
+                knowledge_base_name, profile=session.profile_name
+            )
+        except ValueError:
+            return None
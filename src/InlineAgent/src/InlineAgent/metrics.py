@@ -0,0 +1,576 @@
+"""
+Per-invoke metrics and the exporters that publish them.
+
+``InlineAgent.stream`` fills an ``InvokeMetrics`` while it consumes the event
+stream: token usage per step type, model and collaborator, LLM calls,
+time to first token, tool latencies, return of control round trips and wall
+time. ``InlineAgent.invoke`` returns it on ``InvokeResult.metrics`` and the
+last ``UsageTotals`` event of ``stream`` carries it too.
+
+Every finished turn is also handed to a ``MetricsExporter``, the agent's own
+(``InlineAgent(metrics_exporter=...)``) or the process-wide one installed with
+``set_metrics_exporter``:
+
+* ``PrometheusMetricsExporter`` aggregates counters and histograms and renders
+  the Prometheus text format for a ``/metrics`` endpoint,
+* ``StatsDMetricsExporter`` sends counters and timers over UDP,
+* ``OTelMetricsExporter`` records OpenTelemetry metrics on a meter.
+
+Exporters read the ``InvokeMetrics`` object; traces are never parsed twice.
+"""
+
+import logging
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# (step type, model, collaborator)
+UsageKey = Tuple[str, str, str]
+
+
+@dataclass(slots=True)
+class TokenUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int, llm_calls: int):
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.llm_calls += llm_calls
+
+
+@dataclass(frozen=True, slots=True)
+class ToolCall:
+    """One tool run for a return of control event."""
+
+    name: str
+    action_group: str
+    seconds: float
+    ok: bool = True
+
+
+@dataclass(slots=True)
+class InvokeMetrics:
+    """What one agent turn used and how long it took.
+
+    ``usage`` is keyed on ``(step type, model, collaborator)``; the
+    ``usage_by_*`` methods sum it along one of them. Times are in seconds.
+    ``time_to_first_token`` is ``None`` when no text arrived. ``cache_hit``
+    turns were answered from the agent's response cache without a request.
+    """
+
+    agent_name: str = ""
+    session_id: str = ""
+    usage: Dict[UsageKey, TokenUsage] = field(default_factory=dict)
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    roc_round_trips: int = 0
+    requests: int = 0
+    cache_hit: bool = False
+    time_to_first_token: Optional[float] = None
+    duration_seconds: float = 0.0
+
+    def add_usage(
+        self,
+        step_type: str,
+        model: str,
+        collaborator: str,
+        input_tokens: int,
+        output_tokens: int,
+        llm_calls: int,
+    ):
+        key = (step_type, model, collaborator)
+        usage = self.usage.get(key)
+        if usage is None:
+            usage = self.usage[key] = TokenUsage()
+        usage.add(input_tokens, output_tokens, llm_calls)
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(usage.input_tokens for usage in self.usage.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(usage.output_tokens for usage in self.usage.values())
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def llm_calls(self) -> int:
+        return sum(usage.llm_calls for usage in self.usage.values())
+
+    def usage_by_step(self) -> Dict[str, TokenUsage]:
+        return self._usage_by(0)
+
+    def usage_by_model(self) -> Dict[str, TokenUsage]:
+        return self._usage_by(1)
+
+    def usage_by_collaborator(self) -> Dict[str, TokenUsage]:
+        return self._usage_by(2)
+
+    def tool_seconds(self) -> Dict[str, List[float]]:
+        """Latency of every call, grouped by tool name."""
+        seconds: Dict[str, List[float]] = defaultdict(list)
+        for call in self.tool_calls:
+            seconds[call.name].append(call.seconds)
+        return dict(seconds)
+
+    def _usage_by(self, index: int) -> Dict[str, TokenUsage]:
+        totals: Dict[str, TokenUsage] = dict()
+        for key, usage in self.usage.items():
+            total = totals.get(key[index])
+            if total is None:
+                total = totals[key[index]] = TokenUsage()
+            total.add(usage.input_tokens, usage.output_tokens, usage.llm_calls)
+        return totals
+
+    def to_dict(self) -> Dict:
+        return {
+            "agent_name": self.agent_name,
+            "session_id": self.session_id,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "llm_calls": self.llm_calls,
+            "usage": [
+                {
+                    "step_type": step_type,
+                    "model": model,
+                    "collaborator": collaborator,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                    "llm_calls": usage.llm_calls,
+                }
+                for (step_type, model, collaborator), usage in self.usage.items()
+            ],
+            "tool_calls": [
+                {
+                    "name": call.name,
+                    "action_group": call.action_group,
+                    "seconds": call.seconds,
+                    "ok": call.ok,
+                }
+                for call in self.tool_calls
+            ],
+            "roc_round_trips": self.roc_round_trips,
+            "requests": self.requests,
+            "cache_hit": self.cache_hit,
+            "time_to_first_token": self.time_to_first_token,
+            "duration_seconds": self.duration_seconds,
+        }
+
+
+class InvokeResult(str):
+    """The answer of ``InlineAgent.invoke`` with the metrics of the turn.
+
+    It is the answer string itself, so callers that treat the result as a
+    ``str`` keep working.
+    """
+
+    metrics: InvokeMetrics
+
+    def __new__(cls, answer: str, metrics: InvokeMetrics):
+        result = super().__new__(cls, answer)
+        result.metrics = metrics
+        return result
+
+    @property
+    def answer(self) -> str:
+        return str(self)
+
+    def __reduce__(self):
+        return (InvokeResult, (str(self), self.metrics))
+
+
+class MetricsExporter(ABC):
+    """Publishes the metrics of every finished agent turn."""
+
+    @abstractmethod
+    def export(self, metrics: InvokeMetrics) -> None:
+        pass
+
+
+def export_metrics(metrics: InvokeMetrics, exporter: Optional[MetricsExporter]):
+    """Hand ``metrics`` to ``exporter``; exporter errors are logged, not raised."""
+    if exporter is None:
+        return
+    try:
+        exporter.export(metrics)
+    except Exception:
+        logger.exception("Exporting invoke metrics failed")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class PrometheusMetricsExporter(MetricsExporter):
+    """Aggregate turns in memory and render the Prometheus text format.
+
+    Serve ``render()`` from a ``/metrics`` endpoint.
+
+    Args:
+        namespace (str): Prefix of every metric name.
+        buckets (Sequence[float]): Upper bounds, in seconds, of the duration,
+            time to first token and tool latency histograms.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "inline_agent",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # name -> (help, label names, {label values: value})
+        self._counters: Dict[str, Tuple[str, Tuple[str, ...], Dict]] = dict()
+        self._histograms: Dict[str, Tuple[str, Tuple[str, ...], Dict]] = dict()
+
+    def export(self, metrics: InvokeMetrics) -> None:
+        agent = metrics.agent_name
+        with self._lock:
+            self._inc("invocations_total", "Agent turns.", ("agent",), (agent,))
+            self._inc(
+                "requests_total",
+                "Agent runtime requests.",
+                ("agent",),
+                (agent,),
+                metrics.requests,
+            )
+            self._inc(
+                "roc_round_trips_total",
+                "Return of control round trips.",
+                ("agent",),
+                (agent,),
+                metrics.roc_round_trips,
+            )
+            self._inc(
+                "cache_hits_total",
+                "Agent turns answered from the response cache.",
+                ("agent",),
+                (agent,),
+                int(metrics.cache_hit),
+            )
+            usage_labels = ("agent", "step", "model", "collaborator")
+            for (step_type, model, collaborator), usage in metrics.usage.items():
+                values = (agent, step_type, model, collaborator)
+                self._inc(
+                    "input_tokens_total",
+                    "Input tokens.",
+                    usage_labels,
+                    values,
+                    usage.input_tokens,
+                )
+                self._inc(
+                    "output_tokens_total",
+                    "Output tokens.",
+                    usage_labels,
+                    values,
+                    usage.output_tokens,
+                )
+                self._inc(
+                    "llm_calls_total",
+                    "LLM calls.",
+                    usage_labels,
+                    values,
+                    usage.llm_calls,
+                )
+            self._observe(
+                "invoke_duration_seconds",
+                "Wall time of an agent turn.",
+                ("agent",),
+                (agent,),
+                metrics.duration_seconds,
+            )
+            if metrics.time_to_first_token is not None:
+                self._observe(
+                    "time_to_first_token_seconds",
+                    "Time until the first answer text.",
+                    ("agent",),
+                    (agent,),
+                    metrics.time_to_first_token,
+                )
+            for call in metrics.tool_calls:
+                self._observe(
+                    "tool_duration_seconds",
+                    "Latency of tools run for return of control.",
+                    ("agent", "tool", "status"),
+                    (agent, call.name, "ok" if call.ok else "error"),
+                    call.seconds,
+                )
+
+    def _inc(self, name, help, label_names, label_values, amount=1):
+        _, _, values = self._counters.setdefault(name, (help, label_names, dict()))
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def _observe(self, name, help, label_names, label_values, value):
+        _, _, values = self._histograms.setdefault(name, (help, label_names, dict()))
+        histogram = values.get(label_values)
+        if histogram is None:
+            histogram = values[label_values] = _Histogram(len(self.buckets))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram.counts[index] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = list()
+        with self._lock:
+            for name, (help, label_names, values) in sorted(self._counters.items()):
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full_name} {help}")
+                lines.append(f"# TYPE {full_name} counter")
+                for label_values, value in values.items():
+                    lines.append(
+                        f"{full_name}{_labels(label_names, label_values)} {value}"
+                    )
+
+            for name, (help, label_names, values) in sorted(self._histograms.items()):
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full_name} {help}")
+                lines.append(f"# TYPE {full_name} histogram")
+                bucket_names = label_names + ("le",)
+                for label_values, histogram in values.items():
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        lines.append(
+                            f"{full_name}_bucket"
+                            f"{_labels(bucket_names, label_values + (repr(float(bound)),))}"
+                            f" {count}"
+                        )
+                    lines.append(
+                        f"{full_name}_bucket"
+                        f"{_labels(bucket_names, label_values + ('+Inf',))}"
+                        f" {histogram.count}"
+                    )
+                    labels = _labels(label_names, label_values)
+                    lines.append(f"{full_name}_sum{labels} {histogram.sum}")
+                    lines.append(f"{full_name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class StatsDMetricsExporter(MetricsExporter):
+    """Send every turn to a StatsD server over UDP, in one datagram.
+
+    Args:
+        host (str): StatsD host.
+        port (int): StatsD port.
+        prefix (str): Prefix of every metric name.
+        tags (bool): Append DogStatsD ``|#key:value`` tags. Plain StatsD has
+            no tags, so without them usage is only sent as totals.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8125,
+        prefix: str = "inline_agent",
+        tags: bool = True,
+    ):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.tags = tags
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def lines(self, metrics: InvokeMetrics) -> List[str]:
+        """The StatsD lines sent for ``metrics``."""
+        agent = (("agent", metrics.agent_name),)
+        lines = [
+            self._line("invocations", 1, "c", agent),
+            self._line("requests", metrics.requests, "c", agent),
+            self._line("roc_round_trips", metrics.roc_round_trips, "c", agent),
+            self._line("cache_hits", int(metrics.cache_hit), "c", agent),
+            self._line("duration", metrics.duration_seconds * 1000, "ms", agent),
+        ]
+        if metrics.time_to_first_token is not None:
+            lines.append(
+                self._line(
+                    "time_to_first_token",
+                    metrics.time_to_first_token * 1000,
+                    "ms",
+                    agent,
+                )
+            )
+
+        if self.tags:
+            usage = [
+                (
+                    agent
+                    + (("step", step), ("model", model), ("collaborator", collab)),
+                    u,
+                )
+                for (step, model, collab), u in metrics.usage.items()
+            ]
+        else:
+            usage = [
+                (
+                    agent,
+                    TokenUsage(
+                        metrics.input_tokens, metrics.output_tokens, metrics.llm_calls
+                    ),
+                )
+            ]
+        for tags, this_usage in usage:
+            lines.append(self._line("input_tokens", this_usage.input_tokens, "c", tags))
+            lines.append(
+                self._line("output_tokens", this_usage.output_tokens, "c", tags)
+            )
+            lines.append(self._line("llm_calls", this_usage.llm_calls, "c", tags))
+
+        for call in metrics.tool_calls:
+            lines.append(
+                self._line(
+                    "tool_duration",
+                    call.seconds * 1000,
+                    "ms",
+                    agent
+                    + (("tool", call.name), ("status", "ok" if call.ok else "error")),
+                )
+            )
+        return lines
+
+    def _line(
+        self, name: str, value, kind: str, tags: Iterable[Tuple[str, str]]
+    ) -> str:
+        if isinstance(value, float):
+            value = round(value, 3)
+        line = f"{self.prefix}.{name}:{value}|{kind}"
+        if self.tags:
+            line += "|#" + ",".join(
+                f"{key}:{str(tag).replace(',', '_').replace('|', '_')}"
+                for key, tag in tags
+            )
+        return line
+
+    def export(self, metrics: InvokeMetrics) -> None:
+        try:
+            self._socket.sendto("\n".join(self.lines(metrics)).encode(), self.address)
+        except OSError as e:
+            # A full socket buffer or unreachable host must not fail the turn.
+            logger.debug(f"StatsD send failed: {e}")
+
+    def close(self):
+        self._socket.close()
+
+
+class OTelMetricsExporter(MetricsExporter):
+    """Record turns as OpenTelemetry metrics.
+
+    Args:
+        meter (Meter): Meter to create the instruments on. Defaults to the
+            ``InlineAgent`` meter of the global meter provider.
+    """
+
+    def __init__(self, meter=None):
+        if meter is None:
+            from opentelemetry import metrics
+
+            meter = metrics.get_meter("InlineAgent")
+
+        self.invocations = meter.create_counter(
+            "inline_agent.invocations", description="Agent turns."
+        )
+        self.requests = meter.create_counter(
+            "inline_agent.requests", description="Agent runtime requests."
+        )
+        self.roc_round_trips = meter.create_counter(
+            "inline_agent.roc_round_trips",
+            description="Return of control round trips.",
+        )
+        self.cache_hits = meter.create_counter(
+            "inline_agent.cache_hits",
+            description="Agent turns answered from the response cache.",
+        )
+        self.tokens = meter.create_counter(
+            "inline_agent.tokens", unit="{token}", description="Tokens used."
+        )
+        self.llm_calls = meter.create_counter(
+            "inline_agent.llm_calls", description="LLM calls."
+        )
+        self.duration = meter.create_histogram(
+            "inline_agent.invoke.duration", unit="s", description="Agent turn time."
+        )
+        self.time_to_first_token = meter.create_histogram(
+            "inline_agent.time_to_first_token",
+            unit="s",
+            description="Time until the first answer text.",
+        )
+        self.tool_duration = meter.create_histogram(
+            "inline_agent.tool.duration",
+            unit="s",
+            description="Latency of tools run for return of control.",
+        )
+
+    def export(self, metrics: InvokeMetrics) -> None:
+        agent = {"agent": metrics.agent_name}
+        self.invocations.add(1, agent)
+        self.requests.add(metrics.requests, agent)
+        self.roc_round_trips.add(metrics.roc_round_trips, agent)
+        self.cache_hits.add(int(metrics.cache_hit), agent)
+        for (step_type, model, collaborator), usage in metrics.usage.items():
+            attributes = {
+                **agent,
+                "step": step_type,
+                "model": model,
+                "collaborator": collaborator,
+            }
+            self.tokens.add(usage.input_tokens, {**attributes, "direction": "input"})
+            self.tokens.add(usage.output_tokens, {**attributes, "direction": "output"})
+            self.llm_calls.add(usage.llm_calls, attributes)
+        self.duration.record(metrics.duration_seconds, agent)
+        if metrics.time_to_first_token is not None:
+            self.time_to_first_token.record(metrics.time_to_first_token, agent)
+        for call in metrics.tool_calls:
+            self.tool_duration.record(
+                call.seconds,
+                {**agent, "tool": call.name, "status": "ok" if call.ok else "error"},
+            )
+
+
+_metrics_exporter: Optional[MetricsExporter] = None
+
+
+def get_metrics_exporter() -> Optional[MetricsExporter]:
+    """Return the process-wide metrics exporter, ``None`` when not set."""
+    return _metrics_exporter
+
+
+def set_metrics_exporter(
+    exporter: Optional[MetricsExporter],
+) -> Optional[MetricsExporter]:
+    """Install a process-wide metrics exporter and return the previous one."""
+    global _metrics_exporter
+
+    previous, _metrics_exporter = _metrics_exporter, exporter
+    return previous
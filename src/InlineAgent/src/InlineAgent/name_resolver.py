@@ -0,0 +1,241 @@
+"""
+Process-wide cache for resolving knowledge base and agent names to IDs.
+
+``KnowledgeBasePlugin`` and ``CollaboratorAgent`` are configured by name but
+the Bedrock APIs need IDs. Resolving a name means paging through
+``list_knowledge_bases`` / ``list_agents`` (and ``sts:GetCallerIdentity`` for
+ARNs), so ``NameResolver`` records every name seen during a scan with a TTL
+and can persist the entries to a local JSON file for warm restarts.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Literal, Optional, Tuple
+
+from InlineAgent.client_pool import get_client_pool
+
+DEFAULT_TTL_SECONDS = 15 * 60
+
+ResourceKind = Literal["knowledge_base", "agent", "account"]
+
+_LISTINGS = {
+    "knowledge_base": (
+        "list_knowledge_bases",
+        "knowledgeBaseSummaries",
+        "name",
+        "knowledgeBaseId",
+    ),
+    "agent": ("list_agents", "agentSummaries", "agentName", "agentId"),
+}
+
+
+class NameResolver:
+    """Resolve resource names to IDs with a TTL cache.
+
+    Args:
+        ttl (float): Seconds an entry stays valid. ``None`` never expires.
+        cache_file (str): Optional JSON file used to persist entries.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+        cache_file: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.cache_file = cache_file
+
+        self._lock = threading.RLock()
+        self._entries: Dict[Tuple[str, str, str, str], Tuple[str, float]] = dict()
+
+        if cache_file:
+            self.load()
+
+    def resolve_knowledge_base_id(self, name: str, profile: str = "default") -> str:
+        return self._resolve("knowledge_base", name, profile)
+
+    def resolve_agent_id(self, name: str, profile: str = "default") -> str:
+        return self._resolve("agent", name, profile)
+
+    def resolve_account_id(self, profile: str = "default") -> str:
+        region = self._region(profile)
+        with self._lock:
+            account_id = self._get(("account", profile, region, ""))
+            if account_id is None:
+                sts_client = get_client_pool().get_client("sts", profile=profile)
+                account_id = sts_client.get_caller_identity()["Account"]
+                self._put(("account", profile, region, ""), account_id)
+                self.save()
+            return account_id
+
+    def resolve_many(
+        self, kind: ResourceKind, names: Iterable[str], profile: str = "default"
+    ) -> Dict[str, str]:
+        """Resolve several names of one kind with at most one listing scan."""
+        region = self._region(profile)
+        names = list(dict.fromkeys(names))
+
+        with self._lock:
+            resolved = {
+                name: self._get((kind, profile, region, name)) for name in names
+            }
+            if any(resource_id is None for resource_id in resolved.values()):
+                listing = self._scan(kind, profile, region)
+                resolved = {name: listing.get(name) for name in names}
+
+        missing = [
+            name for name, resource_id in resolved.items() if resource_id is None
+        ]
+        if missing:
+            raise ValueError(f"{kind.replace('_', ' ').title()} {missing} not found")
+        return resolved
+
+    def resolve_agent_tree(self, *roots) -> Dict[str, Dict[str, str]]:
+        """Resolve every knowledge base and collaborator name reachable from roots.
+
+        Roots may be ``InlineAgent``, ``CollaboratorAgent`` or
+        ``KnowledgeBasePlugin`` instances. Each resource type is listed at most
+        once per profile.
+        """
+        from InlineAgent.agent import CollaboratorAgent, InlineAgent
+        from InlineAgent.knowledge_base import KnowledgeBasePlugin
+
+        wanted: Dict[Tuple[str, str], list] = dict()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, InlineAgent):
+                stack.extend(node.collaborators or [])
+                stack.extend(
+                    kb
+                    for kb in node.knowledge_bases
+                    if isinstance(kb, KnowledgeBasePlugin)
+                )
+            elif isinstance(node, CollaboratorAgent):
+                wanted.setdefault(("agent", node.profile), []).append(node.agent_name)
+                self.resolve_account_id(profile=node.profile)
+            elif isinstance(node, KnowledgeBasePlugin):
+                wanted.setdefault(("knowledge_base", node.profile), []).append(
+                    node.name
+                )
+
+        resolved = {"knowledge_base": dict(), "agent": dict()}
+        for (kind, profile), names in wanted.items():
+            resolved[kind].update(self.resolve_many(kind, names, profile=profile))
+
+        return {
+            "knowledge_bases": resolved["knowledge_base"],
+            "agents": resolved["agent"],
+        }
+
+    def invalidate(
+        self,
+        kind: Optional[ResourceKind] = None,
+        name: Optional[str] = None,
+        profile: Optional[str] = None,
+    ):
+        """Drop entries matching every given filter, or all entries."""
+        with self._lock:
+            for key in list(self._entries):
+                entry_kind, entry_profile, _, entry_name = key
+                if kind is not None and entry_kind != kind:
+                    continue
+                if name is not None and entry_name != name:
+                    continue
+                if profile is not None and entry_profile != profile:
+                    continue
+                del self._entries[key]
+            self.save()
+
+    def load(self):
+        """Load unexpired entries from ``cache_file``."""
+        try:
+            with open(self.cache_file, "r") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        now = time.time()
+        with self._lock:
+            for kind, profile, region, name, value, expires_at in data.get(
+                "entries", []
+            ):
+                if expires_at is None or expires_at > now:
+                    self._entries[(kind, profile, region, name)] = (value, expires_at)
+
+    def save(self):
+        """Atomically write the entries to ``cache_file`` if configured."""
+        if not self.cache_file:
+            return
+
+        with self._lock:
+            entries = [
+                [*key, value, expires_at]
+                for key, (value, expires_at) in self._entries.items()
+            ]
+
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump({"version": 1, "entries": entries}, file)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _resolve(self, kind: ResourceKind, name: str, profile: str) -> str:
+        return self.resolve_many(kind, [name], profile=profile)[name]
+
+    def _region(self, profile: str) -> str:
+        return get_client_pool().get_session(profile).region_name or ""
+
+    def _get(self, key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return value
+
+    def _put(self, key, value: str):
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        self._entries[key] = (value, expires_at)
+
+    def _scan(self, kind: ResourceKind, profile: str, region: str) -> Dict[str, str]:
+        operation, summaries_key, name_key, id_key = _LISTINGS[kind]
+        bedrock_agent = get_client_pool().get_client(
+            "bedrock-agent", profile=profile, region=region or None
+        )
+
+        listing = dict()
+        for page in bedrock_agent.get_paginator(operation).paginate():
+            for summary in page.get(summaries_key, []):
+                listing[summary[name_key]] = summary[id_key]
+                self._put((kind, profile, region, summary[name_key]), summary[id_key])
+
+        self.save()
+        return listing
+
+
+_name_resolver = NameResolver()
+
+
+def get_name_resolver() -> NameResolver:
+    """Return the process-wide name resolver."""
+    return _name_resolver
+
+
+def set_name_resolver(name_resolver: NameResolver) -> NameResolver:
+    """Install a process-wide name resolver and return the previous one."""
+    global _name_resolver
+
+    previous, _name_resolver = _name_resolver, name_resolver
+    return previous
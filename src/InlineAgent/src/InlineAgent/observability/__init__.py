@@ -1,6 +1,55 @@
-from .trace import Trace
-from .agent_instrument import observe
-from .settings_management import ObservabilityConfig
-from .trace_provider import create_tracer_provider
+from typing import TYPE_CHECKING
 
-__all__ = ["Trace", "observe", "ObservabilityConfig", "create_tracer_provider"]
+from InlineAgent._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .trace import Trace
+    from .agent_instrument import observe
+    from .dispatch import TraceContext, TraceDispatcher
+    from .process import get_trace_dispatcher, set_trace_dispatcher
+    from .replay import TraceReplayer, load_trace_events
+    from .settings_management import ObservabilityConfig
+    from .trace_provider import create_tracer_provider
+    from .trace_store import (
+        TraceWriter,
+        read_traces,
+        get_trace_writer,
+        set_trace_writer,
+    )
+
+__all__ = [
+    "Trace",
+    "observe",
+    "TraceContext",
+    "TraceDispatcher",
+    "get_trace_dispatcher",
+    "set_trace_dispatcher",
+    "TraceReplayer",
+    "load_trace_events",
+    "ObservabilityConfig",
+    "create_tracer_provider",
+    "TraceWriter",
+    "read_traces",
+    "get_trace_writer",
+    "set_trace_writer",
+]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "Trace": ".trace",
+        "observe": ".agent_instrument",
+        "TraceContext": ".dispatch",
+        "TraceDispatcher": ".dispatch",
+        "get_trace_dispatcher": ".process",
+        "set_trace_dispatcher": ".process",
+        "TraceReplayer": ".replay",
+        "load_trace_events": ".replay",
+        "ObservabilityConfig": ".settings_management",
+        "create_tracer_provider": ".trace_provider",
+        "TraceWriter": ".trace_store",
+        "read_traces": ".trace_store",
+        "get_trace_writer": ".trace_store",
+        "set_trace_writer": ".trace_store",
+    },
+)
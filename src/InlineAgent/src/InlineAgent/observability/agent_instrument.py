@@ -1,11 +1,10 @@
 from datetime import datetime, timezone
+import asyncio
 import functools
+import inspect
 import logging
-import os
+from typing import Any, Dict, List
 from opentelemetry import trace as otel_trace
-from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
 
 
 from opentelemetry.trace import Status, StatusCode, SpanKind
@@ -14,15 +13,20 @@ from openinference.semconv.trace import (
     OpenInferenceSpanKindValues,
 )
 
+from .attributes import AttributeBudget, attribute_budget, get_attribute_budget
 from .utils import add_citation, get_agent_from_caller_chain
 from .semantics import SpanAttributes, SpanName
 from .process import ProcessL2Trace
 from .settings_management import ObservabilityConfig
 from .span_manager import SpanManager
+from .trace_store import get_trace_writer
 from .utils import json_safe
 
 
+from InlineAgent.agent.event_stream import aiter_event_stream
 from InlineAgent.constants import TraceColor
+from InlineAgent.file_output import SavedFile, get_file_writer
+from InlineAgent.sink import OutputSink, get_output_sink
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -32,445 +36,483 @@ config = ObservabilityConfig()
 
 tracer = otel_trace.get_tracer(config.BEDROCK_AGENT_TRACER_NAME)
 
-guardrail_span: otel_trace.Span = None
-output_stream_guardrail_intervene: bool = False
-is_guardrail: bool = False
 
+class ObservedInvocation:
+    """State of one instrumented ``invoke_agent`` call.
+
+    Everything that changes while the event stream is consumed, spans and
+    guardrail flags included, lives on this object, so concurrent invocations
+    on threads or asyncio tasks never share state.
+    """
+
+    def __init__(
+        self,
+        input_text: str,
+        session_id: str,
+        kwargs: Dict[str, Any],
+        show_traces: bool,
+        save_traces: bool,
+        sink: OutputSink = None,
+    ):
+        # Extract tracing parameters
+        user_id = kwargs.pop("user_id", "anonymous")
+        tags = kwargs.pop("tags", [])
+
+        self.agent_id = kwargs.get("agentId", "")
+        self.agent_alias_id = kwargs.get("agentAliasId", "")
+        self.agent_name = kwargs.pop("agent_name", "")
+        self.sink = kwargs.pop("sink", None) or sink or get_output_sink()
+        self.show_traces = show_traces and self.sink.enabled
+        self.save_traces = save_traces
+
+        self.input_text = input_text
+        self.session_id = session_id
+        self.kwargs = kwargs
+
+        if not self.agent_id or not self.agent_alias_id:
+            # TODO: Warning
+            pass
+
+        self.stream_final_response = kwargs.get(
+            "streamingConfigurations", {"streamFinalResponse": False}
+        )["streamFinalResponse"]
+        self.span_manager = SpanManager()
+
+        self.guardrail_span: otel_trace.Span = None
+        self.output_stream_guardrail_intervene = False
+        self.is_guardrail = False
+
+        self.answer_parts: List[str] = list()
+        self.cite = None
+        self.citations = list()
+        self.file_futures = list()
+        self.total_input_tokens = 0
+        self.total_output_tokens = 0
+        self.total_llm_calls = 0
+
+        self.time_before_call = datetime.now(timezone.utc)
+        self.time_after_call = None
+
+        self.root_agent_span = None
+        if config.PRODUCE_BEDROCK_OTEL_TRACES:
+            self.root_agent_span = self.span_manager.create_agent_span_return(
+                agent_session_id=session_id,
+                caller_chain=[
+                    {
+                        "agentAliasArn": f"arn:aws:bedrock:agent:agent-alias/{self.agent_id}/{self.agent_alias_id}"
+                    }
+                ],
+                # start_time=int(time_before_call.timestamp() * 1e9),
+                attributes={
+                    OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.AGENT.value,
+                    OtelSpanAttributes.INPUT_VALUE: input_text,
+                    SpanAttributes.AGENT_ID.value: self.agent_id,
+                    SpanAttributes.AGENT_ALIAS_ID.value: self.agent_alias_id,
+                    OtelSpanAttributes.TAG_TAGS: tags,
+                    OtelSpanAttributes.USER_ID: user_id,
+                    OtelSpanAttributes.TOOL_PARAMETERS: json_safe(kwargs),
+                    OtelSpanAttributes.SESSION_ID: session_id,
+                    "langfuse.tags": tags,
+                    OtelSpanAttributes.LLM_SYSTEM: "aws.bedrock",
+                },
+                name=f"Agent {self.agent_id}:{self.agent_alias_id}",
+            )
 
-def observe(show_traces: bool = True, save_traces: bool = False):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(
-            inputText: str,
-            sessionId: str,
-            **kwargs,
-        ):
-            global guardrail_span
-            global output_stream_guardrail_intervene
-            global is_guardrail
-            # Extract tracing parameters
-            user_id = kwargs.pop("user_id", "anonymous")
-            tags = kwargs.pop("tags", [])
-
-            agent_id = kwargs.get("agentId", "")
-            agent_alias_id = kwargs.get("agentAliasId", "")
-            agent_name = kwargs.pop("agent_name", "")
-
-            if not agent_id or not agent_alias_id:
-                # TODO: Warning
-                pass
-
-            stream_final_response = kwargs.get(
-                "streamingConfigurations", {"streamFinalResponse": False}
+    def handle_event(self, event: Dict):
+        if "files" in event:
+            file_writer = get_file_writer()
+            for this_file in event["files"]["files"]:
+                self.file_futures.append(
+                    file_writer.submit(
+                        session_id=self.session_id,
+                        name=this_file["name"],
+                        data=this_file["bytes"],
+                        type=this_file.get("type", ""),
+                    )
+                )
+
+            if self.show_traces:
+                self.sink.write("\n\n", kind="files")
+                self.sink.markdown("**Files saved in output directory**", kind="files")
+
+        if "returnControl" in event:
+            if config.PRODUCE_BEDROCK_OTEL_TRACES:
+
+                roc_span = tracer.start_span(
+                    name="Return of Control",
+                    kind=SpanKind.CLIENT,
+                    attributes={
+                        SpanAttributes.RETURN_CONTROL.value: json_safe(
+                            event["returnControl"]
+                        )
+                    },
+                    context=otel_trace.set_span_in_context(self.root_agent_span),
+                )
+                roc_span.set_status(Status(StatusCode.OK))
+                roc_span.end()
+
+        if "trace" in event:
+
+            trace_data = event["trace"]
+
+            if "trace" in trace_data:
+                if "guardrailTrace" in trace_data["trace"]:
+                    self._handle_guardrail_trace(trace_data)
+
+            input_tokens, output_tokens, llm_calls = ProcessL2Trace.process_trace_event(
+                trace_data=event["trace"],
+                span_manager=self.span_manager,
+                save_traces=self.save_traces,
+                session_id=self.session_id,
+                show_traces=self.show_traces,
+                sink=self.sink,
             )
-            
-            stream_final_response= stream_final_response["streamFinalResponse"]
-            span_manager = SpanManager()
+            self.total_input_tokens += int(input_tokens)
+            self.total_output_tokens += int(output_tokens)
+            self.total_llm_calls += int(llm_calls)
+
+        # Get Final Answer
+        if "chunk" in event:
+            if "attribution" in event["chunk"]:
+                self.citations.append(event["chunk"]["attribution"]["citations"])
+                text, self.cite = add_citation(
+                    citations=event["chunk"]["attribution"]["citations"],
+                    cite=1 if not self.cite else self.cite,
+                    sink=self.sink,
+                )
+                self.answer_parts.clear()
+                self.answer_parts.append(text)
+            else:
+                data = event["chunk"]["bytes"]
+                if (
+                    self.stream_final_response is True
+                    and self.output_stream_guardrail_intervene is True
+                ):
+                    self.answer_parts.clear()
+                    self.answer_parts.append(data.decode("utf8"))
+                    self.sink.write(
+                        "\n\n\n" + data.decode("utf-8"),
+                        TraceColor.error,
+                        end="",
+                        kind="answer",
+                    )
+                else:
+                    self.answer_parts.append(data.decode("utf8"))
+                    self.sink.write(
+                        data.decode("utf-8"),
+                        TraceColor.final_output,
+                        end="",
+                        kind="answer",
+                    )
 
-            time_before_call = datetime.now(timezone.utc)
-            time_after_call = None
+    def _handle_guardrail_trace(self, trace_data: Dict):
+        session_id = trace_data["sessionId"]
+        caller_chain = trace_data["callerChain"]
+        guardrail_trace = trace_data["trace"]["guardrailTrace"]
+        sub_agent_id, sub_agent_alias_id = get_agent_from_caller_chain(
+            caller_chain=caller_chain, index=-1
+        )
+        is_root_agent = (
+            sub_agent_id == self.agent_id and sub_agent_alias_id == self.agent_alias_id
+        )
+
+        if is_root_agent:
+            self.is_guardrail = True
+
+        if "inputAssessments" in guardrail_trace:
 
             if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                root_agent_span = span_manager.create_agent_span_return(
-                    agent_session_id=sessionId,
-                    caller_chain=[
-                        {
-                            "agentAliasArn": f"arn:aws:bedrock:agent:agent-alias/{agent_id}/{agent_alias_id}"
-                        }
-                    ],
-                    # start_time=int(time_before_call.timestamp() * 1e9),
+                agent_span = self.span_manager.create_agent_span_return(
+                    agent_session_id=session_id,
+                    caller_chain=caller_chain,
+                    # start_time=int(event_time.timestamp() * 1e9),
                     attributes={
                         OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.AGENT.value,
-                        OtelSpanAttributes.INPUT_VALUE: inputText,
-                        SpanAttributes.AGENT_ID.value: agent_id,
-                        SpanAttributes.AGENT_ALIAS_ID.value: agent_alias_id,
-                        OtelSpanAttributes.TAG_TAGS: tags,
-                        OtelSpanAttributes.USER_ID: user_id,
-                        OtelSpanAttributes.TOOL_PARAMETERS: json_safe(kwargs),
-                        OtelSpanAttributes.SESSION_ID: sessionId,
-                        "langfuse.tags": tags,
+                        SpanAttributes.AGENT_ID.value: sub_agent_id,
+                        SpanAttributes.AGENT_ALIAS_ID.value: sub_agent_alias_id,
                         OtelSpanAttributes.LLM_SYSTEM: "aws.bedrock",
+                        OtelSpanAttributes.SESSION_ID: session_id,
                     },
-                    name=f"Agent {agent_id}:{agent_alias_id}",
+                    name=f"Agent {self.agent_id}:{self.agent_alias_id}",
                 )
 
-            agent_answer = str()
-            cite = None
-            citations = list()
-            total_input_tokens = 0
-            total_output_tokens = 0
-            total_llm_calls = 0
-            try:
-                response = func(
-                    inputText=inputText,
-                    sessionId=sessionId,
-                    **kwargs,
+            if guardrail_trace["action"] == "INTERVENED":
+                self.answer_parts.clear()
+
+            if config.PRODUCE_BEDROCK_OTEL_TRACES:
+                guardrail_span = self._start_guardrail_span(
+                    guardrail_trace=guardrail_trace, parent=agent_span
+                )
+                guardrail_span.set_attributes(
+                    {
+                        OtelSpanAttributes.INPUT_VALUE: json_safe(
+                            guardrail_trace["inputAssessments"]
+                        ),
+                        OtelSpanAttributes.INPUT_MIME_TYPE: "application/json",
+                    }
                 )
+                guardrail_span.set_status(Status(StatusCode.OK))
+                guardrail_span.end()
+                self.guardrail_span = None
 
-                event_stream = response["completion"]
-
-                for event in event_stream:
-                    if "files" in event:
-                        files_event = event["files"]
-
-                        files_list = files_event["files"]
-                        for idx, this_file in enumerate(files_list):
-                            file_bytes = this_file["bytes"]
-
-                            # save bytes to file, given the name of file and the bytes
-
-                            directory_path = os.path.join(os.getcwd(), "output")
-                            if not os.path.exists(directory_path):
-                                try:
-                                    os.makedirs(directory_path, exist_ok=True)
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            if not os.path.exists(
-                                os.path.join(directory_path, str(sessionId))
-                            ):
-                                try:
-                                    os.makedirs(
-                                        os.path.join(directory_path, str(sessionId)),
-                                        exist_ok=True,
-                                    )
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            file_name = os.path.join(
-                                directory_path, str(sessionId), this_file["name"]
-                            )
-                            with open(file_name, "wb") as f:
-                                f.write(file_bytes)
-
-                            if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                with open(file_name, "rb") as f:
-                                    root_agent_span.set_attribute(
-                                        SpanAttributes.FILES.value + str(idx + 1),
-                                        f.read().decode("utf8", errors="ignore"),
-                                    )
-
-                        if show_traces:
-                            console = Console()
-                            print("\n\n")
-                            console.print(
-                                Markdown("**Files saved in output directory**")
-                            )
+        if "outputAssessments" in guardrail_trace:
+            if config.PRODUCE_BEDROCK_OTEL_TRACES:
+                if self.stream_final_response is False:
+                    if guardrail_trace["action"] == "INTERVENED":
+                        self.answer_parts.clear()
 
-                    if "returnControl" in event:
-                        if config.PRODUCE_BEDROCK_OTEL_TRACES:
-
-                            roc_span = tracer.start_span(
-                                name="Return of Control",
-                                kind=SpanKind.CLIENT,
-                                attributes={
-                                    SpanAttributes.RETURN_CONTROL.value: json_safe(
-                                        event["returnControl"]
-                                    )
-                                },
-                                context=otel_trace.set_span_in_context(root_agent_span),
-                            )
-                            roc_span.set_status(Status(StatusCode.OK))
-                            roc_span.end()
-
-                    if "trace" in event:
-
-                        trace_data = event["trace"]
-
-                        if "trace" in trace_data:
-                            if "guardrailTrace" in trace_data["trace"]:
-                                session_id = trace_data["sessionId"]
-                                caller_chain = trace_data["callerChain"]
-                                guardrail_trace = trace_data["trace"]["guardrailTrace"]
-                                sub_agent_id, sub_agent_alias_id = (
-                                    get_agent_from_caller_chain(
-                                        caller_chain=caller_chain, index=-1
-                                    )
-                                )
-
-                                if (
-                                    sub_agent_id == agent_id
-                                    and sub_agent_alias_id == agent_alias_id
-                                ):
-                                    is_guardrail = True
-
-                                if "inputAssessments" in guardrail_trace:
-
-                                    if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                        agent_span = span_manager.create_agent_span_return(
-                                            agent_session_id=session_id,
-                                            caller_chain=caller_chain,
-                                            # start_time=int(event_time.timestamp() * 1e9),
-                                            attributes={
-                                                OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.AGENT.value,
-                                                SpanAttributes.AGENT_ID.value: sub_agent_id,
-                                                SpanAttributes.AGENT_ALIAS_ID.value: sub_agent_alias_id,
-                                                OtelSpanAttributes.LLM_SYSTEM: "aws.bedrock",
-                                                OtelSpanAttributes.SESSION_ID: session_id,
-                                            },
-                                            name=f"Agent {agent_id}:{agent_alias_id}",
-                                        )
-
-                                    if guardrail_trace["action"] == "INTERVENED":
-                                        agent_answer = str()
-
-                                    if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                        guardrail_span = tracer.start_span(
-                                            name=SpanName.GUARDRAIL.value,
-                                            kind=SpanKind.CLIENT,
-                                            attributes={
-                                                OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
-                                                SpanAttributes.GUARDRAIL_ACTION.value: guardrail_trace[
-                                                    "action"
-                                                ],
-                                            },
-                                            context=otel_trace.set_span_in_context(
-                                                agent_span
-                                            ),
-                                        )
-                                        guardrail_span.set_attributes(
-                                            {
-                                                OtelSpanAttributes.INPUT_VALUE: json_safe(
-                                                    guardrail_trace["inputAssessments"]
-                                                ),
-                                                OtelSpanAttributes.INPUT_MIME_TYPE: "application/json",
-                                            }
-                                        )
-
-                                        guardrail_span.set_status(Status(StatusCode.OK))
-                                        guardrail_span.end()
-                                        guardrail_span = None
-
-                                if "outputAssessments" in guardrail_trace:
-                                    if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                        if stream_final_response is False:
-                                            if (
-                                                guardrail_trace["action"]
-                                                == "INTERVENED"
-                                            ):
-                                                agent_answer = str()
-
-                                            guardrail_span = tracer.start_span(
-                                                name=SpanName.GUARDRAIL.value,
-                                                kind=SpanKind.CLIENT,
-                                                attributes={
-                                                    OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
-                                                    SpanAttributes.GUARDRAIL_ACTION.value: guardrail_trace[
-                                                        "action"
-                                                    ],
-                                                },
-                                                context=otel_trace.set_span_in_context(
-                                                    span_manager.spans[
-                                                        session_id
-                                                    ].agent_span.span
-                                                ),
-                                            )
-                                            guardrail_span.set_attributes(
-                                                {
-                                                    OtelSpanAttributes.OUTPUT_VALUE: json_safe(
-                                                        guardrail_trace[
-                                                            "outputAssessments"
-                                                        ]
-                                                    ),
-                                                    OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
-                                                }
-                                            )
-                                            guardrail_span.set_status(
-                                                Status(StatusCode.OK)
-                                            )
-                                            guardrail_span.end()
-                                        else:
-                                            if (
-                                                not guardrail_span
-                                                and guardrail_trace["action"]
-                                                == "INTERVENED"
-                                            ):
-
-                                                if (
-                                                    sub_agent_id == agent_id
-                                                    and sub_agent_alias_id
-                                                    == agent_alias_id
-                                                ):
-                                                    output_stream_guardrail_intervene = (
-                                                        True
-                                                    )
-
-                                                guardrail_span = tracer.start_span(
-                                                    name=SpanName.GUARDRAIL.value,
-                                                    kind=SpanKind.CLIENT,
-                                                    attributes={
-                                                        OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
-                                                        SpanAttributes.GUARDRAIL_ACTION.value: guardrail_trace[
-                                                            "action"
-                                                        ],
-                                                    },
-                                                    context=otel_trace.set_span_in_context(
-                                                        span_manager.spans[
-                                                            session_id
-                                                        ].agent_span.span
-                                                    ),
-                                                )
-                                                guardrail_span.set_attributes(
-                                                    {
-                                                        OtelSpanAttributes.OUTPUT_VALUE: json_safe(
-                                                            guardrail_trace[
-                                                                "outputAssessments"
-                                                            ]
-                                                        ),
-                                                        OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
-                                                    }
-                                                )
-                                                guardrail_span.set_status(
-                                                    Status(StatusCode.OK)
-                                                )
-                                                guardrail_span.end()
-
-                        input_tokens, output_tokens, llm_calls = (
-                            ProcessL2Trace.process_trace_event(
-                                trace_data=event["trace"],
-                                span_manager=span_manager,
-                                save_traces=save_traces,
-                                session_id=sessionId,
-                                show_traces=show_traces,
-                            )
-                        )
-                        total_input_tokens += int(input_tokens)
-                        total_output_tokens += int(output_tokens)
-                        total_llm_calls += int(llm_calls)
-
-                    # Get Final Answer
-                    if "chunk" in event:
-                        if "attribution" in event["chunk"]:
-                            citations.append(event["chunk"]["attribution"]["citations"])
-                            agent_answer, cite = add_citation(
-                                citations=event["chunk"]["attribution"]["citations"],
-                                cite=1 if not cite else cite,
-                            )
-                        else:
-                            data = event["chunk"]["bytes"]
-                            if stream_final_response is True:
-                                if output_stream_guardrail_intervene is True:
-                                    agent_answer = str()
-                                    agent_answer += data.decode("utf8")
-                                    print(
-                                        colored(
-                                            "\n\n\n" + data.decode("utf-8"),
-                                            TraceColor.error,
-                                        ),
-                                        end="",
-                                    )
-                                else:
-                                    agent_answer += data.decode("utf8")
-                                    print(
-                                        colored(
-                                            data.decode("utf-8"),
-                                            TraceColor.final_output,
-                                        ),
-                                        end="",
-                                    )
-                            else:
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(agent_answer, TraceColor.final_output),
-                                    end="",
-                                )
-
-                time_after_call = datetime.now(timezone.utc)
-
-                if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                    if sessionId not in span_manager.spans:
-                        raise RuntimeError("Root Agent span not found")
-                    if citations and output_stream_guardrail_intervene is False:
-                        root_agent_span.set_attribute(
-                            OtelSpanAttributes.RETRIEVAL_DOCUMENTS, json_safe(citations)
-                        )
+                    self.guardrail_span = self._start_guardrail_span(
+                        guardrail_trace=guardrail_trace,
+                        parent=self.span_manager.spans[session_id].agent_span.span,
+                    )
+                elif (
+                    not self.guardrail_span
+                    and guardrail_trace["action"] == "INTERVENED"
+                ):
+                    if is_root_agent:
+                        self.output_stream_guardrail_intervene = True
+
+                    self.guardrail_span = self._start_guardrail_span(
+                        guardrail_trace=guardrail_trace,
+                        parent=self.span_manager.spans[session_id].agent_span.span,
+                    )
+                else:
+                    return
+
+                self.guardrail_span.set_attributes(
+                    {
+                        OtelSpanAttributes.OUTPUT_VALUE: json_safe(
+                            guardrail_trace["outputAssessments"]
+                        ),
+                        OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
+                    }
+                )
+                self.guardrail_span.set_status(Status(StatusCode.OK))
+                self.guardrail_span.end()
+
+    @staticmethod
+    def _start_guardrail_span(guardrail_trace: Dict, parent) -> otel_trace.Span:
+        return tracer.start_span(
+            name=SpanName.GUARDRAIL.value,
+            kind=SpanKind.CLIENT,
+            attributes={
+                OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
+                SpanAttributes.GUARDRAIL_ACTION.value: guardrail_trace["action"],
+            },
+            context=otel_trace.set_span_in_context(parent),
+        )
+
+    def end_stream(self):
+        self.time_after_call = datetime.now(timezone.utc)
+
+    def finish(self, saved_files: List[SavedFile]) -> str:
+        """Close the spans of a completed stream and return the answer."""
+        agent_answer = "".join(self.answer_parts)
+
+        for idx, saved_file in enumerate(saved_files):
+            if config.PRODUCE_BEDROCK_OTEL_TRACES:
+                # Record where the file is and what it hashes to, not its bytes.
+                self.root_agent_span.set_attribute(
+                    SpanAttributes.FILES.value + str(idx + 1),
+                    json_safe(saved_file.to_dict()),
+                )
 
-                    if is_guardrail and not guardrail_span:
-                        guardrail_span = tracer.start_span(
-                            name=SpanName.GUARDRAIL.value,
-                            kind=SpanKind.CLIENT,
-                            attributes={
-                                OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
-                                SpanAttributes.GUARDRAIL_ACTION.value: "NONE",
-                            },
-                            context=otel_trace.set_span_in_context(root_agent_span),
-                        )
+        if not config.PRODUCE_BEDROCK_OTEL_TRACES:
+            return agent_answer
 
-                        guardrail_span.set_attributes(
-                            {
-                                OtelSpanAttributes.OUTPUT_VALUE: json_safe([{}]),
-                                OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
-                            }
-                        )
+        root_agent_span = self.root_agent_span
+        span_manager = self.span_manager
 
-                        guardrail_span.set_status(Status(StatusCode.OK))
-                        guardrail_span.end()
-                        guardrail_span = None
-                    else:
-                        guardrail_span = None
+        if self.session_id not in span_manager.spans:
+            raise RuntimeError("Root Agent span not found")
+        if self.citations and self.output_stream_guardrail_intervene is False:
+            root_agent_span.set_attributes(
+                get_attribute_budget().apply(
+                    {OtelSpanAttributes.RETRIEVAL_DOCUMENTS: json_safe(self.citations)}
+                )
+            )
 
-                    root_agent_span.set_attribute(
-                        OtelSpanAttributes.OUTPUT_VALUE, agent_answer
-                    )
-                    root_agent_span.set_attribute(
-                        OtelSpanAttributes.OUTPUT_MIME_TYPE, "text/plain"
-                    )
-                    # End root span
+        if self.is_guardrail and not self.guardrail_span:
+            guardrail_span = tracer.start_span(
+                name=SpanName.GUARDRAIL.value,
+                kind=SpanKind.CLIENT,
+                attributes={
+                    OtelSpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.GUARDRAIL.value,
+                    SpanAttributes.GUARDRAIL_ACTION.value: "NONE",
+                },
+                context=otel_trace.set_span_in_context(root_agent_span),
+            )
 
-                    if output_stream_guardrail_intervene is True:
-                        span_manager.end_all_spans(status_code=StatusCode.OK)
-                    else:
-                        span_manager.spans[sessionId].agent_span.end_time = int(
-                            time_after_call.timestamp() * 1e9
-                        )
+            guardrail_span.set_attributes(
+                {
+                    OtelSpanAttributes.OUTPUT_VALUE: json_safe([{}]),
+                    OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
+                }
+            )
 
-                    if len(span_manager.spans) > 0:
-                        span_manager.end_all_spans(status_code=StatusCode.OK)
+            guardrail_span.set_status(Status(StatusCode.OK))
+            guardrail_span.end()
+        self.guardrail_span = None
 
-            except Exception as e:
-                # Handle exceptions
+        root_agent_span.set_attributes(
+            get_attribute_budget().apply(
+                {OtelSpanAttributes.OUTPUT_VALUE: agent_answer}
+            )
+        )
+        root_agent_span.set_attribute(OtelSpanAttributes.OUTPUT_MIME_TYPE, "text/plain")
+        # End root span
+
+        if self.output_stream_guardrail_intervene is True:
+            span_manager.end_all_spans(status_code=StatusCode.OK)
+        else:
+            span_manager.spans[self.session_id].agent_span.end_time = int(
+                self.time_after_call.timestamp() * 1e9
+            )
 
-                if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                    root_agent_span.record_exception(e)
-                    root_agent_span.set_attribute("error.message", str(e))
-                    root_agent_span.set_attribute("error.type", e.__class__.__name__)
-                    root_agent_span.set_status(Status(StatusCode.ERROR))
+        if len(span_manager.spans) > 0:
+            span_manager.end_all_spans(status_code=StatusCode.OK)
 
-                    agent_answer = str()
-                    agent_answer = json_safe({"error": str(e), "exception": str(e)})
+        return agent_answer
 
-                    root_agent_span.set_attribute(
-                        OtelSpanAttributes.OUTPUT_VALUE, json_safe(agent_answer)
-                    )
-                    root_agent_span.set_attribute(
-                        OtelSpanAttributes.OUTPUT_MIME_TYPE, "application/json"
+    def fail(self, e: Exception) -> str:
+        """Record a failed invocation; re-raises when spans are produced."""
+        if config.PRODUCE_BEDROCK_OTEL_TRACES:
+            root_agent_span = self.root_agent_span
+            root_agent_span.record_exception(e)
+            root_agent_span.set_attribute("error.message", str(e))
+            root_agent_span.set_attribute("error.type", e.__class__.__name__)
+            root_agent_span.set_status(Status(StatusCode.ERROR))
+
+            agent_answer = json_safe({"error": str(e), "exception": str(e)})
+
+            root_agent_span.set_attribute(
+                OtelSpanAttributes.OUTPUT_VALUE, json_safe(agent_answer)
+            )
+            root_agent_span.set_attribute(
+                OtelSpanAttributes.OUTPUT_MIME_TYPE, "application/json"
+            )
+
+            self.span_manager.end_all_spans(status_code=StatusCode.ERROR)
+
+            raise Exception(e)
+
+        self.sink.write(f"An error occurred: {str(e)}", kind="error")
+        self.time_after_call = datetime.now(timezone.utc)
+        return str(e)
+
+    def report(self, agent_answer: str) -> str:
+        """Flush saved traces, print the usage line and return the answer."""
+        if self.save_traces:
+            get_trace_writer().flush()
+
+        duration = (self.time_after_call - self.time_before_call).total_seconds()
+
+        if self.sink.enabled:
+            self.sink.write(
+                f"\nAgent made a total of {self.total_llm_calls} LLM calls, "
+                + f"using {self.total_input_tokens+self.total_output_tokens} tokens "
+                + f"(in: {self.total_input_tokens}, out: {self.total_output_tokens})"
+                + f", and took {duration} total seconds",
+                TraceColor.stats,
+                kind="stats",
+            )
+
+        return agent_answer
+
+
+def observe(
+    show_traces: bool = True, save_traces: bool = False, sink: OutputSink = None
+):
+    """Trace a function that returns an ``invoke_agent`` response.
+
+    Output goes to ``sink``, which can also be chosen per call with the
+    ``sink`` keyword argument; it defaults to the process-wide sink.
+
+    Coroutine functions are supported: the decorated function is then a
+    coroutine too, and the completion stream is consumed without blocking
+    the event loop. Each call keeps its state in its own
+    ``ObservedInvocation``, so instrumented sessions can run concurrently on
+    threads or tasks.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(inputText: str, sessionId: str, **kwargs):
+                with attribute_budget(AttributeBudget.from_config(config)):
+                    invocation = ObservedInvocation(
+                        input_text=inputText,
+                        session_id=sessionId,
+                        kwargs=kwargs,
+                        show_traces=show_traces,
+                        save_traces=save_traces,
+                        sink=sink,
                     )
+                    try:
+                        response = await func(
+                            inputText=inputText,
+                            sessionId=sessionId,
+                            **invocation.kwargs,
+                        )
 
-                    span_manager.end_all_spans(status_code=StatusCode.ERROR)
+                        event_stream = response["completion"]
+                        if not hasattr(event_stream, "__aiter__"):
+                            # A boto3 EventStream blocks on the socket.
+                            event_stream = aiter_event_stream(event_stream)
 
-                    raise Exception(e)
+                        async for event in event_stream:
+                            invocation.handle_event(event)
 
-                else:
-                    print(f"An error occurred: {str(e)}")
-                    agent_answer = str(e)
+                        invocation.end_stream()
+                        saved_files = await asyncio.gather(
+                            *(
+                                asyncio.wrap_future(future)
+                                for future in invocation.file_futures
+                            )
+                        )
+                        agent_answer = invocation.finish(saved_files)
+                    except Exception as e:
+                        agent_answer = invocation.fail(e)
 
-                time_after_call = datetime.now(timezone.utc)
+                    return invocation.report(agent_answer)
 
-            duration = (time_after_call - time_before_call).total_seconds()
+            return async_wrapper
 
-            print(
-                colored(
-                    f"\nAgent made a total of {total_llm_calls} LLM calls, "
-                    + f"using {total_input_tokens+total_output_tokens} tokens "
-                    + f"(in: {total_input_tokens}, out: {total_output_tokens})"
-                    + f", and took {duration} total seconds",
-                    TraceColor.stats,
+        @functools.wraps(func)
+        def wrapper(
+            inputText: str,
+            sessionId: str,
+            **kwargs,
+        ):
+            # Every invocation deduplicates attributes against its own spans.
+            with attribute_budget(AttributeBudget.from_config(config)):
+                invocation = ObservedInvocation(
+                    input_text=inputText,
+                    session_id=sessionId,
+                    kwargs=kwargs,
+                    show_traces=show_traces,
+                    save_traces=save_traces,
+                    sink=sink,
                 )
-            )
+                try:
+                    response = func(
+                        inputText=inputText,
+                        sessionId=sessionId,
+                        **invocation.kwargs,
+                    )
 
-            return agent_answer
+                    for event in response["completion"]:
+                        invocation.handle_event(event)
+
+                    invocation.end_stream()
+                    agent_answer = invocation.finish(
+                        [future.result() for future in invocation.file_futures]
+                    )
+                except Exception as e:
+                    agent_answer = invocation.fail(e)
+
+                return invocation.report(agent_answer)
 
         return wrapper
 
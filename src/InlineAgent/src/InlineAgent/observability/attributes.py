@@ -0,0 +1,128 @@
+"""
+Size budget for span attribute values.
+
+Orchestration prompts and model responses are several kilobytes each and the
+same prompt is attached to the agent span, the LLM span and collaborator spans.
+``AttributeBudget`` bounds what is exported:
+
+* ``max_length`` caps each string value. ``overflow="truncate"`` keeps the
+  first ``max_length`` characters, ``overflow="hash"`` replaces the value with
+  ``sha256:<digest> (<n> chars)``.
+* ``dedup`` emits a long value in full only the first time it is seen in an
+  invocation, together with a ``<key>.sha256`` attribute. Later occurrences
+  are replaced by ``sha256:<digest>``, so the content can be found by hash.
+
+``observe()`` installs a fresh budget built from ``ObservabilityConfig`` for
+every invocation; outside of it values pass through unchanged.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+from typing import Any, Dict, Iterator, Literal, Optional, Set
+
+Overflow = Literal["truncate", "hash"]
+
+
+def content_hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+class AttributeBudget:
+    """Cap and deduplicate string span attribute values.
+
+    Values are expected to be serialized already (see ``json_safe``); other
+    types are passed through.
+
+    Args:
+        max_length (int): Longest string value exported. ``None`` has no cap.
+        overflow (str): ``"truncate"`` or ``"hash"`` for values over the cap.
+        dedup (bool): Replace repeated values by a reference to their hash.
+        dedup_min_length (int): Shorter values are never deduplicated.
+    """
+
+    __slots__ = ("max_length", "overflow", "dedup", "dedup_min_length", "_seen")
+
+    def __init__(
+        self,
+        max_length: Optional[int] = None,
+        overflow: Overflow = "truncate",
+        dedup: bool = False,
+        dedup_min_length: int = 256,
+    ):
+        if overflow not in ("truncate", "hash"):
+            raise ValueError(f"Unsupported attribute overflow {overflow}")
+
+        self.max_length = max_length
+        self.overflow = overflow
+        self.dedup = dedup
+        self.dedup_min_length = dedup_min_length
+        self._seen: Set[str] = set()
+
+    @classmethod
+    def from_config(cls, config) -> "AttributeBudget":
+        return cls(
+            max_length=config.SPAN_ATTRIBUTE_MAX_LENGTH,
+            overflow=config.SPAN_ATTRIBUTE_OVERFLOW,
+            dedup=config.SPAN_ATTRIBUTE_DEDUP,
+            dedup_min_length=config.SPAN_ATTRIBUTE_DEDUP_MIN_LENGTH,
+        )
+
+    @property
+    def passthrough(self) -> bool:
+        return self.max_length is None and not self.dedup
+
+    def value(self, value: Any) -> Any:
+        """Apply the length cap to one value."""
+        if (
+            self.max_length is None
+            or not isinstance(value, str)
+            or len(value) <= self.max_length
+        ):
+            return value
+        if self.overflow == "hash":
+            return f"sha256:{content_hash(value)} ({len(value)} chars)"
+        return value[: self.max_length]
+
+    def apply(self, attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Return ``attributes`` with every string value budgeted."""
+        if self.passthrough:
+            return attributes
+
+        budgeted = dict()
+        for key, value in attributes.items():
+            if (
+                self.dedup
+                and isinstance(value, str)
+                and len(value) >= self.dedup_min_length
+            ):
+                digest = content_hash(value)
+                if digest in self._seen:
+                    budgeted[key] = f"sha256:{digest}"
+                    continue
+                self._seen.add(digest)
+                budgeted[f"{key}.sha256"] = digest
+            budgeted[key] = self.value(value)
+        return budgeted
+
+
+_PASSTHROUGH = AttributeBudget()
+
+_current_budget: contextvars.ContextVar[Optional[AttributeBudget]] = (
+    contextvars.ContextVar("inline_agent_attribute_budget", default=None)
+)
+
+
+def get_attribute_budget() -> AttributeBudget:
+    """Return the budget of the current invocation, or a pass-through one."""
+    return _current_budget.get() or _PASSTHROUGH
+
+
+@contextlib.contextmanager
+def attribute_budget(budget: AttributeBudget) -> Iterator[AttributeBudget]:
+    """Use ``budget`` for span attributes set in this context."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
@@ -0,0 +1,175 @@
+"""
+Single-pass dispatch of Bedrock agent trace events.
+
+A trace is a tagged union at every level: ``trace`` holds one step type
+(``orchestrationTrace``, ``routingClassifierTrace``, ...), the step holds one
+part (``modelInvocationInput``, ``invocationInput``, ``observation``, ...) and
+``invocationInput`` / ``observation`` hold one member
+(``actionGroupInvocationInput``, ``finalResponse``, ...).
+
+``TraceDispatcher`` walks the keys that are present and looks each one up in a
+table, instead of asking every known handler whether its key is there.
+``TraceContext`` parses the caller chain once per event for all handlers.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from InlineAgent.sink import OutputSink
+
+from .utils import get_agent_from_caller_chain
+
+Usage = Tuple[int, int, int]
+Handler = Callable[["TraceContext", Dict], Optional[Usage]]
+
+# Parts whose payload is itself a tagged union of members.
+MEMBER_PARTS = frozenset(("invocationInput", "observation"))
+
+
+class TraceContext:
+    """One trace event and what its handlers share.
+
+    Args:
+        trace_data (dict): The ``trace`` value of an ``InvokeAgent`` event.
+        span_manager (SpanManager): Spans of the invocation, if any.
+        show_traces (bool): Whether handlers should write to the sink.
+        sink (OutputSink): Where trace output is written.
+    """
+
+    __slots__ = (
+        "trace_data",
+        "span_manager",
+        "show_traces",
+        "sink",
+        "session_id",
+        "caller_chain",
+        "event_time",
+        "agent_id",
+        "agent_alias_id",
+        "agent_key",
+        "step_type",
+        "trace_id",
+    )
+
+    def __init__(
+        self,
+        trace_data: Dict,
+        span_manager: Any = None,
+        show_traces: bool = False,
+        sink: Optional[OutputSink] = None,
+    ):
+        self.trace_data = trace_data
+        self.span_manager = span_manager
+        self.show_traces = show_traces
+        self.sink = sink
+        self.session_id = trace_data.get("sessionId")
+        self.caller_chain = trace_data.get("callerChain") or []
+        self.event_time = trace_data.get("eventTime")
+
+        if self.caller_chain:
+            self.agent_id, self.agent_alias_id = get_agent_from_caller_chain(
+                caller_chain=self.caller_chain, index=-1
+            )
+        else:
+            self.agent_id, self.agent_alias_id = "", ""
+        self.agent_key = f"{self.agent_id}:{self.agent_alias_id}"
+
+        # Set by the dispatcher for the step and part being handled.
+        self.step_type: Optional[str] = None
+        self.trace_id: Optional[str] = None
+
+
+class TraceDispatcher:
+    """Table of trace handlers keyed on ``(step_type, part, member)``.
+
+    A handler is called with the ``TraceContext`` and the payload of the key
+    it was registered for, and may return ``(input_tokens, output_tokens,
+    llm_calls)``. Handlers registered for the same key run in order.
+    """
+
+    __slots__ = ("_handlers",)
+
+    def __init__(self):
+        self._handlers: Dict[
+            Tuple[str, Optional[str], Optional[str]], List[Handler]
+        ] = dict()
+
+    def register(
+        self,
+        step_type: Union[str, Iterable[str]],
+        part: Optional[str] = None,
+        member: Optional[str] = None,
+        handler: Optional[Handler] = None,
+    ):
+        """Register ``handler`` for a step type, one of its parts, or a member
+        of that part. Returns a decorator when ``handler`` is not given.
+
+        ``step_type`` may be several step types, e.g. both
+        ``orchestrationTrace`` and ``routingClassifierTrace``.
+        """
+        if member is not None and part not in MEMBER_PARTS:
+            raise ValueError(f"{part} has no members to dispatch on")
+
+        step_types = (step_type,) if isinstance(step_type, str) else tuple(step_type)
+
+        def add(handler: Handler) -> Handler:
+            for this_step_type in step_types:
+                self._handlers.setdefault((this_step_type, part, member), []).append(
+                    handler
+                )
+            return handler
+
+        if handler is None:
+            return add
+        return add(handler)
+
+    def copy(self) -> "TraceDispatcher":
+        return self.wrap(lambda handler: handler)
+
+    def wrap(self, wrapper: Callable[[Handler], Handler]) -> "TraceDispatcher":
+        """Return a copy with every handler replaced by ``wrapper(handler)``,
+        e.g. to time or log the handlers."""
+        dispatcher = TraceDispatcher()
+        dispatcher._handlers = {
+            key: [wrapper(handler) for handler in handlers]
+            for key, handlers in self._handlers.items()
+        }
+        return dispatcher
+
+    def dispatch(self, ctx: TraceContext, trace: Dict) -> Usage:
+        """Run the handlers of every key present in ``trace`` and return the
+        summed usage they report."""
+        usage = [0, 0, 0]
+        handlers = self._handlers
+
+        for step_type, step in trace.items():
+            ctx.step_type = step_type
+            ctx.trace_id = None
+            self._run(handlers.get((step_type, None, None)), ctx, step, usage)
+
+            if not isinstance(step, dict):
+                continue
+
+            for part, payload in step.items():
+                if not isinstance(payload, dict):
+                    continue
+                ctx.trace_id = payload.get("traceId")
+                self._run(handlers.get((step_type, part, None)), ctx, payload, usage)
+
+                if part in MEMBER_PARTS:
+                    for member, value in payload.items():
+                        self._run(
+                            handlers.get((step_type, part, member)), ctx, value, usage
+                        )
+
+        return usage[0], usage[1], usage[2]
+
+    @staticmethod
+    def _run(handlers: Optional[List[Handler]], ctx, payload, usage: List[int]):
+        if not handlers:
+            return
+        for handler in handlers:
+            result = handler(ctx, payload)
+            if result:
+                usage[0] += result[0]
+                usage[1] += result[1]
+                usage[2] += result[2]
@@ -0,0 +1,68 @@
+"""
+Span exporters that work without a collector.
+
+``OTLPJsonFileSpanExporter`` appends every exported batch to a file as one
+line of OTLP/JSON, the format the OpenTelemetry Collector's file exporter
+writes and its ``otlpjson`` receiver reads back.
+"""
+
+import base64
+import json
+import os
+import threading
+from typing import Dict, Sequence
+
+from google.protobuf.json_format import MessageToDict
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+_ID_FIELDS = ("traceId", "spanId", "parentSpanId")
+
+
+def _hex_ids(item: Dict):
+    # protobuf renders bytes as base64, OTLP/JSON wants hex ids.
+    for field in _ID_FIELDS:
+        if field in item:
+            item[field] = base64.b64decode(item[field]).hex()
+
+
+class OTLPJsonFileSpanExporter(SpanExporter):
+    """Append spans to ``path`` as OTLP/JSON lines.
+
+    Args:
+        path (str): File to append to; parent directories are created.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        request = MessageToDict(encode_spans(spans), use_integers_for_enums=True)
+        for resource_spans in request.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    _hex_ids(span)
+                    for link in span.get("links", []):
+                        _hex_ids(link)
+
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return SpanExportResult.FAILURE
+            self._file.write(line)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
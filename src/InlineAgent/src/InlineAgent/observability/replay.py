@@ -0,0 +1,423 @@
+"""
+Offline replay of saved trace events.
+
+``save_trace`` records every trace event of a session (see ``trace_store``).
+``TraceReplayer`` feeds such recordings back through the processing pipeline
+without Bedrock, as fast as possible or at the pace they were recorded, and
+reports events per second, the time spent in each trace handler and the spans
+produced. Three pipelines can be replayed:
+
+* ``observe``: the full ``observe()`` wrapper around a fake ``invoke_agent``,
+* ``process``: ``ProcessL2Trace.process_trace_event`` with a ``SpanManager``,
+* ``console``: ``Trace.parse_trace``, the console formatter of ``InlineAgent``.
+
+Each recording is replayed as one invocation. Spans are recorded with an SDK
+tracer that counts them and exports nothing. While a replay runs it installs
+that tracer, a timing copy of the trace dispatcher and
+``PRODUCE_BEDROCK_OTEL_TRACES`` for the whole process, so do not replay next to
+live invocations.
+
+Usage:
+    python -m InlineAgent.observability.replay trace/<session>.jsonl --repeat 100
+    python -m InlineAgent.observability.replay --session <session> --speed 1
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.trace import StatusCode
+
+from InlineAgent.sink import NullSink, OutputSink
+
+from . import agent_instrument, process, span_manager as span_manager_module
+from .attributes import AttributeBudget, attribute_budget
+from .dispatch import Handler
+from .process import ProcessL2Trace, get_trace_dispatcher, set_trace_dispatcher
+from .span_manager import SpanManager
+from .trace import Trace
+from .trace_store import _read_segment, read_traces
+from .utils import get_agent_from_caller_chain
+
+Pipeline = Literal["observe", "process", "console"]
+
+PIPELINES = ("observe", "process", "console")
+
+
+def load_trace_events(path: str) -> List[Dict]:
+    """Return the trace events saved in ``path``, oldest first.
+
+    Reads JSON Lines segments, compressed or not, and legacy ``.json`` lists.
+    ``eventTime`` is parsed back into the ``datetime`` boto3 returns.
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as file:
+            events = json.load(file)
+    else:
+        events = list()
+        for line in io.BytesIO(_read_segment(path)):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted write.
+                continue
+    return parse_event_times(events)
+
+
+def parse_event_times(events: List[Dict]) -> List[Dict]:
+    """Turn string ``eventTime`` values back into datetimes, in place."""
+    for event in events:
+        event_time = event.get("eventTime")
+        if isinstance(event_time, str):
+            event["eventTime"] = datetime.fromisoformat(event_time)
+    return events
+
+
+class ReplayReport:
+    """What a replay processed and where the time went.
+
+    ``handler_seconds`` and ``handler_calls`` are keyed on the handler's
+    qualified name, or on ``Trace.parse_trace[<step type>]`` for the
+    ``console`` pipeline. ``spans`` counts the ended spans by name.
+    """
+
+    __slots__ = (
+        "pipeline",
+        "invocations",
+        "events",
+        "seconds",
+        "handler_seconds",
+        "handler_calls",
+        "spans",
+        "input_tokens",
+        "output_tokens",
+        "llm_calls",
+        "output_chars",
+    )
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.invocations = 0
+        self.events = 0
+        self.seconds = 0.0
+        self.handler_seconds: Counter = Counter()
+        self.handler_calls: Counter = Counter()
+        self.spans: Counter = Counter()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.llm_calls = 0
+        self.output_chars = 0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def add_usage(self, usage):
+        self.input_tokens += int(usage[0])
+        self.output_tokens += int(usage[1])
+        self.llm_calls += int(usage[2])
+
+    def to_dict(self) -> Dict:
+        return {
+            "pipeline": self.pipeline,
+            "invocations": self.invocations,
+            "events": self.events,
+            "seconds": self.seconds,
+            "events_per_second": self.events_per_second,
+            "handlers": {
+                name: {"calls": self.handler_calls[name], "seconds": seconds}
+                for name, seconds in self.handler_seconds.most_common()
+            },
+            "spans": dict(self.spans.most_common()),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "llm_calls": self.llm_calls,
+            "output_chars": self.output_chars,
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"{self.pipeline}: {self.events} events in {self.invocations} "
+            f"invocations, {self.seconds:.3f}s, {self.events_per_second:,.0f} events/s",
+            f"usage: {self.llm_calls} LLM calls, "
+            f"in: {self.input_tokens}, out: {self.output_tokens} tokens",
+        ]
+        if self.output_chars:
+            lines.append(f"console output: {self.output_chars} characters")
+
+        if self.handler_seconds:
+            width = max(map(len, self.handler_seconds))
+            lines.append("")
+            lines.append(
+                f"{'handler':<{width}} {'calls':>8} {'total ms':>10} {'us/call':>9}"
+            )
+            for name, seconds in self.handler_seconds.most_common():
+                calls = self.handler_calls[name]
+                lines.append(
+                    f"{name:<{width}} {calls:>8} {seconds * 1000:>10.2f}"
+                    f" {seconds * 1e6 / calls:>9.1f}"
+                )
+
+        if self.spans:
+            width = max(map(len, self.spans))
+            lines.append("")
+            lines.append(f"{'span':<{width}} {'count':>8}")
+            for name, count in self.spans.most_common():
+                lines.append(f"{name:<{width}} {count:>8}")
+
+        return "\n".join(lines)
+
+
+class _SpanCounter(SpanProcessor):
+    def __init__(self, spans: Counter):
+        self.spans = spans
+
+    def on_end(self, span: ReadableSpan) -> None:
+        self.spans[span.name] += 1
+
+
+class _CountingSink(OutputSink):
+    """Enabled sink that only counts what it is given."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        self.chars += len(text) + len(end)
+
+
+def _paced(events: Sequence[Dict], speed: Optional[float]):
+    # Deliver each event at its recorded offset from the first, divided by speed.
+    if not speed:
+        yield from events
+        return
+
+    first = None
+    start = time.perf_counter()
+    for event in events:
+        event_time = event.get("eventTime")
+        if isinstance(event_time, datetime):
+            if first is None:
+                first = event_time
+            delay = (event_time - first).total_seconds() / speed
+            delay -= time.perf_counter() - start
+            if delay > 0:
+                time.sleep(delay)
+        yield event
+
+
+class TraceReplayer:
+    """Replay recorded trace events through a processing pipeline.
+
+    Args:
+        recordings (Sequence[List[dict]]): One list of trace events per
+            invocation, as returned by ``load_trace_events``.
+        pipeline (str): ``"observe"``, ``"process"`` or ``"console"``.
+        speed (float): ``None`` replays as fast as possible; otherwise events
+            are delivered at their recorded pace, ``speed`` times faster.
+        produce_spans (bool): Build OpenTelemetry spans, as with
+            ``PRODUCE_BEDROCK_OTEL_TRACES``.
+        time_handlers (bool): Time every trace handler. Costs two clock reads
+            per handler call.
+    """
+
+    def __init__(
+        self,
+        recordings: Sequence[List[Dict]],
+        pipeline: Pipeline = "observe",
+        speed: Optional[float] = None,
+        produce_spans: bool = True,
+        time_handlers: bool = True,
+    ):
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown replay pipeline {pipeline}")
+        if speed is not None and speed <= 0:
+            raise ValueError(f"speed must be positive, got {speed}")
+
+        self.recordings = [list(events) for events in recordings]
+        self.pipeline = pipeline
+        self.speed = speed
+        self.produce_spans = produce_spans
+        self.time_handlers = time_handlers
+
+    def run(self, repeat: int = 1) -> ReplayReport:
+        """Replay every recording ``repeat`` times and return the report."""
+        report = ReplayReport(self.pipeline)
+        replay = getattr(self, f"_replay_{self.pipeline}")
+
+        with self._installed(report):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for events in self.recordings:
+                    replay(events, report)
+                    report.invocations += 1
+                    report.events += len(events)
+            report.seconds = time.perf_counter() - start
+
+        return report
+
+    @contextmanager
+    def _installed(self, report: ReplayReport):
+        provider = TracerProvider()
+        provider.add_span_processor(_SpanCounter(report.spans))
+        tracer = provider.get_tracer(process.config.BEDROCK_AGENT_TRACER_NAME)
+
+        dispatcher = get_trace_dispatcher()
+        if self.time_handlers:
+            dispatcher = dispatcher.wrap(lambda handler: self._timed(handler, report))
+
+        saved = (
+            span_manager_module.tracer,
+            agent_instrument.tracer,
+            process.config.PRODUCE_BEDROCK_OTEL_TRACES,
+            agent_instrument.config.PRODUCE_BEDROCK_OTEL_TRACES,
+        )
+        span_manager_module.tracer = tracer
+        agent_instrument.tracer = tracer
+        process.config.PRODUCE_BEDROCK_OTEL_TRACES = self.produce_spans
+        agent_instrument.config.PRODUCE_BEDROCK_OTEL_TRACES = self.produce_spans
+        previous_dispatcher = set_trace_dispatcher(dispatcher)
+        try:
+            yield
+        finally:
+            set_trace_dispatcher(previous_dispatcher)
+            (
+                span_manager_module.tracer,
+                agent_instrument.tracer,
+                process.config.PRODUCE_BEDROCK_OTEL_TRACES,
+                agent_instrument.config.PRODUCE_BEDROCK_OTEL_TRACES,
+            ) = saved
+            provider.shutdown()
+
+    @staticmethod
+    def _timed(handler: Handler, report: ReplayReport) -> Handler:
+        name = getattr(handler, "__qualname__", repr(handler))
+        perf_counter = time.perf_counter
+
+        def timed(ctx, payload):
+            start = perf_counter()
+            try:
+                return handler(ctx, payload)
+            finally:
+                report.handler_seconds[name] += perf_counter() - start
+                report.handler_calls[name] += 1
+
+        return timed
+
+    def _replay_observe(self, events: List[Dict], report: ReplayReport):
+        if not events:
+            return
+        first = events[0]
+        agent_id, agent_alias_id = "", ""
+        if first.get("callerChain"):
+            agent_id, agent_alias_id = get_agent_from_caller_chain(
+                caller_chain=first["callerChain"], index=0
+            )
+
+        def invoke_agent(inputText, sessionId, **kwargs):
+            return {
+                "completion": (
+                    {"trace": event} for event in self._counted(events, report)
+                )
+            }
+
+        agent_instrument.observe(show_traces=False, sink=NullSink())(invoke_agent)(
+            inputText="",
+            sessionId=first.get("sessionId", "replay"),
+            agentId=agent_id,
+            agentAliasId=agent_alias_id,
+        )
+
+    def _replay_process(self, events: List[Dict], report: ReplayReport):
+        span_manager = SpanManager()
+        with attribute_budget(AttributeBudget.from_config(process.config)):
+            for event in _paced(events, self.speed):
+                report.add_usage(
+                    ProcessL2Trace.process_trace_event(
+                        trace_data=event,
+                        span_manager=span_manager,
+                        save_traces=False,
+                        session_id=event.get("sessionId"),
+                        show_traces=False,
+                    )
+                )
+            span_manager.end_all_spans(status_code=StatusCode.OK)
+
+    def _replay_console(self, events: List[Dict], report: ReplayReport):
+        sink = _CountingSink()
+        perf_counter = time.perf_counter
+        for event in _paced(events, self.speed):
+            trace = event.get("trace")
+            if not trace:
+                continue
+            start = perf_counter()
+            usage = Trace.parse_trace(trace=trace, agentName="replay", sink=sink)
+            if self.time_handlers:
+                name = f"Trace.parse_trace[{next(iter(trace))}]"
+                report.handler_seconds[name] += perf_counter() - start
+                report.handler_calls[name] += 1
+            report.add_usage(usage)
+        report.output_chars += sink.chars
+
+    def _counted(self, events: List[Dict], report: ReplayReport):
+        # observe() does not return the usage it totals, so sum it here.
+        for event in _paced(events, self.speed):
+            if "trace" in event:
+                report.add_usage(Trace.usage(event["trace"]))
+            yield event
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Replay saved agent traces through the observability pipeline."
+    )
+    parser.add_argument(
+        "paths", nargs="*", help="Saved trace files, one per invocation"
+    )
+    parser.add_argument("--session", action="append", default=[], help="Session id")
+    parser.add_argument(
+        "--directory", default="trace", help="Directory of --session traces"
+    )
+    parser.add_argument("--pipeline", choices=PIPELINES, default="observe")
+    parser.add_argument(
+        "--speed", type=float, help="Replay at recorded pace, this many times faster"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-spans", action="store_true", help="Build no spans")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    recordings = [load_trace_events(path) for path in args.paths]
+    recordings.extend(
+        parse_event_times(read_traces(session_id, os.path.abspath(args.directory)))
+        for session_id in args.session
+    )
+    if not any(recordings):
+        parser.error("no trace events to replay")
+
+    report = TraceReplayer(
+        recordings,
+        pipeline=args.pipeline,
+        speed=args.speed,
+        produce_spans=not args.no_spans,
+    ).run(repeat=args.repeat)
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Tail sampling of agent traces.
+
+Head sampling (``SAMPLE_RATIO``) decides when the root span starts, before it
+is known whether the invocation failed. ``TailSamplingSpanProcessor`` holds
+the spans of each trace until its local root span ends and then forwards the
+whole trace, or nothing:
+
+* traces with an ``ERROR`` span or a guardrail intervention are always kept,
+* other traces are kept with probability ``success_ratio``, decided from the
+  trace id so every process makes the same choice. The decision reads the
+  high 64 bits of the id; head sampling reads the low 64, so the two ratios
+  multiply instead of the stricter one winning.
+
+Spans named in ``drop_span_names`` are never forwarded.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+from .semantics import SpanAttributes
+
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+
+def is_notable(span: ReadableSpan) -> bool:
+    """Whether ``span`` makes its trace worth keeping regardless of ratio."""
+    if span.status.status_code is StatusCode.ERROR:
+        return True
+    attributes = span.attributes or {}
+    return attributes.get(SpanAttributes.GUARDRAIL_ACTION.value) == "INTERVENED"
+
+
+class _PendingTrace:
+    __slots__ = ("spans", "notable")
+
+    def __init__(self):
+        self.spans: List[ReadableSpan] = list()
+        self.notable = False
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Forward complete traces to ``span_processor`` after sampling them.
+
+    Args:
+        span_processor (SpanProcessor): Receives the kept spans, usually a
+            ``BatchSpanProcessor``.
+        success_ratio (float): Share of unremarkable traces to keep.
+        drop_span_names (Iterable[str]): Span names never forwarded. Drop
+            leaf spans only, or their children lose their parent.
+        max_pending_traces (int): Traces buffered at once. The oldest is
+            forwarded undecided when the limit is reached.
+    """
+
+    def __init__(
+        self,
+        span_processor: SpanProcessor,
+        success_ratio: float = 1.0,
+        drop_span_names: Iterable[str] = (),
+        max_pending_traces: int = 10000,
+    ):
+        if not 0.0 <= success_ratio <= 1.0:
+            raise ValueError(f"success_ratio must be in [0, 1], got {success_ratio}")
+
+        self.span_processor = span_processor
+        self.success_ratio = success_ratio
+        self.drop_span_names = frozenset(drop_span_names)
+        self.max_pending_traces = max_pending_traces
+        self._bound = round(success_ratio * (_TRACE_ID_LIMIT + 1))
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[int, _PendingTrace]" = OrderedDict()
+        # Decisions for spans that end after their root, e.g. a late L3 span.
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.span_processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.name in self.drop_span_names:
+            return
+
+        if self.success_ratio >= 1.0:
+            self.span_processor.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        forward: List[ReadableSpan] = list()
+
+        with self._lock:
+            decided = self._decided.get(trace_id)
+            if decided is not None:
+                if decided:
+                    forward.append(span)
+            else:
+                pending = self._pending.get(trace_id)
+                if pending is None:
+                    pending = self._pending[trace_id] = _PendingTrace()
+                pending.spans.append(span)
+                pending.notable = pending.notable or is_notable(span)
+
+                if span.parent is None or span.parent.is_remote:
+                    del self._pending[trace_id]
+                    keep = pending.notable or self._sampled(trace_id)
+                    self._remember(trace_id, keep)
+                    if keep:
+                        forward.extend(pending.spans)
+                elif len(self._pending) > self.max_pending_traces:
+                    evicted_id, evicted = self._pending.popitem(last=False)
+                    self._remember(evicted_id, True)
+                    forward.extend(evicted.spans)
+
+        for this_span in forward:
+            self.span_processor.on_end(this_span)
+
+    def _sampled(self, trace_id: int) -> bool:
+        return (trace_id >> 64) < self._bound
+
+    def _remember(self, trace_id: int, keep: bool):
+        self._decided[trace_id] = keep
+        if len(self._decided) > self.max_pending_traces:
+            self._decided.popitem(last=False)
+
+    def shutdown(self) -> None:
+        # Traces whose root never ended are forwarded rather than lost.
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for trace in pending:
+            for span in trace.spans:
+                self.span_processor.on_end(span)
+        self.span_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.span_processor.force_flush(timeout_millis)
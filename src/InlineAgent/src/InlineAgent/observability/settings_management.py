@@ -1,6 +1,6 @@
 from pydantic import HttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 class ObservabilityConfig(BaseSettings):
@@ -18,3 +18,19 @@ class ObservabilityConfig(BaseSettings):
     LANGFUSE_SECRET_KEY: Optional[str] = None
     BEDROCK_AGENT_TRACER_NAME: str = Field(default="bedrock-agent-tracer")
     PRODUCE_BEDROCK_OTEL_TRACES: bool = Field(default=False)
+    TRACE_DIRECTORY: str = Field(default="trace")
+    TRACE_COMPRESSION: Optional[Literal["gzip", "zstd"]] = None
+    TRACE_ROTATE_BYTES: Optional[int] = None
+    SPAN_ATTRIBUTE_MAX_LENGTH: Optional[int] = None
+    SPAN_ATTRIBUTE_OVERFLOW: Literal["truncate", "hash"] = "truncate"
+    SPAN_ATTRIBUTE_DEDUP: bool = False
+    SPAN_ATTRIBUTE_DEDUP_MIN_LENGTH: int = 256
+    SPAN_EXPORTER: Literal["otlp", "file", "memory", "console", "none"] = "otlp"
+    SPAN_EXPORT_FILE: str = Field(default="trace/spans.jsonl")
+    SAMPLE_RATIO: float = Field(default=1.0, ge=0.0, le=1.0)
+    TAIL_SAMPLE_SUCCESS_RATIO: float = Field(default=1.0, ge=0.0, le=1.0)
+    TAIL_SAMPLE_MAX_TRACES: int = Field(default=10000, gt=0)
+    SPAN_DROP_NAMES: List[str] = Field(default_factory=list)
+    SPAN_BATCH_MAX_QUEUE_SIZE: int = Field(default=2048, gt=0)
+    SPAN_BATCH_MAX_EXPORT_SIZE: int = Field(default=512, gt=0)
+    SPAN_BATCH_SCHEDULE_DELAY_MILLIS: int = Field(default=5000, gt=0)
@@ -1,50 +1,45 @@
 # Class to manage spans
+#
+# These classes are touched on every trace event, so they are plain __slots__
+# classes rather than pydantic models: no validation runs on method calls or
+# attribute assignment.
 
 from typing import Dict, Any, Literal, Optional
 
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode, SpanKind, Span
 
-from pydantic import (
-    BaseModel,
-    ConfigDict,
-    ValidationInfo,
-    field_validator,
-    validate_call,
-)
-
+from .attributes import get_attribute_budget
 from .utils import get_agent_from_caller_chain
 
+tracer = trace.get_tracer("bedrock-agent-tracing")
 
-from pydantic import BaseModel
-from typing import Dict, Any
 
-tracer = trace.get_tracer("bedrock-agent-tracing")
+class SpanModel:
+    """A started span and the time it should end at.
 
+    Assigning ``end = True`` ends the span, at ``end_time`` when it is set.
+    """
 
-class SpanModel(BaseModel):
-    span: Span
-    end_time: int = 0
-    end: Optional[bool] = None
+    __slots__ = ("span", "end_time", "_end")
 
-    class Config:
-        arbitrary_types_allowed = True
-        extra = "forbid"
-        validate_assignment = True
+    def __init__(self, span: Span, end_time: int = 0, end: Optional[bool] = None):
+        self.span = span
+        self.end_time = end_time
+        self._end = None
+        self.end = end
 
-    @field_validator("end", mode="after")
-    @classmethod
-    def validate_end(cls, value: bool, info: ValidationInfo):
-        # Check if we're trying to set a non-zero end_time
-        if value is True:
+    @property
+    def end(self) -> Optional[bool]:
+        return self._end
 
-            SpanModel.process_end(
-                span=info.data["span"], end_time=info.data["end_time"]
-            )
-        return value
+    @end.setter
+    def end(self, value: Optional[bool]):
+        self._end = value
+        if value is True:
+            SpanModel.process_end(span=self.span, end_time=self.end_time)
 
     @staticmethod
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def process_end(span: Span, end_time: int):
         if span.is_recording():
             if end_time:
@@ -53,31 +48,47 @@ class SpanModel(BaseModel):
                 span.end()
 
 
-class SpanFamily(BaseModel):
-    family: str
-    counter: str
-    agent_span: SpanModel
-    l2_span: Optional[SpanModel] = (
-        None  # If counter changes end l2 span, if family changes end l2 span
-    )
-    l3_span: Dict[str, SpanModel] = {}
-
-    class Config:
-        arbitrary_types_allowed = True  # Needed for the Span object
-        extra = "forbid"  # Prevents additional fields
+class SpanFamily:
+    """Spans of one agent session: the agent span, the current L2 span and
+    the open L3 spans keyed by agent or collaborator id.
 
+    ``described`` is set once the agent span has the session's agent version
+    and caller chain.
+    """
 
-class SpanManager(BaseModel):
+    __slots__ = ("family", "counter", "agent_span", "l2_span", "l3_span", "described")
 
-    spans: Optional[Dict[str, SpanFamily]] = {}
-    agent_session_id_dict: Optional[Dict[str, str]] = {}
-
-    class Config:
-        arbitrary_types_allowed = True
-        extra = "forbid"
-        validate_assignment = True
+    def __init__(
+        self,
+        family: str,
+        counter: str,
+        agent_span: SpanModel,
+        # If counter changes end l2 span, if family changes end l2 span
+        l2_span: Optional[SpanModel] = None,
+        l3_span: Optional[Dict[str, SpanModel]] = None,
+    ):
+        self.family = family
+        self.counter = counter
+        self.agent_span = agent_span
+        self.l2_span = l2_span
+        self.l3_span = {} if l3_span is None else l3_span
+        self.described = False
+
+
+class SpanManager:
+
+    __slots__ = ("spans", "agent_session_id_dict")
+
+    def __init__(
+        self,
+        spans: Optional[Dict[str, SpanFamily]] = None,
+        agent_session_id_dict: Optional[Dict[str, str]] = None,
+    ):
+        self.spans = {} if spans is None else spans
+        self.agent_session_id_dict = (
+            {} if agent_session_id_dict is None else agent_session_id_dict
+        )
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def create_agent_span_return(
         self,
         agent_session_id: str,
@@ -106,21 +117,11 @@ class SpanManager(BaseModel):
             ]
 
         if collaborator_session_id in self.spans:
-            # print(self.spans)
-
-            if (
-                len(self.spans[collaborator_session_id].l3_span)
-                and f"{agent_id}:{agent_alias_id}"
-                in self.spans[collaborator_session_id].l3_span
-                and self.spans[collaborator_session_id]
-                .l3_span[f"{agent_id}:{agent_alias_id}"]
-                .span
-            ):
-                parent_span = (
-                    self.spans[collaborator_session_id]
-                    .l3_span[f"{agent_id}:{agent_alias_id}"]
-                    .span
-                )
+            l3_span = self.spans[collaborator_session_id].l3_span.get(
+                f"{agent_id}:{agent_alias_id}"
+            )
+            if l3_span is not None and l3_span.span:
+                parent_span = l3_span.span
             else:
                 raise RuntimeError("L3 span not found while creating sub agent span.")
         else:
@@ -132,23 +133,20 @@ class SpanManager(BaseModel):
         span = tracer.start_span(
             name=name,
             kind=SpanKind.CLIENT,
-            attributes=attributes or {},
+            attributes=get_attribute_budget().apply(attributes or {}),
             context=trace.set_span_in_context(parent_span),
             # start_time=start_time,
         )
 
-        span_family = SpanFamily(
+        self.spans[agent_session_id] = SpanFamily(
             family="",
             counter="",
             agent_span=SpanModel(span=span),
         )
-
-        self.spans[agent_session_id] = span_family
         self.agent_session_id_dict[f"{agent_id}:{agent_alias_id}"] = agent_session_id
 
         return span
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def delete_agent_span(
         self,
         agent_session_id: str,
@@ -157,19 +155,19 @@ class SpanManager(BaseModel):
         if agent_session_id not in self.spans:
             raise RuntimeError("Agent span not found while deleting agent span.")
 
-        if self.spans[agent_session_id].l2_span:
+        span_family = self.spans[agent_session_id]
+
+        if span_family.l2_span:
             raise RuntimeError("Close l2 span first before clossing agent span")
 
-        if agent_session_id in self.spans[agent_session_id].l3_span:
+        if agent_session_id in span_family.l3_span:
             raise RuntimeError("Close l3 span first before clossing agent span")
 
-        self.spans[agent_session_id].agent_span.span.set_status(Status(StatusCode.OK))
-        # self.spans[agent_session_id].agent_span.end_time = end_time
-        self.spans[agent_session_id].agent_span.end = True
+        span_family.agent_span.span.set_status(Status(StatusCode.OK))
+        span_family.agent_span.end = True
 
         del self.spans[agent_session_id]
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def assign_new_l2_return(
         self,
         agent_session_id: str,
@@ -184,70 +182,66 @@ class SpanManager(BaseModel):
         agent_id, agent_alias_id = get_agent_from_caller_chain(
             caller_chain=caller_chain, index=-1
         )
-        l2_span = None
         if agent_session_id not in self.spans:
             raise RuntimeError("Agent span not found")
 
+        span_family = self.spans[agent_session_id]
+        agent_key = f"{agent_id}:{agent_alias_id}"
+
         family = trace_id[:36]
         counter = trace_id[37:]
 
-        if self.spans[agent_session_id].family and self.spans[agent_session_id].counter:
-            if family != self.spans[agent_session_id].family:
+        if span_family.family and span_family.counter:
+            if family != span_family.family:
                 raise RuntimeError("New Agent span should be assigned first")
-            else:
-                if counter == self.spans[agent_session_id].counter:
-                    return self.spans[agent_session_id].l2_span.span
-                else:
-                    if (
-                        len(self.spans[agent_session_id].l3_span)
-                        and self.spans[agent_session_id]
-                        .l3_span[f"{agent_id}:{agent_alias_id}"]
-                        .span
-                    ):
-
-                        self.spans[agent_session_id].l3_span[
-                            f"{agent_id}:{agent_alias_id}"
-                        ].span.end = True
-                        del self.spans[agent_session_id].l3_span[
-                            f"{agent_id}:{agent_alias_id}"
-                        ]
-
-                    if (
-                        self.spans[agent_session_id].l2_span
-                        and self.spans[agent_session_id].l2_span.span
-                    ):
-                        self.spans[agent_session_id].l2_span.end = True
-                        self.spans[agent_session_id].l2_span = None
+            if counter == span_family.counter:
+                return span_family.l2_span.span
+
+            l3_span = span_family.l3_span.get(agent_key)
+            if l3_span is not None and l3_span.span:
+                l3_span.end = True
+                del span_family.l3_span[agent_key]
+
+            if span_family.l2_span and span_family.l2_span.span:
+                span_family.l2_span.end = True
+                span_family.l2_span = None
 
         # Save new l2 span
         l2_span = tracer.start_span(
             name=l2_name,
             kind=SpanKind.CLIENT,
-            attributes=l2_attributes or {},
-            context=trace.set_span_in_context(
-                self.spans[agent_session_id].agent_span.span
-            ),
+            attributes=get_attribute_budget().apply(l2_attributes or {}),
+            context=trace.set_span_in_context(span_family.agent_span.span),
         )
 
         l3_span = tracer.start_span(
             name=l3_name,
             kind=SpanKind.CLIENT,
-            attributes=l3_attributes or {},
+            attributes=get_attribute_budget().apply(l3_attributes or {}),
             context=trace.set_span_in_context(l2_span),
         )
 
-        self.spans[agent_session_id].l2_span = SpanModel(span=l2_span)
+        span_family.l2_span = SpanModel(span=l2_span)
+        span_family.l3_span[agent_key] = SpanModel(span=l3_span)
+        span_family.family = family
+        span_family.counter = counter
 
-        self.spans[agent_session_id].l3_span.update(
-            {f"{agent_id}:{agent_alias_id}": SpanModel(span=l3_span)}
-        )
+        return l2_span
+
+    def _check_l2(self, agent_session_id: str, trace_id: str) -> SpanFamily:
+        if agent_session_id not in self.spans:
+            raise RuntimeError("Agent span not found")
 
-        self.spans[agent_session_id].family = family
-        self.spans[agent_session_id].counter = counter
+        span_family = self.spans[agent_session_id]
 
-        return l2_span
+        if trace_id[:36] != span_family.family:
+            raise RuntimeError("New Agent span should be assigned first")
+
+        if trace_id[37:] != span_family.counter:
+            raise RuntimeError("Assign a new L2 span")
+
+        return span_family
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def assign_new_l3_return(
         self,
         agent_session_id: str,
@@ -256,45 +250,27 @@ class SpanManager(BaseModel):
         attributes: Dict[str, Any],
         name: str,
     ) -> Span:
-        l3_span = None
-
-        if agent_session_id not in self.spans:
-            raise RuntimeError("Agent span not found")
-
-        family = trace_id[:36]
-        counter = trace_id[37:]
-
-        if family != self.spans[agent_session_id].family:
-            raise RuntimeError("New Agent span should be assigned first")
-
-        if counter != self.spans[agent_session_id].counter:
-            raise RuntimeError("Assign a new L2 span")
+        span_family = self._check_l2(agent_session_id, trace_id)
 
-        if not self.spans[agent_session_id].l2_span:
+        if not span_family.l2_span:
             raise RuntimeError("L2 span does not exists")
 
-        if collab_agent_trace_id in self.spans[agent_session_id].l3_span:
+        if collab_agent_trace_id in span_family.l3_span:
             raise RuntimeError("L3 span already exists")
 
         # Assign New
         l3_span = tracer.start_span(
             name=name,
             kind=SpanKind.CLIENT,
-            attributes=attributes or {},
-            context=trace.set_span_in_context(
-                self.spans[agent_session_id].l2_span.span
-            ),
-        )
-
-        self.spans[agent_session_id].l3_span.update(
-            {collab_agent_trace_id: SpanModel(span=l3_span)}
+            attributes=get_attribute_budget().apply(attributes or {}),
+            context=trace.set_span_in_context(span_family.l2_span.span),
         )
 
+        span_family.l3_span[collab_agent_trace_id] = SpanModel(span=l3_span)
         self.agent_session_id_dict[collab_agent_trace_id] = agent_session_id
 
         return l3_span
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def delete_l3_span(
         self,
         agent_session_id: str,
@@ -302,39 +278,24 @@ class SpanManager(BaseModel):
         trace_id: str,
         status=StatusCode.OK,
     ) -> Span:
-        if agent_session_id not in self.spans:
-            raise RuntimeError("Agent span not found")
-
-        family = trace_id[:36]
-        counter = trace_id[37:]
+        span_family = self._check_l2(agent_session_id, trace_id)
 
-        if family != self.spans[agent_session_id].family:
-            raise RuntimeError("New Agent span should be assigned first")
-
-        if counter != self.spans[agent_session_id].counter:
-            raise RuntimeError("Assign a new L2 span")
-
-        if not self.spans[agent_session_id].l2_span:
+        if not span_family.l2_span:
             raise RuntimeError("L2 span not found")
 
-        if collab_agent_trace_id not in self.spans[agent_session_id].l3_span:
+        if collab_agent_trace_id not in span_family.l3_span:
             raise RuntimeError("L3 span not found")
 
-        self.spans[agent_session_id].l3_span[collab_agent_trace_id].span.set_status(
-            Status(status)
-        )
-        # self.spans[agent_session_id].l3_span.end_time = end_time
-        self.spans[agent_session_id].l3_span[collab_agent_trace_id].end = True
-        del self.spans[agent_session_id].l3_span[collab_agent_trace_id]
-
-        # self.spans[agent_session_id].l2_span.end_time = end_time
+        l3_span = span_family.l3_span.pop(collab_agent_trace_id)
+        l3_span.span.set_status(Status(status))
+        l3_span.end = True
 
     def end_all_spans(self, status_code: Literal[StatusCode.OK, StatusCode.ERROR]):
 
-        for _, current_span in self.spans.items():
+        for current_span in self.spans.values():
 
             if current_span.l3_span:
-                for _, current_l3_span in current_span.l3_span.items():
+                for current_l3_span in current_span.l3_span.values():
                     current_l3_span.span.set_status(StatusCode(StatusCode.OK))
                     current_l3_span.end = True
 
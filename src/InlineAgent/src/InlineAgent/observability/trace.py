@@ -1,16 +1,20 @@
 from enum import Enum
 from typing import Dict, List
 from InlineAgent.constants import Level, TraceColor
-from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
+from InlineAgent.sink import OutputSink, get_output_sink
 
 import json
 
-
 AGENT = {}
 STEP = 1
 
+USAGE_TRACE_TYPES = (
+    "orchestrationTrace",
+    "routingClassifierTrace",
+    "preProcessingTrace",
+    "postProcessingTrace",
+)
+
 
 class Trace:
 
@@ -19,61 +23,54 @@ class Trace:
         trace: Dict,
         agentName: str,
         truncateResponse: int = None,
+        sink: OutputSink = None,
     ):
+        sink = sink or get_output_sink()
+        if not sink.enabled:
+            return Trace.usage(trace)
+
         input_tokens = 0
         output_tokens = 0
         llm_calls = 0
 
-        if "sessionId" in trace:
-            pass
-            _ = trace["sessionId"]
-
         # This is a Tagged Union structure.
         # Only one of the following top level keys will be set: customOrchestrationTrace, failureTrace, guardrailTrace, orchestrationTrace, postProcessingTrace,
         # preProcessingTrace, routingClassifierTrace.
         # If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member.
         # The structure of SDK_UNKNOWN_MEMBER is as follows: 'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
+        for step_type in trace:
+            parse = STEP_PARSERS.get(step_type)
+            if parse is None:
+                continue
 
-        HighLevelTrace.parse_custom_orchestration_trace(trace=trace)
-
-        HighLevelTrace.parse_failure_trace(trace=trace)
-
-        HighLevelTrace.guardrail_trace(trace=trace)
-
-        orch_input_tokens, orch_output_tokens, orch_llm_calls = (
-            HighLevelTrace.parse_orchestration_trace(trace=trace, agentName=agentName)
-        )
-        input_tokens += orch_input_tokens
-        output_tokens += orch_output_tokens
-        llm_calls += orch_llm_calls
-
-        post_input_tokens, post_output_tokens, post_llm_calls = (
-            HighLevelTrace.parse_post_processing_trace(trace=trace)
-        )
-        input_tokens += post_input_tokens
-        output_tokens += post_output_tokens
-        llm_calls += post_llm_calls
-
-        pre_input_tokens, pre_output_tokens, pre_llm_calls = (
-            HighLevelTrace.parse_preprocessing_trace(trace=trace)
-        )
-        input_tokens += pre_input_tokens
-        output_tokens += pre_output_tokens
-        llm_calls += pre_llm_calls
-
-        rout_input_tokens, rout_output_tokens, rout_llm_calls = (
-            HighLevelTrace.parse_routing_classifier_trace(
-                trace=trace, agentName=agentName
-            )
-        )
-        input_tokens += rout_input_tokens
-        output_tokens += rout_output_tokens
-        llm_calls += rout_llm_calls
+            usage = parse(trace=trace, agentName=agentName, sink=sink)
+            if usage:
+                input_tokens += usage[0]
+                output_tokens += usage[1]
+                llm_calls += usage[2]
 
         return int(input_tokens), int(output_tokens), int(llm_calls)
 
     @staticmethod
-    def add_citation(citations: List, cite=1) -> str:
+    def usage(trace: Dict):
+        """Return the (input tokens, output tokens, llm calls) a trace reports,
+        without printing anything."""
+        for step_type in USAGE_TRACE_TYPES:
+            if step_type in trace:
+                output = trace[step_type].get("modelInvocationOutput")
+                if output is None:
+                    return 0, 0, 0
+                usage = output.get("metadata", {}).get("usage", {})
+                return (
+                    int(usage.get("inputTokens", 0)),
+                    int(usage.get("outputTokens", 0)),
+                    1,
+                )
+        return 0, 0, 0
+
+    @staticmethod
+    def add_citation(citations: List, cite=1, sink: OutputSink = None) -> str:
+        sink = sink or get_output_sink()
 
         agent_answer = str()
 
@@ -118,17 +115,30 @@ class Trace:
             )
 
             agent_answer += text
-            print(colored(text, TraceColor.final_output), end="")
+            sink.write(text, TraceColor.final_output, end="", kind="answer")
             if citation["retrievedReferences"]:
-                print(colored(f" [{cite}]", TraceColor.error), end="")
+                sink.write(
+                    f" [{cite}]",
+                    TraceColor.error,
+                    end="",
+                    kind="citation",
+                )
 
             cite += 1
 
-        print("\n\n")
+        sink.write("\n\n", kind="citation")
         for output in cite_output:
             if len(output[1]):
-                print(colored(output[0], TraceColor.cite))
-                print(colored(output[1] + "\n", TraceColor.retrieved_references))
+                sink.write(
+                    output[0],
+                    TraceColor.cite,
+                    kind="citation",
+                )
+                sink.write(
+                    output[1] + "\n",
+                    TraceColor.retrieved_references,
+                    kind="citation",
+                )
 
         return agent_answer, cite
 
@@ -136,74 +146,82 @@ class Trace:
 class HighLevelTrace:
 
     @staticmethod
-    def parse_custom_orchestration_trace(trace: Dict):
+    def parse_custom_orchestration_trace(trace: Dict, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         if "customOrchestrationTrace" in trace:
-            print(
-                colored(
-                    f"Agent error: {trace['customOrchestrationTrace']['event']['text']}",
-                    TraceColor.custom_orchestraction_trace,
-                )
+            sink.write(
+                f"Agent error: {trace['customOrchestrationTrace']['event']['text']}",
+                TraceColor.custom_orchestraction_trace,
+                kind="trace",
             )
 
     @staticmethod
-    def parse_failure_trace(trace: Dict):
+    def parse_failure_trace(trace: Dict, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         if "failureTrace" in trace:
-            print(
-                colored(
-                    f"Agent error: {trace['failureTrace']['failureReason']}",
-                    TraceColor.error,
-                )
+            sink.write(
+                f"Agent error: {trace['failureTrace']['failureReason']}",
+                TraceColor.error,
+                kind="trace",
             )
 
     @staticmethod
-    def guardrail_trace(trace: Dict):
+    def guardrail_trace(trace: Dict, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         if "guardrailTrace" in trace:
             if trace["guardrailTrace"]["action"] == "INTERVENED":
-                print(
-                    colored(
-                        "<--- Guardrail Intervened --->", TraceColor.guardrail_trace
-                    )
+                sink.write(
+                    "<--- Guardrail Intervened --->",
+                    TraceColor.guardrail_trace,
+                    kind="trace",
                 )
                 for inputAssessment in trace["guardrailTrace"]["inputAssessments"]:
-                    print(colored("Input Guardrail", TraceColor.guardrail_trace))
-                    print(
-                        colored(
-                            json.dumps(inputAssessment, indent=2, default=str),
-                            TraceColor.guardrail_trace,
-                        )
+                    sink.write(
+                        "Input Guardrail",
+                        TraceColor.guardrail_trace,
+                        kind="trace",
+                    )
+                    sink.write(
+                        json.dumps(inputAssessment, indent=2, default=str),
+                        TraceColor.guardrail_trace,
+                        kind="trace",
                     )
 
                 for outputAssessment in trace["guardrailTrace"]["outputAssessments"]:
-                    print(colored("Output Guardrail", TraceColor.guardrail_trace))
-                    print(
-                        colored(
-                            json.dumps(outputAssessment, indent=2, default=str),
-                            TraceColor.guardrail_trace,
-                        )
+                    sink.write(
+                        "Output Guardrail",
+                        TraceColor.guardrail_trace,
+                        kind="trace",
+                    )
+                    sink.write(
+                        json.dumps(outputAssessment, indent=2, default=str),
+                        TraceColor.guardrail_trace,
+                        kind="trace",
                     )
 
     @staticmethod
-    def parse_orchestration_trace(trace: Dict, agentName: str):
+    def parse_orchestration_trace(trace: Dict, agentName: str, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         # This is a Tagged Union structure. Only one of the following top level keys will be set: invocationInput, modelInvocationInput, modelInvocationOutput, observation, rationale. If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member. The structure of SDK_UNKNOWN_MEMBER is as follows:'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
 
         if "orchestrationTrace" in trace:
 
             RoutingAndOrchestrationTrace.parse_invocation_input(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             RoutingAndOrchestrationTrace.parse_model_invocation_input(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             input_tokens, output_tokens, llm_calls = (
                 RoutingAndOrchestrationTrace.parse_model_invocation_output(
-                    trace=trace["orchestrationTrace"]
+                    trace=trace["orchestrationTrace"], sink=sink
                 )
             )
 
             RoutingAndOrchestrationTrace.parse_observation(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             if "rationale" in trace["orchestrationTrace"]:
@@ -213,18 +231,18 @@ class HighLevelTrace:
                 # else:
                 #     # Main agent
                 #     print(colored("Supervisor Agent Invoked", TraceColor.rationale))
-                print(
-                    colored(
-                        f"Thought: {trace['orchestrationTrace']['rationale']['text']}",
-                        TraceColor.rationale,
-                    )
+                sink.write(
+                    f"Thought: {trace['orchestrationTrace']['rationale']['text']}",
+                    TraceColor.rationale,
+                    kind="trace",
                 )
 
             return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_preprocessing_trace(trace: Dict):
+    def parse_preprocessing_trace(trace: Dict, sink: OutputSink = None):
+        sink = sink or get_output_sink()
 
         if "preProcessingTrace" in trace:
             if "modelInvocationOutput" in trace["preProcessingTrace"]:
@@ -242,24 +260,23 @@ class HighLevelTrace:
 
                 llm_calls = 1
 
-                print(
-                    colored(
-                        "Pre-processing trace, agent came up with an initial plan.",
-                        TraceColor.pre_processing,
-                    )
+                sink.write(
+                    "Pre-processing trace, agent came up with an initial plan.",
+                    TraceColor.pre_processing,
+                    kind="trace",
                 )
-                print(
-                    colored(
-                        f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                        TraceColor.stats,
-                    )
+                sink.write(
+                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                    TraceColor.stats,
+                    kind="trace",
                 )
 
                 return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_post_processing_trace(trace: Dict):
+    def parse_post_processing_trace(trace: Dict, sink: OutputSink = None):
+        sink = sink or get_output_sink()
 
         if "postProcessingTrace" in trace:
             if "modelInvocationOutput" in trace["postProcessingTrace"]:
@@ -276,52 +293,82 @@ class HighLevelTrace:
                 )
 
                 llm_calls = 1
-                print(
-                    colored(
-                        "Agent post-processing complete.", TraceColor.post_processing
-                    )
+                sink.write(
+                    "Agent post-processing complete.",
+                    TraceColor.post_processing,
+                    kind="trace",
                 )
-                print(
-                    colored(
-                        f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                        TraceColor.stats,
-                    )
+                sink.write(
+                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                    TraceColor.stats,
+                    kind="trace",
                 )
 
                 return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_routing_classifier_trace(trace: Dict, agentName: str):
+    def parse_routing_classifier_trace(
+        trace: Dict, agentName: str, sink: OutputSink = None
+    ):
+        sink = sink or get_output_sink()
         # This is a Tagged Union structure. Only one of the following top level keys will be set: invocationInput, modelInvocationInput, modelInvocationOutput, observation. If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member. The structure of SDK_UNKNOWN_MEMBER is as follows: 'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
 
         if "routingClassifierTrace" in trace:
             RoutingAndOrchestrationTrace.parse_invocation_input(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             RoutingAndOrchestrationTrace.parse_model_invocation_input(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             input_tokens, output_tokens, llm_calls = (
                 RoutingAndOrchestrationTrace.parse_model_invocation_output(
-                    trace=trace["routingClassifierTrace"]
+                    trace=trace["routingClassifierTrace"], sink=sink
                 )
             )
 
             RoutingAndOrchestrationTrace.parse_observation(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
 
+# Console formatter of each step type. Looked up on HighLevelTrace at call
+# time so the formatters can be replaced.
+STEP_PARSERS = {
+    "customOrchestrationTrace": lambda trace, agentName, sink: HighLevelTrace.parse_custom_orchestration_trace(
+        trace=trace, sink=sink
+    ),
+    "failureTrace": lambda trace, agentName, sink: HighLevelTrace.parse_failure_trace(
+        trace=trace, sink=sink
+    ),
+    "guardrailTrace": lambda trace, agentName, sink: HighLevelTrace.guardrail_trace(
+        trace=trace, sink=sink
+    ),
+    "orchestrationTrace": lambda trace, agentName, sink: HighLevelTrace.parse_orchestration_trace(
+        trace=trace, agentName=agentName, sink=sink
+    ),
+    "postProcessingTrace": lambda trace, agentName, sink: HighLevelTrace.parse_post_processing_trace(
+        trace=trace, sink=sink
+    ),
+    "preProcessingTrace": lambda trace, agentName, sink: HighLevelTrace.parse_preprocessing_trace(
+        trace=trace, sink=sink
+    ),
+    "routingClassifierTrace": lambda trace, agentName, sink: HighLevelTrace.parse_routing_classifier_trace(
+        trace=trace, agentName=agentName, sink=sink
+    ),
+}
+
+
 class RoutingAndOrchestrationTrace:
 
     @staticmethod
-    def parse_invocation_input(trace):
+    def parse_invocation_input(trace, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         if "invocationInput" in trace:
             # NOTE: when agent determines invocations should happen in parallel
             # the trace objects for invocation input still come back one at a time.
@@ -348,11 +395,10 @@ class RoutingAndOrchestrationTrace:
                     param_str = f"{parameter['name']}[{parameter['value']}] ({parameter['type']})"
                     params_info.append(param_str)
 
-                print(
-                    colored(
-                        f"Tool use: {tool} with these inputs: {' '.join(params_info)}",
-                        TraceColor.invocation_input,
-                    )
+                sink.write(
+                    f"Tool use: {tool} with these inputs: {' '.join(params_info)}",
+                    TraceColor.invocation_input,
+                    kind="trace",
                 )
 
             if "agentCollaboratorInvocationInput" in trace["invocationInput"]:
@@ -378,11 +424,10 @@ class RoutingAndOrchestrationTrace:
                                 text += f"{returnControlInvocationResult['functionResult']['actionGroup']} :: {returnControlInvocationResult['functionResult']['function']} ({returnControlInvocationResult['functionResult']['responseBody']['string']['body']})"
 
                     if text:
-                        print(
-                            colored(
-                                f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
-                                TraceColor.invocation_input,
-                            )
+                        sink.write(
+                            f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
+                            TraceColor.invocation_input,
+                            kind="trace",
                         )
                     if (
                         "text"
@@ -393,57 +438,57 @@ class RoutingAndOrchestrationTrace:
                         text = trace["invocationInput"][
                             "agentCollaboratorInvocationInput"
                         ]["input"]["text"]
-                        print(
-                            colored(
-                                f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
-                                TraceColor.invocation_input,
-                            )
+                        sink.write(
+                            f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
+                            TraceColor.invocation_input,
+                            kind="trace",
                         )
                     else:
                         text = str()
 
             if "codeInterpreterInvocationInput" in trace["invocationInput"]:
                 if "code" in trace["invocationInput"]["codeInterpreterInvocationInput"]:
-                    print(colored(f"Code interpreter:", TraceColor.invocation_input))
-                    console = Console()
-                    console.print(
-                        Markdown(
-                            f"**Generated code**\n```python\n{trace['invocationInput']['codeInterpreterInvocationInput']['code']}\n```"
-                        )
+                    sink.write(
+                        f"Code interpreter:",
+                        TraceColor.invocation_input,
+                        kind="trace",
+                    )
+                    sink.markdown(
+                        f"**Generated code**\n```python\n{trace['invocationInput']['codeInterpreterInvocationInput']['code']}\n```",
+                        kind="trace",
                     )
 
                 if (
                     "files"
                     in trace["invocationInput"]["codeInterpreterInvocationInput"]
                 ):
-                    print(
-                        colored(
-                            "Code Interpreter invoked with uploaded files",
-                            TraceColor.invocation_input,
-                        )
+                    sink.write(
+                        "Code Interpreter invoked with uploaded files",
+                        TraceColor.invocation_input,
+                        kind="trace",
                     )
 
             if "knowledgeBaseLookupInput" in trace["invocationInput"]:
-                print(
-                    colored(
-                        f"Knowledgebase retrieval: Knowledgebase Id ({trace['invocationInput']['knowledgeBaseLookupInput']['knowledgeBaseId']}) query ({trace['invocationInput']['knowledgeBaseLookupInput']['text']})",
-                        TraceColor.invocation_input,
-                    )
+                sink.write(
+                    f"Knowledgebase retrieval: Knowledgebase Id ({trace['invocationInput']['knowledgeBaseLookupInput']['knowledgeBaseId']}) query ({trace['invocationInput']['knowledgeBaseLookupInput']['text']})",
+                    TraceColor.invocation_input,
+                    kind="trace",
                 )
 
     @staticmethod
-    def parse_model_invocation_input(trace):
+    def parse_model_invocation_input(trace, sink: OutputSink = None):
+        sink = sink or get_output_sink()
         if "modelInvocationInput" in trace:
             if trace["modelInvocationInput"]["type"] == "ROUTING_CLASSIFIER":
-                print(
-                    colored(
-                        f"Routing the request to collaborators",
-                        TraceColor.rationale,
-                    )
+                sink.write(
+                    f"Routing the request to collaborators",
+                    TraceColor.rationale,
+                    kind="trace",
                 )
 
     @staticmethod
-    def parse_model_invocation_output(trace):
+    def parse_model_invocation_output(trace, sink: OutputSink = None):
+        sink = sink or get_output_sink()
 
         if "modelInvocationOutput" in trace:
             if "inputTokens" in trace["modelInvocationOutput"]["metadata"]["usage"]:
@@ -459,26 +504,25 @@ class RoutingAndOrchestrationTrace:
             else:
                 output_tokens = 0
             llm_calls = 1
-            print(
-                colored(
-                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                    TraceColor.stats,
-                )
+            sink.write(
+                f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                TraceColor.stats,
+                kind="trace",
             )
             return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_observation(trace):
+    def parse_observation(trace, sink: OutputSink = None):
+        sink = sink or get_output_sink()
 
         if "observation" in trace:
 
             if "actionGroupInvocationOutput" in trace["observation"]:
-                print(
-                    colored(
-                        f"Tool use output: {trace['observation']['actionGroupInvocationOutput']['text']}",
-                        TraceColor.invocation_output,
-                    )
+                sink.write(
+                    f"Tool use output: {trace['observation']['actionGroupInvocationOutput']['text']}",
+                    TraceColor.invocation_output,
+                    kind="trace",
                 )
 
             if "agentCollaboratorInvocationOutput" in trace["observation"]:
@@ -501,11 +545,10 @@ class RoutingAndOrchestrationTrace:
                             elif "functionInvocationInput" in invocationInput:
                                 text += f"{invocationInput['functionInvocationInput']['actionGroup']} :: {invocationInput['functionInvocationInput']['function']}"
 
-                        print(
-                            colored(
-                                f"Collaborator output: Invoke ({text})",
-                                TraceColor.invocation_input,
-                            )
+                        sink.write(
+                            f"Collaborator output: Invoke ({text})",
+                            TraceColor.invocation_input,
+                            kind="trace",
                         )
                     elif (
                         "text"
@@ -516,11 +559,10 @@ class RoutingAndOrchestrationTrace:
                         text = trace["observation"][
                             "agentCollaboratorInvocationOutput"
                         ]["output"]["text"]
-                        print(
-                            colored(
-                                f"Collaborator output: {text}",
-                                TraceColor.invocation_input,
-                            )
+                        sink.write(
+                            f"Collaborator output: {text}",
+                            TraceColor.invocation_input,
+                            kind="trace",
                         )
                     else:
                         text = str()
@@ -530,22 +572,20 @@ class RoutingAndOrchestrationTrace:
                     "executionOutput"
                     in trace["observation"]["codeInterpreterInvocationOutput"]
                 ):
-                    print(
-                        colored(
-                            f"Code interpreter output: {trace['observation']['codeInterpreterInvocationOutput']['executionOutput']}",
-                            TraceColor.invocation_output,
-                        )
+                    sink.write(
+                        f"Code interpreter output: {trace['observation']['codeInterpreterInvocationOutput']['executionOutput']}",
+                        TraceColor.invocation_output,
+                        kind="trace",
                     )
 
                 if (
                     "executionError"
                     in trace["observation"]["codeInterpreterInvocationOutput"]
                 ):
-                    print(
-                        colored(
-                            f"Code interpreter output error: {trace['observation']['codeInterpreterInvocationOutput']['executionError']}",
-                            TraceColor.error,
-                        )
+                    sink.write(
+                        f"Code interpreter output error: {trace['observation']['codeInterpreterInvocationOutput']['executionError']}",
+                        TraceColor.error,
+                        kind="trace",
                     )
 
                 if (
@@ -555,19 +595,17 @@ class RoutingAndOrchestrationTrace:
                     if trace["observation"]["codeInterpreterInvocationOutput"][
                         "executionTimeout"
                     ]:
-                        print(
-                            colored(
-                                f"Code interpreter output error: Execution timeout",
-                                TraceColor.error,
-                            )
+                        sink.write(
+                            f"Code interpreter output error: Execution timeout",
+                            TraceColor.error,
+                            kind="trace",
                         )
 
                 if "files" in trace["observation"]["codeInterpreterInvocationOutput"]:
-                    print(
-                        colored(
-                            "Code Interpreter created new files",
-                            TraceColor.invocation_input,
-                        )
+                    sink.write(
+                        "Code Interpreter created new files",
+                        TraceColor.invocation_input,
+                        kind="trace",
                     )
 
             if "finalResponse" in trace["observation"]:
@@ -584,11 +622,10 @@ class RoutingAndOrchestrationTrace:
                         if "content" in retrievedReference:
                             # TODO: ["content"]["type"] does not exist
                             # if retrievedReference["content"]["type"] == "TEXT":
-                            print(
-                                colored(
-                                    retrievedReference["content"]["text"],
-                                    TraceColor.invocation_output,
-                                )
+                            sink.write(
+                                retrievedReference["content"]["text"],
+                                TraceColor.invocation_output,
+                                kind="trace",
                             )
                             # elif retrievedReference["content"]["type"] == "IMAGE":
                             #     print(
@@ -613,17 +650,15 @@ class RoutingAndOrchestrationTrace:
                             #     )
 
                         if "location" in retrievedReference:
-                            print(
-                                colored(
-                                    f"Location: {json.dumps(retrievedReference['location'], indent=2, default=str)}",
-                                    TraceColor.invocation_output,
-                                )
+                            sink.write(
+                                f"Location: {json.dumps(retrievedReference['location'], indent=2, default=str)}",
+                                TraceColor.invocation_output,
+                                kind="trace",
                             )
 
             if "repromptResponse" in trace["observation"]:
-                print(
-                    colored(
-                        f"Reprompting {trace['observation']['repromptResponse']['source']} with query {trace['orchestrationTrace']['observation']['repromptResponse']['text']}",
-                        TraceColor.invocation_output,
-                    )
+                sink.write(
+                    f"Reprompting {trace['observation']['repromptResponse']['source']} with query {trace['orchestrationTrace']['observation']['repromptResponse']['text']}",
+                    TraceColor.invocation_output,
+                    kind="trace",
                 )
@@ -1,10 +1,12 @@
-"""Configuration for OpenTelemetry with Langfuse."""
+"""Configuration for OpenTelemetry with Langfuse, sampling and local exporters."""
 
 import base64
 import logging
+from typing import Optional
 
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
 from opentelemetry.sdk.resources import Resource
 from openinference.semconv.resource import ResourceAttributes
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
@@ -12,9 +14,14 @@ from opentelemetry.sdk.trace.export import (
     BatchSpanProcessor,
     ConsoleSpanExporter,
     SimpleSpanProcessor,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
 )
-from opentelemetry.sdk.resources import Resource
 
+from .exporters import OTLPJsonFileSpanExporter
+from .sampling import TailSamplingSpanProcessor
 from .settings_management import ObservabilityConfig
 
 logging.basicConfig(
@@ -24,8 +31,84 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_tracer_provider(config: ObservabilityConfig, timeout: int = 300):
-    """Create an OpenTelemetry TracerProvider configured for Langfuse."""
+def create_span_exporter(
+    config: ObservabilityConfig, timeout: int = 300
+) -> Optional[SpanExporter]:
+    """Create the exporter selected by ``config.SPAN_EXPORTER``.
+
+    ``otlp`` sends to ``API_URL`` (with Langfuse credentials when set),
+    ``file`` appends OTLP/JSON lines to ``SPAN_EXPORT_FILE``, ``memory`` keeps
+    spans for ``get_finished_spans()``. Returns ``None`` when there is nothing
+    to export to.
+    """
+    if config.SPAN_EXPORTER == "none":
+        return None
+    if config.SPAN_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    if config.SPAN_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if config.SPAN_EXPORTER == "file":
+        logger.info(f"Writing spans to {config.SPAN_EXPORT_FILE}")
+        return OTLPJsonFileSpanExporter(config.SPAN_EXPORT_FILE)
+
+    if not config.API_URL:
+        return None
+
+    endpoint = f"{config.API_URL}/v1/traces"
+    headers = None
+
+    # Configure Langfuse exporter if credentials are provided
+    if config.LANGFUSE_PUBLIC_KEY and config.LANGFUSE_SECRET_KEY:
+
+        # Generate Basic auth header for Langfuse
+        langfuse_auth = base64.b64encode(
+            f"{config.LANGFUSE_PUBLIC_KEY}:{config.LANGFUSE_SECRET_KEY}".encode()
+        ).decode()
+        headers = {"Authorization": f"Basic {langfuse_auth}"}
+        logger.info(f"Using Langfuse endpoint: {endpoint}")
+        logger.info(f"Langfuse exporter configured for project: {config.PROJECT_NAME}")
+
+    return OTLPSpanExporter(endpoint=endpoint, headers=headers, timeout=timeout)
+
+
+def create_span_processor(
+    config: ObservabilityConfig, exporter: SpanExporter
+) -> SpanProcessor:
+    """Wrap ``exporter`` in a batch processor sized by ``config``, behind tail
+    sampling when ``TAIL_SAMPLE_SUCCESS_RATIO`` or ``SPAN_DROP_NAMES`` is set."""
+    if isinstance(exporter, (InMemorySpanExporter, ConsoleSpanExporter)):
+        # Local exporters are cheap; make spans visible as soon as they end.
+        processor = SimpleSpanProcessor(exporter)
+    else:
+        processor = BatchSpanProcessor(
+            span_exporter=exporter,
+            max_queue_size=config.SPAN_BATCH_MAX_QUEUE_SIZE,
+            max_export_batch_size=config.SPAN_BATCH_MAX_EXPORT_SIZE,
+            schedule_delay_millis=config.SPAN_BATCH_SCHEDULE_DELAY_MILLIS,
+        )
+
+    if config.TAIL_SAMPLE_SUCCESS_RATIO < 1.0 or config.SPAN_DROP_NAMES:
+        processor = TailSamplingSpanProcessor(
+            processor,
+            success_ratio=config.TAIL_SAMPLE_SUCCESS_RATIO,
+            drop_span_names=config.SPAN_DROP_NAMES,
+            max_pending_traces=config.TAIL_SAMPLE_MAX_TRACES,
+        )
+    return processor
+
+
+def create_tracer_provider(
+    config: ObservabilityConfig,
+    timeout: int = 300,
+    exporter: Optional[SpanExporter] = None,
+) -> TracerProvider:
+    """Create an OpenTelemetry TracerProvider configured for Langfuse.
+
+    Args:
+        config (ObservabilityConfig): Exporter, sampling and batching settings.
+        timeout (int): OTLP export timeout in seconds.
+        exporter (SpanExporter): Used instead of the one ``config`` selects.
+    """
 
     # Create resource attributes
     resource = Resource.create(
@@ -36,48 +119,30 @@ def create_tracer_provider(config: ObservabilityConfig, timeout: int = 300):
         }
     )
 
+    # Head sampling; children follow the decision of their root span. It reads
+    # the low 64 bits of the trace id, tail sampling the high 64.
+    sampler = None
+    if config.SAMPLE_RATIO < 1.0:
+        sampler = ParentBased(TraceIdRatioBased(config.SAMPLE_RATIO))
+
     # Create tracer provider with resource
-    tracer_provider = TracerProvider(resource=resource)
-
-    if config.API_URL and config.PRODUCE_BEDROCK_OTEL_TRACES:
-        endpoint = f"{config.API_URL}/v1/traces"
-
-        # Configure Langfuse exporter if credentials are provided
-        if config.LANGFUSE_PUBLIC_KEY and config.LANGFUSE_SECRET_KEY:
-
-            # Generate Basic auth header for Langfuse
-            langfuse_auth = base64.b64encode(
-                f"{config.LANGFUSE_PUBLIC_KEY}:{config.LANGFUSE_SECRET_KEY}".encode()
-            ).decode()
-            # Configure OTLP exporter for Langfuse - match the original implementation
-            logger.info(f"Using Langfuse endpoint: {endpoint}")
-
-            langfuse_exporter = OTLPSpanExporter(
-                endpoint=endpoint,
-                headers={"Authorization": f"Basic {langfuse_auth}"},
-                timeout=timeout,
-            )
-
-            # Add Langfuse exporter to tracer provider
-            # Use default settings for simplicity
-            logger.info(
-                f"Langfuse exporter configured for project: {config.PROJECT_NAME}"
-            )
-            tracer_provider.add_span_processor(BatchSpanProcessor(langfuse_exporter))
-        else:
-            span_exporter = OTLPSpanExporter(
-                endpoint=endpoint,
-                timeout=timeout,
-            )
-            tracer_provider.add_span_processor(
-                BatchSpanProcessor(span_exporter=span_exporter)
-            )
+    tracer_provider = TracerProvider(resource=resource, sampler=sampler)
 
+    if config.PRODUCE_BEDROCK_OTEL_TRACES:
+        exporter = exporter or create_span_exporter(config=config, timeout=timeout)
+    else:
+        exporter = None
+
+    if exporter is not None:
+        tracer_provider.add_span_processor(
+            create_span_processor(config=config, exporter=exporter)
+        )
     else:
-        # tracer_provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
         logger.warning(
             "Credentials not provided, telemetry will not be created or exported"
         )
 
     # Set as global tracer provider
     trace.set_tracer_provider(tracer_provider)
+
+    return tracer_provider
@@ -0,0 +1,360 @@
+"""
+Append-only trace persistence for ``observe(save_traces=True)``.
+
+Every trace event is written as one JSON line to ``<directory>/<session>.jsonl``
+(``.jsonl.gz`` or ``.jsonl.zst`` when compressed). The caller only serializes
+the event and queues the line; a background thread batches the writes, so the
+cost per event is constant no matter how long the session runs. When
+``rotate_bytes`` is set, a full segment is renamed to ``<session>.<n>.jsonl``
+and a new one is started.
+
+``read_traces`` returns the events of a session as a list, the format the
+previous ``<session>.json`` files used, and still reads those legacy files.
+"""
+
+import atexit
+import gzip
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, IO, List, Literal, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+Compression = Optional[Literal["gzip", "zstd"]]
+
+_EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+# Seconds between checks that the writer thread is alive during a flush.
+_ALIVE_CHECK_INTERVAL = 0.1
+
+_STOP = object()
+_FLUSH = object()
+
+
+def _open_segment(path: str, compression: Compression) -> IO[bytes]:
+    if compression is None:
+        return open(path, "ab")
+    if compression == "gzip":
+        # Appending adds a new gzip member, which readers handle transparently.
+        return gzip.open(path, "ab")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                "zstd trace compression requires the zstandard package: pip install zstandard"
+            )
+        return zstandard.ZstdCompressor().stream_writer(open(path, "ab"))
+    raise ValueError(f"Unsupported trace compression {compression}")
+
+
+def _read_segment(path: str) -> bytes:
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if path.endswith(".gz"):
+        # Appends produce one gzip member per open; a member that is still
+        # being written is decoded up to its last flush.
+        chunks = list()
+        while data:
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            try:
+                chunks.append(decompressor.decompress(data))
+            except zlib.error:
+                break
+            if not decompressor.eof:
+                break
+            data = decompressor.unused_data
+        return b"".join(chunks)
+
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(
+                "Reading zstd traces requires the zstandard package: pip install zstandard"
+            )
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(data), read_across_frames=True
+        )
+        return reader.read()
+
+    return data
+
+
+class TraceWriter:
+    """Buffered, append-only JSON Lines writer for trace events.
+
+    Args:
+        directory (str): Directory that holds one file per session.
+        compression (str): ``None``, ``"gzip"`` or ``"zstd"``.
+        rotate_bytes (int): Start a new segment once the current one exceeds
+            this many bytes on disk. ``None`` never rotates.
+        flush_interval (float): Longest time, in seconds, an event waits in
+            the buffer before it is written.
+        buffer_size (int): Number of buffered events that triggers a write.
+        max_open_files (int): Segment files kept open across flushes.
+    """
+
+    def __init__(
+        self,
+        directory: str = "trace",
+        compression: Compression = None,
+        rotate_bytes: Optional[int] = None,
+        flush_interval: float = 1.0,
+        buffer_size: int = 256,
+        max_open_files: int = 64,
+    ):
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unsupported trace compression {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd trace compression requires the zstandard package: pip install zstandard"
+            )
+
+        self.directory = os.path.abspath(directory)
+        self.compression = compression
+        self.rotate_bytes = rotate_bytes
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.max_open_files = max_open_files
+
+        self._queue: queue.Queue = queue.Queue()
+        self._files: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="inline-agent-trace-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, session_id: str, trace_data: Dict):
+        """Queue one trace event for ``session_id``."""
+        if self._closed:
+            raise RuntimeError("TraceWriter is closed")
+        self._check_thread()
+        line = json.dumps(trace_data, default=str).encode("utf-8") + b"\n"
+        self._queue.put((str(session_id), line))
+
+    def flush(self):
+        """Block until every event queued so far is on disk.
+
+        Raises ``RuntimeError`` when the background thread has stopped.
+        """
+        if self._closed:
+            return
+        self._check_thread()
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        # The thread may stop before it reaches the marker.
+        while not done.wait(_ALIVE_CHECK_INTERVAL):
+            self._check_thread()
+
+    def close(self):
+        """Flush, stop the background thread and close every file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("TraceWriter thread failed") from self._error
+
+    def _check_thread(self):
+        if not self._thread.is_alive():
+            raise RuntimeError("TraceWriter thread failed") from self._error
+
+    def path(self, session_id: str) -> str:
+        """Path of the segment currently written for ``session_id``."""
+        return os.path.join(
+            self.directory, str(session_id) + _EXTENSIONS[self.compression]
+        )
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except BaseException as e:
+            # Raised to the caller of the next write, flush or close.
+            self._error = e
+
+    def _write_loop(self):
+        pending: Dict[str, List[bytes]] = dict()
+        buffered = 0
+        deadline = None
+        while True:
+            timeout = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            flushed: Optional[threading.Event] = None
+            if item is _STOP:
+                self._write_pending(pending)
+                break
+            if item is not None:
+                key, value = item
+                if key is _FLUSH:
+                    flushed = value
+                else:
+                    pending.setdefault(key, []).append(value)
+                    buffered += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+            if (
+                flushed is not None
+                or buffered >= self.buffer_size
+                or (deadline is not None and time.monotonic() >= deadline)
+            ):
+                self._write_pending(pending)
+                buffered = 0
+                deadline = None
+
+            if flushed is not None:
+                flushed.set()
+
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+    def _write_pending(self, pending: Dict[str, List[bytes]]):
+        try:
+            for session_id, lines in pending.items():
+                self._write_lines(session_id, lines)
+        except Exception as e:
+            # Trace persistence must never break the agent; drop the batch.
+            print(f"An error occurred while saving traces: {str(e)}")
+        finally:
+            pending.clear()
+
+    def _write_lines(self, session_id: str, lines: List[bytes]):
+        file = self._files.get(session_id)
+        if file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            file = _open_segment(self.path(session_id), self.compression)
+            self._files[session_id] = file
+            while len(self._files) > self.max_open_files:
+                _, oldest = self._files.popitem(last=False)
+                oldest.close()
+        else:
+            self._files.move_to_end(session_id)
+
+        file.write(b"".join(lines))
+        if self.compression == "zstd":
+            # Close the frame so readers can decode everything written so far.
+            file.flush(zstandard.FLUSH_FRAME)
+        else:
+            file.flush()
+
+        if self.rotate_bytes and os.path.getsize(self.path(session_id)) >= (
+            self.rotate_bytes
+        ):
+            self._rotate(session_id)
+
+    def _rotate(self, session_id: str):
+        self._files.pop(session_id).close()
+        current = self.path(session_id)
+        index = len(_rotated_segments(self.directory, str(session_id))) + 1
+        os.replace(
+            current,
+            os.path.join(
+                self.directory,
+                f"{session_id}.{index}{_EXTENSIONS[self.compression]}",
+            ),
+        )
+
+
+def _rotated_segments(directory: str, session_id: str) -> List[str]:
+    pattern = re.compile(re.escape(session_id) + r"\.(\d+)\.jsonl(\.gz|\.zst)?$")
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments = [
+        (int(match.group(1)), name) for name in names if (match := pattern.match(name))
+    ]
+    return [os.path.join(directory, name) for _, name in sorted(segments)]
+
+
+def read_traces(session_id: str, directory: str = "trace") -> List[Dict]:
+    """Return every saved trace event of a session, oldest first.
+
+    Reads the legacy ``<session>.json`` list, the rotated segments and the
+    current segment, whatever their compression.
+    """
+    directory = os.path.abspath(directory)
+    traces: List[Dict] = list()
+
+    legacy = os.path.join(directory, f"{session_id}.json")
+    if os.path.exists(legacy):
+        with open(legacy, "r") as file:
+            try:
+                traces.extend(json.load(file))
+            except json.JSONDecodeError:
+                pass
+
+    segments = _rotated_segments(directory, str(session_id))
+    segments.extend(
+        os.path.join(directory, f"{session_id}{extension}")
+        for extension in _EXTENSIONS.values()
+    )
+    for segment in segments:
+        if not os.path.exists(segment):
+            continue
+        for line in io.BytesIO(_read_segment(segment)):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                traces.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted write.
+                continue
+
+    return traces
+
+
+_writer_lock = threading.Lock()
+_trace_writer: Optional[TraceWriter] = None
+
+
+def get_trace_writer() -> TraceWriter:
+    """Return the process-wide trace writer, creating it on first use."""
+    global _trace_writer
+
+    with _writer_lock:
+        if _trace_writer is None:
+            from .settings_management import ObservabilityConfig
+
+            config = ObservabilityConfig()
+            _trace_writer = TraceWriter(
+                directory=config.TRACE_DIRECTORY,
+                compression=config.TRACE_COMPRESSION,
+                rotate_bytes=config.TRACE_ROTATE_BYTES,
+            )
+        return _trace_writer
+
+
+def set_trace_writer(writer: Optional[TraceWriter]) -> Optional[TraceWriter]:
+    """Install a process-wide trace writer and return the previous one."""
+    global _trace_writer
+
+    with _writer_lock:
+        previous, _trace_writer = _trace_writer, writer
+        return previous
+
+
+@atexit.register
+def _close_trace_writer():
+    if _trace_writer is not None:
+        _trace_writer.close()
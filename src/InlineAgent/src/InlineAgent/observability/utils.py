@@ -1,9 +1,8 @@
 import json
 from typing import List, Tuple
 
-from pydantic import validate_call
 from InlineAgent.constants import TraceColor
-from termcolor import colored
+from InlineAgent.sink import OutputSink, get_output_sink
 
 
 def json_safe(obj):
@@ -13,7 +12,6 @@ def json_safe(obj):
     return obj
 
 
-@validate_call
 def get_agent_from_caller_chain(caller_chain: list, index: int) -> Tuple[str, str]:
 
     alias_id = caller_chain[index]["agentAliasArn"]
@@ -28,7 +26,8 @@ def get_agent_id_aliasid(arn: str):
     return agent_id, agent_alias_id
 
 
-def add_citation(citations: List, cite=1) -> str:
+def add_citation(citations: List, cite=1, sink: OutputSink = None) -> str:
+    sink = sink or get_output_sink()
 
     agent_answer = str()
 
@@ -68,17 +67,34 @@ def add_citation(citations: List, cite=1) -> str:
 
         agent_answer += text
 
-        print(colored(f"\n\n<-- Response with Citation -->", TraceColor.cite))
-        print(colored(text, TraceColor.final_output), end="")
+        sink.write(
+            f"\n\n<-- Response with Citation -->",
+            TraceColor.cite,
+            kind="citation",
+        )
+        sink.write(text, TraceColor.final_output, end="", kind="answer")
         if citation["retrievedReferences"]:
-            print(colored(f" [{cite}]", TraceColor.error), end="")
+            sink.write(
+                f" [{cite}]",
+                TraceColor.error,
+                end="",
+                kind="citation",
+            )
 
         cite += 1
 
-    print("\n\n")
+    sink.write("\n\n", kind="citation")
     for output in cite_output:
         if len(output[1]):
-            print(colored(output[0], TraceColor.cite))
-            print(colored(output[1] + "\n", TraceColor.retrieved_references))
+            sink.write(
+                output[0],
+                TraceColor.cite,
+                kind="citation",
+            )
+            sink.write(
+                output[1] + "\n",
+                TraceColor.retrieved_references,
+                kind="citation",
+            )
 
     return agent_answer, cite
@@ -0,0 +1,169 @@
+"""
+Output sinks for agent answers, traces and statistics.
+
+``InlineAgent.invoke``, ``Trace.parse_trace``, ``ProcessROC`` and
+``observability.observe`` write everything they show to the user through an
+``OutputSink`` instead of calling ``print`` directly. Pick a sink per agent
+(``InlineAgent(sink=...)``), per call (``invoke(..., sink=...)``) or for the
+whole process with ``set_output_sink``.
+
+Callers check ``sink.enabled`` before building expensive output, so
+``NullSink`` costs nothing per event.
+"""
+
+import json
+import logging
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import IO, List, Optional, Tuple
+
+from termcolor import colored
+
+
+class OutputSink(ABC):
+    """Destination for human-facing output.
+
+    ``kind`` classifies each write, e.g. ``"answer"``, ``"trace"``,
+    ``"stats"``, ``"citation"``, ``"files"`` or ``"error"``, so structured
+    sinks can route or filter it.
+    """
+
+    enabled: bool = True
+
+    @abstractmethod
+    def write(
+        self,
+        text: str,
+        color: Optional[str] = None,
+        end: str = "\n",
+        kind: str = "text",
+    ) -> None:
+        pass
+
+    def markdown(self, text: str, kind: str = "text") -> None:
+        self.write(text, kind=kind)
+
+    def flush(self) -> None:
+        pass
+
+
+class ConsoleSink(OutputSink):
+    """Colored terminal output, the default."""
+
+    def __init__(self, file: Optional[IO[str]] = None):
+        self.file = file
+        self._console = None
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        print(colored(text, color) if color else text, end=end, file=self.file)
+
+    def markdown(self, text, kind="text"):
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(file=self.file)
+
+        from rich.markdown import Markdown
+
+        self._console.print(Markdown(text))
+
+    def flush(self):
+        (self.file or sys.stdout).flush()
+
+
+class NullSink(OutputSink):
+    """Discard all output."""
+
+    enabled = False
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        pass
+
+    def markdown(self, text, kind="text"):
+        pass
+
+
+class LoggingSink(OutputSink):
+    """Send output to a ``logging.Logger``, one record per complete line."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("InlineAgent")
+        self.level = level
+        self._lock = threading.Lock()
+        self._partial: List[str] = list()
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        if not self.logger.isEnabledFor(self.level):
+            return
+
+        with self._lock:
+            self._partial.append(text)
+            self._partial.append(end)
+            if "\n" not in end:
+                return
+            message = "".join(self._partial).strip("\n")
+            self._partial.clear()
+
+        if message:
+            self.logger.log(self.level, message, extra={"kind": kind})
+
+    def flush(self):
+        with self._lock:
+            message = "".join(self._partial).strip("\n")
+            self._partial.clear()
+        if message:
+            self.logger.log(self.level, message)
+
+
+class JsonSink(OutputSink):
+    """Write one JSON object per write, e.g. for log shippers.
+
+    Each line has the form ``{"kind": ..., "text": ...}``.
+    """
+
+    def __init__(self, file: Optional[IO[str]] = None):
+        self.file = file
+        self._lock = threading.Lock()
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        line = json.dumps({"kind": kind, "text": text}, default=str)
+        with self._lock:
+            (self.file or sys.stdout).write(line + "\n")
+
+    def flush(self):
+        (self.file or sys.stdout).flush()
+
+
+class BufferedSink(OutputSink):
+    """Keep ``(kind, text)`` records in memory for later inspection."""
+
+    def __init__(self):
+        self.records: List[Tuple[str, str]] = list()
+
+    def write(self, text, color=None, end="\n", kind="text"):
+        self.records.append((kind, text))
+
+    def text(self, kind: Optional[str] = None) -> str:
+        return "".join(
+            text for record_kind, text in self.records if kind in (None, record_kind)
+        )
+
+    def clear(self):
+        self.records.clear()
+
+
+_output_sink: OutputSink = ConsoleSink()
+
+
+def get_output_sink() -> OutputSink:
+    """Return the process-wide default sink."""
+    return _output_sink
+
+
+def set_output_sink(sink: OutputSink) -> OutputSink:
+    """Install a process-wide default sink and return the previous one."""
+    global _output_sink
+
+    previous, _output_sink = _output_sink, sink
+    return previous
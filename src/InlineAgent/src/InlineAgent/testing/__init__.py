@@ -0,0 +1,37 @@
+"""
+Offline stand-ins for the Bedrock services, for tests and load generation.
+
+``FakeAgentRuntime`` replaces the ``bedrock-agent-runtime`` client through the
+client pool; ``python -m InlineAgent.testing.loadgen`` drives it to measure
+the SDK's own throughput, latency and memory.
+"""
+
+from .fake_runtime import (
+    FakeAgentRuntime,
+    FakeEventStream,
+    chunk,
+    citation,
+    default_script,
+    fake_client_factory,
+    files,
+    final_response,
+    model_invocation,
+    rationale,
+    return_control,
+    trace,
+)
+
+__all__ = [
+    "FakeAgentRuntime",
+    "FakeEventStream",
+    "chunk",
+    "citation",
+    "default_script",
+    "fake_client_factory",
+    "files",
+    "final_response",
+    "model_invocation",
+    "rationale",
+    "return_control",
+    "trace",
+]
@@ -0,0 +1,360 @@
+"""
+Local stand-in for the ``bedrock-agent-runtime`` client.
+
+``FakeAgentRuntime`` answers ``invoke_inline_agent`` and ``invoke_agent`` with
+a scripted event stream, so ``InlineAgent.invoke``, ``InlineAgent.stream`` and
+``observe()`` run without AWS. It blocks the way boto3 does: the call waits
+``latency`` seconds for the response headers and the stream blocks before
+every event. With ``tokens_per_second`` set, answer chunks and model
+invocation outputs also wait for the tokens they carry to be "generated".
+
+A script is a list of events built with the helpers below. A return of
+control event ends the stream; the next request of that session carrying
+``returnControlInvocationResults`` resumes after it, as the service does.
+Trace events are stamped with the session id, caller chain and time when
+they are sent.
+
+Install it through the client pool::
+
+    runtime = FakeAgentRuntime(default_script(), latency=0.2)
+    set_client_pool(ClientPool(client_factory=fake_client_factory(runtime)))
+"""
+
+import itertools
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from InlineAgent.client_pool import ClientFactory, default_client_factory
+
+Event = Dict[str, Any]
+
+AGENT_ID = "FAKEAGENT"
+AGENT_ALIAS_ID = "FAKEALIAS"
+
+
+def chunk(text: str, citations: Optional[List[Dict]] = None) -> Event:
+    """An answer chunk, with knowledge base citations if given."""
+    event: Dict[str, Any] = {"bytes": text.encode("utf8")}
+    if citations:
+        event["attribution"] = {"citations": citations}
+    return {"chunk": event}
+
+
+def citation(
+    text: str,
+    reference: str = "Retrieved passage.",
+    uri: str = "s3://fake-bucket/document.txt",
+    data_source_id: str = "FAKEDATASOURCE",
+) -> Dict:
+    """A citation of ``text`` backed by one retrieved reference."""
+    return {
+        "generatedResponsePart": {
+            "textResponsePart": {
+                "text": text,
+                "span": {"start": 0, "end": max(len(text) - 1, 0)},
+            }
+        },
+        "retrievedReferences": [
+            {
+                "content": {"type": "TEXT", "text": reference},
+                "location": {"type": "S3", "s3Location": {"uri": uri}},
+                "metadata": {"x-amz-bedrock-kb-data-source-id": data_source_id},
+            }
+        ],
+    }
+
+
+def trace(step: Dict) -> Event:
+    """A trace event around one step, e.g. ``{"orchestrationTrace": {...}}``."""
+    return {"trace": {"agentVersion": "DRAFT", "trace": step}}
+
+
+def model_invocation(
+    input_tokens: int = 1000,
+    output_tokens: int = 100,
+    prompt: str = '{"system": "You are a helpful assistant.", "messages": []}',
+    completion: str = "",
+    step_type: str = "orchestrationTrace",
+    trace_id: str = "fake-trace-0",
+) -> List[Event]:
+    """The input and output trace events of one model invocation."""
+    return [
+        trace(
+            {
+                step_type: {
+                    "modelInvocationInput": {
+                        "traceId": trace_id,
+                        "type": "ORCHESTRATION",
+                        "foundationModel": "fake.model-v1",
+                        "inferenceConfiguration": {
+                            "maximumLength": 2048,
+                            "stopSequences": ["</answer>"],
+                            "temperature": 0.0,
+                            "topK": 250,
+                            "topP": 1.0,
+                        },
+                        "text": prompt,
+                    }
+                }
+            }
+        ),
+        trace(
+            {
+                step_type: {
+                    "modelInvocationOutput": {
+                        "traceId": trace_id,
+                        "metadata": {
+                            "usage": {
+                                "inputTokens": input_tokens,
+                                "outputTokens": output_tokens,
+                            }
+                        },
+                        "rawResponse": {"content": completion},
+                    }
+                }
+            }
+        ),
+    ]
+
+
+def rationale(text: str, trace_id: str = "fake-trace-0") -> Event:
+    return trace(
+        {"orchestrationTrace": {"rationale": {"traceId": trace_id, "text": text}}}
+    )
+
+
+def final_response(text: str, trace_id: str = "fake-trace-0") -> Event:
+    return trace(
+        {
+            "orchestrationTrace": {
+                "observation": {
+                    "traceId": trace_id,
+                    "type": "FINISH",
+                    "finalResponse": {"text": text},
+                }
+            }
+        }
+    )
+
+
+def return_control(
+    function: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    action_group: str = "ActionGroup",
+    invocation_id: str = "fake-invocation",
+    invocation_type: str = "RESULT",
+) -> Event:
+    """Ask the caller to run ``function`` with string-typed ``parameters``."""
+    return {
+        "returnControl": {
+            "invocationId": invocation_id,
+            "invocationInputs": [
+                {
+                    "functionInvocationInput": {
+                        "actionGroup": action_group,
+                        "function": function,
+                        "actionInvocationType": invocation_type,
+                        "agentId": AGENT_ID,
+                        "parameters": [
+                            {"name": name, "type": "string", "value": str(value)}
+                            for name, value in (parameters or {}).items()
+                        ],
+                    }
+                }
+            ],
+        }
+    }
+
+
+def files(*outputs: Tuple[str, bytes, str]) -> Event:
+    """Files produced by the agent, given as ``(name, data, type)``."""
+    return {
+        "files": {
+            "files": [
+                {"name": name, "bytes": data, "type": type}
+                for name, data, type in outputs
+            ]
+        }
+    }
+
+
+def default_script(
+    answer: str = "The weather in Seattle is sunny today.", chunk_words: int = 4
+) -> List[Event]:
+    """One model invocation followed by the answer in chunks of words."""
+    words = answer.split(" ")
+    parts = [
+        " ".join(words[index : index + chunk_words])
+        for index in range(0, len(words), chunk_words)
+    ]
+    return [
+        *model_invocation(completion=answer),
+        final_response(answer),
+        chunk(parts[0]),
+        *(chunk(" " + part) for part in parts[1:]),
+    ]
+
+
+def _split_segments(script: Sequence[Event]) -> List[List[Event]]:
+    # Each return of control ends a request; the next one resumes after it.
+    segments: List[List[Event]] = [[]]
+    for event in script:
+        segments[-1].append(event)
+        if "returnControl" in event:
+            segments.append([])
+    if len(segments) > 1 and not segments[-1]:
+        segments.pop()
+    return segments
+
+
+def _event_tokens(event: Event) -> int:
+    if "chunk" in event:
+        return len(event["chunk"].get("bytes", b"").split())
+    if "trace" in event:
+        for step in event["trace"].get("trace", {}).values():
+            output = (
+                step.get("modelInvocationOutput") if isinstance(step, dict) else None
+            )
+            if output:
+                return int(output["metadata"]["usage"].get("outputTokens", 0))
+    return 0
+
+
+class FakeEventStream:
+    """Blocking event stream of one fake request, like boto3's ``EventStream``."""
+
+    def __init__(self, runtime: "FakeAgentRuntime", events: List[Event], stamp: Dict):
+        self._runtime = runtime
+        self._events = events
+        self._stamp = stamp
+        self._closed = False
+
+    def __iter__(self):
+        runtime = self._runtime
+        for event in self._events:
+            if self._closed:
+                return
+            delay = runtime.event_latency
+            if runtime.tokens_per_second:
+                delay += _event_tokens(event) / runtime.tokens_per_second
+            if delay > 0:
+                time.sleep(delay)
+
+            if "trace" in event:
+                # Stamped per send: the same script serves every session.
+                event = {
+                    "trace": {
+                        **self._stamp,
+                        "eventTime": datetime.now(timezone.utc),
+                        **event["trace"],
+                    }
+                }
+            runtime._count_event()
+            yield event
+
+    def close(self):
+        self._closed = True
+
+
+class FakeAgentRuntime:
+    """Scripted ``bedrock-agent-runtime`` client.
+
+    Args:
+        script (Sequence[dict]): Events of one agent turn, e.g. from
+            ``default_script``.
+        latency (float): Seconds before the response headers arrive.
+        event_latency (float): Seconds the stream blocks before each event.
+        tokens_per_second (float): Output token rate of the fake model.
+            ``None`` sends tokens without delay.
+    """
+
+    def __init__(
+        self,
+        script: Optional[Sequence[Event]] = None,
+        latency: float = 0.0,
+        event_latency: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+    ):
+        self.segments = _split_segments(
+            default_script() if script is None else list(script)
+        )
+        self.latency = latency
+        self.event_latency = event_latency
+        self.tokens_per_second = tokens_per_second
+
+        self.invocations = 0
+        self.events = 0
+        self._lock = threading.Lock()
+        self._resume: Dict[str, int] = dict()
+        self._request_ids = itertools.count(1)
+
+    def invoke_inline_agent(self, **request) -> Dict:
+        return self._invoke(request, AGENT_ID, AGENT_ALIAS_ID)
+
+    def invoke_agent(self, **request) -> Dict:
+        return self._invoke(
+            request,
+            request.get("agentId", AGENT_ID),
+            request.get("agentAliasId", AGENT_ALIAS_ID),
+        )
+
+    def reset(self):
+        """Forget sessions waiting for tool results and zero the counters."""
+        with self._lock:
+            self._resume.clear()
+            self.invocations = 0
+            self.events = 0
+
+    def _invoke(self, request: Dict, agent_id: str, agent_alias_id: str) -> Dict:
+        session_id = request.get("sessionId", "")
+        state = request.get("inlineSessionState") or request.get("sessionState") or {}
+
+        with self._lock:
+            self.invocations += 1
+            request_id = f"FAKE-{next(self._request_ids)}"
+            index = 0
+            if "returnControlInvocationResults" in state:
+                index = self._resume.pop(session_id, 0)
+            if index + 1 < len(self.segments):
+                self._resume[session_id] = index + 1
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        stamp = {
+            "agentId": agent_id,
+            "agentAliasId": agent_alias_id,
+            "sessionId": session_id,
+            "callerChain": [
+                {
+                    "agentAliasArn": f"arn:aws:bedrock:us-east-1:123456789012:agent-alias/{agent_id}/{agent_alias_id}"
+                }
+            ],
+        }
+        return {
+            "completion": FakeEventStream(self, self.segments[index], stamp),
+            "contentType": "application/json",
+            "sessionId": session_id,
+            "ResponseMetadata": {"RequestId": request_id, "RetryAttempts": 0},
+        }
+
+    def _count_event(self):
+        with self._lock:
+            self.events += 1
+
+
+def fake_client_factory(
+    runtime: FakeAgentRuntime, fallback: Optional[ClientFactory] = None
+) -> ClientFactory:
+    """Client factory that returns ``runtime`` for ``bedrock-agent-runtime``
+    and builds every other client with ``fallback``."""
+    fallback = fallback or default_client_factory
+
+    def factory(session, service_name: str, region_name, config):
+        if service_name == "bedrock-agent-runtime":
+            return runtime
+        return fallback(session, service_name, region_name, config)
+
+    return factory
@@ -0,0 +1,317 @@
+"""
+Load generator for the SDK's own overhead.
+
+Runs many sessions of agent turns against ``FakeAgentRuntime`` and reports
+client-side throughput, p50/p99 turn latency and memory per session. Nothing
+leaves the process, so the numbers measure the SDK alone: request building,
+the event stream bridge, trace parsing, return of control and file output.
+
+Scenarios:
+
+* ``text``: one model invocation and a chunked answer,
+* ``tools``: a return of control to a local tool, then the answer,
+* ``rich``: ``tools`` plus a saved file and a cited answer.
+
+APIs: ``invoke`` (``InlineAgent.invoke``), ``stream`` (``InlineAgent.stream``)
+and ``observe`` (an ``observe()``-wrapped ``invoke_agent``).
+
+Memory is measured in a separate pass with ``tracemalloc``: ``peak`` is the
+largest allocation while ``concurrency`` sessions run at once, ``retained``
+what is still allocated after all of them finished, both per session.
+
+Usage:
+    python -m InlineAgent.testing.loadgen --sessions 500 --concurrency 50
+    python -m InlineAgent.testing.loadgen --api stream --scenario rich --latency 0.2 --tokens-per-second 80
+"""
+
+import argparse
+import asyncio
+import gc
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Literal, Optional
+
+from InlineAgent.action_group import ActionGroup
+from InlineAgent.agent import InlineAgent
+from InlineAgent.agent.event_stream import call_blocking
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.file_output import FileOutputWriter, set_file_writer
+from InlineAgent.sink import NullSink
+
+from .fake_runtime import (
+    AGENT_ALIAS_ID,
+    AGENT_ID,
+    Event,
+    FakeAgentRuntime,
+    chunk,
+    citation,
+    default_script,
+    fake_client_factory,
+    files,
+    final_response,
+    model_invocation,
+    rationale,
+    return_control,
+)
+
+Api = Literal["invoke", "stream", "observe"]
+
+APIS = ("invoke", "stream", "observe")
+
+ANSWER = "It is 18 degrees and sunny in Seattle, a good day for a walk by the water."
+
+
+def get_weather(city: str) -> str:
+    """Returns the current weather for a city.
+
+    Args:
+        city: Name of the city
+    """
+    return f"18 degrees and sunny in {city}"
+
+
+def scenario_script(scenario: str) -> List[Event]:
+    if scenario == "text":
+        return default_script(ANSWER)
+
+    script = [
+        *model_invocation(input_tokens=1200, output_tokens=60),
+        rationale("The user asks for the weather, call get_weather."),
+        return_control(
+            "get_weather", {"city": "Seattle"}, action_group="WeatherActionGroup"
+        ),
+        *model_invocation(input_tokens=1400, output_tokens=40, trace_id="fake-trace-1"),
+        final_response(ANSWER, trace_id="fake-trace-1"),
+    ]
+    if scenario == "tools":
+        return script + default_script(ANSWER)[3:]
+    if scenario == "rich":
+        return script + [
+            files(("forecast.csv", b"hour,degrees\n" + b"12,18\n" * 64, "text/csv")),
+            chunk(ANSWER, citations=[citation(ANSWER)]),
+        ]
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+def make_agent() -> InlineAgent:
+    return InlineAgent(
+        foundation_model="fake.model-v1",
+        instruction="You are a helpful assistant for load testing.",
+        agent_name="LoadTestAgent",
+        action_groups=[
+            ActionGroup(
+                name="WeatherActionGroup", tools=[get_weather], argument_key="Args:"
+            )
+        ],
+        profile=None,
+        sink=NullSink(),
+    )
+
+
+def make_turn(api: Api, runtime: FakeAgentRuntime) -> Callable:
+    """Return a coroutine function that runs one turn of a session."""
+    if api == "invoke":
+        agent = make_agent()
+
+        async def turn(session_id: str):
+            await agent.invoke(
+                input_text="What is the weather in Seattle?",
+                session_id=session_id,
+                add_citation=True,
+            )
+
+        return turn
+
+    if api == "stream":
+        agent = make_agent()
+
+        async def turn(session_id: str):
+            async for _ in agent.stream(
+                input_text="What is the weather in Seattle?", session_id=session_id
+            ):
+                pass
+
+        return turn
+
+    if api == "observe":
+        from InlineAgent.observability import observe
+
+        @observe(show_traces=False, sink=NullSink())
+        async def invoke_agent(inputText: str, sessionId: str, **kwargs):
+            return await call_blocking(
+                runtime.invoke_agent, inputText=inputText, sessionId=sessionId, **kwargs
+            )
+
+        async def turn(session_id: str):
+            await invoke_agent(
+                inputText="What is the weather in Seattle?",
+                sessionId=session_id,
+                agentId=AGENT_ID,
+                agentAliasId=AGENT_ALIAS_ID,
+            )
+
+        return turn
+
+    raise ValueError(f"Unknown api {api}")
+
+
+async def run_sessions(
+    turn: Callable, sessions: int, turns: int, concurrency: int, prefix: str
+) -> List[float]:
+    """Run ``sessions`` sessions of ``turns`` sequential turns, at most
+    ``concurrency`` sessions at a time, and return every turn's latency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = list()
+
+    async def session(index: int):
+        async with semaphore:
+            for _ in range(turns):
+                start = time.perf_counter()
+                await turn(f"{prefix}-{index}")
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    return latencies
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))]
+
+
+def measure_memory(turn: Callable, concurrency: int, turns: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        asyncio.run(run_sessions(turn, concurrency, turns, concurrency, "memory"))
+        _, peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib_per_session": (peak - baseline) / 1024 / concurrency,
+        "retained_kib_per_session": (retained - baseline) / 1024 / concurrency,
+    }
+
+
+def run_load(
+    api: Api = "invoke",
+    scenario: str = "text",
+    sessions: int = 100,
+    turns: int = 2,
+    concurrency: int = 50,
+    latency: float = 0.0,
+    event_latency: float = 0.0,
+    tokens_per_second: Optional[float] = None,
+    memory: bool = True,
+) -> Dict:
+    """Run a load test against a fake runtime and return the measurements.
+
+    Installs a client pool around the fake runtime and a file writer into a
+    temporary directory for the duration of the run.
+    """
+    runtime = FakeAgentRuntime(
+        scenario_script(scenario),
+        latency=latency,
+        event_latency=event_latency,
+        tokens_per_second=tokens_per_second,
+    )
+    output = tempfile.TemporaryDirectory()
+    previous_pool = set_client_pool(
+        ClientPool(
+            max_connections=concurrency, client_factory=fake_client_factory(runtime)
+        )
+    )
+    file_writer = FileOutputWriter(directory=output.name)
+    previous_writer = set_file_writer(file_writer)
+    try:
+        turn = make_turn(api, runtime)
+        asyncio.run(run_sessions(turn, 1, 1, 1, "warmup"))
+        runtime.reset()
+
+        start = time.perf_counter()
+        latencies = asyncio.run(
+            run_sessions(turn, sessions, turns, concurrency, "load")
+        )
+        elapsed = time.perf_counter() - start
+
+        result = {
+            "api": api,
+            "scenario": scenario,
+            "sessions": sessions,
+            "turns": len(latencies),
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "turns_per_second": len(latencies) / elapsed,
+            "requests": runtime.invocations,
+            "events_per_second": runtime.events / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000,
+        }
+        if memory:
+            result.update(measure_memory(turn, concurrency, turns))
+        return result
+    finally:
+        set_client_pool(previous_pool)
+        set_file_writer(previous_writer)
+        file_writer.shutdown()
+        output.cleanup()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api", choices=APIS, nargs="+", default=["invoke"])
+    parser.add_argument(
+        "--scenario", choices=("text", "tools", "rich"), nargs="+", default=["text"]
+    )
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=2, help="Turns per session")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50])
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to response headers"
+    )
+    parser.add_argument(
+        "--event-latency", type=float, default=0.0, help="Seconds before each event"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'api':>8} {'scenario':>8} {'conc':>5} {'turns':>7} {'turns/s':>9}"
+        f" {'events/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9} {'kept KiB':>9}"
+    )
+    for api in args.api:
+        for scenario in args.scenario:
+            for concurrency in args.concurrency:
+                result = run_load(
+                    api=api,
+                    scenario=scenario,
+                    sessions=args.sessions,
+                    turns=args.turns,
+                    concurrency=concurrency,
+                    latency=args.latency,
+                    event_latency=args.event_latency,
+                    tokens_per_second=args.tokens_per_second,
+                    memory=not args.no_memory,
+                )
+                print(
+                    f"{api:>8} {scenario:>8} {concurrency:>5} {result['turns']:>7}"
+                    f" {result['turns_per_second']:>9.1f}"
+                    f" {result['events_per_second']:>10.0f}"
+                    f" {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+                    f" {result.get('peak_kib_per_session', 0):>9.1f}"
+                    f" {result.get('retained_kib_per_session', 0):>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Local MCP stdio server for tests and benchmarks.
+
+Tools:
+
+* ``echo``: returns its input,
+* ``slow_echo``: returns its input after ``seconds``, to show concurrent calls,
+* ``parts``: returns ``count`` text parts of ``size`` characters each,
+* ``pid``: returns the server's process id, to stop it from outside.
+* ``version``: returns the server version, which is read at start from the
+  file named by the ``VERSION_FILE`` environment variable when it is set.
+
+Usage:
+    python -m InlineAgent.testing.mcp_echo_server
+"""
+
+import asyncio
+import os
+import sys
+from typing import Dict, List, Optional
+
+from mcp import StdioServerParameters
+
+
+def echo(text: str) -> str:
+    """Return the text unchanged."""
+    return text
+
+
+async def slow_echo(text: str, seconds: float = 0.1) -> str:
+    """Return the text after waiting."""
+    await asyncio.sleep(seconds)
+    return text
+
+
+def parts(count: int = 4, size: int = 1024) -> List[str]:
+    """Return count text parts of size characters each."""
+    return [str(index % 10) * size for index in range(count)]
+
+
+def pid() -> int:
+    """Return the process id of the server."""
+    return os.getpid()
+
+
+def server_parameters(env: Optional[Dict[str, str]] = None) -> StdioServerParameters:
+    """Parameters that start this server with the current interpreter."""
+    # Run as a script: the server gets a minimal environment without PYTHONPATH.
+    return StdioServerParameters(
+        command=sys.executable, args=[os.path.abspath(__file__)], env=env
+    )
+
+
+def main():
+    # Built here: FastMCP configures logging, which importers should not get.
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("InlineAgentEcho", log_level="WARNING")
+    for tool in (echo, slow_echo, parts, pid):
+        server.add_tool(tool)
+
+    version = "1"
+    if "VERSION_FILE" in os.environ:
+        with open(os.environ["VERSION_FILE"]) as version_file:
+            version = version_file.read().strip()
+    # The low level server reports the version to clients.
+    server._mcp_server.version = version
+    server.add_tool(
+        lambda: version,
+        name="version",
+        description=f"Return the server version, {version}.",
+    )
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
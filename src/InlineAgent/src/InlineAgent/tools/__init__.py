@@ -1,3 +1,39 @@
-from .mcp import MCPStdio, MCPServer, MCPHttp
+from typing import TYPE_CHECKING
 
-__all__ = ["MCPStdio", "MCPServer", "MCPHttp"]
+from InlineAgent._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base import MCPServer
+    from .mcp import MCPStdio, MCPHttp
+    from .pool import (
+        MCPPool,
+        PooledMCPServer,
+        SSEServerParameters,
+        get_mcp_pool,
+        set_mcp_pool,
+    )
+
+__all__ = [
+    "MCPStdio",
+    "MCPServer",
+    "MCPHttp",
+    "MCPPool",
+    "PooledMCPServer",
+    "SSEServerParameters",
+    "get_mcp_pool",
+    "set_mcp_pool",
+]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "MCPServer": ".base",
+        "MCPStdio": ".mcp",
+        "MCPHttp": ".mcp",
+        "MCPPool": ".pool",
+        "PooledMCPServer": ".pool",
+        "SSEServerParameters": ".pool",
+        "get_mcp_pool": ".pool",
+        "set_mcp_pool": ".pool",
+    },
+)
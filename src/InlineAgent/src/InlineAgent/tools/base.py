@@ -0,0 +1,150 @@
+"""
+Transport-independent part of the MCP clients.
+
+Kept apart from ``mcp.py`` so that action groups and agents can refer to
+``MCPServer`` without importing the ``mcp`` client stack.
+
+Tools are listed once per connection, or read from an ``MCPSchemaCache``, and
+both the function schema and the callables are built from that one list.
+Tool calls share the connection's session: the MCP client matches responses to
+requests by id, so calls are sent without waiting for the previous one, up to
+``max_in_flight`` at a time.
+"""
+
+import asyncio
+import contextlib
+from abc import ABC
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from pydantic import validate_call
+
+from InlineAgent.types.action_group import FunctionDefination
+
+DEFAULT_MAX_IN_FLIGHT = 16
+
+
+def content_text(content: Any) -> str:
+    """Text of one part of a tool result."""
+    match getattr(content, "type", None):
+        case "text":
+            return content.text
+        case "resource":
+            resource = content.resource
+            text = getattr(resource, "text", None)
+            return text if text is not None else f"[resource {resource.uri}]"
+        case "image" | "audio":
+            return f"[{content.type} {content.mimeType}]"
+    return str(content)
+
+
+class MCPServer(ABC):
+
+    async def list_tools(self, refresh: bool = False) -> List[Dict]:
+        """
+        Tool definitions of the server, listed once per connection.
+        """
+        if not self.session:
+            raise RuntimeError("Not connected to MCP server")
+
+        if getattr(self, "tools", None) is None or refresh:
+            response = await self.session.list_tools()
+            self.tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputSchema": tool.inputSchema,
+                }
+                for tool in response.tools
+            ]
+        return self.tools
+
+    @validate_call
+    async def set_available_tools(self, tools_to_use: set) -> List[FunctionDefination]:
+        """
+        Retrieve a list of available tools from the MCP server.
+        """
+        functions = list()
+        for tool in await self.list_tools():
+            if len(tools_to_use) != 0 and tool["name"] not in tools_to_use:
+                continue
+
+            function = {
+                "description": tool["description"],
+                "name": tool["name"],
+                "parameters": {},
+                "requireConfirmation": "DISABLED",
+            }
+            input_schema = tool["inputSchema"]
+            # Process input schema properties
+            if "properties" in input_schema:
+                for param_name, param_details in input_schema["properties"].items():
+                    function["parameters"][param_name] = {
+                        "description": param_details.get("description", param_name),
+                        "type": param_details.get("type", "string"),
+                        "required": param_name in input_schema.get("required", []),
+                    }
+
+                if len(function["parameters"]) > 5:
+
+                    raise ValueError(
+                        f"Tool {tool['name']} has more than 5 parameters. This is not supported by Bedrock Agents."
+                    )
+
+            functions.append(function)
+
+        if functions:
+            self.function_schema["functions"] = functions
+
+    @validate_call
+    async def set_callable_tool(self, tools_to_use: set) -> Dict[str, Callable]:
+        """
+        Get callable function
+        """
+
+        # Helper factory function to create a callable with the correct tool name
+        def create_callable(tool_name):
+            async def callable(*args, **kwargs):
+                return await self.call_tool(tool_name, arguments=kwargs)
+
+            return callable
+
+        for tool in await self.list_tools():
+            if len(tools_to_use) != 0 and tool["name"] not in tools_to_use:
+                continue
+            self.callable_tools[tool["name"]] = create_callable(tool["name"])
+
+    async def call_tool(self, name: str, arguments: Optional[Dict] = None) -> str:
+        """Call a tool and return the text of every part of its result."""
+        return "\n".join(
+            [part async for part in self.iter_tool_result(name, arguments)]
+        )
+
+    async def iter_tool_result(
+        self, name: str, arguments: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Call a tool and yield the text of its result one part at a time.
+
+        Large multi-part results can be written out part by part instead of
+        joined into one string first.
+        """
+        if not self.session:
+            raise RuntimeError("Not connected to MCP server")
+
+        async with self._in_flight():
+            response = await self.session.call_tool(name, arguments=arguments)
+
+        for content in response.content:
+            yield content_text(content)
+
+    def _in_flight(self):
+        semaphore = getattr(self, "_calls", None)
+        if semaphore is None:
+            max_in_flight = getattr(self, "max_in_flight", DEFAULT_MAX_IN_FLIGHT)
+            if max_in_flight is None:
+                return contextlib.nullcontext()
+            semaphore = self._calls = asyncio.Semaphore(max_in_flight)
+        return semaphore
+
+    async def cleanup(self):
+        """Clean up resources"""
+        await self.exit_stack.aclose()
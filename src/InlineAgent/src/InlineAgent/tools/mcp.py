@@ -1,169 +1,98 @@
-from abc import ABC, abstractmethod
 from contextlib import AsyncExitStack
 
 from termcolor import colored
 
 from pydantic import validate_call
-from mcp import ClientSession, ListToolsResult, StdioServerParameters
+from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
-from typing import Any, Callable, Dict, List
+from typing import Any, AsyncContextManager, Dict, Optional
 
-from InlineAgent.types.action_group import FunctionDefination
 from InlineAgent.constants import TraceColor
+from InlineAgent.tools.base import DEFAULT_MAX_IN_FLIGHT, MCPServer
+from InlineAgent.tools.schema_cache import MCPSchemaCache, server_key
+
+
+async def _connect(
+    self: MCPServer,
+    transport: AsyncContextManager,
+    identity: Dict,
+    tools_to_use: set,
+    schema_cache: Optional[str],
+    max_in_flight: Optional[int],
+):
+    # Initialize session and client objects
+    self.session = None
+    self.exit_stack = AsyncExitStack()
+    self.function_schema = dict()
+    self.callable_tools = dict()
+    self.tools = None
+    self.max_in_flight = max_in_flight
+
+    self.stdio, self.write = await self.exit_stack.enter_async_context(transport)
+    self.session = await self.exit_stack.enter_async_context(
+        ClientSession(self.stdio, self.write)
+    )
+
+    initialize_result = await self.session.initialize()
+    self.server_key = server_key(
+        identity=identity,
+        server_name=initialize_result.serverInfo.name,
+        server_version=initialize_result.serverInfo.version,
+        protocol_version=initialize_result.protocolVersion,
+    )
+
+    # List available tools, once, unless the schema cache knows this server
+    cache = MCPSchemaCache(schema_cache) if schema_cache else None
+    if cache is not None:
+        self.tools = cache.get(self.server_key)
+    if self.tools is None:
+        await self.list_tools()
+        if cache is not None:
+            cache.set(self.server_key, self.tools)
+
+    print(
+        colored(
+            f"\nConnected to server with tools:{[tool['name'] for tool in self.tools]}",
+            TraceColor.invocation_output,
+        )
+    )
 
-
-class MCPServer(ABC):
-
-    @validate_call
-    async def set_available_tools(self, tools_to_use: set) -> List[FunctionDefination]:
-        """
-        Retrieve a list of available tools from the MCP server.
-        """
-        if not self.session:
-            raise RuntimeError("Not connected to MCP server")
-
-        tools: ListToolsResult = await self.session.list_tools()
-        tools_list = tools.tools
-
-        function = {}
-        for tool in tools_list:
-            if len(tools_to_use) != 0:
-                if tool.name in tools_to_use:
-                    function = {
-                        "description": tool.description,
-                        "name": tool.name,
-                        "parameters": {},
-                        "requireConfirmation": "DISABLED",
-                    }
-                    # Process input schema properties
-                    if "properties" in tool.inputSchema:
-
-                        for param_name, param_details in tool.inputSchema[
-                            "properties"
-                        ].items():
-                            function["parameters"][param_name] = {
-                                "description": param_details.get(
-                                    "description", param_name
-                                ),
-                                "type": param_details.get("type", "string"),
-                                "required": param_name
-                                in tool.inputSchema.get("required", []),
-                            }
-
-                        if len(function["parameters"]) > 5:
-
-                            raise ValueError(
-                                f"Tool {tool.name} has more than 5 parameters. This is not supported by Bedrock Agents."
-                            )
-
-                    if "functions" not in self.function_schema:
-                        self.function_schema["functions"] = list()
-
-                    self.function_schema["functions"].append(function)
-            else:
-                function = {
-                    "description": tool.description,
-                    "name": tool.name,
-                    "parameters": {},
-                    "requireConfirmation": "DISABLED",
-                }
-                # Process input schema properties
-                if "properties" in tool.inputSchema:
-
-                    for param_name, param_details in tool.inputSchema[
-                        "properties"
-                    ].items():
-                        function["parameters"][param_name] = {
-                            "description": param_details.get("description", param_name),
-                            "type": param_details.get("type", "string"),
-                            "required": param_name
-                            in tool.inputSchema.get("required", []),
-                        }
-
-                    if len(function["parameters"]) > 5:
-
-                        raise ValueError(
-                            f"Tool {tool.name} has more than 5 parameters. This is not supported by Bedrock Agents."
-                        )
-
-                if "functions" not in self.function_schema:
-                    self.function_schema["functions"] = list()
-
-                self.function_schema["functions"].append(function)
-
-    @validate_call
-    async def set_callable_tool(self, tools_to_use: set) -> Dict[str, Callable]:
-        """
-        Get callable function
-        """
-        if not self.session:
-            raise RuntimeError("Not connected to MCP server")
-
-        tools = await self.session.list_tools()
-        tools_list = tools.tools
-
-        # Helper factory function to create a callable with the correct tool name
-        def create_callable(tool_name):
-            async def callable(*args, **kwargs):
-                response = await self.session.call_tool(
-                    tool_name, arguments=kwargs
-                )
-                return response.content[0].text
-            return callable
-
-        for tool in tools_list:
-            if len(tools_to_use) != 0:
-                if tool.name in tools_to_use:
-                    self.callable_tools[tool.name] = create_callable(tool.name)
-            else:
-                self.callable_tools[tool.name] = create_callable(tool.name)
-
-    async def cleanup(self):
-        """Clean up resources"""
-        await self.exit_stack.aclose()
+    await self.set_available_tools(tools_to_use=tools_to_use)
+    await self.set_callable_tool(tools_to_use=tools_to_use)
 
 
 class MCPStdio(MCPServer):
     """
     A client class for interacting with the MCP (Model Control Protocol) server.
+
+    ``schema_cache`` is the path of a JSON file to keep the server's tool
+    definitions in across restarts. ``max_in_flight`` bounds the concurrent
+    tool calls on the session; ``None`` leaves them unbounded.
     """
 
     @classmethod
     @validate_call
     async def create(
-        cls, server_params: StdioServerParameters, tools_to_use: set = set()
+        cls,
+        server_params: StdioServerParameters,
+        tools_to_use: set = set(),
+        schema_cache: Optional[str] = None,
+        max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
     ):
-        # Initialize session and client objects
         self = cls()
-        self.session = None
-        self.exit_stack = AsyncExitStack()
-        self.function_schema = dict()
-        self.callable_tools = dict()
-
-        stdio_transport = await self.exit_stack.enter_async_context(
-            stdio_client(server_params)
-        )
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(self.stdio, self.write)
-        )
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print(
-            colored(
-                f"\nConnected to server with tools:{[tool.name for tool in tools]}",
-                TraceColor.invocation_output,
-            )
+        await _connect(
+            self,
+            transport=stdio_client(server_params),
+            identity={
+                "command": server_params.command,
+                "args": server_params.args,
+                "cwd": str(server_params.cwd) if server_params.cwd else None,
+            },
+            tools_to_use=tools_to_use,
+            schema_cache=schema_cache,
+            max_in_flight=max_in_flight,
         )
-
-        await self.set_available_tools(tools_to_use=tools_to_use)
-        await self.set_callable_tool(tools_to_use=tools_to_use)
-
         return self
 
 
@@ -177,41 +106,21 @@ class MCPHttp(MCPServer):
         timeout: float = 5,
         sse_read_timeout: float = 60 * 5,
         tools_to_use: set = set(),
+        schema_cache: Optional[str] = None,
+        max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
     ):
-
-        # Initialize session and client objects
         self = cls()
-        self.session = None
-        self.exit_stack = AsyncExitStack()
-        self.function_schema = dict()
-        self.callable_tools = dict()
-
-        stdio_transport = await self.exit_stack.enter_async_context(
-            sse_client(
+        await _connect(
+            self,
+            transport=sse_client(
                 url=url,
                 headers=headers,
                 timeout=timeout,
                 sse_read_timeout=sse_read_timeout,
-            )
+            ),
+            identity={"url": url},
+            tools_to_use=tools_to_use,
+            schema_cache=schema_cache,
+            max_in_flight=max_in_flight,
         )
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(self.stdio, self.write)
-        )
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print(
-            colored(
-                f"\nConnected to server with tools:{[tool.name for tool in tools]}",
-                TraceColor.invocation_output,
-            )
-        )
-
-        await self.set_available_tools(tools_to_use=tools_to_use)
-        await self.set_callable_tool(tools_to_use=tools_to_use)
-
         return self
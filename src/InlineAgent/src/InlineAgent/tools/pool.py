@@ -0,0 +1,531 @@
+"""
+Shared MCP server connections for many agents.
+
+``MCPStdio.create`` starts a server process per client and ``MCPHttp.create``
+opens an SSE stream per client. ``MCPPool`` instead keeps one connection per
+server, keyed by its parameters, and hands it to every ``PooledMCPServer``:
+
+* connections start on first use and stop after ``idle_timeout`` seconds
+  without calls; the tool list is kept, so a later client or call restarts the
+  server without listing again unless the server reports a new version,
+* every ``ping_interval`` seconds idle connections are pinged and dropped when
+  the server does not answer,
+* a call whose connection is lost (the server exited or the stream closed) is
+  retried on a new connection up to ``retries`` times,
+* at most ``max_servers`` connections are live; the least recently used idle
+  one is stopped to make room, or the caller waits for one to go idle.
+
+Retried calls run the tool again, so keep ``retries=0`` for tools that must not
+run twice.
+
+A pool belongs to the event loop that uses it. When used from a new loop, e.g.
+a second ``asyncio.run``, it forgets the connections of the previous one.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from pydantic import BaseModel, validate_call
+
+from InlineAgent.tools.base import DEFAULT_MAX_IN_FLIGHT, MCPServer, content_text
+from InlineAgent.tools.schema_cache import MCPSchemaCache, server_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SERVERS = 16
+
+_LOST_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+class SSEServerParameters(BaseModel):
+    """How to reach an MCP server over HTTP with server-sent events."""
+
+    url: str
+    headers: Optional[Dict[str, Any]] = None
+    timeout: float = 5
+    sse_read_timeout: float = 60 * 5
+
+
+ServerParameters = Union[StdioServerParameters, SSEServerParameters]
+
+
+class MCPConnectionLost(ConnectionError):
+    """The server exited or its stream closed before the call finished."""
+
+
+def _identity(server: ServerParameters) -> Dict:
+    # What the schema cache keys on: how the server is started or reached.
+    if isinstance(server, SSEServerParameters):
+        return {"url": server.url}
+    return {
+        "command": server.command,
+        "args": server.args,
+        "cwd": str(server.cwd) if server.cwd else None,
+    }
+
+
+def _describe(server: ServerParameters) -> str:
+    if isinstance(server, SSEServerParameters):
+        return server.url
+    return " ".join([server.command, *server.args])
+
+
+def _pool_key(server: ServerParameters) -> str:
+    # Servers with other environments or headers are not shared.
+    if isinstance(server, SSEServerParameters):
+        extra = {"headers": server.headers}
+    else:
+        extra = {"env": server.env}
+    return json.dumps({**_identity(server), **extra}, sort_keys=True, default=str)
+
+
+def _transport(server: ServerParameters) -> AsyncContextManager:
+    if isinstance(server, SSEServerParameters):
+        return sse_client(
+            url=server.url,
+            headers=server.headers,
+            timeout=server.timeout,
+            sse_read_timeout=server.sse_read_timeout,
+        )
+    return stdio_client(server)
+
+
+class MCPConnection:
+    """One live session with a server, owned by an ``MCPPool``.
+
+    The transport and session are entered and exited by a task of their own,
+    as the ``mcp`` client requires, so any task can use the session.
+    """
+
+    def __init__(
+        self,
+        server: ServerParameters,
+        max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
+        on_release: Optional[Callable[[], None]] = None,
+    ):
+        self.server = server
+        self.session: Optional[ClientSession] = None
+        self.server_key: Optional[str] = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.last_ping = self.last_used
+        self._calls = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._on_release = on_release
+        self._ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._ended = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ended(self) -> bool:
+        return self._ended.is_set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def wait_ready(self, timeout: Optional[float] = None):
+        await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+
+    async def request(self, method: str, *args, **kwargs):
+        """Run a session method, failing fast when the connection is lost."""
+        return await self._request(method, args, kwargs, touch=True)
+
+    async def ping(self, timeout: float) -> bool:
+        self.last_ping = time.monotonic()
+        try:
+            # A ping does not count as use, or idle connections never stop.
+            await asyncio.wait_for(
+                self._request("send_ping", (), {}, touch=False), timeout
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server {_describe(self.server)} failed a ping: {e}")
+            return False
+
+    async def _request(self, method: str, args: tuple, kwargs: Dict, touch: bool):
+        if self.ended or self.session is None:
+            raise MCPConnectionLost(f"Connection to {_describe(self.server)} is closed")
+
+        self.in_flight += 1
+        try:
+            async with self._calls or contextlib.nullcontext():
+                call = asyncio.ensure_future(
+                    getattr(self.session, method)(*args, **kwargs)
+                )
+                ended = asyncio.ensure_future(self._ended.wait())
+                try:
+                    await asyncio.wait(
+                        {call, ended}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    ended.cancel()
+                    lost = not call.done()
+                    if lost:
+                        call.cancel()
+                if lost:
+                    raise MCPConnectionLost(
+                        f"Connection to {_describe(self.server)} was lost"
+                    )
+                try:
+                    return call.result()
+                except _LOST_ERRORS as e:
+                    raise MCPConnectionLost(str(e)) from e
+        finally:
+            self.in_flight -= 1
+            if touch:
+                self.last_used = time.monotonic()
+            if self._on_release is not None:
+                self._on_release()
+
+    async def close(self):
+        self._ended.set()
+        if self._task is not None:
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await self._task
+
+    async def _run(self):
+        try:
+            async with _transport(self.server) as (read, write):
+                forward, session_read = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as task_group:
+                    task_group.start_soon(self._forward, read, forward)
+                    async with ClientSession(session_read, write) as session:
+                        result = await session.initialize()
+                        self.server_key = server_key(
+                            identity=_identity(self.server),
+                            server_name=result.serverInfo.name,
+                            server_version=result.serverInfo.version,
+                            protocol_version=result.protocolVersion,
+                        )
+                        self.session = session
+                        self._ready.set_result(None)
+                        await self._ended.wait()
+                    task_group.cancel_scope.cancel()
+        except BaseException as e:
+            if not self._ready.done():
+                self._ready.set_exception(
+                    e if isinstance(e, Exception) else MCPConnectionLost(repr(e))
+                )
+            else:
+                logger.debug(f"MCP connection to {_describe(self.server)} ended: {e!r}")
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.session = None
+            self._ended.set()
+            if not self._ready.done():
+                self._ready.set_exception(
+                    MCPConnectionLost(f"Connection to {_describe(self.server)} closed")
+                )
+
+    async def _forward(self, read, forward):
+        # The session does not notice a closed transport; this does.
+        async with forward:
+            async for message in read:
+                await forward.send(message)
+        self._ended.set()
+
+
+class MCPPool:
+    """Shared, supervised connections to MCP servers.
+
+    Args:
+        max_servers (int): Most connections live at once.
+        idle_timeout (float): Seconds without calls before a connection is
+            stopped. ``None`` keeps connections until the pool is closed.
+        ping_interval (float): Seconds between liveness pings of idle
+            connections. ``None`` disables pings.
+        ping_timeout (float): Seconds a ping may take.
+        start_timeout (float): Seconds to start a server and initialize.
+        retries (int): Times a call is retried on a new connection after its
+            connection was lost.
+        max_in_flight (int): Concurrent requests per connection. ``None``
+            leaves them unbounded.
+        schema_cache (str): JSON file to keep tool definitions in, as for
+            ``MCPStdio.create``.
+    """
+
+    def __init__(
+        self,
+        max_servers: int = DEFAULT_MAX_SERVERS,
+        idle_timeout: Optional[float] = 300.0,
+        ping_interval: Optional[float] = 30.0,
+        ping_timeout: float = 5.0,
+        start_timeout: float = 30.0,
+        retries: int = 1,
+        max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT,
+        schema_cache: Optional[str] = None,
+    ):
+        if max_servers < 1:
+            raise ValueError("max_servers must be at least 1")
+
+        self.max_servers = max_servers
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.start_timeout = start_timeout
+        self.retries = retries
+        self.max_in_flight = max_in_flight
+        self.schema_cache = MCPSchemaCache(schema_cache) if schema_cache else None
+
+        self.starts = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connections: "OrderedDict[str, MCPConnection]" = OrderedDict()
+        # Pool key -> (server key, tools); kept across reconnects.
+        self._tools: Dict[str, tuple] = dict()
+        self._released: Optional[asyncio.Event] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def acquire(self, server: ServerParameters) -> MCPConnection:
+        """Return the live connection to ``server``, starting it if needed."""
+        self._bind_loop()
+        key = _pool_key(server)
+
+        started = False
+        connection = self._connections.get(key)
+        if connection is None or connection.ended:
+            if connection is not None:
+                del self._connections[key]
+            await self._make_room()
+            connection = self._connections.get(key)
+            if connection is None:
+                started = True
+                connection = MCPConnection(
+                    server,
+                    max_in_flight=self.max_in_flight,
+                    on_release=self._released.set,
+                )
+                self._connections[key] = connection
+                self.starts += 1
+                connection.start()
+                self._supervise()
+
+        self._connections.move_to_end(key)
+        try:
+            await connection.wait_ready(self.start_timeout)
+        except BaseException:
+            if self._connections.get(key) is connection:
+                del self._connections[key]
+            await connection.close()
+            raise
+
+        known = self._tools.get(key)
+        if started and known is not None and known[0] != connection.server_key:
+            # The server restarted with another version; list its tools again.
+            del self._tools[key]
+        return connection
+
+    async def call_tool(
+        self, server: ServerParameters, name: str, arguments: Optional[Dict] = None
+    ):
+        """Call a tool, reconnecting and retrying when the connection is lost."""
+        for attempt in range(self.retries + 1):
+            connection = await self.acquire(server)
+            try:
+                return await connection.request("call_tool", name, arguments=arguments)
+            except MCPConnectionLost:
+                await self._discard(connection)
+                if attempt == self.retries:
+                    raise
+                logger.warning(
+                    f"Retrying {name} on a new connection to {_describe(server)}"
+                )
+
+    async def list_tools(
+        self, server: ServerParameters, refresh: bool = False
+    ) -> List[Dict]:
+        """Tool definitions of ``server``, listed once and shared by all clients.
+
+        Known tools are returned without starting the server. They are listed
+        again once the server restarts and reports a new version.
+        """
+        key = _pool_key(server)
+        known = self._tools.get(key)
+        if known is not None and not refresh:
+            return known[1]
+
+        connection = await self.acquire(server)
+        tools = None
+        if self.schema_cache is not None and not refresh:
+            tools = self.schema_cache.get(connection.server_key)
+        if tools is None:
+            response = await connection.request("list_tools")
+            tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputSchema": tool.inputSchema,
+                }
+                for tool in response.tools
+            ]
+            if self.schema_cache is not None:
+                self.schema_cache.set(connection.server_key, tools)
+        self._tools[key] = (connection.server_key, tools)
+        return tools
+
+    async def close(self):
+        """Stop every connection and the supervisor."""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for connection in connections:
+            await connection.close()
+
+    def __len__(self) -> int:
+        return sum(not connection.ended for connection in self._connections.values())
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections of another loop died with it.
+            self._loop = loop
+            self._connections.clear()
+            self._released = asyncio.Event()
+            self._supervisor = None
+
+    async def _make_room(self):
+        while True:
+            # A dead connection holds a slot but never signals a release.
+            for connection in list(self._connections.values()):
+                if connection.ended:
+                    await self._discard(connection)
+            if len(self._connections) < self.max_servers:
+                return
+            idle = [
+                connection
+                for connection in self._connections.values()
+                if connection.in_flight == 0 and connection.session is not None
+            ]
+            if idle:
+                await self._discard(min(idle, key=lambda c: c.last_used))
+                continue
+            self._released.clear()
+            await self._released.wait()
+
+    async def _discard(self, connection: MCPConnection):
+        for key, current in list(self._connections.items()):
+            if current is connection:
+                del self._connections[key]
+        await connection.close()
+        self._released.set()
+
+    def _supervise(self):
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise_loop())
+
+    async def _supervise_loop(self):
+        periods = [
+            period for period in (self.idle_timeout, self.ping_interval) if period
+        ]
+        if not periods:
+            return
+        tick = max(min(periods) / 4, 0.01)
+
+        while self._connections:
+            await asyncio.sleep(tick)
+            now = time.monotonic()
+            for connection in list(self._connections.values()):
+                if connection.session is None and not connection.ended:
+                    continue  # still starting
+                if connection.ended:
+                    await self._discard(connection)
+                elif connection.in_flight:
+                    continue
+                elif (
+                    self.idle_timeout is not None
+                    and now - connection.last_used >= self.idle_timeout
+                ):
+                    await self._discard(connection)
+                elif (
+                    self.ping_interval is not None
+                    and now - connection.last_ping >= self.ping_interval
+                    and not await connection.ping(self.ping_timeout)
+                ):
+                    await self._discard(connection)
+
+
+class PooledMCPServer(MCPServer):
+    """MCP client whose tools run on a pooled connection.
+
+    Any number of clients for the same server parameters share one server
+    process or stream. Use it wherever ``MCPStdio`` or ``MCPHttp`` go, e.g.
+    in ``ActionGroup(mcp_clients=[...])``.
+    """
+
+    @classmethod
+    @validate_call(config=dict(arbitrary_types_allowed=True))
+    async def create(
+        cls,
+        server_params: ServerParameters,
+        tools_to_use: set = set(),
+        pool: Optional[MCPPool] = None,
+    ):
+        self = cls()
+        self.server_params = server_params
+        self.pool = pool if pool is not None else get_mcp_pool()
+        self.session = None
+        self.tools = None
+        self.function_schema = dict()
+        self.callable_tools = dict()
+
+        await self.set_available_tools(tools_to_use=tools_to_use)
+        await self.set_callable_tool(tools_to_use=tools_to_use)
+        return self
+
+    async def list_tools(self, refresh: bool = False) -> List[Dict]:
+        # Always asked of the pool, which knows when the server was upgraded.
+        self.tools = await self.pool.list_tools(self.server_params, refresh)
+        return self.tools
+
+    async def iter_tool_result(
+        self, name: str, arguments: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        response = await self.pool.call_tool(self.server_params, name, arguments)
+        for content in response.content:
+            yield content_text(content)
+
+    async def cleanup(self):
+        """Nothing to release: the pool owns the connection."""
+
+
+_mcp_pool: Optional[MCPPool] = None
+
+
+def get_mcp_pool() -> MCPPool:
+    """Return the process-wide MCP pool, creating it on first use."""
+    global _mcp_pool
+
+    if _mcp_pool is None:
+        _mcp_pool = MCPPool()
+    return _mcp_pool
+
+
+def set_mcp_pool(pool: Optional[MCPPool]) -> Optional[MCPPool]:
+    """Install a process-wide MCP pool and return the previous one."""
+    global _mcp_pool
+
+    previous, _mcp_pool = _mcp_pool, pool
+    return previous
@@ -0,0 +1,73 @@
+"""
+On-disk cache of MCP tool definitions.
+
+Listing tools is a round trip per server, and for stdio servers it often waits
+for the server to import its tool modules. ``MCPSchemaCache`` keeps the tool
+definitions of every server in one JSON file, keyed by ``server_key``: the
+connection parameters plus the name, version and protocol version the server
+reports on ``initialize``. A server upgrade changes the key, so a stale schema
+is never used.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+SCHEMA_CACHE_VERSION = 1
+
+
+def server_key(
+    identity: Dict,
+    server_name: str,
+    server_version: str,
+    protocol_version: str,
+) -> str:
+    """Key of a server's tools, from how it is reached and what it reports."""
+    payload = json.dumps(
+        [identity, server_name, server_version, str(protocol_version)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MCPSchemaCache:
+    """Tool definitions of MCP servers in a JSON file.
+
+    Args:
+        path (str): Cache file, created on first write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Cached tools of a server, ``None`` when unknown."""
+        entry = self._read().get(key)
+        return None if entry is None else entry["tools"]
+
+    def set(self, key: str, tools: List[Dict]):
+        with self._lock:
+            servers = self._read()
+            servers[key] = {"tools": tools}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                json.dump({"version": SCHEMA_CACHE_VERSION, "servers": servers}, file)
+            # Readers in other processes see the old file or the new one.
+            os.replace(temporary, self.path)
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r") as file:
+                cached = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+        if cached.get("version") != SCHEMA_CACHE_VERSION:
+            return dict()
+        return cached["servers"]
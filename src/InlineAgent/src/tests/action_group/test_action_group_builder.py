@@ -1,7 +1,10 @@
+import os
+import tempfile
 from typing import Any, Dict, Literal
 import unittest
+from unittest import mock
 
-from InlineAgent.action_group import ActionGroupBuilder
+from InlineAgent.action_group import ActionGroup, ActionGroupBuilder
 
 
 def spider_run(website_url: str, mode: Literal["scrape", "crawl"] = "scrape"):
@@ -286,3 +289,32 @@ class TestActionGroupBuilder(unittest.TestCase):
         self.assertEqual(
             ActionGroupBuilder.create_function_schema(spider_run), spider_run_schema
         )
+
+    def test_create_function_schema_is_cached(self):
+        ActionGroupBuilder.clear_schema_cache()
+        first = ActionGroupBuilder.create_function_schema(spider_run)
+
+        with mock.patch.object(ActionGroupBuilder, "parse_docstring") as parse:
+            second = ActionGroupBuilder.create_function_schema(spider_run)
+            parse.assert_not_called()
+
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_freeze_and_load_schemas(self):
+        action_group = ActionGroup(
+            name="SpiderActionGroup", tools=[spider_run], test=True
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "schemas.json")
+            self.assertEqual(ActionGroupBuilder.freeze_schemas(path, [action_group]), 1)
+
+            ActionGroupBuilder.clear_schema_cache()
+            self.assertEqual(ActionGroupBuilder.load_frozen_schemas(path), 1)
+
+        with mock.patch.object(ActionGroupBuilder, "parse_docstring") as parse:
+            schema = ActionGroupBuilder.create_function_schema(spider_run)
+            parse.assert_not_called()
+
+        self.assertEqual(schema, spider_run_schema)
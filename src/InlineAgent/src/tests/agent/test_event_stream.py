@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from InlineAgent.agent import InlineAgent
+from InlineAgent.agent.event_stream import aiter_event_stream, call_blocking
+from InlineAgent.client_pool import ClientPool, set_client_pool
+
+
+class BlockingEventStream:
+    def __init__(self, events, delay=0.0, error=None):
+        self.events = events
+        self.delay = delay
+        self.error = error
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            time.sleep(self.delay)
+            if self.closed:
+                return
+            yield event
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+class FakeRuntime:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def invoke_inline_agent(self, **kwargs):
+        time.sleep(self.delay)
+        chunks = [{"chunk": {"bytes": word.encode("utf8")}} for word in ("Hi", "!")]
+        return {
+            "completion": BlockingEventStream(chunks, delay=self.delay),
+            "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+        }
+
+
+class TestEventStream(unittest.IsolatedAsyncioTestCase):
+    async def test_yields_events_in_order(self):
+        stream = BlockingEventStream([1, 2, 3])
+
+        events = [event async for event in aiter_event_stream(stream)]
+
+        self.assertEqual(events, [1, 2, 3])
+
+    async def test_reraises_stream_errors(self):
+        stream = BlockingEventStream([1], error=RuntimeError("boom"))
+
+        with self.assertRaises(RuntimeError):
+            async for _ in aiter_event_stream(stream):
+                pass
+
+    async def test_closes_stream_when_consumer_stops(self):
+        stream = BlockingEventStream(list(range(100)), delay=0.01)
+
+        async for event in aiter_event_stream(stream):
+            break
+
+        await asyncio.sleep(0.05)
+        self.assertTrue(stream.closed)
+
+    async def test_call_blocking_does_not_block_loop(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        thread_name = await call_blocking(
+            lambda: time.sleep(0.1) or threading.current_thread().name
+        )
+        ticker.cancel()
+
+        self.assertGreater(ticks, 3)
+        self.assertTrue(thread_name.startswith("inline-agent-stream"))
+
+    async def test_concurrent_invocations(self):
+        delay = 0.1
+        session_patch = mock.patch(
+            "InlineAgent.client_pool.boto3.Session", FakeSession
+        )
+        session_patch.start()
+        self.addCleanup(session_patch.stop)
+        previous = set_client_pool(
+            ClientPool(client_factory=lambda *args: FakeRuntime(delay))
+        )
+        self.addCleanup(set_client_pool, previous)
+
+        agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            agent_name="MockAgent",
+        )
+
+        with mock.patch("builtins.print"):
+            start = time.perf_counter()
+            answers = await asyncio.gather(
+                *(
+                    agent.invoke(input_text="Hello", session_id=str(index))
+                    for index in range(10)
+                )
+            )
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(answers, ["Hi!"] * 10)
+        # One turn takes three blocking waits; ten sequential turns take 3s.
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -584,6 +584,91 @@ class TestInlineAgent(unittest.TestCase):
 
         self.assertEqual(agent.action_groups, data_test___init___8)
 
+    def test_compile_is_cached_until_field_changes(self):
+        weather_action_group = ActionGroup(
+            name="WeatherActionGroup",
+            tools=[get_current_weather],
+            argument_key="Args:",
+            test=True,
+        )
+        agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            action_groups=[weather_action_group],
+            agent_name="MockAgent",
+        )
+
+        compiled = agent.compile()
+        self.assertIs(agent.compile(), compiled)
+        self.assertEqual(
+            agent.get_invoke_params()["actionGroups"], data_test_weather_function
+        )
+
+        agent.instruction = "You are a grumpy assistant."
+        recompiled = agent.compile()
+        self.assertIsNot(recompiled, compiled)
+        self.assertNotEqual(recompiled.content_hash, compiled.content_hash)
+
+        agent.invalidate()
+        self.assertEqual(agent.compile().content_hash, recompiled.content_hash)
+
+    def test_compiled_payload_cannot_be_changed_through_its_copies(self):
+        agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            action_groups=[
+                ActionGroup(
+                    name="WeatherActionGroup",
+                    tools=[get_current_weather],
+                    argument_key="Args:",
+                    test=True,
+                )
+            ],
+            agent_name="MockAgent",
+        )
+        compiled = agent.compile()
+
+        params = agent.get_invoke_params()
+        params["actionGroups"].append({"actionGroupName": "Extra"})
+        params["actionGroups"][0]["actionGroupName"] = "Renamed"
+
+        self.assertEqual(
+            agent.get_invoke_params()["actionGroups"], data_test_weather_function
+        )
+        with self.assertRaises(TypeError):
+            compiled.invoke_params["actionGroups"][0]["actionGroupName"] = "Renamed"
+        with self.assertRaises(AttributeError):
+            compiled.invoke_params["actionGroups"].append({})
+        self.assertIs(agent.compile(), compiled)
+
+    def test_compile_tracks_inline_collaborators(self):
+        collaborator = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a weather assistant.",
+            agent_name="WeatherAgent",
+        )
+        supervisor = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a supervisor.",
+            agent_name="Supervisor",
+            agent_collaboration="SUPERVISOR",
+            collaborators=[collaborator],
+        )
+
+        compiled = supervisor.compile()
+        self.assertIs(supervisor.compile(), compiled)
+        self.assertEqual(
+            compiled.invoke_params["collaborators"][0]["agentName"], "WeatherAgent"
+        )
+
+        collaborator.instruction = "You are a rain assistant."
+        recompiled = supervisor.compile()
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(
+            recompiled.invoke_params["collaborators"][0]["instruction"],
+            "You are a rain assistant.",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
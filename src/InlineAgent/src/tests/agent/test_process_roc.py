@@ -1,6 +1,8 @@
 import copy
+import gc
 import json
 import unittest
+import warnings
 from unittest import mock
 import asyncio
 from InlineAgent.agent import ProcessROC
@@ -469,6 +471,104 @@ class TestProcessROC(unittest.IsolatedAsyncioTestCase):
         )
         self.assertEqual(functionResult, output_invoke_roc_function_without_confirm)
 
+    async def test_concurrent_tools(self):
+
+        async def slow_echo(value: str):
+            await asyncio.sleep(0.2)
+            return value
+
+        roc_event = {
+            "invocationId": "MOCKID",
+            "invocationInputs": [
+                {
+                    "functionInvocationInput": {
+                        "actionGroup": "EchoActionGroup",
+                        "parameters": [
+                            {"name": "value", "type": "string", "value": str(index)}
+                        ],
+                        "function": "slow_echo",
+                        "actionInvocationType": "RESULT",
+                        "agentId": "INLINE_AGENT",
+                    }
+                }
+                for index in range(5)
+            ],
+        }
+
+        with mock.patch("builtins.print"):
+            start = asyncio.get_running_loop().time()
+            session_state_output = await ProcessROC.process_roc(
+                inlineSessionState=dict(),
+                roc_event=roc_event,
+                tool_map={"slow_echo": slow_echo},
+            )
+            elapsed = asyncio.get_running_loop().time() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(
+            [
+                result["functionResult"]["responseBody"]["TEXT"]["body"]
+                for result in session_state_output["returnControlInvocationResults"]
+            ],
+            ["0", "1", "2", "3", "4"],
+        )
+
+    async def test_bad_input_leaves_no_call_behind(self):
+        calls = list()
+
+        async def echo(value: str):
+            calls.append(value)
+            return value
+
+        roc_event = {
+            "invocationId": "MOCKID",
+            "invocationInputs": [
+                {
+                    "functionInvocationInput": {
+                        "actionGroup": "EchoActionGroup",
+                        "parameters": [
+                            {"name": "value", "type": "string", "value": "0"}
+                        ],
+                        "function": function,
+                        "actionInvocationType": "RESULT",
+                        "agentId": "INLINE_AGENT",
+                    }
+                }
+                for function in ("echo", "missing")
+            ],
+        }
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with self.assertRaises(ValueError):
+                await ProcessROC.process_roc(
+                    inlineSessionState=dict(),
+                    roc_event=roc_event,
+                    tool_map={"echo": echo},
+                )
+            gc.collect()
+
+        self.assertEqual(calls, [])
+        self.assertEqual(
+            [str(w.message) for w in caught if "never awaited" in str(w.message)], []
+        )
+
+    async def test_invoke_roc_function_timeout(self):
+
+        async def hang(place: str):
+            await asyncio.sleep(10)
+
+        with mock.patch("builtins.print"):
+            functionResult = await ProcessROC.invoke_roc_function(
+                functionInvocationInput=invoke_roc_function_functionInvocationInput,
+                tool_to_invoke=hang,
+                parameters={"place": "New York City"},
+                timeout=0.05,
+            )
+
+        self.assertEqual(functionResult["responseState"], "FAILURE")
+        self.assertIn("timed out", functionResult["responseBody"]["TEXT"]["body"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,228 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from InlineAgent.action_group import ActionGroup
+from InlineAgent.agent import InlineAgent
+from InlineAgent.agent.events import FilesEvent, OutputFile, TextChunk
+from InlineAgent.agent.response_cache import (
+    CachedResponse,
+    DiskResponseCache,
+    MemoryResponseCache,
+    cacheable,
+)
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.file_output import FileOutputWriter, set_file_writer
+from InlineAgent.sink import NullSink
+from InlineAgent.testing import (
+    FakeAgentRuntime,
+    default_script,
+    fake_client_factory,
+    return_control,
+)
+from InlineAgent.testing.loadgen import ANSWER, scenario_script
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+@cacheable
+def get_weather(city: str) -> str:
+    """Returns the current weather for a city.
+
+    Args:
+        city: Name of the city
+    """
+    return f"18 degrees and sunny in {city}"
+
+
+def get_time(city: str) -> str:
+    """Returns the current time in a city.
+
+    Args:
+        city: Name of the city
+    """
+    return "noon"
+
+
+def response(text):
+    return CachedResponse(events=(TextChunk(text=text),))
+
+
+class TestResponseCaching(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        writer = FileOutputWriter(directory=output.name)
+        self.addCleanup(set_file_writer, set_file_writer(writer))
+        self.addCleanup(writer.shutdown)
+
+        self.cache = MemoryResponseCache()
+
+    def use_runtime(self, script):
+        runtime = FakeAgentRuntime(script)
+        previous = set_client_pool(
+            ClientPool(client_factory=fake_client_factory(runtime))
+        )
+        self.addCleanup(set_client_pool, previous)
+        return runtime
+
+    def make_agent(self, tool=get_weather, instruction="You are a weather bot."):
+        return InlineAgent(
+            foundation_model="fake.model-v1",
+            instruction=instruction,
+            agent_name="CachedAgent",
+            action_groups=[
+                ActionGroup(
+                    name="WeatherActionGroup", tools=[tool], argument_key="Args:"
+                )
+            ],
+            sink=NullSink(),
+            response_cache=self.cache,
+        )
+
+    async def test_repeated_question_is_answered_from_cache(self):
+        runtime = self.use_runtime(default_script("Sunny."))
+        agent = self.make_agent()
+
+        first = await agent.invoke(input_text="Weather in Seattle?")
+        second = await agent.invoke(input_text="  weather in   SEATTLE? ")
+
+        self.assertEqual((first, second), ("Sunny.", "Sunny."))
+        self.assertEqual(runtime.invocations, 1)
+        self.assertTrue(second.metrics.cache_hit)
+        self.assertEqual((second.metrics.requests, second.metrics.llm_calls), (0, 0))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    async def test_config_and_session_attributes_are_part_of_the_key(self):
+        runtime = self.use_runtime(default_script("Sunny."))
+
+        await self.make_agent().invoke(input_text="Weather?")
+        await self.make_agent(instruction="You are terse.").invoke(
+            input_text="Weather?"
+        )
+        await self.make_agent().invoke(
+            input_text="Weather?",
+            session_state={"sessionAttributes": {"city": "Seattle"}},
+        )
+
+        self.assertEqual(runtime.invocations, 3)
+        self.assertEqual(len(self.cache), 3)
+
+    async def test_other_session_state_bypasses_cache(self):
+        self.use_runtime(default_script("Sunny."))
+
+        await self.make_agent().invoke(
+            input_text="Weather?", session_state={"files": []}
+        )
+
+        self.assertEqual(len(self.cache), 0)
+
+    async def test_turns_with_cacheable_tools_are_stored(self):
+        runtime = self.use_runtime(scenario_script("rich"))
+        agent = self.make_agent()
+
+        await agent.invoke(input_text="Weather?", session_id="a")
+        events = [
+            event async for event in agent.stream(input_text="Weather?", session_id="b")
+        ]
+
+        self.assertEqual(runtime.invocations, 2)
+        self.assertEqual(
+            [type(event) for event in events], [FilesEvent, TextChunk, type(events[-1])]
+        )
+        self.assertEqual(events[1].text, ANSWER)
+        self.assertIsNotNone(events[1].attribution)
+
+    async def test_turns_with_other_tools_bypass_cache(self):
+        self.use_runtime(
+            [
+                return_control(
+                    "get_time", {"city": "Seattle"}, action_group="WeatherActionGroup"
+                ),
+                *default_script("Noon."),
+            ]
+        )
+
+        await self.make_agent(tool=get_time).invoke(input_text="Time?")
+
+        self.assertEqual(len(self.cache), 0)
+
+    async def test_use_cache_off_calls_the_service(self):
+        runtime = self.use_runtime(default_script("Sunny."))
+        agent = self.make_agent()
+
+        await agent.invoke(input_text="Weather?")
+        await agent.invoke(input_text="Weather?", use_cache=False)
+
+        self.assertEqual(runtime.invocations, 2)
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = MemoryResponseCache(max_entries=2)
+        cache.set("a", response("A"))
+        cache.set("b", response("B"))
+        cache.get("a")
+        cache.set("c", response("C"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").text, "A")
+
+    def test_entries_expire(self):
+        cache = MemoryResponseCache(ttl=10)
+        with mock.patch("InlineAgent.agent.response_cache.time.monotonic") as clock:
+            clock.return_value = 100
+            cache.set("a", response("A"))
+            clock.return_value = 111
+
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestDiskResponseCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache", "responses.db")
+
+    def open(self, **kwargs):
+        cache = DiskResponseCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_entries_survive_reopening(self):
+        files = FilesEvent(
+            files=(OutputFile(name="a.png", type="image/png", data=b"\x89"),)
+        )
+        self.open().set("k", CachedResponse(events=(files, TextChunk(text="Hi"))))
+
+        cached = self.open().get("k")
+
+        self.assertEqual(cached.events[0], files)
+        self.assertEqual(cached.text, "Hi")
+
+    def test_evicts_and_expires(self):
+        cache = self.open(max_entries=2, ttl=10)
+        with mock.patch("InlineAgent.agent.response_cache.time.time") as clock:
+            for now, key in enumerate("abc"):
+                clock.return_value = 100 + now
+                cache.set(key, response(key))
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b").text, "b")
+
+            clock.return_value = 200
+            self.assertIsNone(cache.get("c"))
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from InlineAgent.action_group import ActionGroup
+from InlineAgent.agent import InlineAgent
+from InlineAgent.agent.events import (
+    ReturnControlEvent,
+    TextChunk,
+    TraceStep,
+    UsageTotals,
+)
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.file_output import FileOutputWriter, set_file_writer
+from InlineAgent.sink import BufferedSink
+
+
+def get_lat_long(place: str) -> dict:
+    """Returns the latitude and longitude for a given place name.
+
+    Args:
+        place: City of the location
+    """
+    return "40.7128, 74.0060"
+
+
+orchestration_trace = {
+    "trace": {
+        "trace": {
+            "orchestrationTrace": {
+                "modelInvocationOutput": {
+                    "metadata": {"usage": {"inputTokens": 10, "outputTokens": 4}}
+                }
+            }
+        }
+    }
+}
+
+roc_event = {
+    "returnControl": {
+        "invocationId": "MOCK_INVOCATION",
+        "invocationInputs": [
+            {
+                "functionInvocationInput": {
+                    "actionGroup": "WeatherActionGroup",
+                    "parameters": [
+                        {"name": "place", "type": "string", "value": "New York City"}
+                    ],
+                    "function": "get_lat_long",
+                    "actionInvocationType": "RESULT",
+                    "agentId": "INLINE_AGENT",
+                }
+            }
+        ],
+    }
+}
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+class FakeRuntime:
+    def __init__(self, *turns):
+        self.turns = list(turns)
+        self.requests = list()
+
+    def invoke_inline_agent(self, **kwargs):
+        self.requests.append(kwargs)
+        return {
+            "completion": iter(self.turns.pop(0)),
+            "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+        }
+
+
+def chunk(text):
+    return {"chunk": {"bytes": text.encode("utf8")}}
+
+
+class TestStream(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_runtime(self, runtime):
+        previous = set_client_pool(ClientPool(client_factory=lambda *_: runtime))
+        self.addCleanup(set_client_pool, previous)
+
+    def make_agent(self):
+        return InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            agent_name="MockAgent",
+            action_groups=[
+                ActionGroup(
+                    name="WeatherActionGroup",
+                    tools=[get_lat_long],
+                    argument_key="Args:",
+                )
+            ],
+        )
+
+    async def test_yields_typed_events_without_printing(self):
+        self.use_runtime(
+            FakeRuntime([orchestration_trace, chunk("Hello"), chunk(" world")])
+        )
+        agent = self.make_agent()
+
+        with mock.patch("builtins.print") as mock_print:
+            events = [event async for event in agent.stream(input_text="Hi")]
+
+        mock_print.assert_not_called()
+        self.assertIsInstance(events[0], TraceStep)
+        self.assertEqual(events[0].step_type, "orchestrationTrace")
+        self.assertEqual(
+            [event.text for event in events if isinstance(event, TextChunk)],
+            ["Hello", " world"],
+        )
+        self.assertIsInstance(events[-1], UsageTotals)
+        self.assertEqual(
+            (events[-1].input_tokens, events[-1].output_tokens, events[-1].llm_calls),
+            (10, 4, 1),
+        )
+
+    async def test_handles_return_control(self):
+        runtime = FakeRuntime([roc_event], [chunk("It is sunny")])
+        self.use_runtime(runtime)
+        agent = self.make_agent()
+
+        with mock.patch("builtins.print"):
+            events = [event async for event in agent.stream(input_text="Weather?")]
+
+        self.assertIsInstance(events[0], ReturnControlEvent)
+        self.assertEqual(events[0].invocation_id, "MOCK_INVOCATION")
+        self.assertEqual(events[1], TextChunk(text="It is sunny"))
+
+        session_state = runtime.requests[1]["inlineSessionState"]
+        self.assertEqual(session_state["invocationId"], "MOCK_INVOCATION")
+        self.assertEqual(
+            session_state["returnControlInvocationResults"][0]["functionResult"][
+                "responseBody"
+            ]["TEXT"]["body"],
+            "40.7128, 74.0060",
+        )
+
+    async def test_stops_at_return_control_when_not_handled(self):
+        runtime = FakeRuntime([roc_event])
+        self.use_runtime(runtime)
+        agent = self.make_agent()
+
+        events = [
+            event
+            async for event in agent.stream(
+                input_text="Weather?", handle_return_control=False
+            )
+        ]
+
+        self.assertIsInstance(events[0], ReturnControlEvent)
+        self.assertIsInstance(events[-1], UsageTotals)
+        self.assertEqual(len(runtime.requests), 1)
+
+    async def test_invoke_joins_chunks(self):
+        self.use_runtime(FakeRuntime([chunk("Hello"), chunk(" world")]))
+        agent = self.make_agent()
+
+        with mock.patch("builtins.print"):
+            answer = await agent.invoke(
+                input_text="Hi",
+                streaming_configurations={"streamFinalResponse": True},
+            )
+
+        self.assertEqual(answer, "Hello world")
+
+    async def test_invoke_writes_each_chunk_once_to_sink(self):
+        self.use_runtime(FakeRuntime([chunk("Hello"), chunk(" world")]))
+        sink = BufferedSink()
+        agent = self.make_agent()
+        agent.sink = sink
+
+        with mock.patch("builtins.print") as mock_print:
+            answer = await agent.invoke(input_text="Hi")
+
+        mock_print.assert_not_called()
+        self.assertEqual(answer, "Hello world")
+        self.assertEqual(sink.text("answer"), "Hello world")
+        self.assertIn("LLM calls", sink.text("stats"))
+
+    async def test_invoke_saves_files_in_background(self):
+        files_event = {
+            "files": {
+                "files": [{"name": "chart.png", "type": "image/png", "bytes": b"png"}]
+            }
+        }
+        self.use_runtime(FakeRuntime([files_event, chunk("Done")]))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        previous = set_file_writer(FileOutputWriter(directory=directory.name))
+        self.addCleanup(set_file_writer, previous)
+        agent = self.make_agent()
+
+        answer = await agent.invoke(
+            input_text="Plot", session_id="session", sink=BufferedSink()
+        )
+
+        self.assertEqual(answer, "Done")
+        with open(os.path.join(directory.name, "session", "chart.png"), "rb") as f:
+            self.assertEqual(f.read(), b"png")
+
+
+if __name__ == "__main__":
+    unittest.main()
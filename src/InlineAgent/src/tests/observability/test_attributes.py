@@ -0,0 +1,71 @@
+import unittest
+
+from InlineAgent.observability.attributes import (
+    AttributeBudget,
+    attribute_budget,
+    content_hash,
+    get_attribute_budget,
+)
+
+PROMPT = "You are a supervisor. " * 40
+
+
+class TestAttributeBudget(unittest.TestCase):
+    def test_default_budget_passes_values_through(self):
+        attributes = {"input.value": PROMPT, "tag.tags": ["a", "b"]}
+
+        self.assertIs(AttributeBudget().apply(attributes), attributes)
+
+    def test_truncates_long_strings_only(self):
+        budget = AttributeBudget(max_length=10)
+
+        budgeted = budget.apply({"input.value": PROMPT, "short": "ok", "count": 3})
+
+        self.assertEqual(budgeted["input.value"], PROMPT[:10])
+        self.assertEqual(budgeted["short"], "ok")
+        self.assertEqual(budgeted["count"], 3)
+
+    def test_hash_overflow_keeps_digest_and_length(self):
+        budget = AttributeBudget(max_length=10, overflow="hash")
+
+        budgeted = budget.apply({"input.value": PROMPT})
+
+        self.assertEqual(
+            budgeted["input.value"],
+            f"sha256:{content_hash(PROMPT)} ({len(PROMPT)} chars)",
+        )
+
+    def test_unknown_overflow_is_rejected(self):
+        with self.assertRaises(ValueError):
+            AttributeBudget(overflow="drop")
+
+    def test_dedup_references_repeated_values(self):
+        budget = AttributeBudget(dedup=True)
+        digest = content_hash(PROMPT)
+
+        first = budget.apply({"input.value": PROMPT})
+        second = budget.apply({"input.value": PROMPT, "output.value": "short"})
+
+        self.assertEqual(first, {"input.value.sha256": digest, "input.value": PROMPT})
+        self.assertEqual(
+            second, {"input.value": f"sha256:{digest}", "output.value": "short"}
+        )
+
+    def test_dedup_hashes_before_truncating(self):
+        budget = AttributeBudget(max_length=10, dedup=True)
+
+        first = budget.apply({"input.value": PROMPT})
+
+        self.assertEqual(first["input.value"], PROMPT[:10])
+        self.assertEqual(first["input.value.sha256"], content_hash(PROMPT))
+
+    def test_context_installs_budget(self):
+        budget = AttributeBudget(max_length=10)
+
+        with attribute_budget(budget):
+            self.assertIs(get_attribute_budget(), budget)
+        self.assertTrue(get_attribute_budget().passthrough)
+
+
+if __name__ == "__main__":
+    unittest.main()
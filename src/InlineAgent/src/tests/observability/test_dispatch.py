@@ -0,0 +1,151 @@
+import unittest
+from unittest import mock
+
+from InlineAgent.observability import dispatch, process
+from InlineAgent.observability.dispatch import TraceContext, TraceDispatcher
+from InlineAgent.observability.process import (
+    ProcessL2Trace,
+    get_trace_dispatcher,
+    set_trace_dispatcher,
+)
+from InlineAgent.observability.span_manager import SpanManager
+
+AGENT_ARN = "arn:aws:bedrock:agent:agent-alias/AGENT/ALIAS"
+
+
+def trace_data(trace):
+    return {
+        "sessionId": "session",
+        "callerChain": [{"agentAliasArn": AGENT_ARN}],
+        "trace": trace,
+    }
+
+
+rationale = {"orchestrationTrace": {"rationale": {"traceId": "t-0", "text": "Think"}}}
+
+observation = {
+    "orchestrationTrace": {
+        "observation": {
+            "traceId": "t-1",
+            "type": "ACTION_GROUP",
+            "actionGroupInvocationOutput": {"text": "sunny"},
+        }
+    }
+}
+
+
+class TestTraceDispatcher(unittest.TestCase):
+    def test_context_parses_caller_chain_once(self):
+        with mock.patch.object(
+            dispatch,
+            "get_agent_from_caller_chain",
+            wraps=dispatch.get_agent_from_caller_chain,
+        ) as parse:
+            ctx = TraceContext(trace_data(rationale))
+
+        parse.assert_called_once()
+        self.assertEqual(ctx.agent_key, "AGENT:ALIAS")
+        self.assertEqual(ctx.session_id, "session")
+
+    def test_dispatches_parts_and_members(self):
+        dispatcher = TraceDispatcher()
+        calls = list()
+
+        @dispatcher.register("orchestrationTrace", "observation")
+        def on_observation(ctx, payload):
+            calls.append(("observation", ctx.trace_id))
+
+        @dispatcher.register(
+            ("orchestrationTrace", "routingClassifierTrace"),
+            "observation",
+            "actionGroupInvocationOutput",
+        )
+        def on_output(ctx, payload):
+            calls.append(("output", payload["text"]))
+
+        dispatcher.register(
+            "orchestrationTrace",
+            "rationale",
+            handler=lambda ctx, payload: calls.append(("rationale", ctx.step_type)),
+        )
+
+        dispatcher.dispatch(TraceContext(trace_data(observation)), observation)
+
+        self.assertEqual(calls, [("observation", "t-1"), ("output", "sunny")])
+
+    def test_sums_usage_from_handlers(self):
+        dispatcher = TraceDispatcher()
+        dispatcher.register("orchestrationTrace", handler=lambda ctx, step: (1, 2, 1))
+        dispatcher.register(
+            "orchestrationTrace", "rationale", handler=lambda ctx, step: (3, 4, 1)
+        )
+        dispatcher.register("orchestrationTrace", "rationale", handler=lambda *_: None)
+
+        usage = dispatcher.dispatch(TraceContext(trace_data(rationale)), rationale)
+
+        self.assertEqual(usage, (4, 6, 2))
+
+    def test_members_only_for_tagged_union_parts(self):
+        with self.assertRaises(ValueError):
+            TraceDispatcher().register("orchestrationTrace", "rationale", "text")
+
+    def test_copy_does_not_share_handlers(self):
+        dispatcher = TraceDispatcher()
+        copy = dispatcher.copy()
+        copy.register("failureTrace", handler=lambda *_: (1, 0, 0))
+        failure = {"failureTrace": {"failureReason": "boom"}}
+
+        self.assertEqual(dispatcher.dispatch(TraceContext({}), failure), (0, 0, 0))
+        self.assertEqual(copy.dispatch(TraceContext({}), failure), (1, 0, 0))
+
+
+class TestProcessTraceEvent(unittest.TestCase):
+    def test_runs_registered_handlers(self):
+        dispatcher = get_trace_dispatcher().copy()
+        seen = list()
+        dispatcher.register(
+            "failureTrace",
+            handler=lambda ctx, step: seen.append((ctx.agent_key, step)),
+        )
+        previous = set_trace_dispatcher(dispatcher)
+        self.addCleanup(set_trace_dispatcher, previous)
+
+        usage = ProcessL2Trace.process_trace_event(
+            trace_data=trace_data({"failureTrace": {"failureReason": "boom"}}),
+            span_manager=SpanManager(),
+            save_traces=False,
+            session_id="session",
+            show_traces=False,
+        )
+
+        self.assertEqual(usage, (0, 0, 0))
+        self.assertEqual(seen, [("AGENT:ALIAS", {"failureReason": "boom"})])
+
+    def test_set_none_restores_default_handlers(self):
+        previous = set_trace_dispatcher(TraceDispatcher())
+        self.addCleanup(set_trace_dispatcher, previous)
+
+        set_trace_dispatcher(None)
+        model_output = {
+            "orchestrationTrace": {
+                "modelInvocationOutput": {
+                    "traceId": "t-0",
+                    "metadata": {"usage": {"inputTokens": 4, "outputTokens": 2}},
+                }
+            }
+        }
+
+        with mock.patch.object(process.config, "PRODUCE_BEDROCK_OTEL_TRACES", False):
+            usage = ProcessL2Trace.process_trace_event(
+                trace_data=trace_data(model_output),
+                span_manager=SpanManager(),
+                save_traces=False,
+                session_id="session",
+                show_traces=False,
+            )
+
+        self.assertEqual(usage, (4, 2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
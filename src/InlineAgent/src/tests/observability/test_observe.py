@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from InlineAgent.observability import agent_instrument, process, span_manager
+from InlineAgent.observability import observe
+from InlineAgent.sink import BufferedSink, NullSink
+
+AGENT_ARN = "arn:aws:bedrock:agent:agent-alias/AGENT/ALIAS"
+
+
+def chunk(text):
+    return {"chunk": {"bytes": text.encode("utf8")}}
+
+
+def guardrail_intervened(session_id):
+    return {
+        "trace": {
+            "sessionId": session_id,
+            "callerChain": [{"agentAliasArn": AGENT_ARN}],
+            "trace": {
+                "guardrailTrace": {
+                    "action": "INTERVENED",
+                    "outputAssessments": [{}],
+                }
+            },
+        }
+    }
+
+
+def model_invocation_input(session_id):
+    return {
+        "trace": {
+            "agentId": "AGENT",
+            "agentAliasId": "ALIAS",
+            "agentVersion": "7",
+            "sessionId": session_id,
+            "callerChain": [{"agentAliasArn": AGENT_ARN}],
+            "eventTime": "2025-03-01T12:00:00Z",
+            "trace": {
+                "orchestrationTrace": {
+                    "modelInvocationInput": {
+                        "traceId": "t-0",
+                        "type": "ORCHESTRATION",
+                        "inferenceConfiguration": {
+                            "maximumLength": 2048,
+                            "temperature": 0.0,
+                            "topK": 250,
+                            "topP": 1.0,
+                            "stopSequences": [],
+                        },
+                        "text": '{"messages": []}',
+                    }
+                }
+            },
+        }
+    }
+
+
+def invoke_kwargs(session_id):
+    return dict(
+        inputText="Hi",
+        sessionId=session_id,
+        agentId="AGENT",
+        agentAliasId="ALIAS",
+        streamingConfigurations={"streamFinalResponse": True},
+    )
+
+
+class TestObserve(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+        for patcher in (
+            mock.patch.object(agent_instrument, "tracer", tracer),
+            mock.patch.object(span_manager, "tracer", tracer),
+            mock.patch.object(
+                agent_instrument.config, "PRODUCE_BEDROCK_OTEL_TRACES", True
+            ),
+            mock.patch.object(process.config, "PRODUCE_BEDROCK_OTEL_TRACES", True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.exporter = exporter
+
+    def test_guardrail_state_does_not_leak_between_invocations(self):
+        streams = {
+            "blocked": [guardrail_intervened("blocked"), chunk("Sorry.")],
+            "allowed": [chunk("Hello"), chunk(" world")],
+        }
+
+        @observe(show_traces=False, sink=NullSink())
+        def invoke(inputText, sessionId, **kwargs):
+            return {"completion": iter(streams[sessionId])}
+
+        self.assertEqual(invoke(**invoke_kwargs("blocked")), "Sorry.")
+        self.assertEqual(invoke(**invoke_kwargs("allowed")), "Hello world")
+
+    def test_threads_keep_separate_answers(self):
+        barrier = threading.Barrier(8)
+
+        @observe(show_traces=False, sink=NullSink())
+        def invoke(inputText, sessionId, **kwargs):
+            def events():
+                barrier.wait()
+                if sessionId.endswith("0"):
+                    yield guardrail_intervened(sessionId)
+                yield chunk(sessionId)
+                yield chunk("!")
+
+            return {"completion": events()}
+
+        answers = dict()
+
+        def run(index):
+            answers[index] = invoke(**invoke_kwargs(f"session-{index}"))
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Only the session whose guardrail intervened replaces its answer.
+        self.assertEqual(answers.pop(0), "!")
+        self.assertEqual(answers, {index: f"session-{index}!" for index in range(1, 8)})
+
+    def test_config_budget_caps_root_span_output(self):
+        @observe(show_traces=False, sink=NullSink())
+        def invoke(inputText, sessionId, **kwargs):
+            return {"completion": iter([chunk("Hello"), chunk(" world")])}
+
+        with mock.patch.object(agent_instrument.config, "SPAN_ATTRIBUTE_MAX_LENGTH", 5):
+            answer = invoke(**invoke_kwargs("session"))
+
+        self.assertEqual(answer, "Hello world")
+        (root_span,) = [
+            span
+            for span in self.exporter.get_finished_spans()
+            if span.name == "Agent AGENT:ALIAS"
+        ]
+        self.assertEqual(root_span.attributes["output.value"], "Hello")
+
+    def test_root_span_gets_agent_version_and_caller_chain(self):
+        @observe(show_traces=False, sink=NullSink())
+        def invoke(inputText, sessionId, **kwargs):
+            return {
+                "completion": iter([model_invocation_input(sessionId), chunk("Hi")])
+            }
+
+        invoke(**invoke_kwargs("session"))
+
+        (root_span,) = [
+            span
+            for span in self.exporter.get_finished_spans()
+            if span.name == "Agent AGENT:ALIAS"
+        ]
+        self.assertEqual(root_span.attributes["bedrock.agent.version"], "7")
+        self.assertEqual(
+            root_span.attributes["bedrock.agent.caller_chain"],
+            '[{"agentAliasArn": "%s"}]' % AGENT_ARN,
+        )
+
+    async def test_async_invoker_with_blocking_stream(self):
+        @observe(show_traces=False)
+        async def invoke(inputText, sessionId, **kwargs):
+            await asyncio.sleep(0)
+            return {"completion": iter([chunk(sessionId), chunk(" done")])}
+
+        sink = BufferedSink()
+        answers = await asyncio.gather(
+            *(
+                invoke(**invoke_kwargs(f"session-{index}"), sink=sink)
+                for index in range(5)
+            )
+        )
+
+        self.assertEqual(answers, [f"session-{index} done" for index in range(5)])
+        self.assertIn("LLM calls", sink.text("stats"))
+        root_spans = [
+            span
+            for span in self.exporter.get_finished_spans()
+            if span.name == "Agent AGENT:ALIAS"
+        ]
+        self.assertEqual(len(root_spans), 5)
+
+    async def test_async_invoker_with_async_stream(self):
+        async def events():
+            yield chunk("Hello")
+            yield chunk(" async")
+
+        @observe(show_traces=False, sink=NullSink())
+        async def invoke(inputText, sessionId, **kwargs):
+            return {"completion": events()}
+
+        self.assertEqual(await invoke(**invoke_kwargs("session")), "Hello async")
+
+
+if __name__ == "__main__":
+    unittest.main()
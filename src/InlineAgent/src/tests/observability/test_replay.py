@@ -0,0 +1,155 @@
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from InlineAgent.observability import agent_instrument, process, span_manager
+from InlineAgent.observability.process import get_trace_dispatcher
+from InlineAgent.observability.replay import TraceReplayer, load_trace_events
+from InlineAgent.observability.trace_store import TraceWriter
+
+AGENT_ARN = "arn:aws:bedrock:agent:agent-alias/AGENT/ALIAS"
+START = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def trace_event(seconds, trace):
+    return {
+        "agentId": "AGENT",
+        "agentAliasId": "ALIAS",
+        "agentVersion": "DRAFT",
+        "sessionId": "session",
+        "callerChain": [{"agentAliasArn": AGENT_ARN}],
+        "eventTime": START + timedelta(seconds=seconds),
+        "trace": trace,
+    }
+
+
+def recorded_turn(step=0.0):
+    return [
+        trace_event(
+            0,
+            {
+                "orchestrationTrace": {
+                    "modelInvocationInput": {
+                        "traceId": "t-0",
+                        "type": "ORCHESTRATION",
+                        "foundationModel": "model",
+                        "inferenceConfiguration": {
+                            "maximumLength": 2048,
+                            "temperature": 0.0,
+                            "topK": 250,
+                            "topP": 1.0,
+                            "stopSequences": [],
+                        },
+                        "text": '{"messages": []}',
+                    }
+                }
+            },
+        ),
+        trace_event(
+            step,
+            {
+                "orchestrationTrace": {
+                    "modelInvocationOutput": {
+                        "traceId": "t-0",
+                        "metadata": {"usage": {"inputTokens": 10, "outputTokens": 2}},
+                        "rawResponse": {"content": "Done."},
+                    }
+                }
+            },
+        ),
+        trace_event(
+            2 * step,
+            {
+                "orchestrationTrace": {
+                    "observation": {
+                        "traceId": "t-0",
+                        "type": "FINISH",
+                        "finalResponse": {"text": "Done."},
+                    }
+                }
+            },
+        ),
+    ]
+
+
+class TestTraceReplay(unittest.TestCase):
+    def test_loads_what_save_trace_writes(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        writer = TraceWriter(directory=directory.name, compression="gzip")
+        for event in recorded_turn(step=1.0):
+            writer.write(session_id="session", trace_data=event)
+        writer.close()
+
+        events = load_trace_events(writer.path("session"))
+
+        self.assertEqual(events, recorded_turn(step=1.0))
+
+    def test_pipelines_report_usage_and_spans(self):
+        for pipeline in ("observe", "process"):
+            with self.subTest(pipeline=pipeline):
+                report = TraceReplayer([recorded_turn()], pipeline=pipeline).run(
+                    repeat=3
+                )
+
+                self.assertEqual(report.invocations, 3)
+                self.assertEqual(report.events, 9)
+                self.assertEqual(
+                    (report.input_tokens, report.output_tokens, report.llm_calls),
+                    (30, 6, 3),
+                )
+                self.assertEqual(report.spans["LLM"], 3)
+                self.assertEqual(
+                    report.handler_calls[
+                        "ProcessL4Trace.process_model_invocation_input"
+                    ],
+                    3,
+                )
+                self.assertIn("events/s", report.format())
+
+    def test_console_pipeline_formats_every_event(self):
+        report = TraceReplayer([recorded_turn()], pipeline="console").run()
+
+        self.assertEqual(report.llm_calls, 1)
+        self.assertGreater(report.output_chars, 0)
+        self.assertEqual(
+            report.handler_calls["Trace.parse_trace[orchestrationTrace]"], 3
+        )
+        self.assertEqual(report.spans, {})
+
+    def test_restores_process_state(self):
+        state = (
+            span_manager.tracer,
+            agent_instrument.tracer,
+            process.config.PRODUCE_BEDROCK_OTEL_TRACES,
+            get_trace_dispatcher(),
+        )
+
+        TraceReplayer([recorded_turn()], produce_spans=True).run()
+
+        self.assertEqual(
+            state,
+            (
+                span_manager.tracer,
+                agent_instrument.tracer,
+                process.config.PRODUCE_BEDROCK_OTEL_TRACES,
+                get_trace_dispatcher(),
+            ),
+        )
+
+    def test_recorded_pace_scaled_by_speed(self):
+        replayer = TraceReplayer([recorded_turn(step=0.05)], speed=2.0)
+
+        start = time.perf_counter()
+        replayer.run()
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_rejects_unknown_pipeline(self):
+        with self.assertRaises(ValueError):
+            TraceReplayer([recorded_turn()], pipeline="bedrock")
+
+
+if __name__ == "__main__":
+    unittest.main()
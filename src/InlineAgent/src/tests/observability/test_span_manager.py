@@ -0,0 +1,124 @@
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from InlineAgent.observability import span_manager as span_manager_module
+from InlineAgent.observability.span_manager import SpanManager, SpanModel
+
+SUPERVISOR = [{"agentAliasArn": "arn:aws:bedrock:agent:agent-alias/SUP/ALIAS"}]
+COLLABORATOR = SUPERVISOR + [
+    {"agentAliasArn": "arn:aws:bedrock:agent:agent-alias/COL/ALIAS"}
+]
+FAMILY = "00000000-0000-0000-0000-000000000001"
+
+
+class TestSpanManager(unittest.TestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        patcher = mock.patch.object(
+            span_manager_module, "tracer", provider.get_tracer("test")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = SpanManager()
+
+    def finished(self):
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    def start_supervisor(self, counter=0):
+        self.manager.create_agent_span_return(
+            agent_session_id="session",
+            caller_chain=SUPERVISOR,
+            attributes={},
+            name="Agent SUP:ALIAS",
+        )
+        return self.manager.assign_new_l2_return(
+            agent_session_id="session",
+            caller_chain=SUPERVISOR,
+            trace_id=f"{FAMILY}-{counter}",
+            l2_attributes={},
+            l3_attributes={},
+            l2_name=f"orchestration-{counter}",
+            l3_name=f"llm-{counter}",
+        )
+
+    def test_end_assignment_ends_span_at_end_time(self):
+        span = span_manager_module.tracer.start_span("span")
+        model = SpanModel(span=span)
+        model.end_time = 1_000
+        model.end = True
+
+        self.assertEqual(self.finished()["span"].end_time, 1_000)
+
+    def test_same_counter_reuses_l2_span(self):
+        first = self.start_supervisor()
+        second = self.start_supervisor()
+
+        self.assertIs(first, second)
+
+    def test_new_counter_ends_previous_l2_and_l3(self):
+        self.start_supervisor(counter=0)
+        self.start_supervisor(counter=1)
+
+        finished = self.finished()
+        self.assertIn("orchestration-0", finished)
+        self.assertIn("llm-0", finished)
+        self.assertNotIn("orchestration-1", finished)
+
+    def test_collaborator_span_is_child_of_sub_agent_span(self):
+        self.start_supervisor()
+        trace_id = f"{FAMILY}-0"
+        self.manager.delete_l3_span(
+            agent_session_id="session",
+            collab_agent_trace_id="SUP:ALIAS",
+            trace_id=trace_id,
+        )
+        sub_agent = self.manager.assign_new_l3_return(
+            agent_session_id="session",
+            collab_agent_trace_id="COL:ALIAS",
+            trace_id=trace_id,
+            attributes={},
+            name="sub-agent",
+        )
+        collaborator = self.manager.create_agent_span_return(
+            agent_session_id="collaborator-session",
+            caller_chain=COLLABORATOR,
+            attributes={},
+            name="Agent COL:ALIAS",
+        )
+
+        self.assertEqual(
+            collaborator.parent.span_id, sub_agent.get_span_context().span_id
+        )
+
+    def test_delete_l3_span_checks_counter(self):
+        self.start_supervisor(counter=0)
+
+        with self.assertRaises(RuntimeError):
+            self.manager.delete_l3_span(
+                agent_session_id="session",
+                collab_agent_trace_id="SUP:ALIAS",
+                trace_id=f"{FAMILY}-1",
+            )
+
+    def test_end_all_spans(self):
+        self.start_supervisor()
+
+        self.manager.end_all_spans(status_code=StatusCode.OK)
+
+        self.assertEqual(
+            set(self.finished()), {"Agent SUP:ALIAS", "orchestration-0", "llm-0"}
+        )
+        self.assertEqual(self.manager.spans, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
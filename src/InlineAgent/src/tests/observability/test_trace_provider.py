@@ -0,0 +1,191 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode, set_span_in_context
+
+from InlineAgent.observability import trace_provider
+from InlineAgent.observability.exporters import OTLPJsonFileSpanExporter
+from InlineAgent.observability.sampling import TailSamplingSpanProcessor
+from InlineAgent.observability.settings_management import ObservabilityConfig
+
+
+def run_trace(tracer, child_status=StatusCode.OK, child_attributes=None):
+    root = tracer.start_span("Agent")
+    child = tracer.start_span(
+        "LLM", context=set_span_in_context(root), attributes=child_attributes
+    )
+    child.set_status(Status(child_status))
+    child.end()
+    root.end()
+
+
+class TestTailSampling(unittest.TestCase):
+    def make_tracer(self, **kwargs):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(
+            TailSamplingSpanProcessor(SimpleSpanProcessor(self.exporter), **kwargs)
+        )
+        return provider.get_tracer("test")
+
+    def exported(self):
+        return [span.name for span in self.exporter.get_finished_spans()]
+
+    def test_drops_successful_traces_at_zero_ratio(self):
+        run_trace(self.make_tracer(success_ratio=0.0))
+
+        self.assertEqual(self.exported(), [])
+
+    def test_keeps_whole_trace_with_an_error(self):
+        run_trace(self.make_tracer(success_ratio=0.0), child_status=StatusCode.ERROR)
+
+        self.assertEqual(self.exported(), ["LLM", "Agent"])
+
+    def test_keeps_guardrail_interventions(self):
+        run_trace(
+            self.make_tracer(success_ratio=0.0),
+            child_attributes={"bedrock.guardrail.action": "INTERVENED"},
+        )
+
+        self.assertEqual(self.exported(), ["LLM", "Agent"])
+
+    def test_late_spans_follow_the_trace_decision(self):
+        tracer = self.make_tracer(success_ratio=0.0)
+        root = tracer.start_span("Agent")
+        late = tracer.start_span("Tool", context=set_span_in_context(root))
+        root.set_status(Status(StatusCode.ERROR))
+        root.end()
+        late.end()
+
+        self.assertEqual(self.exported(), ["Agent", "Tool"])
+
+    def test_drops_named_spans_without_buffering(self):
+        tracer = self.make_tracer(drop_span_names=["LLM"])
+        root = tracer.start_span("Agent")
+        tracer.start_span("LLM", context=set_span_in_context(root)).end()
+        tracer.start_span("Tool", context=set_span_in_context(root)).end()
+
+        self.assertEqual(self.exported(), ["Tool"])
+        root.end()
+        self.assertEqual(self.exported(), ["Tool", "Agent"])
+
+    def test_forwards_oldest_trace_when_buffer_is_full(self):
+        tracer = self.make_tracer(success_ratio=0.0, max_pending_traces=1)
+        roots = [tracer.start_span(f"Agent {index}") for index in range(2)]
+        for index, root in enumerate(roots):
+            tracer.start_span(f"LLM {index}", context=set_span_in_context(root)).end()
+
+        self.assertEqual(self.exported(), ["LLM 0"])
+
+    def test_rejects_invalid_ratio(self):
+        with self.assertRaises(ValueError):
+            TailSamplingSpanProcessor(SimpleSpanProcessor(InMemorySpanExporter()), 2)
+
+
+class TestOTLPJsonFileSpanExporter(unittest.TestCase):
+    def test_appends_otlp_json_lines(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "spans", "spans.jsonl")
+        exporter = OTLPJsonFileSpanExporter(path)
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+
+        run_trace(tracer)
+        provider.shutdown()
+
+        with open(path) as file:
+            lines = [json.loads(line) for line in file]
+        spans = [
+            span
+            for line in lines
+            for resource_spans in line["resourceSpans"]
+            for scope_spans in resource_spans["scopeSpans"]
+            for span in scope_spans["spans"]
+        ]
+        llm, agent = spans
+        self.assertEqual(llm["parentSpanId"], agent["spanId"])
+        self.assertEqual(len(agent["traceId"]), 32)
+        int(agent["traceId"], 16)
+        self.assertEqual(agent["kind"], 1)
+
+
+class TestCreateTracerProvider(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(trace_provider.trace, "set_tracer_provider")
+        self.set_tracer_provider = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exporter_follows_config(self):
+        for name, exporter_class in (
+            ("memory", InMemorySpanExporter),
+            ("console", ConsoleSpanExporter),
+        ):
+            config = ObservabilityConfig(SPAN_EXPORTER=name)
+            self.assertIsInstance(
+                trace_provider.create_span_exporter(config), exporter_class
+            )
+        self.assertIsNone(
+            trace_provider.create_span_exporter(ObservabilityConfig(API_URL=None))
+        )
+
+    def test_samples_and_exports_through_given_exporter(self):
+        exporter = InMemorySpanExporter()
+        config = ObservabilityConfig(
+            PRODUCE_BEDROCK_OTEL_TRACES=True, TAIL_SAMPLE_SUCCESS_RATIO=0.0
+        )
+
+        provider = trace_provider.create_tracer_provider(config, exporter=exporter)
+        run_trace(provider.get_tracer("test"))
+        run_trace(provider.get_tracer("test"), child_status=StatusCode.ERROR)
+
+        self.set_tracer_provider.assert_called_once_with(provider)
+        self.assertEqual(len(exporter.get_finished_spans()), 2)
+
+    def test_head_sampling_drops_traces_at_zero_ratio(self):
+        exporter = InMemorySpanExporter()
+        config = ObservabilityConfig(PRODUCE_BEDROCK_OTEL_TRACES=True, SAMPLE_RATIO=0.0)
+
+        provider = trace_provider.create_tracer_provider(config, exporter=exporter)
+        run_trace(provider.get_tracer("test"))
+
+        self.assertEqual(exporter.get_finished_spans(), ())
+
+    def test_head_and_tail_ratios_multiply(self):
+        exporter = InMemorySpanExporter()
+        config = ObservabilityConfig(
+            PRODUCE_BEDROCK_OTEL_TRACES=True,
+            SAMPLE_RATIO=0.5,
+            TAIL_SAMPLE_SUCCESS_RATIO=0.1,
+        )
+
+        provider = trace_provider.create_tracer_provider(config, exporter=exporter)
+        tracer = provider.get_tracer("test")
+        for _ in range(4000):
+            tracer.start_span("Agent").end()
+
+        # About 5% of 4000; keeping 10% would mean the decisions overlap.
+        self.assertTrue(140 < len(exporter.get_finished_spans()) < 260)
+
+    def test_nothing_exported_without_traces_enabled(self):
+        exporter = InMemorySpanExporter()
+        config = ObservabilityConfig(PRODUCE_BEDROCK_OTEL_TRACES=False)
+
+        with self.assertLogs(trace_provider.logger, "WARNING"):
+            provider = trace_provider.create_tracer_provider(config, exporter=exporter)
+        run_trace(provider.get_tracer("test"))
+
+        self.assertEqual(exporter.get_finished_spans(), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from InlineAgent.observability.trace_store import TraceWriter, read_traces, zstandard
+
+
+def make_trace(index):
+    return {
+        "sessionId": "session",
+        "eventTime": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "trace": {"orchestrationTrace": {"rationale": {"text": f"step {index}"}}},
+    }
+
+
+class TestTraceWriter(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_and_read(self, count=50, **kwargs):
+        writer = TraceWriter(directory=self.directory, **kwargs)
+        self.addCleanup(writer.close)
+
+        for index in range(count):
+            writer.write("session", make_trace(index))
+        writer.flush()
+
+        return writer, read_traces("session", directory=self.directory)
+
+    def test_appends_json_lines(self):
+        writer, traces = self.write_and_read()
+
+        self.assertEqual(len(traces), 50)
+        self.assertEqual(
+            traces[-1]["trace"]["orchestrationTrace"]["rationale"]["text"], "step 49"
+        )
+        self.assertEqual(traces[0]["eventTime"], "2025-01-01 00:00:00+00:00")
+        with open(writer.path("session"), "rb") as file:
+            self.assertEqual(len(file.read().splitlines()), 50)
+
+    def test_gzip_segments_survive_reopen(self):
+        writer, _ = self.write_and_read(count=10, compression="gzip")
+        writer.close()
+
+        writer = TraceWriter(directory=self.directory, compression="gzip")
+        self.addCleanup(writer.close)
+        writer.write("session", make_trace(10))
+        writer.flush()
+
+        traces = read_traces("session", directory=self.directory)
+        self.assertEqual(len(traces), 11)
+        self.assertTrue(writer.path("session").endswith(".jsonl.gz"))
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_compression(self):
+        _, traces = self.write_and_read(count=20, compression="zstd")
+
+        self.assertEqual(len(traces), 20)
+
+    def test_rotation_keeps_order(self):
+        writer = TraceWriter(directory=self.directory, rotate_bytes=500, buffer_size=1)
+        self.addCleanup(writer.close)
+
+        for index in range(30):
+            writer.write("session", make_trace(index))
+        writer.flush()
+
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "session.1.jsonl")))
+        traces = read_traces("session", directory=self.directory)
+        self.assertEqual(
+            [
+                trace["trace"]["orchestrationTrace"]["rationale"]["text"]
+                for trace in traces
+            ],
+            [f"step {index}" for index in range(30)],
+        )
+
+    def test_reads_legacy_json_list(self):
+        with open(os.path.join(self.directory, "session.json"), "w") as file:
+            json.dump([{"legacy": True}], file)
+
+        _, traces = self.write_and_read(count=2)
+
+        self.assertEqual(traces[0], {"legacy": True})
+        self.assertEqual(len(traces), 3)
+
+    def test_write_after_close_raises(self):
+        writer = TraceWriter(directory=self.directory)
+        writer.close()
+
+        with self.assertRaises(RuntimeError):
+            writer.write("session", make_trace(0))
+
+    def test_flush_raises_when_the_thread_died(self):
+        writer = TraceWriter(directory=self.directory)
+        writer._write_pending = mock.Mock(side_effect=OSError("disk full"))
+        writer.write("session", make_trace(0))
+
+        with self.assertRaises(RuntimeError) as context:
+            writer.flush()
+
+        self.assertIsInstance(context.exception.__cause__, OSError)
+        with self.assertRaises(RuntimeError):
+            writer.flush()
+        with self.assertRaises(RuntimeError):
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
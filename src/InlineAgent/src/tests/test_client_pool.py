@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+
+from botocore.config import Config
+
+from InlineAgent.client_pool import ClientPool, get_client_pool, set_client_pool
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+def fake_factory(session, service_name, region_name, config):
+    return mock.Mock(
+        service_name=service_name,
+        region_name=region_name,
+        config=config,
+        profile=session.profile_name,
+    )
+
+
+class TestClientPool(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reuses_session_and_client(self):
+        pool = ClientPool(client_factory=fake_factory)
+
+        self.assertIs(pool.get_session("default"), pool.get_session("default"))
+        client = pool.get_client("bedrock-agent-runtime", profile="default")
+        self.assertIs(
+            client, pool.get_client("bedrock-agent-runtime", profile="default")
+        )
+        self.assertEqual(client.region_name, "us-east-1")
+        self.assertTrue(client.config.tcp_keepalive)
+
+    def test_key_includes_region_and_config(self):
+        pool = ClientPool(client_factory=fake_factory)
+
+        default = pool.get_client("sts")
+        west = pool.get_client("sts", region="us-west-2")
+        tuned = pool.get_client("sts", config=Config(read_timeout=600))
+
+        self.assertIsNot(default, west)
+        self.assertIsNot(default, tuned)
+        self.assertIs(tuned, pool.get_client("sts", config=Config(read_timeout=600)))
+        self.assertEqual(tuned.config.read_timeout, 600)
+        self.assertTrue(tuned.config.tcp_keepalive)
+
+    def test_evicts_least_recently_used(self):
+        pool = ClientPool(max_size=2, client_factory=fake_factory)
+
+        first = pool.get_client("sts")
+        pool.get_client("bedrock-agent")
+        pool.get_client("sts")
+        pool.get_client("bedrock-agent-runtime")
+
+        self.assertEqual(len(pool), 2)
+        self.assertIs(first, pool.get_client("sts"))
+
+    def test_set_client_pool(self):
+        pool = ClientPool(client_factory=fake_factory)
+        previous = set_client_pool(pool)
+        self.addCleanup(set_client_pool, previous)
+
+        self.assertIs(get_client_pool(), pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from InlineAgent.file_output import FileOutputWriter
+
+
+class TestFileOutputWriter(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make_writer(self, **kwargs):
+        writer = FileOutputWriter(directory=self.directory, chunk_size=7, **kwargs)
+        self.addCleanup(writer.shutdown)
+        return writer
+
+    def test_writes_and_hashes_content(self):
+        data = b"chart bytes " * 100
+        writer = self.make_writer()
+
+        saved = writer.submit("session", "chart.png", data, type="image/png").result()
+
+        self.assertEqual(
+            saved.path, os.path.join(self.directory, "session", "chart.png")
+        )
+        self.assertEqual(saved.size, len(data))
+        self.assertEqual(saved.sha256, hashlib.sha256(data).hexdigest())
+        self.assertFalse(saved.truncated)
+        with open(saved.path, "rb") as file:
+            self.assertEqual(file.read(), data)
+
+    def test_truncates_over_cap(self):
+        writer = self.make_writer(max_bytes=10)
+
+        saved = writer.submit("session", "big.csv", b"x" * 100).result()
+
+        self.assertTrue(saved.truncated)
+        self.assertEqual((saved.size, saved.original_size), (10, 100))
+        self.assertEqual(os.path.getsize(saved.path), 10)
+
+    def test_skips_over_cap(self):
+        writer = self.make_writer(max_bytes=10, truncation="skip")
+
+        saved = writer.submit("session", "big.csv", b"x" * 100).result()
+
+        self.assertIsNone(saved.path)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "session")))
+
+    def test_errors_over_cap(self):
+        writer = self.make_writer(max_bytes=10, truncation="error")
+
+        with self.assertRaises(ValueError):
+            writer.submit("session", "big.csv", b"x" * 100).result()
+
+    def test_keeps_files_inside_session_directory(self):
+        writer = self.make_writer()
+
+        saved = writer.submit("session", "../../escape.txt", b"data").result()
+
+        self.assertEqual(
+            saved.path, os.path.join(self.directory, "session", "escape.txt")
+        )
+
+    def test_recreates_a_removed_session_directory(self):
+        writer = self.make_writer()
+        writer.submit("session", "first.txt", b"data").result()
+        shutil.rmtree(os.path.join(self.directory, "session"))
+
+        saved = writer.submit("session", "second.txt", b"data").result()
+
+        with open(saved.path, "rb") as file:
+            self.assertEqual(file.read(), b"data")
+
+    def test_save_is_awaitable(self):
+        writer = self.make_writer()
+
+        saved = asyncio.run(writer.save("session", "a.txt", memoryview(b"abc")))
+
+        self.assertEqual(saved.size, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
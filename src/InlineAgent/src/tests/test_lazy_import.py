@@ -0,0 +1,59 @@
+import importlib
+import os
+import subprocess
+import sys
+import unittest
+
+import InlineAgent
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(statement):
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            statement + "\nimport sys\nprint('\\n'.join(sys.modules))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=SRC,
+    ).stdout
+    return set(output.split())
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_agent_import_skips_heavy_dependencies(self):
+        modules = loaded_modules("from InlineAgent import InlineAgent, ActionGroup")
+
+        for heavy in ("opentelemetry", "mcp", "rich", "pydantic_settings"):
+            self.assertNotIn(heavy, modules)
+        self.assertNotIn("InlineAgent._version", modules)
+
+    def test_exports_resolve_on_access(self):
+        from InlineAgent.observability import observe
+        from InlineAgent.tools import MCPStdio
+
+        self.assertIs(InlineAgent.observe, observe)
+        self.assertIs(InlineAgent.MCPStdio, MCPStdio)
+        self.assertIn("InlineAgent", dir(InlineAgent))
+        self.assertIsInstance(InlineAgent.__version__, str)
+
+    def test_root_exports_every_subpackage_name(self):
+        # The root once re-exported these subpackages with star imports.
+        for subpackage in ("agent", "observability", "tools", "types"):
+            module = importlib.import_module(f"InlineAgent.{subpackage}")
+            with self.subTest(subpackage=subpackage):
+                self.assertEqual(set(module.__all__) - set(InlineAgent.__all__), set())
+                for name in module.__all__:
+                    self.assertIs(getattr(InlineAgent, name), getattr(module, name))
+
+    def test_unknown_attribute_raises(self):
+        with self.assertRaises(AttributeError):
+            InlineAgent.DoesNotExist
+
+
+if __name__ == "__main__":
+    unittest.main()
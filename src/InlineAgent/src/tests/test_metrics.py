@@ -0,0 +1,189 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from InlineAgent.agent.events import UsageTotals
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.file_output import FileOutputWriter, set_file_writer
+from InlineAgent.metrics import (
+    InvokeMetrics,
+    InvokeResult,
+    MetricsExporter,
+    OTelMetricsExporter,
+    PrometheusMetricsExporter,
+    StatsDMetricsExporter,
+    ToolCall,
+)
+from InlineAgent.testing import FakeAgentRuntime, fake_client_factory
+from InlineAgent.testing.loadgen import ANSWER, make_agent, scenario_script
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+class RecordingExporter(MetricsExporter):
+    def __init__(self):
+        self.exported = list()
+
+    def export(self, metrics):
+        self.exported.append(metrics)
+
+
+def sample_metrics():
+    metrics = InvokeMetrics(agent_name="Agent", session_id="s")
+    metrics.add_usage("orchestrationTrace", "model-a", "Agent", 100, 10, 1)
+    metrics.add_usage("orchestrationTrace", "model-b", "Helper", 50, 5, 1)
+    metrics.add_usage("routingClassifierTrace", "model-a", "Agent", 20, 2, 1)
+    metrics.tool_calls.append(ToolCall("get_weather", "Weather", 0.02))
+    metrics.tool_calls.append(ToolCall("get_weather", "Weather", 0.3, ok=False))
+    metrics.roc_round_trips = 1
+    metrics.requests = 2
+    metrics.time_to_first_token = 0.4
+    metrics.duration_seconds = 1.5
+    return metrics
+
+
+class TestInvokeMetrics(unittest.TestCase):
+    def test_usage_breakdowns_sum_to_totals(self):
+        metrics = sample_metrics()
+
+        self.assertEqual((metrics.input_tokens, metrics.llm_calls), (170, 3))
+        self.assertEqual(metrics.usage_by_model()["model-a"].total_tokens, 132)
+        self.assertEqual(metrics.usage_by_collaborator()["Helper"].input_tokens, 50)
+        self.assertEqual(metrics.usage_by_step()["orchestrationTrace"].llm_calls, 2)
+        self.assertEqual(metrics.tool_seconds(), {"get_weather": [0.02, 0.3]})
+
+    def test_result_is_the_answer(self):
+        result = InvokeResult("Hello", sample_metrics())
+
+        self.assertEqual(result, "Hello")
+        self.assertEqual(result.upper(), "HELLO")
+        self.assertEqual(result.metrics.requests, 2)
+
+
+class TestStreamMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        runtime = FakeAgentRuntime(scenario_script("rich"))
+        self.addCleanup(
+            set_client_pool,
+            set_client_pool(ClientPool(client_factory=fake_client_factory(runtime))),
+        )
+
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        writer = FileOutputWriter(directory=output.name)
+        self.addCleanup(set_file_writer, set_file_writer(writer))
+        self.addCleanup(writer.shutdown)
+
+    async def test_invoke_returns_metrics_and_exports_them(self):
+        agent = make_agent()
+        agent.metrics_exporter = RecordingExporter()
+
+        result = await agent.invoke(input_text="Weather?", session_id="s")
+
+        self.assertEqual(result, ANSWER)
+        metrics = result.metrics
+        self.assertEqual(agent.metrics_exporter.exported, [metrics])
+        self.assertEqual((metrics.requests, metrics.roc_round_trips), (2, 1))
+        self.assertEqual(metrics.input_tokens, 2600)
+        self.assertEqual(list(metrics.usage_by_model()), ["fake.model-v1"])
+        self.assertEqual(list(metrics.usage_by_collaborator()), ["LoadTestAgent"])
+        self.assertEqual([call.name for call in metrics.tool_calls], ["get_weather"])
+        self.assertIsNotNone(metrics.time_to_first_token)
+        self.assertGreaterEqual(metrics.duration_seconds, metrics.time_to_first_token)
+
+    async def test_stream_totals_carry_metrics(self):
+        events = [event async for event in make_agent().stream(input_text="Hi")]
+
+        totals = events[-1]
+        self.assertIsInstance(totals, UsageTotals)
+        self.assertEqual(totals.llm_calls, totals.metrics.llm_calls)
+        self.assertEqual(totals.input_tokens, totals.metrics.input_tokens)
+
+    async def test_failing_exporter_does_not_fail_the_turn(self):
+        agent = make_agent()
+        agent.metrics_exporter = mock.Mock(spec=MetricsExporter)
+        agent.metrics_exporter.export.side_effect = RuntimeError("down")
+
+        with self.assertLogs("InlineAgent.metrics", "ERROR"):
+            result = await agent.invoke(input_text="Weather?", session_id="s")
+
+        self.assertEqual(result, ANSWER)
+
+
+class TestExporters(unittest.TestCase):
+    def test_prometheus_renders_counters_and_histograms(self):
+        exporter = PrometheusMetricsExporter(buckets=(0.1, 1))
+        exporter.export(sample_metrics())
+        exporter.export(sample_metrics())
+
+        text = exporter.render()
+
+        self.assertIn("# TYPE inline_agent_input_tokens_total counter", text)
+        self.assertIn(
+            'inline_agent_input_tokens_total{agent="Agent",step="orchestrationTrace",'
+            'model="model-b",collaborator="Helper"} 100',
+            text,
+        )
+        self.assertIn(
+            'inline_agent_tool_duration_seconds_bucket{agent="Agent",tool="get_weather",'
+            'status="ok",le="0.1"} 2',
+            text,
+        )
+        self.assertIn(
+            'inline_agent_invoke_duration_seconds_count{agent="Agent"} 2', text
+        )
+
+    def test_statsd_lines(self):
+        exporter = StatsDMetricsExporter(tags=False)
+        self.addCleanup(exporter.close)
+
+        lines = exporter.lines(sample_metrics())
+
+        self.assertIn("inline_agent.input_tokens:170|c", lines)
+        self.assertIn("inline_agent.duration:1500.0|ms", lines)
+        exporter.export(sample_metrics())
+
+    def test_statsd_tags(self):
+        exporter = StatsDMetricsExporter()
+        self.addCleanup(exporter.close)
+
+        lines = exporter.lines(sample_metrics())
+
+        self.assertIn(
+            "inline_agent.tool_duration:300.0|ms|#agent:Agent,tool:get_weather,status:error",
+            lines,
+        )
+
+    def test_otel_records_on_meter(self):
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        exporter = OTelMetricsExporter(provider.get_meter("test"))
+
+        exporter.export(sample_metrics())
+
+        data = reader.get_metrics_data()
+        points = {
+            metric.name: metric.data.data_points
+            for resource in data.resource_metrics
+            for scope in resource.scope_metrics
+            for metric in scope.metrics
+        }
+        self.assertEqual(
+            sum(point.value for point in points["inline_agent.tokens"]), 187
+        )
+        self.assertEqual(points["inline_agent.tool.duration"][0].count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from InlineAgent.agent import CollaboratorAgent, InlineAgent
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.knowledge_base import KnowledgeBasePlugin
+from InlineAgent.name_resolver import NameResolver
+
+KNOWLEDGE_BASES = [
+    {"knowledgeBaseSummaries": [{"name": "kb-one", "knowledgeBaseId": "KB1"}]},
+    {"knowledgeBaseSummaries": [{"name": "kb-two", "knowledgeBaseId": "KB2"}]},
+]
+AGENTS = [{"agentSummaries": [{"agentName": "weather", "agentId": "AGENT1"}]}]
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+class FakeBedrockAgent:
+    def __init__(self):
+        self.scans = {"list_knowledge_bases": 0, "list_agents": 0}
+
+    def get_paginator(self, operation):
+        self.scans[operation] += 1
+        pages = KNOWLEDGE_BASES if operation == "list_knowledge_bases" else AGENTS
+        return mock.Mock(paginate=mock.Mock(return_value=iter(pages)))
+
+
+class TestNameResolver(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.bedrock_agent = FakeBedrockAgent()
+        self.sts = mock.Mock()
+        self.sts.get_caller_identity.return_value = {"Account": "123456789012"}
+        clients = {"bedrock-agent": self.bedrock_agent, "sts": self.sts}
+
+        previous = set_client_pool(
+            ClientPool(client_factory=lambda session, name, *_: clients[name])
+        )
+        self.addCleanup(set_client_pool, previous)
+
+    def test_one_scan_resolves_every_page(self):
+        resolver = NameResolver()
+
+        self.assertEqual(resolver.resolve_knowledge_base_id("kb-two"), "KB2")
+        self.assertEqual(resolver.resolve_knowledge_base_id("kb-one"), "KB1")
+        self.assertEqual(self.bedrock_agent.scans["list_knowledge_bases"], 1)
+
+    def test_missing_name_raises(self):
+        resolver = NameResolver()
+
+        with self.assertRaises(ValueError):
+            resolver.resolve_agent_id("missing")
+
+    def test_ttl_and_invalidate(self):
+        resolver = NameResolver(ttl=0)
+        resolver.resolve_agent_id("weather")
+        resolver.resolve_agent_id("weather")
+        self.assertEqual(self.bedrock_agent.scans["list_agents"], 2)
+
+        resolver = NameResolver()
+        resolver.resolve_agent_id("weather")
+        resolver.invalidate(kind="agent", name="weather")
+        resolver.resolve_agent_id("weather")
+        self.assertEqual(self.bedrock_agent.scans["list_agents"], 4)
+
+    def test_account_id_is_cached(self):
+        resolver = NameResolver()
+
+        self.assertEqual(resolver.resolve_account_id(), "123456789012")
+        self.assertEqual(resolver.resolve_account_id(), "123456789012")
+        self.sts.get_caller_identity.assert_called_once()
+
+    def test_persists_to_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, "names.json")
+            NameResolver(cache_file=cache_file).resolve_knowledge_base_id("kb-one")
+
+            warm = NameResolver(cache_file=cache_file)
+            self.assertEqual(warm.resolve_knowledge_base_id("kb-two"), "KB2")
+            self.assertEqual(self.bedrock_agent.scans["list_knowledge_bases"], 1)
+
+    def test_resolve_agent_tree(self):
+        resolver = NameResolver()
+        supervisor = InlineAgent(
+            foundation_model="MOCK_MODEL",
+            instruction="MOCK_INSTRUCTION",
+            agent_name="supervisor",
+            agent_collaboration="SUPERVISOR",
+            collaborators=[
+                CollaboratorAgent(
+                    agent_name="weather",
+                    agent_alias_id="ALIAS",
+                    routing_instruction="weather questions",
+                )
+            ],
+        )
+
+        resolved = resolver.resolve_agent_tree(
+            supervisor,
+            KnowledgeBasePlugin(name="kb-one", description="one"),
+            KnowledgeBasePlugin(name="kb-two", description="two"),
+        )
+
+        self.assertEqual(resolved["agents"], {"weather": "AGENT1"})
+        self.assertEqual(
+            resolved["knowledge_bases"], {"kb-one": "KB1", "kb-two": "KB2"}
+        )
+        self.assertEqual(self.bedrock_agent.scans["list_knowledge_bases"], 1)
+        self.assertEqual(self.bedrock_agent.scans["list_agents"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import io
+import json
+import logging
+import unittest
+from unittest import mock
+
+from InlineAgent.observability import Trace
+from InlineAgent.sink import (
+    BufferedSink,
+    ConsoleSink,
+    JsonSink,
+    LoggingSink,
+    NullSink,
+    get_output_sink,
+    set_output_sink,
+)
+
+orchestration_trace = {
+    "orchestrationTrace": {
+        "rationale": {"text": "Look up the weather"},
+    }
+}
+
+usage_trace = {
+    "orchestrationTrace": {
+        "modelInvocationOutput": {
+            "metadata": {"usage": {"inputTokens": 7, "outputTokens": 3}}
+        }
+    }
+}
+
+
+class TestSinks(unittest.TestCase):
+    def test_console_sink_prints_colored_text(self):
+        file = io.StringIO()
+        sink = ConsoleSink(file=file)
+
+        sink.write("Hello", "green", end="")
+        sink.write(" world")
+
+        self.assertIn("Hello", file.getvalue())
+        self.assertTrue(file.getvalue().endswith(" world\n"))
+
+    def test_json_sink_writes_one_object_per_write(self):
+        file = io.StringIO()
+        sink = JsonSink(file=file)
+
+        sink.write("Hello", "green", kind="answer")
+        sink.markdown("**Files**", kind="files")
+
+        lines = [json.loads(line) for line in file.getvalue().splitlines()]
+        self.assertEqual(
+            lines,
+            [
+                {"kind": "answer", "text": "Hello"},
+                {"kind": "files", "text": "**Files**"},
+            ],
+        )
+
+    def test_logging_sink_joins_partial_lines(self):
+        logger = logging.getLogger("tests.sink")
+        sink = LoggingSink(logger=logger)
+
+        with self.assertLogs(logger, level="INFO") as logs:
+            sink.write("Hel", end="")
+            sink.write("lo", end="")
+            sink.write("!")
+
+        self.assertEqual([record.getMessage() for record in logs.records], ["Hello!"])
+
+    def test_buffered_sink_filters_by_kind(self):
+        sink = BufferedSink()
+
+        sink.write("a", kind="answer")
+        sink.write("t", kind="trace")
+        sink.write("b", kind="answer")
+
+        self.assertEqual(sink.text("answer"), "ab")
+        self.assertEqual(sink.text(), "atb")
+
+    def test_parse_trace_uses_given_sink(self):
+        sink = BufferedSink()
+
+        with mock.patch("builtins.print") as mock_print:
+            Trace.parse_trace(trace=orchestration_trace, agentName="Mock", sink=sink)
+
+        mock_print.assert_not_called()
+        self.assertIn("Thought: Look up the weather", sink.text("trace"))
+
+    def test_null_sink_skips_formatting_but_keeps_usage(self):
+        with mock.patch(
+            "InlineAgent.observability.trace.HighLevelTrace.parse_orchestration_trace"
+        ) as parse:
+            usage = Trace.parse_trace(
+                trace=usage_trace, agentName="Mock", sink=NullSink()
+            )
+
+        parse.assert_not_called()
+        self.assertEqual(usage, (7, 3, 1))
+
+    def test_set_output_sink_returns_previous(self):
+        sink = NullSink()
+        previous = set_output_sink(sink)
+        self.addCleanup(set_output_sink, previous)
+
+        self.assertIs(get_output_sink(), sink)
+        self.assertIs(set_output_sink(previous), sink)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from InlineAgent.action_group import ActionGroup
+from InlineAgent.agent import InlineAgent
+from InlineAgent.agent.events import FilesEvent, ReturnControlEvent, TextChunk
+from InlineAgent.client_pool import ClientPool, set_client_pool
+from InlineAgent.file_output import FileOutputWriter, set_file_writer
+from InlineAgent.sink import NullSink
+from InlineAgent.testing import (
+    FakeAgentRuntime,
+    chunk,
+    default_script,
+    fake_client_factory,
+)
+from InlineAgent.testing.loadgen import get_weather, run_load, scenario_script
+
+
+class FakeSession:
+    def __init__(self, profile_name=None):
+        self.profile_name = profile_name
+        self.region_name = "us-east-1"
+
+
+class TestFakeAgentRuntime(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        writer = FileOutputWriter(directory=output.name)
+        self.addCleanup(set_file_writer, set_file_writer(writer))
+        self.addCleanup(writer.shutdown)
+
+    def use_runtime(self, runtime):
+        previous = set_client_pool(
+            ClientPool(client_factory=fake_client_factory(runtime))
+        )
+        self.addCleanup(set_client_pool, previous)
+
+    def make_agent(self):
+        return InlineAgent(
+            foundation_model="fake.model-v1",
+            instruction="You are a friendly assistant.",
+            agent_name="FakeAgent",
+            action_groups=[
+                ActionGroup(
+                    name="WeatherActionGroup",
+                    tools=[get_weather],
+                    argument_key="Args:",
+                )
+            ],
+            sink=NullSink(),
+        )
+
+    async def test_invoke_answers_from_script(self):
+        self.use_runtime(FakeAgentRuntime(default_script("Sunny and warm.")))
+
+        answer = await self.make_agent().invoke(input_text="Hi", session_id="s")
+
+        self.assertEqual(answer, "Sunny and warm.")
+
+    async def test_resumes_after_return_of_control(self):
+        runtime = FakeAgentRuntime(scenario_script("rich"))
+        self.use_runtime(runtime)
+
+        events = [
+            event
+            async for event in self.make_agent().stream(
+                input_text="Weather?", session_id="s"
+            )
+        ]
+
+        self.assertEqual(runtime.invocations, 2)
+        kinds = [type(event) for event in events]
+        self.assertLess(kinds.index(ReturnControlEvent), kinds.index(FilesEvent))
+        self.assertIn(TextChunk, kinds)
+
+    def test_stamps_trace_events(self):
+        runtime = FakeAgentRuntime(default_script())
+
+        response = runtime.invoke_agent(
+            sessionId="s", agentId="AGENT", agentAliasId="ALIAS", inputText="Hi"
+        )
+        trace = next(iter(response["completion"]))["trace"]
+
+        self.assertEqual(trace["sessionId"], "s")
+        self.assertIn(
+            "agent-alias/AGENT/ALIAS", trace["callerChain"][0]["agentAliasArn"]
+        )
+        self.assertIsInstance(trace["eventTime"], datetime)
+
+    def test_tokens_per_second_paces_chunks(self):
+        runtime = FakeAgentRuntime(
+            [chunk("one two three four")] * 2, tokens_per_second=200
+        )
+
+        start = time.perf_counter()
+        list(runtime.invoke_inline_agent(sessionId="s")["completion"])
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+        self.assertEqual(runtime.events, 2)
+
+
+class TestLoadgen(unittest.TestCase):
+    def test_reports_throughput_latency_and_memory(self):
+        with mock.patch("InlineAgent.client_pool.boto3.Session", FakeSession):
+            result = run_load(
+                api="invoke", scenario="tools", sessions=4, turns=2, concurrency=2
+            )
+
+        self.assertEqual(result["turns"], 8)
+        self.assertEqual(result["requests"], 16)
+        self.assertGreater(result["turns_per_second"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertIn("peak_kib_per_session", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from InlineAgent.testing.mcp_echo_server import server_parameters
+from InlineAgent.tools import MCPStdio
+
+
+async def connect(**kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await MCPStdio.create(server_params=server_parameters(), **kwargs)
+
+
+class TestMCPStdio(unittest.IsolatedAsyncioTestCase):
+    async def test_schema_cache_skips_listing_on_reconnect(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mcp_tools.json")
+
+            server = await connect(tools_to_use={"echo"}, schema_cache=path)
+            await server.cleanup()
+            self.assertEqual(
+                [function["name"] for function in server.function_schema["functions"]],
+                ["echo"],
+            )
+
+            with open(path) as file:
+                cached = json.load(file)
+            tools = cached["servers"][server.server_key]["tools"]
+            tools[0]["description"] = "Cached echo."
+            with open(path, "w") as file:
+                json.dump(cached, file)
+
+            server = await connect(tools_to_use={"echo"}, schema_cache=path)
+            await server.cleanup()
+
+        self.assertEqual(
+            server.function_schema["functions"][0]["description"], "Cached echo."
+        )
+
+    async def test_calls_are_pipelined_up_to_max_in_flight(self):
+        server = await connect(max_in_flight=2)
+        try:
+            slow_echo = server.callable_tools["slow_echo"]
+
+            start = time.perf_counter()
+            for index in range(4):
+                await slow_echo(text=str(index), seconds=0.2)
+            sequential = time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(slow_echo(text=str(index), seconds=0.2) for index in range(4))
+            )
+            pipelined = time.perf_counter() - start
+        finally:
+            await server.cleanup()
+
+        self.assertEqual(results, ["0", "1", "2", "3"])
+        self.assertGreaterEqual(pipelined, 0.4)
+        self.assertLess(pipelined, sequential)
+
+    async def test_multi_part_results(self):
+        server = await connect()
+        try:
+            parts = [
+                part
+                async for part in server.iter_tool_result(
+                    "parts", {"count": 3, "size": 2}
+                )
+            ]
+            joined = await server.callable_tools["parts"](count=2, size=3)
+        finally:
+            await server.cleanup()
+
+        self.assertEqual(parts, ["00", "11", "22"])
+        self.assertEqual(joined, "000\n111")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import signal
+import tempfile
+import unittest
+
+from InlineAgent.testing.mcp_echo_server import server_parameters
+from InlineAgent.tools import MCPPool, PooledMCPServer
+
+
+class TestMCPPool(unittest.IsolatedAsyncioTestCase):
+    def make_pool(self, **kwargs):
+        pool = MCPPool(**kwargs)
+        self.addAsyncCleanup(pool.close)
+        return pool
+
+    async def test_clients_share_one_connection(self):
+        pool = self.make_pool()
+
+        clients = await asyncio.gather(
+            *(
+                PooledMCPServer.create(server_params=server_parameters(), pool=pool)
+                for _ in range(10)
+            )
+        )
+        answers = await asyncio.gather(
+            *(
+                client.callable_tools["echo"](text=str(index))
+                for index, client in enumerate(clients)
+            )
+        )
+
+        self.assertEqual(answers, [str(index) for index in range(10)])
+        self.assertEqual((pool.starts, len(pool)), (1, 1))
+        self.assertEqual(clients[0].function_schema, clients[-1].function_schema)
+
+    async def test_lost_connection_is_replaced_and_call_retried(self):
+        pool = self.make_pool(retries=1)
+        client = await PooledMCPServer.create(
+            server_params=server_parameters(), pool=pool
+        )
+        pid = int(await client.call_tool("pid"))
+
+        call = asyncio.ensure_future(
+            client.call_tool("slow_echo", {"text": "retried", "seconds": 0.3})
+        )
+        await asyncio.sleep(0.1)
+        os.kill(pid, signal.SIGKILL)
+
+        self.assertEqual(await call, "retried")
+        self.assertEqual(pool.starts, 2)
+        self.assertNotEqual(int(await client.call_tool("pid")), pid)
+
+    async def test_idle_connections_stop_and_restart_lazily(self):
+        pool = self.make_pool(idle_timeout=0.2, ping_interval=None)
+        client = await PooledMCPServer.create(
+            server_params=server_parameters(), pool=pool
+        )
+
+        await asyncio.sleep(0.5)
+        self.assertEqual(len(pool), 0)
+
+        self.assertEqual(await client.call_tool("echo", {"text": "back"}), "back")
+        self.assertEqual((pool.starts, len(pool)), (2, 1))
+
+    async def test_live_servers_are_capped(self):
+        pool = self.make_pool(max_servers=1)
+        first, second = [
+            await PooledMCPServer.create(
+                server_params=server_parameters(env={"SERVER": name}), pool=pool
+            )
+            for name in ("first", "second")
+        ]
+
+        await first.call_tool("echo", {"text": "first"})
+        await second.call_tool("echo", {"text": "second"})
+
+        self.assertEqual((pool.starts, len(pool)), (4, 1))
+
+    async def test_dead_connection_frees_its_slot(self):
+        pool = self.make_pool(max_servers=1, idle_timeout=None, ping_interval=None)
+        first, second = [
+            await PooledMCPServer.create(
+                server_params=server_parameters(env={"SERVER": name}), pool=pool
+            )
+            for name in ("first", "second")
+        ]
+        pid = int(await first.call_tool("pid"))
+        os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.2)
+
+        answer = await asyncio.wait_for(
+            second.call_tool("echo", {"text": "second"}), timeout=10
+        )
+        self.assertEqual(answer, "second")
+        self.assertEqual(len(pool), 1)
+
+    async def test_upgraded_server_is_listed_again(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+            file.write("1")
+        self.addCleanup(os.remove, file.name)
+        pool = self.make_pool()
+        client = await PooledMCPServer.create(
+            server_params=server_parameters(env={"VERSION_FILE": file.name}),
+            pool=pool,
+        )
+
+        def version_description(tools):
+            (tool,) = [tool for tool in tools if tool["name"] == "version"]
+            return tool["description"]
+
+        self.assertIn("1", version_description(await client.list_tools()))
+
+        with open(file.name, "w") as version_file:
+            version_file.write("2")
+        os.kill(int(await client.call_tool("pid")), signal.SIGKILL)
+        await asyncio.sleep(0.2)
+
+        self.assertEqual(await client.call_tool("version"), "2")
+        self.assertIn("2", version_description(await client.list_tools()))
+        self.assertEqual(pool.starts, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,6 +35,18 @@ from termcolor import colored
 from rich.console import Console
 from rich.markdown import Markdown
 
+# Per-invoke metrics come from the InlineAgent SDK when it is installed;
+# without it invoke() returns the plain answer string.
+try:
+    from InlineAgent.metrics import (
+        InvokeMetrics,
+        InvokeResult,
+        export_metrics,
+        get_metrics_exporter,
+    )
+except ImportError:
+    InvokeMetrics = None
+
 
 PYTHON_TIMEOUT = 180
 PYTHON_RUNTIME = "python3.12"
@@ -2019,10 +2031,20 @@ class AgentsForAmazonBedrock:
             trace_level (str, optional): The level of trace. Defaults to "none". Possible values are "none", "all", "core".
 
         Returns:
-            str: The answer from the agent.
+            str: The answer from the agent. With the InlineAgent SDK installed
+                it is an InvokeResult, with the token usage and timings of the
+                turn on ``.metrics``.
         """
 
         _time_before_call = datetime.datetime.now()
+        _perf_start = time.perf_counter()
+        _metrics = None
+        if InvokeMetrics is not None:
+            _metrics = InvokeMetrics(
+                agent_name=agent_id, session_id=session_id, requests=1
+            )
+        # Model of each model invocation, by trace id, for its usage.
+        _models = {}
 
         _agent_resp = self._bedrock_agent_runtime_client.invoke_agent(
             inputText=input_text,
@@ -2050,7 +2072,7 @@ class AgentsForAmazonBedrock:
             _error_message = f"API Response was not 200: {_agent_resp}"
             if enable_trace and trace_level == "all":
                 print(_error_message)
-            return _error_message
+            return self._invoke_result(_error_message, _metrics, _perf_start)
 
         _total_in_tokens = 0
         _total_out_tokens = 0
@@ -2082,6 +2104,10 @@ class AgentsForAmazonBedrock:
                     _agent_answer += _tmp_agent_answer
 
                     if _num_response_chunks == 0:
+                        if _metrics is not None:
+                            _metrics.time_to_first_token = (
+                                time.perf_counter() - _perf_start
+                            )
                         _time_to_first_token = (
                             datetime.datetime.now() - _overall_start_time
                         )
@@ -2122,6 +2148,11 @@ class AgentsForAmazonBedrock:
                                 print(colored(f"Citations: {_citations}", "blue"))
 
                 if "trace" in _event and enable_trace:
+                    if _metrics is not None:
+                        self._record_usage(
+                            _metrics, _models, _event["trace"], agent_id
+                        )
+
                     if trace_level == "all":
                         print("---")
                     else:
@@ -2575,7 +2606,7 @@ class AgentsForAmazonBedrock:
                 _agent_answer, _citations_event, enable_trace, trace_level
             )
 
-            return _agent_answer
+            return self._invoke_result(_agent_answer, _metrics, _perf_start)
 
         except Exception as e:
             print(f"Caught exception while processing input to invokeAgent:\n")
@@ -2587,6 +2618,41 @@ class AgentsForAmazonBedrock:
             print(f"Error: {e}")
             raise Exception("Unexpected exception: ", e)
 
+    @staticmethod
+    def _record_usage(metrics, models: dict, trace_data: dict, agent_name: str):
+        """Add the usage of one model invocation trace to ``metrics``, keyed
+        like ``InlineAgent.invoke`` does: step type, model, collaborator."""
+        _trace = trace_data.get("trace", {})
+        _step_type = next(iter(_trace), "")
+        _step = _trace.get(_step_type)
+        if not isinstance(_step, dict):
+            return
+
+        _model_input = _step.get("modelInvocationInput") or {}
+        if "foundationModel" in _model_input:
+            models[_model_input.get("traceId", "")] = _model_input["foundationModel"]
+
+        _model_output = _step.get("modelInvocationOutput")
+        if _model_output is None:
+            return
+        _usage = _model_output.get("metadata", {}).get("usage", {})
+        metrics.add_usage(
+            _step_type,
+            models.pop(_model_output.get("traceId", ""), ""),
+            trace_data.get("collaboratorName") or agent_name,
+            _usage.get("inputTokens", 0),
+            _usage.get("outputTokens", 0),
+            1,
+        )
+
+    @staticmethod
+    def _invoke_result(answer: str, metrics, start: float) -> str:
+        if metrics is None:
+            return answer
+        metrics.duration_seconds = time.perf_counter() - start
+        export_metrics(metrics, get_metrics_exporter())
+        return InvokeResult(answer, metrics)
+
     def invoke_roc(
         self,
         input_text: str,